@@ -0,0 +1,57 @@
+"""
+IntelliFit — Build the Workout Space Docker image locally
+Run: python deploy/build_workout_space.py [--tag workout-space] [--context DIR]
+
+The Space's Dockerfile copies model_output_scanner.py, which lives in
+ml_models/Workout-Plan_Generating/ and has no copy under deploy/.  This
+stages deploy/hf-workout-space plus those shared modules in one build
+context — the same files upload_to_hf.py commits to the Space — and runs
+docker build on it.
+"""
+import argparse, shutil, subprocess, sys, tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent  # repo root
+
+WORKOUT_SPACE_DIR = ROOT / "deploy/hf-workout-space"
+
+# Modules the Space imports from the service tree — shipped next to the Space
+# files instead of keeping a copy under deploy/
+WORKOUT_SPACE_SHARED = [ROOT / "ml_models/Workout-Plan_Generating/model_output_scanner.py"]
+
+def workout_space_files():
+    """[(path in the Space repo, local path)] — Space folder + shared modules."""
+    shared = {path.name for path in WORKOUT_SPACE_SHARED}
+    files = [(path.relative_to(WORKOUT_SPACE_DIR).as_posix(), path)
+             for path in sorted(WORKOUT_SPACE_DIR.rglob("*"))
+             if path.is_file() and "__pycache__" not in path.parts
+             and path.name not in shared]      # a stale local copy never wins
+    return files + [(path.name, path) for path in WORKOUT_SPACE_SHARED]
+
+def stage(context: Path):
+    for name, path in workout_space_files():
+        target = context / name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(path, target)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tag", default="workout-space", help="Docker image tag")
+    parser.add_argument("--context", help="Stage the build context here and keep it "
+                                          "(default: a temporary directory)")
+    args = parser.parse_args()
+    if not args.context and shutil.which("docker") is None:
+        sys.exit("docker not found — pass --context DIR to only stage the build context")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        context = Path(args.context or tmp)
+        context.mkdir(parents=True, exist_ok=True)
+        stage(context)
+        print(f"Build context: {context}")
+        if shutil.which("docker") is None:
+            sys.exit("docker not found — context staged, build it with: "
+                     f"docker build -t {args.tag} {context}")
+        sys.exit(subprocess.call(["docker", "build", "-t", args.tag, str(context)]))
+
+if __name__ == "__main__":
+    main()
@@ -32,6 +32,7 @@ import gradio as gr
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from peft import PeftModel
 from huggingface_hub import snapshot_download
+from model_output_scanner import scan_model_output
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 log = logging.getLogger("workout-space")
@@ -257,25 +258,9 @@ def enrich_exercise_with_metadata(exercise: dict) -> dict:
 def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: str = "Muscle",
                                        req_level: str = "Intermediate", req_equipment: List[str] = None) -> Dict[str, Any]:
     """Parse model output — mirrors extract_workout_from_model_output in workout_api_direct.py."""
-    plan_name_match = re.search(r'"plan_name":\s*"([^"]+)"', text)
-    plan_name = plan_name_match.group(1) if plan_name_match else f"AI {req_goal} Plan"
-
-    exercise_pattern = r'"name":\s*"([^"]+)".*?"sets":\s*"?(\d+)"?.*?"reps":\s*"([^"]+)".*?"rest":\s*"([^"]+)"'
-    seen_global: set = set()
-    exercises_data: List[Dict] = []
-    for match in re.finditer(exercise_pattern, text):
-        ex_name = match.group(1).strip()
-        if ex_name.lower() in seen_global: continue
-        seen_global.add(ex_name.lower())
-        exercise = {"name": ex_name, "sets": match.group(2), "reps": match.group(3), "rest": match.group(4)}
-        search_start = match.start()
-        next_name = text.find('"name":', match.end())
-        window = text[search_start:next_name if next_name > 0 else min(len(text), search_start+500)]
-        m = re.search(r'"target_muscles":\s*\[([^\]]+)\]', window)
-        if m: exercise["target_muscles"] = re.findall(r'"([^"]+)"', m.group(1))
-        m = re.search(r'"equipment":\s*"([^"]+)"', window)
-        if m: exercise["equipment"] = m.group(1)
-        exercises_data.append(exercise)
+    scanned = scan_model_output(text)
+    plan_name = scanned.plan_name or f"AI {req_goal} Plan"
+    exercises_data: List[Dict] = scanned.exercises
 
     if req_equipment:
         eq_lower = [e.lower() for e in req_equipment]
@@ -292,27 +277,14 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
     }
     templates = day_templates.get(req_days, day_templates[4])
 
-    day_pattern = r'"day_number":\s*(\d+).*?"day_name":\s*"([^"]+)".*?"focus_areas":\s*\[([^\]]+)\]'
-    day_matches = list(re.finditer(day_pattern, text))
     days_data: List[Dict] = []
 
-    if day_matches:
-        for i, match in enumerate(day_matches):
-            day_number = int(match.group(1))
-            day_name = match.group(2)
-            focus_areas = re.findall(r'"([^"]+)"', match.group(3))
-            start_pos = match.end()
-            end_pos = day_matches[i+1].start() if i+1 < len(day_matches) else len(text)
-            day_text = text[start_pos:end_pos]
-            day_exercises, seen_day = [], set()
-            for em in re.finditer(exercise_pattern, day_text):
-                n = em.group(1).strip()
-                if n.lower() in seen_day: continue
-                seen_day.add(n.lower())
-                day_exercises.append({"name":n,"sets":em.group(2),"reps":em.group(3),"rest":em.group(4)})
-            days_data.append({"day_number":day_number,"day_name":day_name,
+    if scanned.days:
+        for d in scanned.days:
+            focus_areas = d["focus_areas"]
+            days_data.append({"day_number":d["day_number"],"day_name":d["day_name"],
                                "focus_areas":focus_areas,"focus":", ".join(focus_areas),
-                               "exercises":day_exercises})
+                               "exercises":d["exercises"]})
     else:
         muscle_keywords = {
             "chest":["chest","pec","bench","fly"],"back":["back","lat","row","pulldown"],
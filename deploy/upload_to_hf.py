@@ -4,7 +4,9 @@ Run: python deploy/upload_to_hf.py --token YOUR_HF_TOKEN
 """
 import argparse, os, sys
 from pathlib import Path
-from huggingface_hub import HfApi, login
+from huggingface_hub import CommitOperationAdd, HfApi, login
+
+from build_workout_space import workout_space_files
 
 # ── Config ────────────────────────────────────────────────────────────────────
 HF_USER            = "youssefeemad"
@@ -18,7 +20,6 @@ ROOT = Path(__file__).parent.parent  # repo root
 WORKOUT_MODEL_DIR  = ROOT / "ml_models/Workout-Plan_Generating/models/workout-generator-v3"
 NUTRITION_CKPT_DIR = ROOT / "ml_models/Nutrition-Plan_Generating/checkpoint_to_resume (1)/checkpoint-2412"
 
-WORKOUT_SPACE_DIR  = ROOT / "deploy/hf-workout-space"
 NUTRITION_SPACE_DIR= ROOT / "deploy/hf-nutrition-space"
 
 def ensure_repo(api: HfApi, repo_id: str, repo_type: str):
@@ -43,6 +44,21 @@ def upload_folder(api: HfApi, folder: Path, repo_id: str, repo_type: str, label:
     )
     print(f"  ✓ Done — https://huggingface.co/{repo_type}s/{repo_id}")
 
+def upload_files(api: HfApi, files, repo_id: str, repo_type: str, label: str):
+    """Push [(path in repo, local path)] as ONE commit, so a Space rebuilds once
+    with every file its Dockerfile copies already present."""
+    print(f"\n[{label}] Uploading {len(files)} files → {repo_id}")
+    for name, path in files:
+        print(f"  → {name} (from {path.parent.relative_to(ROOT)})")
+    api.create_commit(
+        repo_id=repo_id,
+        repo_type=repo_type,
+        operations=[CommitOperationAdd(path_in_repo=name, path_or_fileobj=str(path))
+                    for name, path in files],
+        commit_message=f"Upload {label}",
+    )
+    print(f"  ✓ Done — https://huggingface.co/{repo_type}s/{repo_id}")
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--token", required=True, help="Hugging Face write token")
@@ -70,7 +86,7 @@ def main():
 
     # ── Upload Space files ─────────────────────────────────────────────────────
     if not args.skip_spaces:
-        upload_folder(api, WORKOUT_SPACE_DIR,   WORKOUT_SPACE,   "space", "Workout Space files")
+        upload_files(api, workout_space_files(), WORKOUT_SPACE, "space", "Workout Space files")
         upload_folder(api, NUTRITION_SPACE_DIR, NUTRITION_SPACE, "space", "Nutrition Space files")
     else:
         print("\n[Skipping Space file uploads]")
@@ -0,0 +1,204 @@
+"""
+Benchmark for /foods/search: the old linear substring scan vs FoodIndex.
+
+food_db_halal.json is built from the Kaggle CSVs (build_food_db.py) and
+isn't checked in, so a stand-in with the same shape is generated: ~20k
+Egyptian rows named like the Egyptian dataset ("ful medames , with oil",
+no health_score) and ~40k USDA rows named like FoodData Central
+("Chicken, broilers or fryers, breast, meat only, roasted", health_score
+0–100).
+
+The query log follows what the app sends: Zipf-distributed target foods;
+typeahead (every prefix as the member types), full names, words out of
+order, Arabic transliteration variants (molokhia → mulukhiya, ful → foul)
+and typos; a third of the queries filtered to one source.
+
+Reported per engine: queries/s on one core, p50/p99 latency, and how
+often the food the member was looking for is in the results (full-name
+queries only — a typeahead prefix has no single target).  The index is
+run cold (no result cache) and with its default LRU result cache.
+
+Run with: python benchmarks/bench_food_search.py
+"""
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from food_index import FoodIndex, normalize  # noqa: E402
+
+QUERIES = 20_000
+LIMIT = 20
+
+EGY_DISHES = [
+    "ful medames", "taameya", "koshari", "molokhia", "mahshi kousa", "mahshi wara enab",
+    "fattah", "feteer meshaltet", "basbousa", "konafa", "om ali", "hawawshi",
+    "roz bel laban", "shorbat adas", "bamya", "torly", "baba ghanoug", "tahina",
+    "gebna domiati", "gebna areesh", "mish", "baladi bread", "besara", "kofta",
+    "kebda eskandarani", "sayadeya", "shakshuka", "freekeh", "mesaka'a", "macarona bechamel",
+    "hummus", "lentils", "fasolia", "bisella", "kharshoof", "mulukhiya soup", "sobia",
+    "karkade", "sahlab", "ghorayeba", "kahk", "qatayef", "roz moammar", "hamam mahshi",
+    "kaware'", "lesan asfour", "gollash", "batates", "salata baladi", "torshi",
+]
+EGY_QUALIFIERS = [
+    "cooked", "with oil", "with tomato", "fried", "boiled", "home made", "canned",
+    "with meat", "with rice", "with ghee", "dry", "stewed", "grilled", "stuffed",
+    "salad", "sauce", "with onion", "with garlic", "street style", "oven baked",
+]
+USDA_FOODS = [
+    "Chicken", "Beef", "Lamb", "Turkey", "Fish", "Salmon", "Tuna", "Rice", "Bread",
+    "Cheese", "Milk", "Yogurt", "Egg", "Beans", "Lentils", "Chickpeas", "Pasta",
+    "Potatoes", "Tomatoes", "Cucumber", "Spinach", "Broccoli", "Carrots", "Onions",
+    "Apples", "Oranges", "Bananas", "Dates", "Figs", "Almonds", "Walnuts", "Peanuts",
+    "Oats", "Wheat flour", "Cereal", "Crackers", "Cookies", "Chocolate", "Juice", "Soup",
+]
+USDA_PARTS = [
+    "breast", "thigh", "ground", "whole", "raw", "canned", "frozen", "dried", "fresh",
+    "low fat", "whole grain", "white", "brown", "sweetened", "unsweetened", "plain",
+    "meat only", "with skin", "light", "enriched",
+]
+USDA_PREP = [
+    "cooked", "roasted", "boiled", "baked", "grilled", "fried", "steamed", "stewed",
+    "braised", "microwaved", "ready-to-eat", "prepared from recipe", "drained solids",
+    "without salt", "with salt",
+]
+BRANDS = ["ALMARAI", "JUHAYNA", "DOMTY", "KELLOGG'S", "NESTLE", "HEINZ", "DANONE", "EDITA"]
+VARIANTS = {
+    "molokhia": ["mulukhiya", "molokheya", "mloukhia"], "koshari": ["kushari", "koshary"],
+    "taameya": ["ta'ameya", "tamiya", "taamiya"], "ful": ["foul", "fool"],
+    "konafa": ["kunafa", "knafeh"], "basbousa": ["basboosa", "basbusa"],
+    "fattah": ["fatta", "fatteh"], "hawawshi": ["hawawshy"], "shakshuka": ["shakshouka"],
+    "feteer": ["fetir", "fateer"], "tahina": ["tahini", "tehina"], "bamya": ["bamia", "okra"],
+    "chickpeas": ["chick peas", "chikpeas"], "yogurt": ["yoghurt", "yougurt"],
+}
+
+
+def build_db(rng):
+    foods, seen = [], set()
+
+    def add(name, source, score):
+        if name.lower() in seen:
+            return
+        seen.add(name.lower())
+        prefix = "egy" if source == "egyptian" else "usda"
+        foods.append({"id": f"{prefix}_{len(foods):05d}", "name": name, "source": source,
+                      "per_100g": {"calories_kcal": rng.randint(20, 600)},
+                      "health_score": score})
+
+    while len(foods) < 20_000:
+        dish = rng.choice(EGY_DISHES)
+        quals = rng.sample(EGY_QUALIFIERS, rng.randint(0, 3))
+        add(" , ".join([dish] + quals), "egyptian", None)
+    while len(foods) < 60_000:
+        parts = [rng.choice(USDA_FOODS)] + rng.sample(USDA_PARTS, rng.randint(0, 2))
+        parts += rng.sample(USDA_PREP, rng.randint(0, 2))
+        name = ", ".join(parts)
+        if rng.random() < 0.2:
+            name = f"{rng.choice(BRANDS)}, {name}"
+        add(name, "usda", round(rng.uniform(0, 100), 1))
+    return foods
+
+
+def typo(word, rng):
+    if len(word) < 4:
+        return word
+    i = rng.randrange(1, len(word) - 1)
+    kind = rng.random()
+    if kind < 0.4:
+        return word[:i] + word[i + 1:]                          # dropped letter
+    if kind < 0.7:
+        return word[:i] + word[i + 1] + word[i] + word[i + 2:]  # swapped letters
+    return word[:i] + word[i] + word[i:]                        # doubled letter
+
+
+def query_log(foods, rng):
+    """(query, source filter, target food id or None) like the app sends them."""
+    popular = rng.sample(foods, 2_000)
+    weights = [1.0 / (rank + 1) for rank in range(len(popular))]
+    log = []
+    while len(log) < QUERIES:
+        food = rng.choices(popular, weights)[0]
+        words = normalize(food["name"])
+        source = food["source"] if rng.random() < 0.33 else None
+        kind = rng.random()
+        if kind < 0.45:      # typeahead: every prefix of the first two words
+            text = " ".join(words[:2])
+            log.extend((text[:n], source, None) for n in range(1, len(text) + 1))
+            continue
+        if kind < 0.65:
+            query = " ".join(words)
+        elif kind < 0.75:
+            query = " ".join(reversed(words))
+        elif kind < 0.9:
+            query = " ".join(rng.choice(VARIANTS[w]) if w in VARIANTS else w for w in words)
+        else:                # one typo, in the longest word
+            longest = max(words, key=len)
+            query = " ".join(typo(w, rng) if w is longest else w for w in words)
+        log.append((query, source, food["id"]))
+    return log[:QUERIES]
+
+
+def linear_search(foods, q, source=None, limit=LIMIT):
+    """The previous /foods/search body."""
+    q_lower = q.lower()
+    results = []
+    for food in foods:
+        if source and food.get("source") != source:
+            continue
+        if q_lower in food.get("name", "").lower():
+            results.append({
+                "id":      food.get("id"),
+                "name":    food.get("name"),
+                "source":  food.get("source"),
+                "per_100g": food.get("per_100g", {}),
+                "health_score": food.get("health_score"),
+            })
+        if len(results) >= limit:
+            break
+    return results
+
+
+def run(search, log):
+    latencies, found, targeted = [], 0, 0
+    t0 = time.perf_counter()
+    for query, source, target in log:
+        t = time.perf_counter()
+        results = search(query, source)
+        latencies.append(time.perf_counter() - t)
+        if target is not None:
+            targeted += 1
+            found += any(r["id"] == target for r in results)
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return (len(log) / wall, latencies[len(latencies) // 2] * 1e6,
+            latencies[int(len(latencies) * 0.99)] * 1e6, found / targeted)
+
+
+def main():
+    rng = random.Random(25)
+    foods = build_db(rng)
+    log = query_log(foods, rng)
+    t0 = time.perf_counter()
+    index = FoodIndex(foods)
+    build_s = time.perf_counter() - t0
+    cold = FoodIndex(foods, cache_size=0)
+    print(f"{len(foods):,} foods, {len(log):,} queries "
+          f"({len({q for q, _, _ in log}):,} distinct); index built in {build_s:.2f} s")
+    print(f"{'engine':<26}{'q/s':>9}{'p50 µs':>9}{'p99 µs':>10}{'found':>8}")
+    engines = (
+        ("before (linear scan)", lambda q, s: linear_search(foods, q, s), log[:2_000]),
+        ("after (index, no cache)", lambda q, s: cold.search(q, s, LIMIT), log),
+        ("after (index + LRU cache)", lambda q, s: index.search(q, s, LIMIT), log),
+    )
+    for label, search, queries in engines:
+        qps, p50, p99, found = run(search, queries)
+        print(f"{label:<26}{qps:>9,.0f}{p50:>9,.0f}{p99:>10,.0f}{found:>8.1%}")
+    print("  (linear scan timed on the first 2,000 queries)")
+    print(f"  index stats: {index.stats()}")
+
+
+if __name__ == "__main__":
+    main()
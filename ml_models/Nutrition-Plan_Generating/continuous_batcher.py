@@ -0,0 +1,557 @@
+"""
+continuous_batcher.py
+---------------------
+Continuous (token-level) batching scheduler for the nutrition generator.
+
+``model.generate`` runs one request to completion: a 3-day plan is
+~3000–4500 tokens, so every other request waits minutes for the GPU.  The
+scheduler here instead advances every in-flight request by one token per
+step and admits waiting requests between steps:
+
+  1. admit   — while a slot is free, pop a waiting request and prefill its
+               prompt (this yields its first token);
+  2. decode  — one batched forward pass over every sequence that was
+               already running, one new token each;
+  3. retire  — a sequence whose root JSON object has closed
+               (``JsonRootTracker``), that emitted EOS, hit its
+               token budget or whose caller went away is removed at once,
+               its KV cache released and its slot handed to the next
+               request on the following step.
+
+Each sequence keeps its own KV cache (``Sequence.past``), its own
+``JsonRootTracker`` and its own token budget, so requests of very
+different lengths share the GPU without padding to the longest one.
+Decoding a batch costs little more than decoding a single sequence while
+the model is memory-bound, so aggregate tokens/sec grows with the number
+of concurrent requests.
+
+The scheduler is model-agnostic.  A step model provides::
+
+    eos_token_id: int
+    prefill(seq) -> int                   # fills seq.past, returns 1st token;
+                                          # sets seq.cached_prompt_tokens on a
+                                          # shared-prefix hit (prefix_cache.py)
+    decode(seqs) -> list[int]             # one token per seq, updates seq.past
+    token_text(token_id) -> str           # text of one token (for JSON tracking)
+    release(seq) -> None                  # drop seq's KV cache
+    reset() -> None                       # forget any batch-level state after an error
+
+``hf_step_model.HFStepModel`` implements it for the transformers model;
+``ScriptedStepModel`` below is a CPU stand-in (character tokens, a list as
+the "KV cache", optional simulated step latency, the same shared-prefix
+reuse) for the unit tests and the benchmark.
+
+The loop runs on one dedicated thread; ``await batcher.submit(ids)`` is
+the request-handler entry point, and ``async for tokens, result in
+batcher.stream(ids)`` hands tokens over as they are generated.  ``step()`` can also be driven directly,
+which is what the tests do.
+
+Only Python standard library is used, so the scheduler can be exercised
+without torch installed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import threading
+import time
+from collections import deque
+from typing import (
+    Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Sequence as Seq, Tuple,
+)
+
+from prefix_cache import PrefixCache
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# PER-SEQUENCE STATE
+# ══════════════════════════════════════════════════════════════════════════════
+
+class JsonRootTracker:
+    """Incremental brace/string state: has the root JSON object closed yet?
+
+    ``feed`` takes the text of newly generated tokens only, so the cost per
+    token is the length of that token, not of the whole output.
+    """
+
+    __slots__ = ("depth", "in_str", "esc", "started", "closed")
+
+    def __init__(self) -> None:
+        self.depth = 0
+        self.in_str = False
+        self.esc = False
+        self.started = False
+        self.closed = False
+
+    def feed(self, text: str) -> bool:
+        if self.closed:
+            return True
+        for ch in text:
+            if self.esc:
+                self.esc = False
+                continue
+            if ch == "\\" and self.in_str:
+                self.esc = True
+                continue
+            if ch == '"':
+                self.in_str = not self.in_str
+                continue
+            if self.in_str:
+                continue
+            if ch == '{':
+                self.depth += 1
+                self.started = True
+            elif ch == '}':
+                self.depth -= 1
+                if self.started and self.depth == 0:
+                    self.closed = True
+                    return True
+        return False
+
+
+class Sequence:
+    """One request in the running batch."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, prompt_ids: Seq[int], max_new_tokens: int,
+                 on_done: Optional[Callable[["Sequence"], None]] = None,
+                 on_token: Optional[Callable[["Sequence", int], None]] = None) -> None:
+        self.seq_id = next(Sequence._ids)
+        self.prompt_ids = list(prompt_ids)
+        self.max_new_tokens = max_new_tokens
+        self.generated: List[int] = []
+        self.json = JsonRootTracker()
+        self.on_done = on_done
+        self.on_token = on_token
+        # Owned by the step model: KV cache and any per-sequence sampling state
+        self.past: Any = None
+        self.model_state: Dict[str, Any] = {}
+        self.cached_prompt_tokens = 0
+        self.prefill_ms = 0.0
+        self.cancelled = False
+        self.finish_reason: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.t_submit = time.perf_counter()
+        self.t_first_token: Optional[float] = None
+        self.t_done: Optional[float] = None
+
+    def __repr__(self) -> str:
+        return (f"Sequence(id={self.seq_id}, prompt={len(self.prompt_ids)}, "
+                f"generated={len(self.generated)}, finish={self.finish_reason})")
+
+
+class GenerationResult:
+    """What ``submit`` returns: the new token ids and why generation stopped."""
+
+    __slots__ = ("token_ids", "finish_reason", "prompt_tokens", "cached_prompt_tokens",
+                 "prefill_ms", "queue_ms", "generation_ms")
+
+    def __init__(self, seq: Sequence) -> None:
+        self.token_ids = seq.generated
+        self.finish_reason = seq.finish_reason
+        self.prompt_tokens = len(seq.prompt_ids)
+        self.cached_prompt_tokens = seq.cached_prompt_tokens
+        self.prefill_ms = seq.prefill_ms
+        start = seq.t_first_token or seq.t_done
+        self.queue_ms = int((start - seq.t_submit) * 1000)
+        self.generation_ms = int((seq.t_done - seq.t_submit) * 1000)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# SCHEDULER
+# ══════════════════════════════════════════════════════════════════════════════
+
+class ContinuousBatcher:
+    """Token-granularity scheduler: admits, decodes and retires sequences."""
+
+    def __init__(self, model: Any, max_batch_size: int = 4,
+                 max_new_tokens: int = 4500, name: str = "nutrition") -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._model = model
+        self.max_batch_size = int(max_batch_size)
+        self.max_new_tokens = int(max_new_tokens)
+        self.name = name
+
+        self._pending: Deque[Sequence] = deque()
+        self._active: List[Sequence] = []
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+
+        # ── Metrics ──
+        self.steps_total = 0
+        self.decode_tokens_total = 0
+        self.prefills_total = 0
+        self.prompt_tokens_total = 0
+        self.cached_prompt_tokens_total = 0
+        self.tokens_total = 0
+        self.errors_total = 0
+        self.max_active = 0
+        self.max_queue_depth = 0
+        self.busy_seconds = 0.0
+        self.finished: Dict[str, int] = {}
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the scheduler thread (idempotent)."""
+        if self.running:
+            return
+        self._stopping = False
+        self._thread = threading.Thread(
+            target=self._run, name=f"{self.name}-batcher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the thread and fail every waiting or running sequence."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        error = RuntimeError(f"{self.name} batcher stopped")
+        with self._cond:
+            pending, self._pending = list(self._pending), deque()
+        for seq in pending + self._active:
+            self._finish(seq, "error", error)
+        self._active = []
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def enqueue(self, prompt_ids: Seq[int], max_new_tokens: Optional[int] = None,
+                on_done: Optional[Callable[[Sequence], None]] = None,
+                on_token: Optional[Callable[[Sequence, int], None]] = None) -> Sequence:
+        """Queue a prompt; ``on_token(seq, id)`` and ``on_done(seq)`` are called
+        from the scheduler thread."""
+        if not prompt_ids:
+            raise ValueError("prompt_ids must not be empty")
+        budget = min(max_new_tokens or self.max_new_tokens, self.max_new_tokens)
+        seq = Sequence(prompt_ids, budget, on_done, on_token)
+        with self._cond:
+            self._pending.append(seq)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._pending))
+            self._cond.notify()
+        return seq
+
+    async def submit(self, prompt_ids: Seq[int],
+                     max_new_tokens: Optional[int] = None) -> GenerationResult:
+        """Generate for one prompt; resolves when its sequence retires."""
+        if not self.running:
+            self.start()
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+
+        def _resolve(seq: Sequence) -> None:
+            if fut.done():
+                return
+            if seq.error is not None:
+                fut.set_exception(seq.error)
+            else:
+                fut.set_result(GenerationResult(seq))
+
+        seq = self.enqueue(prompt_ids, max_new_tokens,
+                           on_done=lambda s: loop.call_soon_threadsafe(_resolve, s))
+        try:
+            return await fut
+        except asyncio.CancelledError:
+            # Client went away: free the slot on the next step
+            seq.cancelled = True
+            raise
+
+    async def stream(self, prompt_ids: Seq[int], max_new_tokens: Optional[int] = None,
+                     ) -> AsyncIterator[Tuple[List[int], Optional[GenerationResult]]]:
+        """
+        Generate for one prompt, yielding ``(new token ids, None)`` as tokens
+        arrive and ``(last token ids, GenerationResult)`` once it retires.
+
+        Tokens that arrive while the consumer is busy are handed over
+        together.  Closing the generator early frees the slot.
+        """
+        if not self.running:
+            self.start()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        seq = self.enqueue(
+            prompt_ids, max_new_tokens,
+            on_done=lambda s: loop.call_soon_threadsafe(queue.put_nowait, s),
+            on_token=lambda s, t: loop.call_soon_threadsafe(queue.put_nowait, t))
+        tokens: List[int] = []
+        try:
+            while True:
+                item = await queue.get()
+                if isinstance(item, Sequence):
+                    if item.error is not None:
+                        raise item.error
+                    yield tokens, GenerationResult(item)
+                    return
+                tokens.append(item)
+                if queue.empty():
+                    yield tokens, None
+                    tokens = []
+        finally:
+            if seq.finish_reason is None:
+                seq.cancelled = True
+
+    def step(self) -> int:
+        """One scheduler iteration; returns the number of tokens produced."""
+        t0 = time.perf_counter()
+        produced = 0
+
+        for seq in [s for s in self._active if s.cancelled]:
+            self._retire(seq, "cancelled")
+
+        # Sequences already running decode this step; new ones only prefill
+        running = list(self._active)
+
+        while len(self._active) < self.max_batch_size:
+            with self._cond:
+                if not self._pending:
+                    break
+                seq = self._pending.popleft()
+            if seq.cancelled:
+                self._finish(seq, "cancelled")
+                continue
+            t_prefill = time.perf_counter()
+            try:
+                token = self._model.prefill(seq)
+            except Exception as e:
+                self.errors_total += 1
+                self._model.release(seq)
+                self._finish(seq, "error", e)
+                continue
+            seq.t_first_token = time.perf_counter()
+            seq.prefill_ms = (seq.t_first_token - t_prefill) * 1000
+            self.prefills_total += 1
+            self.prompt_tokens_total += len(seq.prompt_ids)
+            self.cached_prompt_tokens_total += seq.cached_prompt_tokens
+            self._active.append(seq)
+            produced += 1
+            self._append(seq, token)
+
+        running = [s for s in running if s.finish_reason is None]
+        if running:
+            try:
+                tokens = self._model.decode(running)
+                if len(tokens) != len(running):
+                    raise RuntimeError(
+                        f"{self.name} decode returned {len(tokens)} tokens for {len(running)} sequences")
+            except Exception as e:
+                # A failed batched forward leaves no usable KV for anyone in it
+                self.errors_total += 1
+                self._model.reset()
+                for seq in running:
+                    self._retire(seq, "error", e)
+            else:
+                self.steps_total += 1
+                self.decode_tokens_total += len(running)
+                produced += len(running)
+                for seq, token in zip(running, tokens):
+                    self._append(seq, token)
+
+        self.max_active = max(self.max_active, len(self._active))
+        self.tokens_total += produced
+        if produced:
+            self.busy_seconds += time.perf_counter() - t0
+        return produced
+
+    def run_until_idle(self) -> None:
+        """Step until nothing is waiting or running (tests / offline use)."""
+        while self._active or self._pending:
+            self.step()
+
+    def queue_depth(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> Dict[str, Any]:
+        """Slot occupancy and throughput metrics for /health."""
+        avg_batch = self.decode_tokens_total / self.steps_total if self.steps_total else 0.0
+        tps = self.tokens_total / self.busy_seconds if self.busy_seconds else 0.0
+        return {
+            "running": self.running,
+            "max_batch_size": self.max_batch_size,
+            "active": len(self._active),
+            "queue_depth": self.queue_depth(),
+            "max_active": self.max_active,
+            "max_queue_depth": self.max_queue_depth,
+            "decode_steps_total": self.steps_total,
+            "prefills_total": self.prefills_total,
+            "prompt_tokens_total": self.prompt_tokens_total,
+            "cached_prompt_tokens_total": self.cached_prompt_tokens_total,
+            "tokens_total": self.tokens_total,
+            "errors_total": self.errors_total,
+            "avg_decode_batch": round(avg_batch, 3),
+            "tokens_per_sec": round(tps, 1),
+            "finished": dict(sorted(self.finished.items())),
+        }
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _append(self, seq: Sequence, token: int) -> None:
+        if token == self._model.eos_token_id:
+            self._retire(seq, "eos")
+            return
+        seq.generated.append(token)
+        if seq.on_token is not None:
+            seq.on_token(seq, token)
+        if seq.json.feed(self._model.token_text(token)):
+            self._retire(seq, "json_closed")
+        elif len(seq.generated) >= seq.max_new_tokens:
+            self._retire(seq, "length")
+
+    def _retire(self, seq: Sequence, reason: str,
+                error: Optional[BaseException] = None) -> None:
+        if seq in self._active:
+            self._active.remove(seq)
+        self._model.release(seq)
+        self._finish(seq, reason, error)
+
+    def _finish(self, seq: Sequence, reason: str,
+                error: Optional[BaseException] = None) -> None:
+        if seq.finish_reason is not None:
+            return
+        seq.finish_reason = reason
+        seq.error = error
+        seq.t_done = time.perf_counter()
+        self.finished[reason] = self.finished.get(reason, 0) + 1
+        if seq.on_done is not None:
+            seq.on_done(seq)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and not self._pending and not self._active:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+            self.step()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CPU STAND-IN MODEL
+# ══════════════════════════════════════════════════════════════════════════════
+
+class ScriptedStepModel:
+    """Deterministic step model for tests and benchmarks (no torch).
+
+    Tokens are short text pieces; ``encode`` maps a prompt to one token per
+    character.  ``script(prompt_text)`` gives the full text a prompt
+    "generates" — by default a JSON object echoing the prompt, followed by
+    trailing chatter that must never be reached because the root object
+    closes first.  The "KV cache" is the list of token ids the sequence has
+    fed so far; ``decode`` checks it is exactly prompt + generated[:-1], so
+    any mix-up between sequences in a batch fails loudly.
+
+    ``step_latency_s`` + ``per_seq_latency_s`` × batch size is slept per
+    forward pass, modelling a memory-bound GPU where a wider batch is
+    almost free; ``prefill_latency_s`` + ``prefill_token_latency_s`` × tokens
+    per prefill, so a shared-prefix hit (``set_prefix``) is visibly cheaper.
+    """
+
+    eos_token_id = 0
+
+    def __init__(self, script: Optional[Callable[[str], str]] = None,
+                 piece_len: int = 3, step_latency_s: float = 0.0,
+                 per_seq_latency_s: float = 0.0, prefill_latency_s: float = 0.0,
+                 prefill_token_latency_s: float = 0.0) -> None:
+        self._script = script or (lambda p: json_script(p))
+        self.piece_len = piece_len
+        self.step_latency_s = step_latency_s
+        self.per_seq_latency_s = per_seq_latency_s
+        self.prefill_latency_s = prefill_latency_s
+        self.prefill_token_latency_s = prefill_token_latency_s
+        self.prefix = PrefixCache()
+        self._vocab: List[str] = ["<eos>"]
+        self._ids: Dict[str, int] = {"<eos>": 0}
+        self.batch_sizes: List[int] = []
+        self.live_caches = 0
+        self.fail_next_decode = False
+
+    # ── Tokenizer side ───────────────────────────────────────────────────────
+
+    def _id(self, piece: str) -> int:
+        if piece not in self._ids:
+            self._ids[piece] = len(self._vocab)
+            self._vocab.append(piece)
+        return self._ids[piece]
+
+    def encode(self, text: str) -> List[int]:
+        return [self._id(ch) for ch in text]
+
+    def token_text(self, token_id: int) -> str:
+        return "" if token_id == self.eos_token_id else self._vocab[token_id]
+
+    def decode_text(self, token_ids: Seq[int]) -> str:
+        return "".join(self.token_text(t) for t in token_ids)
+
+    # ── Step model protocol ──────────────────────────────────────────────────
+
+    def _next(self, seq: Sequence) -> int:
+        pieces = seq.model_state["pieces"]
+        n = len(seq.generated)
+        return self._id(pieces[n]) if n < len(pieces) else self.eos_token_id
+
+    def _forward(self, n_tokens: int) -> None:
+        delay = self.prefill_latency_s + self.prefill_token_latency_s * n_tokens
+        if delay:
+            time.sleep(delay)
+
+    def set_prefix(self, ids: Seq[int]) -> None:
+        t0 = time.perf_counter()
+        self._forward(len(ids))
+        self.prefix.set(ids, list(ids), (time.perf_counter() - t0) * 1000)
+
+    def prefill(self, seq: Sequence) -> int:
+        t0 = time.perf_counter()
+        n = self.prefix.match(seq.prompt_ids)
+        # The reused "KV" must be exactly what a full prefill would produce
+        seq.past = self.prefix.past + seq.prompt_ids[n:] if n else list(seq.prompt_ids)
+        seq.cached_prompt_tokens = n
+        self._forward(len(seq.prompt_ids) - n)
+        if n:
+            self.prefix.record_prefill((time.perf_counter() - t0) * 1000)
+        text = self._script(self.decode_text(seq.prompt_ids))
+        seq.model_state["pieces"] = [text[i:i + self.piece_len]
+                                     for i in range(0, len(text), self.piece_len)]
+        self.live_caches += 1
+        return self._next(seq)
+
+    def decode(self, seqs: List[Sequence]) -> List[int]:
+        if self.fail_next_decode:
+            self.fail_next_decode = False
+            raise RuntimeError("simulated decode failure")
+        self.batch_sizes.append(len(seqs))
+        if self.step_latency_s or self.per_seq_latency_s:
+            time.sleep(self.step_latency_s + self.per_seq_latency_s * len(seqs))
+        out = []
+        for seq in seqs:
+            expected = seq.prompt_ids + seq.generated[:-1]
+            if seq.past != expected:
+                raise AssertionError(f"KV cache mismatch for {seq!r}")
+            seq.past.append(seq.generated[-1])
+            out.append(self._next(seq))
+        return out
+
+    def release(self, seq: Sequence) -> None:
+        if seq.past is not None:
+            seq.past = None
+            self.live_caches -= 1
+
+    def reset(self) -> None:
+        pass
+
+
+def json_script(prompt: str, days: int = 3) -> str:
+    """Default ScriptedStepModel output: a small plan-shaped JSON object + chatter."""
+    plan = ('{"prompt": "%s", "days": [%s], "foods_to_avoid": []}'
+            % (prompt.replace("\\", "\\\\").replace('"', '\\"'),
+               ", ".join('{"day": %d, "meals": {"note": "braces } in \\"strings\\" {"}}' % d
+                         for d in range(1, days + 1))))
+    return plan + "\nHope this helps! {not part of the plan}"
@@ -0,0 +1,348 @@
+"""
+food_index.py
+-------------
+In-memory search index over food_db_halal.json for ``/foods/search``.
+
+The endpoint used to scan every Egyptian and USDA row with a substring
+test and return the first ``limit`` hits in file order.  ``FoodIndex`` is
+built once at startup and answers from posting lists instead:
+
+  exact       the normalized name equals the query          ("ful medames")
+  phrase      the name starts with the query                 ("ful med")
+  words       every query word is a word of the name         ("medames ful")
+  typeahead   every query word starts a word of the name     ("med fu")
+  fuzzy       words matched by trigram similarity or by
+              consonant skeleton — misspellings and
+              transliteration variants                        ("foul mudammas",
+                                                               "mulukhiya")
+
+Results are ranked by match quality (the tiers above, then similarity for
+fuzzy matches), then ``health_score`` (highest first, unscored last), then
+shorter names.  Fuzzy matching only runs when the better tiers return
+fewer than ``limit`` foods and some query word starts no word in the DB.
+
+Layout: foods are renumbered so that each ``source`` is one contiguous
+id range and, inside it, ids follow the static rank (health_score, name
+length).  Every posting list is a sorted ``array('I')`` of those ids, so
+filtering by source is a bisect into the range, a posting list is already
+in rank order, and each tier stops as soon as it has ``limit`` foods.
+Typeahead uses a prefix trie flattened into a dict: every prefix of every
+name word → the posting list of the words it starts.
+
+Normalization: lowercase, accents stripped (NFKD), apostrophes dropped
+("ta'ameya" → "taameya"), anything else that isn't a letter or digit
+splits words.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import bisect
+import heapq
+import re
+import unicodedata
+from array import array
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+_VOWELS = re.compile(r"[aeiouy]+")
+_DOUBLES = re.compile(r"(.)\1+")
+
+# Match quality per tier; fuzzy matches score 0 < similarity < 1
+EXACT, PHRASE, WORDS, TYPEAHEAD = 5.0, 4.0, 3.0, 2.0
+FUZZY_MIN_SIMILARITY = 0.45      # word-level, trigram Dice or skeleton match
+FUZZY_MIN_SCORE = 0.5            # query-level: mean over the query's words
+SKELETON_SIMILARITY = 0.8
+_MAX_CORRECTIONS = 8
+
+
+def normalize(text: str) -> List[str]:
+    """Search words of *text*."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(" ", _APOSTROPHES.sub("", text)).split()
+
+
+def trigrams(word: str) -> frozenset:
+    padded = f" {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def skeleton(word: str) -> str:
+    """Consonant skeleton for Arabic transliterations (molokhia ~ mulukhiya).
+
+    Vowels and doubled letters carry little signal in romanized Arabic, and
+    a final h is usually the ta marbuta ("fattah" ~ "fatta").
+    """
+    word = word.replace("q", "k").replace("ou", "u").replace("ee", "i")
+    if len(word) > 3 and word.endswith("h") and word[-2] in "aeiouy":
+        word = word[:-1]
+    core = word[0] + _VOWELS.sub("", word[1:])
+    return _DOUBLES.sub(r"\1", core)
+
+
+def _postings(ids: Iterable[int]) -> array:
+    return array("I", sorted(set(ids)))
+
+
+def _in(postings: array, doc: int) -> bool:
+    i = bisect.bisect_left(postings, doc)
+    return i < len(postings) and postings[i] == doc
+
+
+def _window(postings: Sequence[int], lo: int, hi: int) -> Sequence[int]:
+    return postings[bisect.bisect_left(postings, lo):bisect.bisect_left(postings, hi)]
+
+
+class FoodIndex:
+    """Ranked name search over food records (food_db_halal.json rows)."""
+
+    def __init__(self, foods: Sequence[Dict[str, Any]], cache_size: int = 4096) -> None:
+        def static_rank(i: int) -> tuple:
+            score = foods[i].get("health_score")
+            return (score is None, -(score or 0.0), len(foods[i].get("name") or ""), i)
+
+        by_rank = sorted(range(len(foods)), key=static_rank)
+        self._rank = [0] * len(foods)           # doc id → global static rank
+        for rank, i in enumerate(by_rank):
+            self._rank[i] = rank
+        # Doc ids: grouped by source, rank order inside each source
+        order = sorted(range(len(foods)),
+                       key=lambda i: (str(foods[i].get("source")), self._rank[i]))
+        self._rank = [self._rank[i] for i in order]
+        self._results: List[Dict[str, Any]] = []
+        self._names: List[str] = []
+        self._doc_words: List[Tuple[str, ...]] = []
+        self.sources: Dict[str, Tuple[int, int]] = {}
+
+        words: Dict[str, List[int]] = {}
+        first_words: Dict[str, List[int]] = {}
+        exact: Dict[str, List[int]] = {}
+        for doc, i in enumerate(order):
+            food = foods[i]
+            source = food.get("source")
+            lo, _ = self.sources.get(source, (doc, doc))
+            self.sources[source] = (lo, doc + 1)
+            self._results.append({
+                "id":      food.get("id"),
+                "name":    food.get("name"),
+                "source":  source,
+                "per_100g": food.get("per_100g", {}),
+                "health_score": food.get("health_score"),
+            })
+            doc_words = tuple(normalize(food.get("name") or ""))
+            self._doc_words.append(doc_words)
+            self._names.append(" ".join(doc_words))
+            exact.setdefault(self._names[-1], []).append(doc)
+            if doc_words:
+                first_words.setdefault(doc_words[0], []).append(doc)
+            for word in set(doc_words):
+                words.setdefault(word, []).append(doc)
+
+        self._exact = {k: _postings(v) for k, v in exact.items()}
+        self._words = {k: _postings(v) for k, v in words.items()}
+        self._first_words = {k: _postings(v) for k, v in first_words.items()}
+        self._prefixes = self._prefix_trie(self._words)
+        self._first_prefixes = self._prefix_trie(self._first_words)
+
+        # Fuzzy side: trigram and skeleton indexes over the word vocabulary
+        self._vocab = sorted(self._words)
+        self._vocab_grams = [len(trigrams(w)) for w in self._vocab]
+        grams: Dict[str, List[int]] = {}
+        skeletons: Dict[str, List[int]] = {}
+        for v, word in enumerate(self._vocab):
+            for g in trigrams(word):
+                grams.setdefault(g, []).append(v)
+            if not word.isdigit():
+                skeletons.setdefault(skeleton(word), []).append(v)
+        self._grams = grams
+        self._skeletons = skeletons
+
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._corrections_cache: "OrderedDict[str, Dict[str, float]]" = OrderedDict()
+        self.queries = 0
+        self.cache_hits = 0
+        self.fuzzy_queries = 0
+
+    @staticmethod
+    def _prefix_trie(postings: Dict[str, array]) -> Dict[str, array]:
+        """Every prefix of every word → union of the postings of the words it starts."""
+        acc: Dict[str, List[int]] = {}
+        for word, ids in postings.items():
+            for k in range(1, len(word) + 1):
+                acc.setdefault(word[:k], []).extend(ids)
+        return {p: _postings(ids) for p, ids in acc.items()}
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    # ── Search ───────────────────────────────────────────────────────────────
+
+    def search(self, query: str, source: Optional[str] = None,
+               limit: int = 20) -> List[Dict[str, Any]]:
+        """Best *limit* foods for *query*, optionally from one source only.
+
+        The result dicts are shared between calls; don't mutate them.
+        """
+        self.queries += 1
+        q = normalize(query)
+        key = (tuple(q), source, limit)
+        hit = self._cache.get(key)
+        if hit is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return hit
+        results = [self._results[doc] for doc, _ in self.ranked(q, source, limit)]
+        if self.cache_size:
+            self._cache[key] = results
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return results
+
+    def ranked(self, q: Sequence[str], source: Optional[str] = None,
+               limit: int = 20) -> List[Tuple[int, float]]:
+        """(doc id, match quality) for normalized query words *q*, best first."""
+        if not q or limit < 1:
+            return []
+        if source is None:
+            ranges = list(self.sources.values())
+        elif source in self.sources:
+            ranges = [self.sources[source]]
+        else:
+            return []
+
+        phrase = " ".join(q)
+        tiers = (
+            (EXACT, lambda lo, hi: iter(_window(self._exact.get(phrase, ()), lo, hi))),
+            (PHRASE, lambda lo, hi: self._phrase(q, phrase, lo, hi)),
+            (WORDS, lambda lo, hi: self._intersect([self._words.get(w) for w in q], lo, hi)),
+            (TYPEAHEAD, lambda lo, hi: self._intersect([self._prefixes.get(w) for w in q], lo, hi)),
+        )
+        out: List[Tuple[int, float]] = []
+        taken = set()
+        for quality, docs in tiers:
+            need = limit - len(out)
+            found: List[int] = []
+            for lo, hi in ranges:
+                found += islice((d for d in docs(lo, hi) if d not in taken), need)
+            found.sort(key=self._rank.__getitem__)
+            for doc in found[:need]:
+                taken.add(doc)
+                out.append((doc, quality))
+            if len(out) >= limit:
+                return out
+        self.fuzzy_queries += 1
+        return out + self._fuzzy(q, ranges, taken, limit - len(out))
+
+    def _phrase(self, q: Sequence[str], phrase: str, lo: int, hi: int) -> Iterator[int]:
+        if len(q) == 1:
+            lists = [self._first_prefixes.get(q[0])]
+        else:
+            lists = ([self._first_words.get(q[0])]
+                     + [self._prefixes.get(w) for w in q[1:]])
+        names = self._names
+        return (d for d in self._intersect(lists, lo, hi) if names[d].startswith(phrase))
+
+    @staticmethod
+    def _intersect(lists: List[Optional[array]], lo: int, hi: int) -> Iterator[int]:
+        """Ids in every list and in [lo, hi), in rank order."""
+        if any(p is None for p in lists):
+            return iter(())
+        windows = sorted((_window(p, lo, hi) for p in lists), key=len)
+        shortest, rest = windows[0], windows[1:]
+        if not rest:
+            return iter(shortest)
+        return (d for d in shortest if all(_in(p, d) for p in rest))
+
+    # ── Fuzzy fallback ───────────────────────────────────────────────────────
+
+    def corrections(self, word: str) -> Dict[str, float]:
+        """Vocabulary words similar to *word* → similarity in (0, 1]."""
+        hit = self._corrections_cache.get(word)
+        if hit is not None:
+            return hit
+        grams = trigrams(word)
+        common: Dict[int, int] = {}
+        for g in grams:
+            for v in self._grams.get(g, ()):
+                common[v] = common.get(v, 0) + 1
+        sims = {}
+        for v, n in common.items():
+            dice = 2.0 * n / (len(grams) + self._vocab_grams[v])
+            if dice >= FUZZY_MIN_SIMILARITY:
+                sims[self._vocab[v]] = dice
+        if not word.isdigit():
+            for v in self._skeletons.get(skeleton(word), ()):
+                w = self._vocab[v]
+                sims[w] = max(sims.get(w, 0.0), SKELETON_SIMILARITY)
+        best = dict(sorted(sims.items(), key=lambda kv: -kv[1])[:_MAX_CORRECTIONS])
+        self._corrections_cache[word] = best
+        if len(self._corrections_cache) > self.cache_size:
+            self._corrections_cache.popitem(last=False)
+        return best
+
+    def _fuzzy(self, q: Sequence[str], ranges: List[Tuple[int, int]], taken: set,
+               need: int) -> List[Tuple[int, float]]:
+        """Foods matching the query with its misspelled words corrected.
+
+        A word that starts no vocabulary word is replaced by its corrections
+        (a union of their postings, each with its similarity); the other
+        words must still match by prefix.  The intersection is walked in rank
+        order like the typeahead tier, and a misspelled word with no
+        correction is dropped as long as the rest reaches FUZZY_MIN_SCORE.
+        Runs only if some word is misspelled.
+        """
+        per_word = []
+        misspelled = 0
+        for w in q:
+            prefix = self._prefixes.get(w)
+            if prefix is not None:
+                per_word.append([(prefix, 1.0)])
+                continue
+            misspelled += 1
+            lists = [(self._words[c], sim) for c, sim in self.corrections(w).items()]
+            if lists:
+                per_word.append(lists)
+        if not misspelled or not per_word or len(per_word) / len(q) < FUZZY_MIN_SCORE:
+            return []
+        scored = []
+        for lo, hi in ranges:
+            words = sorted(([(_window(p, lo, hi), sim) for p, sim in lists] for lists in per_word),
+                           key=lambda lists: sum(len(p) for p, _ in lists))
+            driver, rest = words[0], words[1:]
+            found = 0
+            last = -1
+            for doc in heapq.merge(*(p for p, _ in driver)):
+                if doc == last or doc in taken:
+                    continue
+                last = doc
+                total = max(sim for p, sim in driver if _in(p, doc))
+                for lists in rest:
+                    best = max((sim for p, sim in lists if _in(p, doc)), default=0.0)
+                    if not best:
+                        break
+                    total += best
+                else:
+                    # Below every exact tier; ties broken by static rank
+                    scored.append((-total / len(q), self._rank[doc], doc))
+                    found += 1
+                    if found >= need * 4:
+                        break
+        scored.sort()
+        return [(doc, min(-neg, 0.99)) for neg, _, doc in scored[:need] if -neg >= FUZZY_MIN_SCORE]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "foods": len(self._results),
+            "sources": {s: hi - lo for s, (lo, hi) in self.sources.items()},
+            "words": len(self._words),
+            "prefixes": len(self._prefixes),
+            "queries": self.queries,
+            "cache_hits": self.cache_hits,
+            "fuzzy_queries": self.fuzzy_queries,
+        }
@@ -0,0 +1,242 @@
+"""
+hf_step_model.py
+----------------
+Step model for ``continuous_batcher.ContinuousBatcher`` over a transformers
+causal LM (the Qwen2.5 nutrition model).
+
+  prefill(seq)   one forward pass over the prompt → the sequence's own KV
+                 cache (``seq.past``, legacy ``((k, v), ...)`` tuples).
+  decode(seqs)   one forward pass for the whole batch, one token each.
+
+Sequences in a batch have different lengths, so their caches are
+left-padded to the longest one and stacked; the attention mask hides the
+padding and ``position_ids`` carry each sequence's true position.  The
+stacked cache is kept between steps and only rebuilt when the batch
+membership changes (a sequence is admitted or retired): before rebuilding,
+each surviving sequence's rows are sliced back out into ``seq.past``.  In
+steady state a decode step therefore costs one forward pass and one
+column appended to the mask.
+
+``set_prefix`` prefills the shared prompt prefix once per model load
+(prefix_cache.py); a prompt that starts with it reuses that KV and only
+its suffix goes through the prefill forward pass.
+
+Sampling matches the previous ``model.generate`` call: repetition penalty
+over prompt + generated tokens, temperature, then top-p, sampled
+independently per sequence.  With ``constrain`` (plan_grammar.py), every
+sequence carries a grammar state and tokens the plan schema can't accept
+next are masked out before sampling.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Any, List, Optional, Sequence
+
+import torch
+import torch.nn.functional as F
+
+try:
+    from transformers import DynamicCache
+except ImportError:   # older transformers: legacy tuples all the way
+    DynamicCache = None
+
+from plan_grammar import JsonGrammar, TokenAutomaton
+from prefix_cache import PrefixCache
+
+# seq.past while the sequence's KV lives in the stacked batch cache
+_PACKED = object()
+
+
+def _legacy(cache: Any) -> tuple:
+    return cache.to_legacy_cache() if hasattr(cache, "to_legacy_cache") else cache
+
+
+def _as_cache(legacy: tuple) -> Any:
+    return DynamicCache.from_legacy_cache(legacy) if DynamicCache is not None else legacy
+
+
+class HFStepModel:
+    """transformers model + tokenizer behind the step-model protocol."""
+
+    def __init__(self, model, tokenizer, temperature: float = 0.3, top_p: float = 0.9,
+                 repetition_penalty: float = 1.1, max_prompt_tokens: int = 1536) -> None:
+        self._model = model
+        self._tok = tokenizer
+        self.temperature = temperature
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.max_prompt_tokens = max_prompt_tokens
+        self.eos_token_id = tokenizer.eos_token_id
+        self.device = next(model.parameters()).device
+        self.vocab_size = model.get_output_embeddings().weight.shape[0]
+        self.prefix = PrefixCache()
+        self.grammar: Optional[TokenAutomaton] = None
+        self._plain_ids: Optional[torch.Tensor] = None
+        # Stacked batch state, valid while the batch membership is unchanged
+        self._packed: List[Any] = []
+        self._packed_cache: Any = None
+        self._packed_mask: Optional[torch.Tensor] = None
+
+    # ── Tokenizer side ───────────────────────────────────────────────────────
+
+    def encode(self, prompt: str) -> List[int]:
+        return self._tok(prompt, truncation=True,
+                         max_length=self.max_prompt_tokens)["input_ids"]
+
+    def token_text(self, token_id: int) -> str:
+        return self._tok.decode([token_id], skip_special_tokens=True)
+
+    def decode_text(self, token_ids) -> str:
+        return self._tok.decode(token_ids, skip_special_tokens=True)
+
+    def constrain(self, grammar: JsonGrammar, warm_text: Optional[str] = None) -> None:
+        """Compile *grammar* against the vocabulary; every sequence is masked by it."""
+        special = set(self._tok.all_special_ids)
+        texts = self._tok.batch_decode([[i] for i in range(len(self._tok))],
+                                       clean_up_tokenization_spaces=False)
+        vocab = [None if i in special else t for i, t in enumerate(texts)]
+        self.grammar = TokenAutomaton(grammar, vocab, self.eos_token_id)
+        # String content allows plain_ids[:n]; a sorted tensor makes that a slice
+        self._plain_ids = torch.tensor(self.grammar.plain_ids, dtype=torch.long,
+                                       device=self.device)
+        if warm_text is not None:
+            self.grammar.warm(self._tok(warm_text, add_special_tokens=False)["input_ids"])
+
+    # ── Step model protocol ──────────────────────────────────────────────────
+
+    def _sync(self) -> None:
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+
+    @torch.no_grad()
+    def set_prefix(self, ids: Sequence[int]) -> None:
+        """Prefill the shared prompt prefix once and keep its KV."""
+        if not ids:
+            return
+        self._sync()
+        t0 = time.perf_counter()
+        out = self._model(input_ids=torch.tensor([list(ids)], device=self.device),
+                          use_cache=True)
+        self._sync()
+        self.prefix.set(ids, _legacy(out.past_key_values), (time.perf_counter() - t0) * 1000)
+
+    @torch.no_grad()
+    def prefill(self, seq) -> int:
+        t0 = time.perf_counter()
+        ids = torch.tensor([seq.prompt_ids], device=self.device)
+        n = self.prefix.match(seq.prompt_ids)
+        if n:
+            out = self._model(input_ids=ids[:, n:], past_key_values=_as_cache(self.prefix.past),
+                              use_cache=True)
+        else:
+            out = self._model(input_ids=ids, use_cache=True)
+        seq.past = _legacy(out.past_key_values)
+        seq.cached_prompt_tokens = n
+        seen = torch.zeros(self.vocab_size, dtype=torch.bool, device=self.device)
+        seen[ids[0]] = True
+        seq.model_state["seen"] = seen
+        if self.grammar is not None:
+            seq.model_state["grammar"] = self.grammar.initial()
+        token = self._sample(out.logits[:, -1, :], [seq])[0]
+        if n:
+            self.prefix.record_prefill((time.perf_counter() - t0) * 1000)
+        return token
+
+    @torch.no_grad()
+    def decode(self, seqs) -> List[int]:
+        if [s.seq_id for s in seqs] != [s.seq_id for s in self._packed]:
+            self._unpack()
+            self._pack(seqs)
+        lengths = [len(s.prompt_ids) + len(s.generated) - 1 for s in seqs]
+        input_ids = torch.tensor([[s.generated[-1]] for s in seqs], device=self.device)
+        position_ids = torch.tensor([[n] for n in lengths], device=self.device)
+        mask = torch.cat([self._packed_mask, self._packed_mask.new_ones((len(seqs), 1))], dim=1)
+        out = self._model(input_ids=input_ids, attention_mask=mask, position_ids=position_ids,
+                          past_key_values=self._packed_cache, use_cache=True)
+        self._packed_cache = out.past_key_values
+        self._packed_mask = mask
+        return self._sample(out.logits[:, -1, :], seqs)
+
+    def release(self, seq) -> None:
+        seq.past = None
+        seq.model_state.pop("seen", None)
+        seq.model_state.pop("grammar", None)
+
+    def reset(self) -> None:
+        self._packed, self._packed_cache, self._packed_mask = [], None, None
+
+    # ── Batch packing ────────────────────────────────────────────────────────
+
+    def _unpack(self) -> None:
+        """Slice each still-running sequence's rows back out of the stacked cache."""
+        if self._packed_cache is None:
+            return
+        layers = _legacy(self._packed_cache)
+        width = self._packed_mask.shape[1]
+        for i, seq in enumerate(self._packed):
+            if seq.past is None:     # retired since the last step
+                continue
+            n = len(seq.prompt_ids) + len(seq.generated) - 1
+            seq.past = tuple((k[i:i + 1, :, width - n:].contiguous(),
+                              v[i:i + 1, :, width - n:].contiguous()) for k, v in layers)
+        self.reset()
+
+    def _pack(self, seqs) -> None:
+        lengths = [s.past[0][0].shape[2] for s in seqs]
+        width = max(lengths)
+        layers = []
+        for layer in range(len(seqs[0].past)):
+            ks, vs = [], []
+            for seq, n in zip(seqs, lengths):
+                k, v = seq.past[layer]
+                ks.append(F.pad(k, (0, 0, width - n, 0)))
+                vs.append(F.pad(v, (0, 0, width - n, 0)))
+            layers.append((torch.cat(ks), torch.cat(vs)))
+        mask = torch.zeros((len(seqs), width), dtype=torch.long, device=self.device)
+        for i, n in enumerate(lengths):
+            mask[i, width - n:] = 1
+        # The stacked cache now owns the KV; per-sequence copies are stale
+        for seq in seqs:
+            seq.past = _PACKED
+        self._packed = list(seqs)
+        self._packed_cache = _as_cache(tuple(layers))
+        self._packed_mask = mask
+
+    # ── Sampling ─────────────────────────────────────────────────────────────
+
+    def _allowed_mask(self, seqs) -> torch.Tensor:
+        mask = torch.zeros((len(seqs), self.vocab_size), dtype=torch.bool, device=self.device)
+        for row, seq in zip(mask, seqs):
+            allowed = self.grammar.allowed(seq.model_state["grammar"])
+            if allowed.cache is None:
+                allowed.cache = torch.tensor(allowed.ids, dtype=torch.long, device=self.device)
+            row[self._plain_ids[:allowed.plain]] = True
+            row[allowed.cache] = True
+        return mask
+
+    def _sample(self, logits: torch.Tensor, seqs) -> List[int]:
+        logits = logits.float()
+        if self.grammar is not None:
+            logits = logits.masked_fill(~self._allowed_mask(seqs), float("-inf"))
+        if self.repetition_penalty != 1.0:
+            seen = torch.stack([s.model_state["seen"] for s in seqs])
+            penalized = torch.where(logits > 0, logits / self.repetition_penalty,
+                                    logits * self.repetition_penalty)
+            logits = torch.where(seen, penalized, logits)
+        logits = logits / self.temperature
+        if self.top_p < 1.0:
+            sorted_logits, sorted_idx = torch.sort(logits, descending=True, dim=-1)
+            cum = sorted_logits.softmax(dim=-1).cumsum(dim=-1)
+            drop = cum > self.top_p
+            drop[:, 1:] = drop[:, :-1].clone()   # always keep the top token
+            drop[:, 0] = False
+            logits = logits.scatter(1, sorted_idx, sorted_logits.masked_fill(drop, float("-inf")))
+        tokens = torch.multinomial(logits.softmax(dim=-1), 1).squeeze(1)
+        for seq, token in zip(seqs, tokens):
+            seq.model_state["seen"][token] = True
+        tokens = tokens.tolist()
+        if self.grammar is not None:
+            for seq, token in zip(seqs, tokens):
+                seq.model_state["grammar"] = self.grammar.advance(seq.model_state["grammar"], token)
+        return tokens
@@ -0,0 +1,514 @@
+"""
+plan_grammar.py
+---------------
+Grammar-constrained decoding for the 3-day nutrition plan.
+
+The model used to be free to write anything; a stopping criterion ended
+generation when the root object closed and ``extract_json`` tried to make
+sense of the rest (direct parse → brace walk → brace closing →
+json_repair).  Here every sampled token is restricted to those that keep
+the output a prefix of a valid plan, so the output is always valid JSON in
+the training schema and generation ends the moment the plan is complete.
+
+Two layers:
+
+``JsonGrammar`` – a character-level pushdown automaton over a fixed JSON
+    schema.  Objects are written as in training (``json.dumps`` defaults:
+    keys in schema order, ``", "`` and ``": "`` separators), so an object
+    is a sequence of literal text and value slots.  Arrays have a minimum
+    and maximum length, strings a maximum length and numbers a maximum
+    number of digits, so every output is finite.  A state is an immutable
+    tuple of frames — hashable, cheap to keep per sequence.
+
+``TokenAutomaton`` – the grammar lifted to the tokenizer's vocabulary.
+    ``allowed(state)`` is the set of token ids whose text the grammar
+    accepts from *state*; results are memoized per state, so the
+    automaton's token transitions are compiled the first time a state is
+    reached (``warm`` walks a reference plan at startup).  The vocabulary
+    is kept as a sorted list of token texts and walked like a trie: tokens
+    sharing a rejected prefix are skipped with one bisect.  Inside string
+    content — most of a plan — almost every token is valid, so that case
+    is computed from precomputed tables instead: "plain" tokens (no quote,
+    backslash or control character) by length, plus tokens that close the
+    string grouped by what follows the quote, checked once per enclosing
+    state.
+
+``NUTRITION_PLAN_GRAMMAR`` is the plan schema from generate_nutrition_sft
+(``build_3day_plan`` / ``build_meal_json`` / ``portion_foods``): exactly
+three days numbered 1–3; breakfast, snack, lunch and dinner, each with
+1–8 food items; integer calories and grams; macros with at most two
+decimals.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import bisect
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+State = Tuple[tuple, ...]
+
+_LIT, _SEQ, _ARR, _STR, _NUM = range(5)
+_DIGITS = frozenset("0123456789")
+_HEX = frozenset("0123456789abcdefABCDEF")
+_SIMPLE_ESCAPES = frozenset('"\\/bfnrt')
+
+
+def _plain(ch: str) -> bool:
+    """A character that may appear unescaped inside a JSON string."""
+    return ch != '"' and ch != "\\" and ch >= " "
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# CHARACTER-LEVEL GRAMMAR
+# ══════════════════════════════════════════════════════════════════════════════
+
+class JsonGrammar:
+    """
+    Pushdown automaton for one fixed JSON layout.
+
+    Build the layout with ``lit`` / ``seq`` / ``obj`` / ``array`` /
+    ``string`` / ``number`` (each returns a node id), then ``set_root``.
+
+    Frames (top of stack last):
+      literal  (id, pos)                 next char must be text[pos]
+      seq      (id, idx)                 children[:idx] started
+      array    (id, count, phase)        0 before '[', 1 after '[',
+                                         2 after an item, 3 after ',',
+                                         4 inside an item, 5 after ', '
+      string   (id, length, mode)        -1 before '"', 0 content,
+                                         1 after '\\', 2–5 reading \\uXXXX
+      number   (id, int_len, frac_len)   int_len -1 = a lone leading 0;
+                                         frac_len -1 = no '.' yet
+    """
+
+    def __init__(self) -> None:
+        self._nodes: List[tuple] = []
+        self.root: Optional[int] = None
+
+    # ── Construction ─────────────────────────────────────────────────────────
+
+    def _add(self, node: tuple) -> int:
+        self._nodes.append(node)
+        return len(self._nodes) - 1
+
+    def lit(self, text: str) -> int:
+        if not text:
+            raise ValueError("empty literal")
+        return self._add((_LIT, text))
+
+    def seq(self, *parts: int) -> int:
+        """Concatenation; nested sequences are flattened and adjacent literals merged."""
+        flat: List[int] = []
+        for part in parts:
+            node = self._nodes[part]
+            for child in (node[1] if node[0] == _SEQ else (part,)):
+                prev = self._nodes[flat[-1]] if flat else None
+                cur = self._nodes[child]
+                if prev is not None and prev[0] == _LIT and cur[0] == _LIT:
+                    flat[-1] = self.lit(prev[1] + cur[1])
+                else:
+                    flat.append(child)
+        return self._add((_SEQ, tuple(flat)))
+
+    def obj(self, fields: Sequence[Tuple[str, int]]) -> int:
+        parts = []
+        for i, (key, value) in enumerate(fields):
+            parts += [self.lit(('{"' if i == 0 else ', "') + key + '": '), value]
+        return self.seq(*parts, self.lit("}")) if parts else self.lit("{}")
+
+    def array(self, item: int, min_items: int = 0, max_items: int = 64) -> int:
+        if not 0 <= min_items <= max_items:
+            raise ValueError("need 0 <= min_items <= max_items")
+        return self._add((_ARR, item, min_items, max_items))
+
+    def string(self, max_len: int = 128) -> int:
+        return self._add((_STR, max_len))
+
+    def number(self, int_digits: int = 6, frac_digits: int = 0) -> int:
+        """Non-negative number; ``frac_digits=0`` means integers only."""
+        return self._add((_NUM, int_digits, frac_digits))
+
+    def set_root(self, node: int) -> None:
+        self.root = node
+
+    # ── Running ──────────────────────────────────────────────────────────────
+
+    def initial(self) -> State:
+        return (self._frame(self.root),)
+
+    def _frame(self, nid: int) -> tuple:
+        kind = self._nodes[nid][0]
+        if kind == _ARR:
+            return (nid, 0, 0)
+        if kind in (_STR, _NUM):
+            return (nid, 0, -1)
+        return (nid, 0)
+
+    @staticmethod
+    def is_complete(state: State) -> bool:
+        return not state
+
+    def _complete(self, stack: State) -> State:
+        """The frame above *stack* finished: advance its parent(s)."""
+        while stack:
+            f = stack[-1]
+            node = self._nodes[f[0]]
+            if node[0] == _SEQ:
+                if f[1] == len(node[1]):
+                    stack = stack[:-1]
+                    continue
+                return stack
+            # array: an item finished
+            return stack[:-1] + ((f[0], f[1] + 1, 2),)
+        return stack
+
+    def advance_char(self, stack: State, c: str) -> Optional[State]:
+        """State after *c*, or None if *c* is not allowed here."""
+        nodes = self._nodes
+        while stack:
+            f = stack[-1]
+            nid = f[0]
+            node = nodes[nid]
+            kind = node[0]
+            rest = stack[:-1]
+
+            if kind == _LIT:
+                text = node[1]
+                pos = f[1]
+                if text[pos] != c:
+                    return None
+                if pos + 1 == len(text):
+                    return self._complete(rest)
+                return rest + ((nid, pos + 1),)
+
+            if kind == _STR:
+                length, mode = f[1], f[2]
+                if mode == 0:
+                    if c == '"':
+                        return self._complete(rest)
+                    if length >= node[1] or c < " ":
+                        return None
+                    if c == "\\":
+                        return rest + ((nid, length, 1),)
+                    return rest + ((nid, length + 1, 0),)
+                if mode == -1:
+                    return rest + ((nid, 0, 0),) if c == '"' else None
+                if mode == 1:
+                    if c in _SIMPLE_ESCAPES:
+                        return rest + ((nid, length + 1, 0),)
+                    return rest + ((nid, length, 2),) if c == "u" else None
+                if c not in _HEX:
+                    return None
+                return rest + ((nid, length + 1, 0) if mode == 5 else (nid, length, mode + 1),)
+
+            if kind == _NUM:
+                int_len, frac_len = f[1], f[2]
+                if c in _DIGITS:
+                    if frac_len >= 0:
+                        return rest + ((nid, int_len, frac_len + 1),) if frac_len < node[2] else None
+                    if int_len == 0:
+                        return rest + ((nid, -1 if c == "0" else 1, -1),)
+                    if int_len == -1 or int_len >= node[1]:
+                        return None
+                    return rest + ((nid, int_len + 1, -1),)
+                if c == "." and node[2] and frac_len == -1 and int_len != 0:
+                    return rest + ((nid, int_len, 0),)
+                if int_len == 0 or frac_len == 0:
+                    return None
+                # The number ended before c: let the parent read it
+                stack = self._complete(rest)
+                continue
+
+            if kind == _SEQ:
+                stack = rest + ((nid, f[1] + 1), self._frame(node[1][f[1]]))
+                continue
+
+            # _ARR
+            _, item, lo, hi = node
+            count, phase = f[1], f[2]
+            if phase == 0:
+                return rest + ((nid, 0, 1),) if c == "[" else None
+            if phase == 1:
+                if c == "]":
+                    return self._complete(rest) if lo == 0 else None
+                if hi == 0:
+                    return None
+                stack = rest + ((nid, count, 4), self._frame(item))
+                continue
+            if phase == 2:
+                if c == "]" and count >= lo:
+                    return self._complete(rest)
+                if c == "," and count < hi:
+                    return rest + ((nid, count, 3),)
+                return None
+            if phase == 3:
+                return rest + ((nid, count, 5),) if c == " " else None
+            stack = rest + ((nid, count, 4), self._frame(item))   # phase 5
+        return None
+
+    def advance_text(self, stack: Optional[State], text: str) -> Optional[State]:
+        for c in text:
+            if stack is None:
+                return None
+            stack = self.advance_char(stack, c)
+        return stack
+
+    def string_content(self, stack: State) -> Optional[Tuple[int, State]]:
+        """(characters left, state once the string closes) if inside string content."""
+        if stack:
+            f = stack[-1]
+            node = self._nodes[f[0]]
+            if node[0] == _STR and f[2] == 0:
+                return node[1] - f[1], self._complete(stack[:-1])
+        return None
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# TOKEN-LEVEL AUTOMATON
+# ══════════════════════════════════════════════════════════════════════════════
+
+class Allowed:
+    """Token ids allowed in one state: ``plain_ids[:plain]`` plus ``ids``.
+
+    ``cache`` is free for the caller (the torch side keeps the mask tensor
+    there so it is built once per state).
+    """
+
+    __slots__ = ("plain", "ids", "cache")
+
+    def __init__(self, plain: int, ids: Tuple[int, ...]) -> None:
+        self.plain = plain
+        self.ids = ids
+        self.cache = None
+
+    def __len__(self) -> int:
+        return self.plain + len(self.ids)
+
+
+class TokenAutomaton:
+    """``JsonGrammar`` over a tokenizer vocabulary (``vocab[i]`` = text of token i)."""
+
+    def __init__(self, grammar: JsonGrammar, vocab: Sequence[Optional[str]],
+                 eos_token_id: int, cache_size: int = 50_000) -> None:
+        self.grammar = grammar
+        self.eos_token_id = eos_token_id
+        self.vocab = list(vocab)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[State, Allowed]" = OrderedDict()
+        self._close_cache: "OrderedDict[State, List[List[Tuple[int, int]]]]" = OrderedDict()
+        self.states_compiled = 0
+        self.cache_hits = 0
+
+        usable = [(text, tid) for tid, text in enumerate(self.vocab)
+                  if text and tid != eos_token_id]
+        usable.sort()
+        self._texts = [t for t, _ in usable]
+        self._ids = [i for _, i in usable]
+
+        # String-content tables
+        plain = sorted((len(t), tid) for t, tid in usable if all(_plain(ch) for ch in t))
+        self.plain_ids: List[int] = [tid for _, tid in plain]
+        self._plain_lens = [n for n, _ in plain]
+        # Tokens whose first non-plain character is '"', grouped by the text after it
+        groups: Dict[str, List[Tuple[int, int]]] = {}
+        self._escape_tokens: List[Tuple[int, int]] = []
+        for text, tid in usable:
+            p = next((i for i, ch in enumerate(text) if not _plain(ch)), None)
+            if p is None:
+                continue
+            if text[p] == '"':
+                groups.setdefault(text[p + 1:], []).append((p, tid))
+            elif text[p] == "\\":
+                self._escape_tokens.append((p, tid))
+        self._close_groups = [(suffix, sorted(members)) for suffix, members in groups.items()]
+
+    # ── Queries ──────────────────────────────────────────────────────────────
+
+    def initial(self) -> State:
+        return self.grammar.initial()
+
+    def advance(self, state: State, token_id: int) -> Optional[State]:
+        if token_id == self.eos_token_id:
+            return state if self.grammar.is_complete(state) else None
+        text = self.vocab[token_id] if token_id < len(self.vocab) else None
+        return self.grammar.advance_text(state, text) if text else None
+
+    def is_complete(self, state: State) -> bool:
+        return self.grammar.is_complete(state)
+
+    def allowed(self, state: State) -> Allowed:
+        hit = self._cache.get(state)
+        if hit is not None:
+            self._cache.move_to_end(state)
+            self.cache_hits += 1
+            return hit
+        allowed = self._compile(state)
+        self._cache[state] = allowed
+        self.states_compiled += 1
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return allowed
+
+    def warm(self, token_ids: Sequence[int]) -> int:
+        """Compile every state along a reference output; returns states visited."""
+        state: Optional[State] = self.initial()
+        n = 0
+        for tid in token_ids:
+            self.allowed(state)
+            n += 1
+            state = self.advance(state, tid)
+            if state is None:
+                raise ValueError(f"reference output leaves the grammar at token {n}")
+        self.allowed(state)
+        return n + 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "vocab": len(self._texts),
+            "plain_tokens": len(self.plain_ids),
+            "string_close_groups": len(self._close_groups),
+            "states_cached": len(self._cache),
+            "states_compiled": self.states_compiled,
+            "cache_hits": self.cache_hits,
+        }
+
+    # ── Compilation ──────────────────────────────────────────────────────────
+
+    def _compile(self, state: State) -> Allowed:
+        if self.grammar.is_complete(state):
+            return Allowed(0, (self.eos_token_id,))
+        content = self.grammar.string_content(state)
+        if content is not None:
+            return self._compile_string(state, *content)
+        return Allowed(0, tuple(self._walk(state)))
+
+    def _compile_string(self, state: State, left: int, closed: State) -> Allowed:
+        plain = bisect.bisect_right(self._plain_lens, left)
+        ids: List[int] = []
+        for members in self._valid_closers(closed):
+            for p, tid in members:
+                if p > left:
+                    break
+                ids.append(tid)
+        for p, tid in self._escape_tokens:
+            if p <= left and self.grammar.advance_text(state, self.vocab[tid]) is not None:
+                ids.append(tid)
+        return Allowed(plain, tuple(ids))
+
+    def _valid_closers(self, closed: State) -> List[List[Tuple[int, int]]]:
+        """Groups of string-closing tokens whose text after the quote fits *closed*."""
+        hit = self._close_cache.get(closed)
+        if hit is not None:
+            self._close_cache.move_to_end(closed)
+            return hit
+        advance_text = self.grammar.advance_text
+        valid = []
+        for suffix, members in self._close_groups:
+            if not suffix or advance_text(closed, suffix) is not None:
+                valid.append(members)
+        self._close_cache[closed] = valid
+        if len(self._close_cache) > self.cache_size:
+            self._close_cache.popitem(last=False)
+        return valid
+
+    def _walk(self, state: State) -> List[int]:
+        """Trie walk over the sorted vocabulary, skipping rejected prefixes."""
+        texts, ids = self._texts, self._ids
+        advance_char = self.grammar.advance_char
+        out: List[int] = []
+        n = len(texts)
+        # Outside string content the next character is ASCII (JSON punctuation,
+        # digits or a literal), so only those first-character ranges are walked
+        for code in range(0x20, 0x7F):
+            c = chr(code)
+            s1 = advance_char(state, c)
+            if s1 is None:
+                continue
+            i = bisect.bisect_left(texts, c)
+            end = bisect.bisect_left(texts, chr(code + 1), i)
+            states = [state, s1]      # states[k] = state after text[:k]
+            prev = c
+            while i < end:
+                text = texts[i]
+                k = 1
+                limit = min(len(prev), len(text), len(states) - 1)
+                while k < limit and prev[k] == text[k]:
+                    k += 1
+                del states[k + 1:]
+                st = states[k]
+                j = k
+                while j < len(text):
+                    st = advance_char(st, text[j])
+                    if st is None:
+                        break
+                    states.append(st)
+                    j += 1
+                if st is None:
+                    # Every token starting with text[:j + 1] is rejected too
+                    prefix = text[:j + 1]
+                    i = bisect.bisect_left(texts, prefix[:-1] + chr(ord(prefix[-1]) + 1), i + 1, end)
+                    prev = text[:j]
+                    del states[j + 1:]
+                    continue
+                out.append(ids[i])
+                prev = text
+                i += 1
+        return out
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+# NUTRITION PLAN SCHEMA
+# ══════════════════════════════════════════════════════════════════════════════
+
+MEAL_ORDER = ("breakfast", "snack", "lunch", "dinner")   # build_3day_plan's meal_splits
+PLAN_DAYS = 3
+
+
+def nutrition_plan_grammar(max_items: int = 8, max_avoid: int = 40) -> JsonGrammar:
+    """The 3-day plan layout the model was fine-tuned on."""
+    g = JsonGrammar()
+    integer = g.number(int_digits=5)
+    grams = g.number(int_digits=4)
+    macro = g.number(int_digits=4, frac_digits=2)
+    macros = g.obj([("protein_g", macro), ("carbs_g", macro), ("fat_g", macro)])
+    item = g.obj([
+        ("name", g.string(80)), ("grams", grams), ("calories", integer),
+        ("protein_g", macro), ("carbs_g", macro), ("fat_g", macro),
+    ])
+    meal = g.obj([
+        ("items", g.array(item, 1, max_items)), ("total_calories", integer),
+        ("macros", macros), ("prep_notes", g.string(200)),
+    ])
+    meals = g.obj([(name, meal) for name in MEAL_ORDER])
+    days = []
+    for n in range(1, PLAN_DAYS + 1):
+        days += [g.lit("[" if n == 1 else ", "), g.obj([
+            ("day", g.lit(str(n))), ("total_calories", integer), ("macros", macros),
+            ("meals", meals), ("hydration_ml", integer),
+        ])]
+    g.set_root(g.obj([
+        ("foods_to_avoid", g.array(g.string(60), 0, max_avoid)),
+        ("days", g.seq(*days, g.lit("]"))),
+    ]))
+    return g
+
+
+def example_plan(items_per_meal: int = 3) -> dict:
+    """A small plan in the schema, for warming the token automaton at startup."""
+    item = {"name": "Ful medames with olive oil", "grams": 200, "calories": 250,
+            "protein_g": 13.5, "carbs_g": 30.0, "fat_g": 8.2}
+    macros = {"protein_g": 40.5, "carbs_g": 90.0, "fat_g": 24.6}
+    meal = {"items": [item] * items_per_meal, "total_calories": 750, "macros": macros,
+            "prep_notes": "Cook the beans with cumin; serve with baladi bread."}
+    return {
+        "foods_to_avoid": ["white bread", "pickles"],
+        "days": [{"day": n, "total_calories": 3000, "macros": macros,
+                  "meals": {name: meal for name in MEAL_ORDER}, "hydration_ml": 2500}
+                 for n in range(1, PLAN_DAYS + 1)],
+    }
+
+
+NUTRITION_PLAN_GRAMMAR = nutrition_plan_grammar()
@@ -0,0 +1,142 @@
+"""
+plan_stream.py
+--------------
+Incremental parsing of the nutrition model's output for /generate/stream.
+
+``DayStreamParser`` follows the text as it is generated with the same
+brace/string state machine as ``JsonRootTracker``, extended to arrays and
+to the keys of the root object.  When an element of the root ``"days"``
+array closes, exactly that element's text is parsed and returned, so each
+day reaches the member seconds after the model writes it instead of after
+the whole plan::
+
+    parser = DayStreamParser(max_days=3)
+    for chunk in text_chunks:
+        for day in parser.feed(chunk):
+            ...                       # a complete days[i] dict
+    plan = extract_json(parser.text)  # the whole output, for the final fixes
+
+Only days that parse as-is are returned; a malformed day is skipped here
+(``skipped`` counts them) and left to ``extract_json``'s recovery cascade
+on the full text at the end.
+
+``TokenTextStream`` turns token ids into text incrementally without
+splitting a multi-byte character that spans two tokens.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+class DayStreamParser:
+    """Returns each completed element of the root object's ``days`` array."""
+
+    def __init__(self, max_days: Optional[int] = None, key: str = "days") -> None:
+        self.max_days = max_days
+        self.key = key
+        self.days_emitted = 0
+        self.skipped = 0
+        self.closed = False
+        self._parts: List[str] = []
+        self._offset = 0             # characters fed before the current chunk
+        self._depth = 0              # open { and [
+        self._in_str = False
+        self._esc = False
+        self._key_chars: Optional[List[str]] = None   # string being read at depth 1
+        self._last_str: Optional[str] = None
+        self._root_key: Optional[str] = None
+        self._days_depth: Optional[int] = None        # depth inside the days array
+        self._day_start: Optional[int] = None         # absolute offset of the open day
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Scan *chunk*; return the days it completed, in order."""
+        self._parts.append(chunk)
+        days: List[Dict[str, Any]] = []
+        if self.closed:
+            self._offset += len(chunk)
+            return days
+        for i, ch in enumerate(chunk):
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                    if self._key_chars is not None:
+                        self._last_str = "".join(self._key_chars)
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(ch)
+                continue
+            if ch == '"':
+                self._in_str = True
+                self._key_chars = [] if self._depth == 1 else None
+            elif ch == ':' and self._depth == 1:
+                self._root_key = self._last_str
+            elif ch == ',' and self._depth == 1:
+                self._root_key = None
+            elif ch in "{[":
+                if self._depth == self._days_depth and ch == "{":
+                    self._day_start = self._offset + i
+                self._depth += 1
+                if ch == "[" and self._depth == 2 and self._root_key == self.key:
+                    self._days_depth = 2
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == self._days_depth and ch == "}" and self._day_start is not None:
+                    day = self._parse_day(self._offset + i + 1)
+                    if day is not None:
+                        days.append(day)
+                elif self._days_depth is not None and self._depth < self._days_depth:
+                    self._days_depth = None
+                if self._depth == 0:
+                    self.closed = True
+                    break
+        self._offset += len(chunk)
+        return days
+
+    def _parse_day(self, end: int) -> Optional[Dict[str, Any]]:
+        start, self._day_start = self._day_start, None
+        if self.max_days is not None and self.days_emitted >= self.max_days:
+            return None
+        try:
+            day = json.loads(self.text[start:end])
+        except json.JSONDecodeError:
+            self.skipped += 1
+            return None
+        if not isinstance(day, dict):
+            self.skipped += 1
+            return None
+        self.days_emitted += 1
+        return day
+
+
+class TokenTextStream:
+    """Token ids → text, holding back ids that end mid-character."""
+
+    def __init__(self, decode: Callable[[Sequence[int]], str]) -> None:
+        self._decode = decode
+        self._pending: List[int] = []
+
+    def push(self, token_ids: Sequence[int]) -> str:
+        self._pending.extend(token_ids)
+        text = self._decode(self._pending)
+        if text.endswith("\ufffd"):   # incomplete UTF-8 sequence: wait for more
+            return ""
+        self._pending = []
+        return text
+
+    def flush(self) -> str:
+        text = self._decode(self._pending) if self._pending else ""
+        self._pending = []
+        return text
@@ -0,0 +1,97 @@
+"""
+prefix_cache.py
+---------------
+Shared-prompt-prefix bookkeeping for the nutrition step models.
+
+Every prompt is ``apply_chat_template`` around SYSTEM_PROMPT and a user
+message that opens with the same sentence stem, so the first couple of
+hundred tokens are identical for every member.  Their KV is computed once
+per model load (``HFStepModel.set_prefix``); a request whose token ids
+start with the cached prefix reuses that KV and prefills only its own
+suffix (demographics, InBody flags, allergies, conditions, and the closing
+instructions, which come after them in the trained prompt format).
+
+The prefix is found rather than hard-coded: ``shared_prefix`` renders a few
+deliberately different sample requests and keeps their common token
+prefix, so a template or system-prompt change can't silently poison the
+cache.  ``match`` still compares ids per request — a prompt that happens
+to tokenize differently at the boundary just prefills in full.
+
+The cached KV is referenced, not copied: appending to a cache concatenates
+into new tensors, so the shared prefix tensors are never written.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+
+def common_prefix(seqs: Iterable[Sequence[int]]) -> List[int]:
+    """Longest common prefix of several token-id sequences."""
+    seqs = list(seqs)
+    if not seqs:
+        return []
+    n = min(len(s) for s in seqs)
+    for i in range(n):
+        tok = seqs[0][i]
+        if any(s[i] != tok for s in seqs[1:]):
+            return list(seqs[0][:i])
+    return list(seqs[0][:n])
+
+
+def shared_prefix(encode: Callable[[str], List[int]], prompts: Iterable[str]) -> List[int]:
+    """Common token prefix of the rendered sample prompts."""
+    return common_prefix([encode(p) for p in prompts])
+
+
+class PrefixCache:
+    """The shared prefix's ids and KV, plus hit/miss and time-saved counters."""
+
+    def __init__(self) -> None:
+        self.ids: tuple = ()
+        self.past: Any = None
+        self.build_ms = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.tokens_reused = 0
+        self.suffix_prefill_ms_total = 0.0
+
+    @property
+    def ready(self) -> bool:
+        return self.past is not None
+
+    def set(self, ids: Sequence[int], past: Any, build_ms: float) -> None:
+        self.ids = tuple(ids)
+        self.past = past
+        self.build_ms = build_ms
+
+    def match(self, prompt_ids: Sequence[int]) -> int:
+        """Prefix length to reuse for *prompt_ids* (0 → prefill in full)."""
+        n = len(self.ids)
+        # At least one suffix token must remain to produce the next-token logits
+        if self.ready and len(prompt_ids) > n and tuple(prompt_ids[:n]) == self.ids:
+            self.hits += 1
+            self.tokens_reused += n
+            return n
+        if self.ready:
+            self.misses += 1
+        return 0
+
+    def record_prefill(self, ms: float) -> None:
+        self.suffix_prefill_ms_total += ms
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Prefix size, hit rate and estimated prefill time saved, for /health."""
+        return {
+            "prefix_tokens": len(self.ids),
+            "prefix_build_ms": round(self.build_ms, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "tokens_reused": self.tokens_reused,
+            # Each hit skips one forward pass over the prefix
+            "prefill_ms_saved_total": round(self.hits * self.build_ms, 1),
+            "avg_suffix_prefill_ms": (round(self.suffix_prefill_ms_total / self.hits, 1)
+                                      if self.hits else None),
+        }
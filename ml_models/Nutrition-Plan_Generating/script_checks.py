@@ -0,0 +1,39 @@
+"""
+script_checks.py
+----------------
+``check()`` and the end-of-run summary shared by the test_*.py scripts in
+this directory, so each one works both as ``python test_<name>.py`` (no
+pytest in the Docker image) and under pytest::
+
+    from script_checks import check, summarize
+
+    def test_something():
+        check("it works", result == expected, repr(result))
+
+    def main():
+        test_something()
+        summarize("something")
+
+As a script every check prints PASS/FAIL and the run exits 1 at the end if
+any failed.  Under pytest a failed check raises, so it fails its test.
+"""
+import os
+import sys
+
+failures = []
+
+
+def check(name, ok, detail=""):
+    print(f"  {'PASS' if ok else 'FAIL'}  {name}{'  — ' + detail if detail and not ok else ''}")
+    if not ok:
+        failures.append(name)
+        if "PYTEST_CURRENT_TEST" in os.environ:
+            raise AssertionError(f"{name}  — {detail}" if detail else name)
+
+
+def summarize(title):
+    """Print the result of a script run; exit 1 if any check failed."""
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print(f"\nAll {title} checks passed")
@@ -8,9 +8,10 @@ Loads the fine-tuned QLoRA adapter (merged at startup) and the pre-built
 artefacts (food_db_halal.json, allergen_taxonomy.json, disease_rules.json).
 
 Endpoints:
-  POST /generate    — generate a 3-day nutrition plan
+  POST /generate    — generate a 3-day nutrition plan (continuous batching)
+  POST /generate/stream — same, streamed day by day (Server-Sent Events)
   GET  /health      — liveness check
-  GET  /foods/search?q=... — search food DB by name
+  GET  /foods/search?q=... — ranked food DB search (food_index.py)
 
 Request body schema (JSON):
 {
@@ -36,6 +37,27 @@ Request body schema (JSON):
 
 Response: 3-day JSON nutrition plan (same schema as training targets).
 
+Generation goes through continuous_batcher.ContinuousBatcher: concurrent
+requests share the GPU token by token instead of queueing behind one
+``model.generate`` call.  Each sequence retires as soon as its root JSON
+object closes and its slot is reused on the next step.
+
+The system prompt, chat template and opening sentence of every prompt are
+prefilled once at startup (prefix_cache.py); each request prefills only
+its member-specific suffix.  Prefill time saved is logged per request and
+reported under ``prefix_cache`` in /health.
+
+Decoding is constrained to the plan schema (plan_grammar.py): at every
+step only tokens that keep the output a prefix of a valid 3-day plan can
+be sampled, so the plan always parses, has exactly three days, and ends
+with EOS as soon as the root object closes.  extract_json's recovery is
+only needed when the token budget runs out mid-plan; finalize_plan still
+trims to three days in case that recovered text had more.
+
+Environment:
+    NUTRITION_BATCH_SIZE       max sequences decoded together (default 4)
+    NUTRITION_MAX_NEW_TOKENS   per-request token budget (default 4500)
+
 Requirements:
     pip install fastapi uvicorn transformers peft bitsandbytes torch
 
@@ -46,7 +68,7 @@ Run:
 """
 
 from peft import PeftModel
-from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig, StoppingCriteria, StoppingCriteriaList
+from transformers import AutoModelForCausalLM, AutoTokenizer, BitsAndBytesConfig
 from pydantic import BaseModel, Field, field_validator
 from fastapi.middleware.cors import CORSMiddleware
 import os
@@ -56,7 +78,7 @@ import math
 import time
 import logging
 from contextlib import asynccontextmanager
-from typing import Optional
+from typing import Any, AsyncIterator, Optional
 
 try:
     from json_repair import repair_json as _repair_json
@@ -67,6 +89,14 @@ except ImportError:
 import torch
 import uvicorn
 from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from continuous_batcher import ContinuousBatcher
+from food_index import FoodIndex
+from hf_step_model import HFStepModel
+from plan_grammar import NUTRITION_PLAN_GRAMMAR, example_plan
+from plan_stream import DayStreamParser, TokenTextStream
+from prefix_cache import shared_prefix
 
 # ── Allergen keyword expansion (taxonomy file is product-level; use these for plan injection) ──
 ALLERGEN_KEYWORDS: dict[str, list[str]] = {
@@ -80,60 +110,6 @@ ALLERGEN_KEYWORDS: dict[str, list[str]] = {
     "sesame":    ["sesame", "tahini", "sesame oil", "sesame seeds"],
 }
 
-# ── JSON end stopping criteria ──────────────────────────────────────────────
-
-
-class JsonRootClosedCriteria(StoppingCriteria):
-    """Stop generation once the root JSON object has been closed.
-
-    Uses incremental scanning — only processes newly generated tokens each call,
-    carrying brace/string state forward to avoid O(n^2) overhead.
-    """
-
-    def __init__(self, tokenizer, prompt_len: int):
-        self._tok = tokenizer
-        self._prompt_len = prompt_len
-        self._scanned_len = 0   # number of new tokens already processed
-        # Persistent parse state
-        self._depth = 0
-        self._in_str = False
-        self._esc = False
-        self._started = False
-
-    def __call__(self, input_ids, scores, **kwargs) -> bool:
-        new_ids = input_ids[0][self._prompt_len:]
-        total_new = len(new_ids)
-        if total_new <= self._scanned_len:
-            return False  # nothing new to scan
-
-        # Decode only the newly added tokens
-        incremental_ids = new_ids[self._scanned_len:]
-        incremental_text = self._tok.decode(
-            incremental_ids, skip_special_tokens=True)
-        self._scanned_len = total_new
-
-        for ch in incremental_text:
-            if self._esc:
-                self._esc = False
-                continue
-            if ch == "\\" and self._in_str:
-                self._esc = True
-                continue
-            if ch == '"':
-                self._in_str = not self._in_str
-                continue
-            if self._in_str:
-                continue
-            if ch == '{':
-                self._depth += 1
-                self._started = True
-            elif ch == '}':
-                self._depth -= 1
-                if self._started and self._depth == 0:
-                    return True
-        return False
-
-
 # ── Paths ───────────────────────────────────────────────────────────────────
 BASE = os.path.dirname(__file__)
 # Priority: fully-merged production model (SFT+DPO) → final checkpoint → base model
@@ -146,6 +122,9 @@ FOOD_DB_PATH = os.path.join(BASE, "food_db_halal.json")
 ALLERGEN_PATH = os.path.join(BASE, "allergen_taxonomy.json")
 DISEASE_PATH = os.path.join(BASE, "disease_rules.json")
 
+BATCH_SIZE = int(os.environ.get("NUTRITION_BATCH_SIZE", "4"))
+MAX_NEW_TOKENS = int(os.environ.get("NUTRITION_MAX_NEW_TOKENS", "4500"))
+
 logging.basicConfig(level=logging.INFO,
                     format="%(asctime)s [%(levelname)s] %(message)s")
 log = logging.getLogger("nutrition-serve")
@@ -154,8 +133,11 @@ log = logging.getLogger("nutrition-serve")
 _model = None
 _tokenizer = None
 _food_db: list = []
+_food_index: Optional[FoodIndex] = None
 _allergen: dict = {}
 _diseases: dict = {}
+_step_model: Optional[HFStepModel] = None
+_batcher: Optional[ContinuousBatcher] = None
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -164,13 +146,17 @@ _diseases: dict = {}
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    global _model, _tokenizer, _food_db, _allergen, _diseases
+    global _model, _tokenizer, _food_db, _food_index, _allergen, _diseases, _step_model, _batcher
 
     log.info("Loading artefacts...")
     if os.path.exists(FOOD_DB_PATH):
         with open(FOOD_DB_PATH, encoding="utf-8") as f:
             _food_db = json.load(f)
         log.info(f"Food DB: {len(_food_db):,} entries")
+        t0 = time.perf_counter()
+        _food_index = FoodIndex(_food_db)
+        log.info(f"Food search index: {_food_index.stats()['words']:,} words, "
+                 f"built in {time.perf_counter() - t0:.1f} s")
     else:
         log.warning("food_db_halal.json not found — food search disabled.")
 
@@ -241,10 +227,22 @@ async def lifespan(app: FastAPI):
 
     _tokenizer.pad_token = _tokenizer.eos_token
     _model.eval()
-    log.info("Model ready.")
+    _step_model = HFStepModel(_model, _tokenizer)
+    warm_prefix_cache()
+    t0 = time.perf_counter()
+    _step_model.constrain(NUTRITION_PLAN_GRAMMAR,
+                          warm_text=json.dumps(example_plan(), ensure_ascii=False))
+    log.info(f"Plan grammar compiled in {time.perf_counter() - t0:.1f} s "
+             f"({_step_model.grammar.stats()['states_compiled']} token states warmed)")
+    _batcher = ContinuousBatcher(_step_model, max_batch_size=BATCH_SIZE,
+                                 max_new_tokens=MAX_NEW_TOKENS)
+    _batcher.start()
+    log.info(f"Model ready (continuous batching, up to {BATCH_SIZE} sequences, "
+             f"device {_step_model.device}).")
     yield
 
     log.info("Shutting down.")
+    _batcher.stop(timeout=5)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -545,17 +543,24 @@ def correct_plan_calories(plan: dict) -> dict:
     `estimated_calories` in edge cases — we check both for robustness.
     """
     for day in plan.get("days", []):
-        meals = day.get("meals", {})
-        actual_total = sum(
-            meal.get("total_calories", meal.get("estimated_calories", 0))
-            for meal in (meals.values() if isinstance(meals, dict) else meals)
-        )
-        if actual_total > 0:
-            day["total_calories"] = actual_total
+        correct_day_calories(day)
     return plan
 
 
-def run_inference(req: NutritionRequest) -> dict:
+def correct_day_calories(day: dict) -> dict:
+    """`correct_plan_calories` for a single day (used as days stream out)."""
+    meals = day.get("meals", {})
+    actual_total = sum(
+        meal.get("total_calories", meal.get("estimated_calories", 0))
+        for meal in (meals.values() if isinstance(meals, dict) else meals)
+    )
+    if actual_total > 0:
+        day["total_calories"] = actual_total
+    return day
+
+
+def build_chat_prompt(req: NutritionRequest) -> tuple[str, int]:
+    """Chat-templated prompt and the daily calorie target for one request."""
     daily_kcal = compute_tdee(req)
     inbody_flags, cal_adj, protein_pct, carbs_pct, fat_pct = build_inbody_flags(
         req.inbody)
@@ -583,47 +588,33 @@ def run_inference(req: NutritionRequest) -> dict:
         tokenize=False,
         add_generation_prompt=True,
     )
-    _device = next(_model.parameters()).device
-    inputs = _tokenizer(prompt, return_tensors="pt",
-                        truncation=True, max_length=1536).to(_device)
-    log.info(f"Inference device: {_device}")
-
-    stopping_criteria = StoppingCriteriaList([
-        JsonRootClosedCriteria(_tokenizer, inputs["input_ids"].shape[1])
-    ])
-    with torch.no_grad():
-        output_ids = _model.generate(
-            **inputs,
-            max_new_tokens=4500,
-            temperature=0.3,
-            top_p=0.9,
-            do_sample=True,
-            repetition_penalty=1.1,
-            eos_token_id=_tokenizer.eos_token_id,
-            pad_token_id=_tokenizer.eos_token_id,
-            stopping_criteria=stopping_criteria,
-        )
+    return prompt, daily_kcal
 
-    new_tokens = output_ids[0][inputs["input_ids"].shape[1]:]
-    log.info(
-        f"Generated {len(new_tokens)} new tokens (prompt: {inputs['input_ids'].shape[1]} tokens)")
-    generated = _tokenizer.decode(new_tokens, skip_special_tokens=True)
 
+def finalize_plan(req: NutritionRequest, generated: str, daily_kcal: int) -> dict:
+    """Parse the model output and apply the post-processing fixes."""
     plan = extract_json(generated)
     plan = correct_plan_calories(plan)
 
-    # ── Post-processing fixes ────────────────────────────────────────────────
-
-    # 1. Trim to exactly 3 days (model sometimes generates 5-6)
+    # Trim to exactly 3 days.  The grammar already allows only three, but it
+    # stops applying when the token budget runs out mid-plan, and whatever
+    # extract_json then recovers was never checked against it.
     if isinstance(plan.get("days"), list):
         plan["days"] = plan["days"][:3]
 
-    # 2. Ensure foods_to_avoid is a list
+    inject_foods_to_avoid(req, plan)
+    plan["_daily_calories"] = daily_kcal
+    return plan
+
+
+def inject_foods_to_avoid(req: NutritionRequest, plan: dict) -> dict:
+    """Make sure the member's allergens and disease rules appear in foods_to_avoid."""
+    # 1. Ensure foods_to_avoid is a list
     if not isinstance(plan.get("foods_to_avoid"), list):
         plan["foods_to_avoid"] = []
     existing_avoid_lower = {x.lower() for x in plan["foods_to_avoid"]}
 
-    # 3. Inject allergen keywords so they always appear in foods_to_avoid
+    # 2. Inject allergen keywords so they always appear in foods_to_avoid
     for allergy in req.allergies:
         keywords = ALLERGEN_KEYWORDS.get(allergy.lower(), [allergy])
         if not keywords:  # fallback: add the raw allergy term
@@ -633,16 +624,52 @@ def run_inference(req: NutritionRequest) -> dict:
                 plan["foods_to_avoid"].append(kw)
                 existing_avoid_lower.add(kw.lower())
 
-    # 4. Inject disease-specific foods_to_avoid from rules (e.g. hypertension → pickles, chips, etc.)
+    # 3. Inject disease-specific foods_to_avoid from rules (e.g. hypertension → pickles, chips, etc.)
     for cond in req.health_conditions:
         rule = _diseases.get(cond.lower(), {})
         for item in rule.get("foods_to_avoid", []):
             if item.lower() not in existing_avoid_lower:
                 plan["foods_to_avoid"].append(item)
                 existing_avoid_lower.add(item.lower())
+    return plan
 
-    plan["_daily_calories"] = daily_kcal
-    return plan, daily_kcal
+
+# Requests that differ in every member-specific field: whatever token prefix
+# their prompts share is shared by every prompt.
+_PREFIX_SAMPLES = [
+    NutritionRequest(gender="male", age=25, weight_kg=90.0, height_cm=178.0,
+                     goal="weight_loss"),
+    NutritionRequest(gender="female", age=61, weight_kg=58.5, height_cm=162.0,
+                     goal="muscle_gain", activity_level="very_active",
+                     health_conditions=["diabetes"], allergies=["dairy"],
+                     cuisine_preference="international",
+                     inbody=InBodyData(body_fat_percentage=31.0, bmr_kcal=1400)),
+    NutritionRequest(gender="male", age=40, weight_kg=120.0, height_cm=190.0,
+                     goal="body_recomposition", activity_level="sedentary"),
+]
+
+
+def warm_prefix_cache() -> None:
+    """Prefill the prompt prefix every request shares, once per model load."""
+    ids = shared_prefix(_step_model.encode,
+                        (build_chat_prompt(r)[0] for r in _PREFIX_SAMPLES))
+    _step_model.set_prefix(ids)
+    log.info(f"Prefix cache: {len(ids)} shared prompt tokens prefilled in "
+             f"{_step_model.prefix.build_ms:.0f} ms")
+
+
+async def run_inference(req: NutritionRequest) -> tuple[dict, int]:
+    prompt, daily_kcal = build_chat_prompt(req)
+    prompt_ids = _step_model.encode(prompt)
+    result = await _batcher.submit(prompt_ids)
+    saved = (f", ~{_step_model.prefix.build_ms:.0f} ms saved"
+             if result.cached_prompt_tokens else "")
+    log.info(
+        f"Generated {len(result.token_ids)} new tokens (prompt: {result.prompt_tokens} tokens, "
+        f"{result.cached_prompt_tokens} from prefix cache; prefill {result.prefill_ms:.0f} ms"
+        f"{saved}; finish: {result.finish_reason}, queued {result.queue_ms} ms)")
+    generated = _step_model.decode_text(result.token_ids)
+    return finalize_plan(req, generated, daily_kcal), daily_kcal
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -658,18 +685,23 @@ def health():
         "food_db_size": len(_food_db),
         "allergen_entries": len(_allergen),
         "disease_rules": len(_diseases),
+        "food_index": _food_index.stats() if _food_index is not None else None,
+        "batcher": _batcher.stats() if _batcher is not None else None,
+        "prefix_cache": _step_model.prefix.stats() if _step_model is not None else None,
+        "grammar": (_step_model.grammar.stats()
+                    if _step_model is not None and _step_model.grammar is not None else None),
     }
 
 
 @app.post("/generate", response_model=NutritionResponse)
-def generate_plan(req: NutritionRequest):
+async def generate_plan(req: NutritionRequest):
     if _model is None:
         raise HTTPException(503, "Model is still loading. Try again shortly.")
 
     log.info(f"Generating plan for member={req.member_id} goal={req.goal}")
     t0 = time.time()
     try:
-        plan, daily_kcal = run_inference(req)
+        plan, daily_kcal = await run_inference(req)
     except Exception as e:
         log.error(f"Inference error: {e}")
         raise HTTPException(500, f"Inference failed: {str(e)}")
@@ -687,6 +719,77 @@ def generate_plan(req: NutritionRequest):
     )
 
 
+def _sse(event: str, data: Any) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/generate/stream")
+async def generate_plan_stream(req: NutritionRequest) -> StreamingResponse:
+    """
+    Streaming variant of /generate (Server-Sent Events).
+
+    Events, in order:
+      context  – calorie target computed, request queued
+      day      – {"index": i, "day": {...}} as soon as the model closes
+                 days[i], with its total_calories corrected; the grammar
+                 allows exactly 3
+      plan     – the complete plan, same shape as the /generate response,
+                 with foods_to_avoid and the allergen / disease injections
+      error    – generation failed; no plan event follows
+
+    Decoding is grammar-constrained, so every day the model closes parses;
+    if the token budget runs out mid-plan and extract_json's recovery
+    rescues the open day, it is sent just before ``plan``.
+    """
+    if _model is None:
+        raise HTTPException(503, "Model is still loading. Try again shortly.")
+
+    log.info(f"Streaming plan for member={req.member_id} goal={req.goal}")
+    t0 = time.time()
+    prompt, daily_kcal = build_chat_prompt(req)
+    prompt_ids = _step_model.encode(prompt)
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("context", {"member_id": req.member_id, "daily_calories": daily_kcal,
+                               "prompt_tokens": len(prompt_ids)})
+        text = TokenTextStream(_step_model.decode_text)
+        parser = DayStreamParser()
+        streamed = 0
+        try:
+            async for token_ids, result in _batcher.stream(prompt_ids):
+                chunk = text.push(token_ids) + (text.flush() if result else "")
+                for day in parser.feed(chunk):
+                    yield _sse("day", {"index": streamed, "day": correct_day_calories(day)})
+                    streamed += 1
+            log.info(
+                f"Streamed {len(result.token_ids)} new tokens, {streamed} days "
+                f"(finish: {result.finish_reason}, queued {result.queue_ms} ms)")
+
+            plan = finalize_plan(req, parser.text, daily_kcal)
+            for i, day in enumerate(plan.get("days", [])[streamed:], streamed):
+                yield _sse("day", {"index": i, "day": day})
+            elapsed_ms = int((time.time() - t0) * 1000)
+            log.info(f"Plan streamed for member={req.member_id} in {elapsed_ms} ms")
+            yield _sse("plan", NutritionResponse(
+                member_id=req.member_id,
+                generated_at=__import__(
+                    "datetime").datetime.utcnow().isoformat() + "Z",
+                daily_calories=daily_kcal,
+                plan=plan,
+                generation_ms=elapsed_ms,
+            ).model_dump())
+        except Exception as e:
+            log.error(f"Streaming inference error: {e}")
+            yield _sse("error", {"error": f"Inference failed: {str(e)}"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.get("/foods/search")
 def search_foods(
     q: str = Query(..., min_length=1, max_length=100,
@@ -694,22 +797,14 @@ def search_foods(
     source: Optional[str] = Query(None, pattern="^(egyptian|usda)$"),
     limit: int = Query(20, ge=1, le=100),
 ):
-    """Fuzzy-ish food search — substring match on name, case-insensitive."""
-    q_lower = q.lower()
-    results = []
-    for food in _food_db:
-        if source and food.get("source") != source:
-            continue
-        if q_lower in food.get("name", "").lower():
-            results.append({
-                "id":      food.get("id"),
-                "name":    food.get("name"),
-                "source":  food.get("source"),
-                "per_100g": food.get("per_100g", {}),
-                "health_score": food.get("health_score"),
-            })
-        if len(results) >= limit:
-            break
+    """
+    Food search for typeahead and lookups.
+
+    Ranked by match quality — exact name, name starts with q, all words,
+    all word prefixes, then misspelling / transliteration matches — and
+    then by health_score.  See food_index.py.
+    """
+    results = _food_index.search(q, source, limit) if _food_index is not None else []
     return {"query": q, "count": len(results), "foods": results}
 
 
@@ -0,0 +1,247 @@
+"""
+Scheduler tests for continuous_batcher.ContinuousBatcher, on the CPU
+stand-in model (ScriptedStepModel) — no torch, no GPU.
+
+Checks:
+  - every sequence's output is exactly its own script up to the token that
+    closes the root JSON object (trailing chatter never generated), with
+    prompts of very different lengths sharing one batch
+  - a request submitted while others are running is admitted on the next
+    step, not after the batch drains, and a retired sequence's slot is
+    reused on the following step
+  - the batch never exceeds max_batch_size and every KV cache is released
+  - token budget, EOS and a decode failure retire the right sequences
+  - the async submit() path and cancellation of a waiting caller
+  - stream(): tokens arrive before the sequence retires, in order, and
+    closing the stream early frees the slot
+  - shared-prefix reuse: identical outputs, only the suffix prefilled,
+    non-matching prompts fall back to a full prefill
+
+Run with: python test_continuous_batcher.py   (or pytest)
+"""
+import asyncio
+
+from continuous_batcher import ContinuousBatcher, ScriptedStepModel, json_script
+from prefix_cache import common_prefix, shared_prefix
+from script_checks import check, summarize
+
+
+def expected_output(prompt):
+    text = json_script(prompt)
+    plan_end = text.index("\nHope")
+    # Generation stops on the 3-char piece containing the closing brace
+    return text[:((plan_end - 1) // 3 + 1) * 3]
+
+
+def test_outputs_and_slots():
+    print("1. Mixed-length prompts, max_batch_size=3")
+    model = ScriptedStepModel()
+    batcher = ContinuousBatcher(model, max_batch_size=3, max_new_tokens=10_000)
+    prompts = [f"member {i} " + "x" * (i * 37) for i in range(7)]
+    seqs = [batcher.enqueue(model.encode(p)) for p in prompts]
+    batcher.run_until_idle()
+
+    outputs = [model.decode_text(s.generated) for s in seqs]
+    check("outputs match scripts up to the root close",
+          outputs == [expected_output(p) for p in prompts])
+    check("every sequence retired on json_closed",
+          all(s.finish_reason == "json_closed" for s in seqs))
+    check("batch never exceeds max_batch_size", max(model.batch_sizes) == 3,
+          str(max(model.batch_sizes)))
+    check("all KV caches released", model.live_caches == 0, str(model.live_caches))
+    stats = batcher.stats()
+    check("stats count every generated token",
+          stats["tokens_total"] == sum(len(s.generated) for s in seqs))
+
+
+def test_admission_mid_batch():
+    print("2. Token-granularity admission and slot reuse")
+    model = ScriptedStepModel()
+    batcher = ContinuousBatcher(model, max_batch_size=2)
+    long_seq = batcher.enqueue(model.encode("long " * 40))
+    short_seq = batcher.enqueue(model.encode("s"))
+    for _ in range(5):
+        batcher.step()
+    late = batcher.enqueue(model.encode("late"))
+    check("late request waits while both slots are busy",
+          batcher.step() > 0 and late.t_first_token is None)
+
+    while short_seq.finish_reason is None:
+        batcher.step()
+    check("short sequence retires while the long one is still running",
+          long_seq.finish_reason is None)
+    batcher.step()
+    check("freed slot goes to the waiting request on the next step",
+          late.t_first_token is not None and long_seq.finish_reason is None)
+    batcher.run_until_idle()
+    check("late and long sequences both complete",
+          late.finish_reason == long_seq.finish_reason == "json_closed")
+    check("late output is intact",
+          model.decode_text(late.generated) == expected_output("late"))
+
+
+def test_limits_and_errors():
+    print("3. Budget, EOS and decode failure")
+    model = ScriptedStepModel(script=lambda p: '{"never": "closes"' if p == "open" else "{}")
+    batcher = ContinuousBatcher(model, max_batch_size=4, max_new_tokens=5)
+    capped = batcher.enqueue(model.encode("open"), max_new_tokens=50)
+    short = batcher.enqueue(model.encode("open"), max_new_tokens=3)
+    batcher.run_until_idle()
+    check("max_new_tokens is capped by the batcher budget",
+          capped.finish_reason == "length" and len(capped.generated) == 5)
+    check("per-request budget is honoured",
+          short.finish_reason == "length" and len(short.generated) == 3)
+
+    model = ScriptedStepModel(script=lambda p: '{"a": 1')
+    batcher = ContinuousBatcher(model, max_batch_size=4)
+    ended = batcher.enqueue(model.encode("p"))
+    batcher.run_until_idle()
+    check("script exhausted → EOS retirement",
+          ended.finish_reason == "eos" and model.decode_text(ended.generated) == '{"a": 1')
+
+    model = ScriptedStepModel()
+    batcher = ContinuousBatcher(model, max_batch_size=4)
+    doomed = [batcher.enqueue(model.encode(f"d{i}")) for i in range(2)]
+    batcher.step()                       # prefill both
+    model.fail_next_decode = True
+    after = batcher.enqueue(model.encode("after"))
+    batcher.step()                       # decode fails; "after" was prefilled this step
+    check("decode failure fails only the sequences in that forward pass",
+          all(s.finish_reason == "error" for s in doomed) and after.finish_reason is None)
+    batcher.run_until_idle()
+    check("scheduler keeps going after a failure",
+          after.finish_reason == "json_closed" and model.live_caches == 0)
+
+
+async def _submit_many(batcher, model, prompts):
+    return await asyncio.gather(*(batcher.submit(model.encode(p)) for p in prompts))
+
+
+def test_async_submit():
+    print("4. async submit() and cancellation on the scheduler thread")
+    model = ScriptedStepModel(per_seq_latency_s=0.0002)
+    batcher = ContinuousBatcher(model, max_batch_size=4)
+    prompts = [f"async {i}" for i in range(10)]
+    try:
+        results = asyncio.run(_submit_many(batcher, model, prompts))
+        check("submit() returns each caller its own tokens",
+              [model.decode_text(r.token_ids) for r in results]
+              == [expected_output(p) for p in prompts])
+        check("finish reason and prompt length are reported",
+              all(r.finish_reason == "json_closed" for r in results)
+              and results[0].prompt_tokens == len(prompts[0]))
+
+        async def cancel_one():
+            task = asyncio.ensure_future(batcher.submit(model.encode("slow " * 200)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            for _ in range(100):
+                if batcher.stats()["active"] == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+        asyncio.run(cancel_one())
+        check("cancelled caller's sequence is retired",
+              batcher.finished.get("cancelled") == 1 and model.live_caches == 0,
+              str(batcher.stats()))
+    finally:
+        batcher.stop(timeout=5)
+    check("stop() joins the scheduler thread", not batcher.running)
+
+
+def test_stream():
+    print("6. stream()")
+    model = ScriptedStepModel(per_seq_latency_s=0.0005)
+    batcher = ContinuousBatcher(model, max_batch_size=2)
+
+    async def consume(prompt):
+        batches, result = [], None
+        async for tokens, result in batcher.stream(model.encode(prompt)):
+            batches.append((list(tokens), result is None))
+        return batches, result
+
+    async def close_early():
+        agen = batcher.stream(model.encode("abandon " * 50))
+        await agen.__anext__()
+        await agen.aclose()
+        for _ in range(100):
+            if batcher.stats()["active"] == 0:
+                break
+            await asyncio.sleep(0.01)
+
+    async def side_by_side():
+        return await asyncio.gather(consume("stream a"), consume("stream b"),
+                                    batcher.submit(model.encode("stream c")))
+
+    try:
+        (a, res_a), (b, _), res_c = asyncio.run(side_by_side())
+        tokens_a = [t for batch, _ in a for t in batch]
+        check("streamed tokens equal the final result's tokens",
+              tokens_a == res_a.token_ids and model.decode_text(tokens_a) == expected_output("stream a"))
+        check("tokens arrive before the sequence retires",
+              len(a) > 1 and all(pending for _, pending in a[:-1]) and not a[-1][1])
+        check("stream and submit share the batch",
+              model.decode_text(res_c.token_ids) == expected_output("stream c")
+              and max(model.batch_sizes) == 2)
+        asyncio.run(close_early())
+        check("closing a stream early retires its sequence",
+              batcher.finished.get("cancelled") == 1 and model.live_caches == 0,
+              str(batcher.stats()))
+    finally:
+        batcher.stop(timeout=5)
+
+
+def test_shared_prefix():
+    print("5. Shared prompt prefix")
+    check("common_prefix", common_prefix([[1, 2, 3], [1, 2, 4], [1, 2]]) == [1, 2]
+          and common_prefix([[5], [6]]) == [] and common_prefix([]) == [])
+
+    system = "<|im_start|>system\nYou are a coach.<|im_end|>\n<|im_start|>user\nPlan for a "
+    members = [f"{age}-year-old, allergies: {a}" for age, a in
+               ((25, "none"), (61, "dairy"), (40, "nuts, eggs"), (33, "gluten"))]
+    prompts = [system + m for m in members] + ["unrelated prompt"]
+
+    plain = ScriptedStepModel(prefill_token_latency_s=0.0001)
+    batcher = ContinuousBatcher(plain, max_batch_size=2)
+    baseline = [batcher.enqueue(plain.encode(p)) for p in prompts]
+    batcher.run_until_idle()
+
+    model = ScriptedStepModel(prefill_token_latency_s=0.0001)
+    ids = shared_prefix(model.encode, [system + m for m in members[:3]])
+    model.set_prefix(ids)
+    check("prefix is the shared system/template text",
+          model.decode_text(ids) == system)
+    batcher = ContinuousBatcher(model, max_batch_size=2)
+    seqs = [batcher.enqueue(model.encode(p)) for p in prompts]
+    batcher.run_until_idle()
+    check("outputs identical with and without the prefix cache",
+          [model.decode_text(s.generated) for s in seqs]
+          == [plain.decode_text(s.generated) for s in baseline])
+    check("matching prompts reuse the prefix, the unrelated one does not",
+          [s.cached_prompt_tokens for s in seqs] == [len(ids)] * 4 + [0])
+    stats = model.prefix.stats()
+    check("hit/miss counters", stats["hits"] == 4 and stats["misses"] == 1, str(stats))
+    check("batcher reports cached prompt tokens",
+          batcher.stats()["cached_prompt_tokens_total"] == 4 * len(ids))
+    check("prefix hits prefill faster",
+          max(s.prefill_ms for s in seqs[:4]) < min(s.prefill_ms for s in baseline[:4]))
+    check("prefix KV is never written",
+          model.prefix.past == list(ids) and model.live_caches == 0)
+
+
+def main():
+    test_outputs_and_slots()
+    test_admission_mid_batch()
+    test_limits_and_errors()
+    test_async_submit()
+    test_shared_prefix()
+    test_stream()
+    summarize("continuous batcher")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Tests for food_index.py (/foods/search), no model or food DB needed.
+
+A few thousand foods are generated in the two naming styles of
+food_db_halal.json (Egyptian "dish , qualifier", USDA "Food, part, prep")
+and every query is checked against a brute-force ranking written straight
+from the definitions: exact name > name starts with the query > all words
+> all word prefixes, then health_score (unscored last), then shorter name.
+
+Checks:
+  - the index ranking equals brute force for random full, reordered and
+    typeahead queries, with and without a source filter
+  - a source filter returns the same foods in the same order as filtering
+    the unfiltered ranking
+  - misspellings and transliteration variants find the intended dish;
+    fuzzy matches never outrank exact ones
+  - normalization, empty queries, unknown sources, the result cache
+
+Run with: python test_food_index.py   (or pytest)
+"""
+import functools
+import random
+
+from food_index import EXACT, PHRASE, TYPEAHEAD, WORDS, FoodIndex, normalize
+from script_checks import check, summarize
+
+NAME_WORDS = []      # normalize(food["name"]) per food, for brute_force
+
+DISHES = ["ful medames", "taameya", "koshari", "molokhia", "mahshi kousa", "fattah",
+          "basbousa", "konafa", "om ali", "baladi bread", "gebna domiati", "shorbat adas"]
+QUALIFIERS = ["cooked", "with oil", "fried", "boiled", "canned", "with rice", "stewed"]
+USDA = ["Chicken", "Beef", "Rice", "Bread", "Cheese", "Milk", "Yogurt", "Dates", "Oats"]
+PARTS = ["breast", "ground", "whole", "raw", "low fat", "white", "brown", "plain"]
+PREP = ["roasted", "boiled", "baked", "grilled", "ready-to-eat", "without salt"]
+
+
+def make_foods(rng):
+    foods, seen = [], set()
+    while len(foods) < 3000:
+        if len(foods) < 1000:
+            name = " , ".join([rng.choice(DISHES)] + rng.sample(QUALIFIERS, rng.randint(0, 3)))
+            source, score = "egyptian", None
+        else:
+            parts = [rng.choice(USDA)] + rng.sample(PARTS, rng.randint(0, 2))
+            name = ", ".join(parts + rng.sample(PREP, rng.randint(0, 1)))
+            source, score = "usda", round(rng.uniform(0, 100), 1)
+        if name in seen:
+            continue
+        seen.add(name)
+        foods.append({"id": f"f{len(foods)}", "name": name, "source": source,
+                      "per_100g": {}, "health_score": score})
+    return foods
+
+
+@functools.lru_cache(maxsize=1)
+def setup():
+    """(foods, index), built once."""
+    foods = make_foods(random.Random(25))
+    NAME_WORDS.extend(normalize(f["name"]) for f in foods)
+    return foods, FoodIndex(foods)
+
+
+def brute_force(foods, query, source=None, limit=20):
+    q = normalize(query)
+    phrase = " ".join(q)
+    ranked = []
+    for i, (food, words) in enumerate(zip(foods, NAME_WORDS)):
+        if source and food["source"] != source:
+            continue
+        name = " ".join(words)
+        if name == phrase:
+            quality = EXACT
+        elif name.startswith(phrase):
+            quality = PHRASE
+        elif all(w in words for w in q):
+            quality = WORDS
+        elif all(any(d.startswith(w) for d in words) for w in q):
+            quality = TYPEAHEAD
+        else:
+            continue
+        score = food["health_score"]
+        ranked.append((-quality, score is None, -(score or 0.0), len(food["name"]), i))
+    ranked.sort()
+    return [foods[r[-1]]["id"] for r in ranked[:limit]]
+
+
+def ids(results):
+    return [r["id"] for r in results]
+
+
+def test_ranking():
+    print("1. Ranking vs brute force")
+    foods, index = setup()
+    rng = random.Random(26)
+    queries = []
+    for food in rng.sample(foods, 150):
+        words = normalize(food["name"])
+        queries += [" ".join(words), " ".join(reversed(words)),
+                    " ".join(words[:2])[:rng.randint(1, 12)],
+                    " ".join(w[:rng.randint(1, len(w))] for w in words[-2:])]
+    bad = []
+    for query in queries:
+        for source in (None, "egyptian", "usda"):
+            if ids(index.search(query, source, 20)) != brute_force(foods, query, source, 20):
+                bad.append((query, source))
+    check(f"{len(queries) * 3} queries match", not bad, f"first: {bad[:3]}")
+
+    bad = []
+    for query in queries[:200]:
+        everything = index.search(query, None, 100)
+        for source in ("egyptian", "usda"):
+            expected = [r["id"] for r in everything if r["source"] == source][:10]
+            got = ids(index.search(query, source, 10))
+            if len(expected) == 10 and got != expected:
+                bad.append((query, source))
+    check("source filter = filtered unfiltered ranking", not bad, f"first: {bad[:3]}")
+
+    ranked = index.ranked(normalize("chicken"), "usda", 60)
+    tiers = {}
+    for doc, quality in ranked:
+        tiers.setdefault(quality, []).append(index._results[doc]["health_score"])
+    check("each tier ordered by health_score", len(tiers) > 1
+          and all(s == sorted(s, reverse=True) for s in tiers.values()), repr(list(tiers)))
+    top = index.search("koshari", None, 5)
+    check("unscored Egyptian foods still ranked by match quality first",
+          top[0]["name"] == "koshari", repr([r["name"] for r in top]))
+
+
+def test_fuzzy():
+    print("2. Misspellings and transliterations")
+    _, index = setup()
+    cases = {
+        "mulukhiya": "molokhia", "molokheya with oil": "molokhia", "foul medames": "ful medames",
+        "kushari": "koshari", "basboosa": "basbousa", "fatta": "fattah",
+        "chiken breast": "chicken breast", "yoghurt": "yogurt", "kunafa": "konafa",
+    }
+    for query, wanted in cases.items():
+        top = index.search(query, None, 5)
+        names = [" ".join(normalize(r["name"])) for r in top]
+        check(f"{query!r} → {wanted!r}", bool(names) and all(wanted in n for n in names[:1]),
+              repr(names[:3]))
+    ranked = index.ranked(normalize("koshari with oli"), None, 50)
+    qualities = [q for _, q in ranked]
+    check("fuzzy matches rank below exact tiers",
+          qualities == sorted(qualities, reverse=True) and all(0 < q < TYPEAHEAD for q in qualities),
+          repr(qualities[:5]))
+    check("gibberish finds nothing", index.search("xqzvvt", None, 20) == [])
+
+
+def test_edges():
+    print("3. Normalization and edge cases")
+    foods, index = setup()
+    check("apostrophes and accents", normalize("Ta'ameya, Café-style") == ["taameya", "cafe", "style"])
+    check("empty / punctuation-only query", index.search("  , . ", None, 20) == [])
+    check("unknown source", index.search("rice", "french", 20) == [])
+    first = index.search("rice white", None, 20)
+    check("repeated query served from cache",
+          index.search("Rice,  WHITE", None, 20) is first and index.cache_hits >= 1)
+    cold = FoodIndex(foods, cache_size=0)
+    check("no cache: same results", ids(cold.search("rice white", None, 20)) == ids(first)
+          and cold.cache_hits == 0)
+    check("stats", index.stats()["foods"] == len(foods)
+          and index.stats()["sources"] == {"egyptian": 1000, "usda": 2000})
+
+
+def main():
+    test_ranking()
+    test_fuzzy()
+    test_edges()
+    summarize("food index")
+
+
+if __name__ == "__main__":
+    main()
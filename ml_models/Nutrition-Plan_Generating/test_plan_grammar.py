@@ -0,0 +1,208 @@
+"""
+Tests for plan_grammar.py (constrained decoding), no model needed.
+
+The vocabulary is a stand-in for a BPE tokenizer's: every printable ASCII
+character, the words and punctuation runs of the reference plan in
+test_quick_result.json (with and without a leading space), and the
+awkward tokens a real vocabulary has — quotes glued to text ('",', '"}',
+'", "', '"name'), escapes, newlines, partial UTF-8 bytes ('\\ufffd').
+
+Checks:
+  - the reference plan, serialized as in training, is accepted token by
+    token and leaves the automaton in its accept state (only EOS allowed)
+  - the fast string-content masks equal a brute-force scan of the vocab
+  - random walks over the allowed tokens always produce JSON that parses
+    and has exactly the training schema: three days numbered 1–3, four
+    meals, 1–8 items per meal, integer calories
+  - wrong day numbers, a fourth day, extra keys and pretty-printing are
+    rejected
+
+Run with: python test_plan_grammar.py   (or pytest)
+"""
+import functools
+import json
+import os
+import random
+import re
+
+from plan_grammar import MEAL_ORDER, NUTRITION_PLAN_GRAMMAR, TokenAutomaton, example_plan
+from script_checks import check, summarize
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+EOS = 0
+
+
+def load_plan():
+    with open(os.path.join(BASE, "test_quick_result.json"), encoding="utf-8") as f:
+        plan = json.load(f)["plan"]
+    plan.pop("_daily_calories", None)
+    return plan
+
+
+@functools.lru_cache(maxsize=1)
+def setup():
+    """(plan, serialized plan, automaton, token ids of the plan), built once."""
+    plan = load_plan()
+    text = json.dumps(plan, ensure_ascii=False)
+    auto = TokenAutomaton(NUTRITION_PLAN_GRAMMAR, build_vocab(text), eos_token_id=EOS)
+    return plan, text, auto, tokenize(text, auto.vocab)
+
+
+def build_vocab(text):
+    pieces = {chr(c) for c in range(0x20, 0x7F)} | set(text)
+    for word in re.findall(r"\w+|[^\w\s]+", text):
+        pieces |= {word, " " + word}
+    pieces |= {'",', '"}', '"]', '", "', '": ', '{"', '"name', '":"', '"\n',
+               "\\n", '\\"', "\\u00e9", "\\", "\n", "\n\n", "}\n", "```", "�",
+               "��", "caf�", "}, {", "]}", "}}", "}]", ".0", "00"}
+    return [None] + sorted(pieces)       # id 0 is EOS
+
+
+def tokenize(text, vocab):
+    """Greedy longest match, as a stand-in for the real tokenizer."""
+    index = {t: i for i, t in enumerate(vocab) if t}
+    longest = max(len(t) for t in index)
+    ids, i = [], 0
+    while i < len(text):
+        for n in range(min(longest, len(text) - i), 0, -1):
+            if text[i:i + n] in index:
+                ids.append(index[text[i:i + n]])
+                i += n
+                break
+    return ids
+
+
+def brute_force(auto, state):
+    allowed = {tid for tid, t in enumerate(auto.vocab)
+               if t and auto.grammar.advance_text(state, t) is not None}
+    if auto.is_complete(state):
+        allowed.add(EOS)
+    return allowed
+
+
+def allowed_set(auto, state):
+    a = auto.allowed(state)
+    return set(auto.plain_ids[:a.plain]) | set(a.ids)
+
+
+def test_reference_plan():
+    print("1. Reference plan")
+    _, _, auto, ids = setup()
+    state, ok, where = auto.initial(), True, ""
+    for n, tid in enumerate(ids):
+        if tid not in allowed_set(auto, state):
+            ok, where = False, f"token {n} {auto.vocab[tid]!r} not allowed"
+            break
+        state = auto.advance(state, tid)
+    check("accepted token by token", ok, where)
+    check("accept state: only EOS allowed",
+          ok and auto.is_complete(state) and allowed_set(auto, state) == {EOS})
+    check("warm() walks the reference plan", auto.warm(ids) == len(ids) + 1)
+
+
+def test_masks_match_brute_force():
+    print("2. Masks vs brute force")
+    _, _, auto, ids = setup()
+    rng = random.Random(24)
+    state, states = auto.initial(), []
+    for tid in ids:
+        states.append(state)
+        state = auto.advance(state, tid)
+    states.append(state)
+    sample = rng.sample(states, 150) + states[:40] + states[-40:]
+    bad = [s for s in sample if allowed_set(auto, s) != brute_force(auto, s)]
+    in_string = sum(auto.grammar.string_content(s) is not None for s in sample)
+    detail = ""
+    if bad:
+        diff = sorted(allowed_set(auto, bad[0]) ^ brute_force(auto, bad[0]))
+        detail = f"{len(bad)} differ, first diff {[auto.vocab[t] for t in diff[:5]]}"
+    check(f"{len(sample)} states ({in_string} inside strings) match", not bad, detail)
+
+
+def random_walk(auto, rng, max_steps=20000):
+    state, out = auto.initial(), []
+    for _ in range(max_steps):
+        a = auto.allowed(state)
+        choices = list(a.ids) + auto.plain_ids[:a.plain]
+        if not choices:
+            return None, "dead end"
+        # Bias toward structure so walks finish: prefer non-plain tokens half the time
+        tid = rng.choice(a.ids if a.ids and rng.random() < 0.5 else choices)
+        if tid == EOS:
+            return "".join(out), None
+        out.append(auto.vocab[tid])
+        state = auto.advance(state, tid)
+    return None, "did not finish"
+
+
+def schema_ok(plan):
+    if list(plan) != ["foods_to_avoid", "days"] or len(plan["days"]) != 3:
+        return False
+    for n, day in enumerate(plan["days"], 1):
+        if day["day"] != n or list(day["meals"]) != list(MEAL_ORDER):
+            return False
+        if not isinstance(day["total_calories"], int) or not isinstance(day["hydration_ml"], int):
+            return False
+        for meal in day["meals"].values():
+            if not 1 <= len(meal["items"]) <= 8 or not isinstance(meal["total_calories"], int):
+                return False
+            if any(not isinstance(it["calories"], int) or not isinstance(it["name"], str)
+                   for it in meal["items"]):
+                return False
+    return True
+
+
+def test_random_walks():
+    print("3. Random walks stay in the schema")
+    _, _, auto, _ = setup()
+    rng = random.Random(7)
+    parsed, schema, errors = 0, 0, []
+    walks = 40
+    for _ in range(walks):
+        text, err = random_walk(auto, rng)
+        if err:
+            errors.append(err)
+            continue
+        try:
+            plan = json.loads(text.replace("�", "?"))
+        except json.JSONDecodeError as e:
+            errors.append(str(e))
+            continue
+        parsed += 1
+        schema += schema_ok(plan)
+    check(f"{walks} walks end in EOS and parse", parsed == walks, "; ".join(errors[:3]))
+    check("all have three days and the training schema", schema == walks)
+
+
+def test_rejections():
+    print("4. Rejected outputs")
+    plan, _, auto, _ = setup()
+    g = auto.grammar
+
+    def accepts(obj, **kw):
+        s = g.advance_text(g.initial(), json.dumps(obj, ensure_ascii=False, **kw))
+        return s is not None and g.is_complete(s)
+
+    check("reference accepted", accepts(plan))
+    check("example_plan (startup warm-up) accepted", accepts(example_plan()))
+    check("fourth day rejected", not accepts(dict(plan, days=plan["days"] + plan["days"][:1])))
+    check("two days rejected", not accepts(dict(plan, days=plan["days"][:2])))
+    swapped = dict(plan, days=[plan["days"][1], plan["days"][0], plan["days"][2]])
+    check("days out of order rejected", not accepts(swapped))
+    check("extra key rejected", not accepts(dict(plan, reference_suggestions=[])))
+    check("indented output rejected", not accepts(plan, indent=2))
+    day = dict(plan["days"][0], total_calories=2100.5)
+    check("fractional calories rejected", not accepts(dict(plan, days=[day] + plan["days"][1:])))
+
+
+def main():
+    test_reference_plan()
+    test_masks_match_brute_force()
+    test_random_walks()
+    test_rejections()
+    print(f"\n  automaton: {setup()[2].stats()}")
+    summarize("plan grammar")
+
+
+if __name__ == "__main__":
+    main()
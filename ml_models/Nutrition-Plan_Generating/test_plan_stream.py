@@ -0,0 +1,126 @@
+"""
+Tests for plan_stream.py (the /generate/stream parser), no model needed.
+
+The model output is the plan in test_quick_result.json, re-serialized the
+ways the model writes it (indented, compact, with a markdown fence and
+trailing chatter, with five days instead of three) and fed in chunks of
+random sizes — down to one character — so every boundary case between
+chunks is hit.
+
+Checks:
+  - each streamed day equals the same day of the fully parsed plan, and
+    arrives as soon as its closing brace is fed
+  - never more than max_days days; days after the root closes are ignored
+  - braces, brackets and a "days" key inside strings or nested objects
+    don't confuse it; a malformed day is skipped, not fatal
+  - TokenTextStream never splits a multi-byte character
+
+Run with: python test_plan_stream.py   (or pytest)
+"""
+import json
+import os
+import random
+
+from plan_stream import DayStreamParser, TokenTextStream
+from script_checks import check, summarize
+
+BASE = os.path.dirname(os.path.abspath(__file__))
+
+
+def chunks(text, rng, max_len):
+    i = 0
+    while i < len(text):
+        n = rng.randint(1, max_len)
+        yield text[i:i + n]
+        i += n
+
+
+def stream_days(text, rng, max_len, max_days=3):
+    parser = DayStreamParser(max_days=max_days)
+    days = []
+    for chunk in chunks(text, rng, max_len):
+        days.extend(parser.feed(chunk))
+    return parser, days
+
+
+def load_plan():
+    with open(os.path.join(BASE, "test_quick_result.json"), encoding="utf-8") as f:
+        plan = json.load(f)["plan"]
+    plan.pop("_daily_calories", None)
+    return plan
+
+
+def test_real_plan():
+    print("1. Real plan, random chunking")
+    plan = load_plan()
+    five = dict(plan, days=plan["days"] + [dict(d, day=d["day"] + 3) for d in plan["days"][:2]])
+    variants = {
+        "indented": json.dumps(plan, indent=2, ensure_ascii=False),
+        "compact": json.dumps(plan, separators=(",", ":")),
+        "fenced + chatter": "```json\n" + json.dumps(plan) + "\n```\nEnjoy! {\"days\": [{}]}",
+        "five days": json.dumps(five, indent=1),
+    }
+    rng = random.Random(23)
+    for label, text in variants.items():
+        ok = True
+        for max_len in (1, 3, 16, 200, len(text)):
+            parser, days = stream_days(text, rng, max_len)
+            ok &= days == plan["days"][:3] and parser.closed
+            ok &= parser.text == text
+        check(f"{label}: days match the parsed plan at every chunk size", ok)
+
+    text = json.dumps(plan)
+    parser = DayStreamParser(max_days=3)
+    first_end = text.index(json.dumps(plan["days"][0])) + len(json.dumps(plan["days"][0]))
+    early = parser.feed(text[:first_end])
+    check("day 1 is returned the moment its closing brace arrives",
+          early == plan["days"][:1])
+
+
+def test_tricky_json():
+    print("2. Strings, nesting and malformed days")
+    text = ('{"note": "a } ] { [ \\" days", "meta": {"days": [{"x": 1}]}, '
+            '"days": [{"day": 1, "tip": "use {braces}", "n": [1, [2]]}, '
+            '{"day": 2, "bad": ,}, {"day": 3, "esc": "\\\\"}], '
+            '"after": {"days": [{"day": 99}]}}')
+    rng = random.Random(5)
+    ok = True
+    for max_len in (1, 2, 7, len(text)):
+        parser, days = stream_days(text, rng, max_len, max_days=None)
+        ok &= days == [{"day": 1, "tip": "use {braces}", "n": [1, [2]]},
+                       {"day": 3, "esc": "\\"}] and parser.skipped == 1
+    check("only root-level days; malformed day 2 skipped", ok)
+
+    parser, days = stream_days('{"days": [{"day": 1}, {"day": 2', rng, 4)
+    check("truncated output: complete days only, root not closed",
+          days == [{"day": 1}] and not parser.closed)
+
+    parser, days = stream_days('{"days": [1, "x", {"day": 1}]}', rng, 3)
+    check("non-object elements are ignored", days == [{"day": 1}] and parser.closed)
+
+
+def test_token_text_stream():
+    print("3. TokenTextStream")
+    text = "Ful medames — طعمية, café {\"k\": 1}"
+    data = text.encode("utf-8")
+    # One "token" per byte: every multi-byte character is split
+    decode = lambda ids: bytes(ids).decode("utf-8", errors="replace")  # noqa: E731
+    stream = TokenTextStream(decode)
+    out = "".join(stream.push([b]) for b in data) + stream.flush()
+    check("byte-split characters are reassembled", out == text, repr(out))
+    stream = TokenTextStream(decode)
+    rng = random.Random(7)
+    pieces = [stream.push(list(c)) for c in chunks(data, rng, 4)] + [stream.flush()]
+    check("no replacement characters mid-stream",
+          "".join(pieces) == text and not any("\ufffd" in p for p in pieces))
+
+
+def main():
+    test_real_plan()
+    test_tricky_json()
+    test_token_text_stream()
+    summarize("plan stream")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Tokens-per-second benchmark for the workout model backends.
+
+Loads each backend (torch / int8 / onnx — see model_loader.py), warms it
+up, then generates REFERENCE_PROMPTS at batch size 1 and at --batch-size
+with the production decoding settings (num_beams=2, max_length=1024).
+Reports generated tokens per second and mean latency per call.
+
+Run with: python benchmarks/bench_backends.py [--backends torch int8 onnx] [--repeat 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from model_loader import REFERENCE_PROMPTS, ModelLoader  # noqa: E402
+
+BASE_MODEL = "google/flan-t5-small"
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3")
+MERGED_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-merged")
+ONNX_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-onnx")
+
+
+def bench(loader, batch_size, repeat):
+    batches = [REFERENCE_PROMPTS[i:i + batch_size]
+               for i in range(0, len(REFERENCE_PROMPTS), batch_size)]
+    tokens, calls = 0, 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for batch in batches:
+            _, n = loader.generate(batch)
+            tokens += n
+            calls += 1
+    elapsed = time.perf_counter() - t0
+    return tokens / elapsed, elapsed / calls * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    ap.add_argument("--batch-size", type=int, default=4)
+    ap.add_argument("--repeat", type=int, default=2)
+    args = ap.parse_args()
+
+    print(f"{'backend':<10}{'source':<26}{'load s':>8}{'bs=1 tok/s':>12}{'ms/call':>10}"
+          f"{f'bs={args.batch_size} tok/s':>12}{'ms/call':>10}")
+    for backend in args.backends:
+        loader = ModelLoader(BASE_MODEL, MODEL_DIR, merged_dir=MERGED_DIR,
+                             device="cpu", backend=backend, onnx_dir=ONNX_DIR)
+        try:
+            loader.load()
+        except (ImportError, FileNotFoundError) as e:
+            print(f"{backend:<10}skipped: {e}")
+            continue
+        loader.generate(REFERENCE_PROMPTS[:1])  # warm-up
+        tps1, ms1 = bench(loader, 1, args.repeat)
+        tpsb, msb = bench(loader, args.batch_size, args.repeat)
+        load_s = loader.finished_at - loader.started_at
+        print(f"{backend:<10}{loader.source:<26}{load_s:>8.1f}{tps1:>12.1f}{ms1:>10.0f}"
+              f"{tpsb:>12.1f}{msb:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Cold-start and per-process memory: CSV parsing vs. the compiled catalog.
+
+Each variant runs in a fresh interpreter (so nothing is warm in-process)
+and loads what workout_api_direct.py loads at import time — exercises,
+calisthenics pool, goal templates — then builds ExerciseIndex and the
+DB_BY_NAME map.  Reported per variant:
+
+  load ms     wall time to load exercises, calisthenics and templates
+  index ms    ExerciseIndex build on top (identical work for both)
+  RSS MB      resident set growth during the load
+  private MB  growth of Private_Clean+Private_Dirty (Linux smaps_rollup);
+              mapped catalog pages count as shared, so this is the part
+              each extra uvicorn worker pays for
+
+Run with: python benchmarks/bench_catalog_load.py [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATASET_DIR = os.path.join(SCRIPT_DIR, "Dataset")
+
+_CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, {script_dir!r})
+
+def mem():
+    out = {{}}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                k, v = line.split(":", 1)
+                if k in ("Rss", "Private_Clean", "Private_Dirty"):
+                    out[k] = int(v.split()[0]) / 1024
+    except OSError:
+        import resource
+        out["Rss"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return out.get("Rss", 0.0), out.get("Private_Clean", 0.0) + out.get("Private_Dirty", 0.0)
+
+from exercise_catalog import (ExerciseIndex, load_calisthenics,
+                              load_unique_exercises, load_workout_goal_templates)
+from compiled_catalog import CompiledCatalog
+
+rss0, priv0 = mem()
+t0 = time.perf_counter()
+if {mode!r} == "csv":
+    db = load_unique_exercises(os.path.join({dataset_dir!r}, "unique_exercises.csv"))
+    cal = load_calisthenics(os.path.join({dataset_dir!r}, "calisthenics-exercises-training-data.csv"))
+    try:
+        tmpl = load_workout_goal_templates(os.path.join({dataset_dir!r}, "workout_dataset.csv"))
+    except FileNotFoundError:
+        tmpl = {{}}
+else:
+    cat = CompiledCatalog.open({catalog!r}, {dataset_dir!r})
+    assert cat is not None, "compiled catalog missing or stale"
+    db = cat.exercises()
+    cal = cat.calisthenics()
+    tmpl = cat.goal_templates
+by_name = {{ex.get("name", "").lower().strip(): ex for ex in db}}
+t1 = time.perf_counter()
+index = ExerciseIndex(db)
+t2 = time.perf_counter()
+rss1, priv1 = mem()
+print(json.dumps({{"load": (t1 - t0) * 1000, "index": (t2 - t1) * 1000,
+                  "rss": rss1 - rss0, "private": priv1 - priv0, "n": len(db)}}))
+"""
+
+
+def run(mode, catalog, runs):
+    code = _CHILD.format(script_dir=SCRIPT_DIR, dataset_dir=DATASET_DIR,
+                         catalog=catalog, mode=mode)
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", code], check=True,
+                             capture_output=True, text=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return {k: statistics.median(r[k] for r in results)
+            for k in ("load", "index", "rss", "private", "n")}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    args = ap.parse_args()
+
+    sys.path.insert(0, SCRIPT_DIR)
+    from compiled_catalog import compile_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        catalog = os.path.join(tmp, "exercise_catalog.bin")
+        compile_catalog(DATASET_DIR, catalog)
+        print(f"Compiled catalog: {os.path.getsize(catalog) / 1024:.0f} KB; "
+              f"median of {args.runs} fresh processes\n")
+        print(f"{'variant':<10}{'load ms':>10}{'index ms':>10}{'RSS MB':>10}{'private MB':>12}")
+        for mode in ("csv", "compiled"):
+            r = run(mode, catalog, args.runs)
+            print(f"{mode:<10}{r['load']:>10.1f}{r['index']:>10.1f}{r['rss']:>10.1f}"
+                  f"{r['private']:>12.1f}"
+                  f"   ({int(r['n'])} exercises)")
+
+
+if __name__ == "__main__":
+    main()
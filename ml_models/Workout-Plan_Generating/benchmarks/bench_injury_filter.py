@@ -0,0 +1,105 @@
+"""
+Before/after micro-benchmark for InjuryRulesEngine.filter_exercises.
+
+"before" is the original loop (set-membership checks per exercise, a
+``dict(exercise)`` copy for every kept exercise, note text formatted per
+restricted exercise); "after" is the compiled pattern → action table
+(one dict lookup per exercise, copies only for annotated entries).
+
+The pool is the full Dataset/unique_exercises.csv catalog — the
+pre-model filtering the engine's module docstring describes — filtered
+against the decision for each single region and a few multi-region
+combinations.  Outputs are checked for equality before timing.  The
+batch API is timed on the pool split into 6 "days".
+
+Run with: python benchmarks/bench_injury_filter.py
+"""
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import load_unique_exercises  # noqa: E402
+from injury_rules_engine import (  # noqa: E402
+    DurationCategory, InjuryInput, InjuryRegion, InjuryRulesEngine, InjuryType,
+    Severity,
+)
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+
+
+def legacy_filter(exercises, decision):
+    """The pre-compiled filter_exercises loop."""
+    filtered = []
+    for exercise in exercises:
+        pattern = exercise.get("movement_pattern", "")
+        ex = dict(exercise)
+        if pattern in decision.contraindicated_patterns:
+            continue
+        if pattern in decision.restricted_patterns:
+            ex["load_modifier"] = round(decision.load_modifier, 2)
+            ex["rom_modifier"] = decision.rom_modifier.value
+            ex["injury_note"] = (
+                f"RESTRICTED ({pattern}): use "
+                f"{int(decision.load_modifier * 100)} % of normal load; "
+                f"ROM constraint: {decision.rom_modifier.value.replace('_', ' ')}."
+            )
+            if "reps_min" in ex:
+                ex["reps_min"] = max(1, int(ex["reps_min"] * decision.load_modifier))
+            if "reps_max" in ex:
+                ex["reps_max"] = max(1, int(ex["reps_max"] * decision.load_modifier))
+            sub = decision.substitutions.get(pattern)
+            if sub:
+                ex["substitution_suggestion"] = sub
+        filtered.append(ex)
+    return filtered
+
+
+def injury(region, severity=Severity.MODERATE):
+    return InjuryInput(
+        injury_region=region, injury_type=InjuryType.PAIN, severity=severity,
+        duration_category=DurationCategory.CHRONIC, pain_now=4,
+        pain_with_daily_activity=False, range_of_motion_limited=True,
+        doctor_cleared=False, currently_in_physio=False, movements_that_hurt=[],
+        recent_trauma=False, unexplained_swelling=False, major_weakness=False,
+        systemic_symptoms=False, worsening=False,
+    )
+
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000
+
+
+def main():
+    pool = [dict(ex, reps_min=8, reps_max=12) for ex in load_unique_exercises(CSV_PATH)]
+    engine = InjuryRulesEngine()
+
+    cases = [[injury(r)] for r in InjuryRegion]
+    cases += [[injury(InjuryRegion.SHOULDER), injury(InjuryRegion.LOWER_BACK, Severity.MILD)],
+              [injury(InjuryRegion.KNEE), injury(InjuryRegion.HIP), injury(InjuryRegion.ANKLE)]]
+    decisions = [engine.evaluate(c) for c in cases]
+
+    for decision in decisions:
+        assert legacy_filter(pool, decision) == engine.filter_exercises(pool, decision)
+        assert legacy_filter(pool, decision.thaw()) == engine.filter_exercises(pool, decision.thaw())
+    print(f"✅ Parity: {len(decisions)} decisions × {len(pool)} exercises (frozen and mutable)")
+
+    days = [pool[i::6] for i in range(6)]
+    print(f"{'decision':<34}{'kept':>6}{'annot.':>8}{'before':>10}{'after':>10}{'batch/6d':>10}  (ms)")
+    for case, decision in zip(cases, decisions):
+        label = " + ".join(f"{i.injury_region.value}/{i.severity.value}" for i in case)
+        out = engine.filter_exercises(pool, decision)
+        annotated = sum("injury_note" in ex for ex in out)
+        before = _time(lambda: legacy_filter(pool, decision), 20)
+        after = _time(lambda: engine.filter_exercises(pool, decision), 20)
+        batch = _time(lambda: engine.filter_exercise_lists(days, decision), 20)
+        print(f"{label[:33]:<34}{len(out):>6}{annotated:>8}{before:>10.3f}{after:>10.3f}{batch:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
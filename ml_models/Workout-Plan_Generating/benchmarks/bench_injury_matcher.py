@@ -0,0 +1,111 @@
+"""
+Before/after micro-benchmark for the injury keyword blacklist check.
+
+"before" is the original per-injury loop (``keyword.lower() in
+name.lower()`` for every keyword of every reported injury); "after" is
+InjuryKeywordMatcher (one Aho–Corasick scan of the name → every injury it
+triggers).  The blacklist is read straight from workout_api_direct.py so
+the benchmark can't drift from the service.
+
+Checks, before timing:
+  - parity of the triggering injury for every catalog name × every
+    reported-injury list of size 1–3, plus random keyword mash-ups
+  - the per-injury catalog bitmaps agree with the legacy check
+
+Run with: python benchmarks/bench_injury_matcher.py
+"""
+import ast
+import itertools
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import ExerciseIndex, load_unique_exercises  # noqa: E402
+from injury_keyword_matcher import InjuryKeywordMatcher  # noqa: E402
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+SERVICE_PATH = os.path.join(SCRIPT_DIR, "workout_api_direct.py")
+
+
+def load_blacklist():
+    """INJURY_EXERCISE_BLACKLIST from the service source (no torch import)."""
+    with open(SERVICE_PATH, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if (isinstance(node, ast.AnnAssign) and isinstance(node.target, ast.Name)
+                and node.target.id == "INJURY_EXERCISE_BLACKLIST"):
+            return ast.literal_eval(node.value)
+    raise RuntimeError("INJURY_EXERCISE_BLACKLIST not found")
+
+
+def legacy_first_unsafe(blacklist, name, injuries):
+    for injury in injuries:
+        name_lower = name.lower()
+        for keyword in blacklist.get(injury, []):
+            if keyword.lower() in name_lower:
+                return injury
+    return None
+
+
+def _time(fn, names, injury_lists, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for injuries in injury_lists:
+            for name in names:
+                fn(name, injuries)
+    return (time.perf_counter() - t0) / (repeat * len(names) * len(injury_lists)) * 1e6
+
+
+def main():
+    blacklist = load_blacklist()
+    db = load_unique_exercises(CSV_PATH)
+    index = ExerciseIndex(db)
+    names = [ex["name"] for ex in db]
+
+    t0 = time.perf_counter()
+    matcher = InjuryKeywordMatcher(blacklist)
+    t_build = time.perf_counter() - t0
+    n_keywords = sum(len(v) for v in blacklist.values())
+    print(f"Blacklist: {len(blacklist)} injuries, {n_keywords} keywords "
+          f"(automaton: {len(matcher._goto)} states, built in {t_build * 1000:.2f} ms)")
+
+    rng = random.Random(14)
+    keywords = [kw for kws in blacklist.values() for kw in kws] + ["cable", "press", "row", "band"]
+    mashups = [" ".join(rng.choice(keywords).title() for _ in range(3)) for _ in range(2000)]
+    injury_lists = [list(c) for k in (1, 2, 3)
+                    for c in itertools.permutations(blacklist, k)]
+    for injuries in injury_lists:
+        for name in names + mashups:
+            assert legacy_first_unsafe(blacklist, name, injuries) == \
+                matcher.first_unsafe(name, injuries), (name, injuries)
+    print(f"✅ Parity: {len(names) + len(mashups)} names × {len(injury_lists)} injury lists")
+
+    t0 = time.perf_counter()
+    masks = matcher.id_masks(index.name_lower)
+    t_masks = time.perf_counter() - t0
+    for injury, mask in masks.items():
+        for i, name in enumerate(names):
+            assert bool(mask >> i & 1) == (legacy_first_unsafe(blacklist, name, [injury]) == injury)
+    unsafe_any = 0
+    for mask in masks.values():
+        unsafe_any |= mask
+    print(f"✅ Catalog bitmaps: {bin(unsafe_any).count('1')}/{len(db)} exercises unsafe "
+          f"for at least one injury (built in {t_masks * 1000:.1f} ms)")
+
+    # Typical requests report 1–2 injuries; the legacy cost grows with both
+    sample = [["Knee"], ["Lower Back", "Shoulder"], ["Knee", "Hip", "Ankle"]]
+    for injuries in sample:
+        before_us = _time(lambda n, inj: legacy_first_unsafe(blacklist, n, inj), names, [injuries], 5)
+        matcher.bits.cache_clear()
+        cold_us = _time(matcher.first_unsafe, names, [injuries], 1)
+        warm_us = _time(matcher.first_unsafe, names, [injuries], 5)
+        print(f"{', '.join(injuries):<24} before {before_us:6.2f} µs | "
+              f"after (cold) {cold_us:6.2f} µs | after (cached) {warm_us:6.2f} µs  per name")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Before/after benchmark for bulk injury screening (/injury-screening/batch).
+
+"before" is what a client had to do without the endpoint: one
+``from_dict`` + ``evaluate`` (memo cache off) + ``decision_to_json`` per
+member.
+"after" is BatchScreener over the same NDJSON upload — in-batch dedupe of
+identical injury profiles, inline and with a 2-process pool.
+
+The upload mimics an import from the old system: most members share a
+handful of common profiles, the rest are random.  Every decision is
+checked against the per-member path before timing, plus a malformed line
+and a missing trailing newline.
+
+Run with: python benchmarks/bench_injury_screening.py
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from injury_rules_engine import (  # noqa: E402
+    DurationCategory, InjuryRegion, InjuryRulesEngine, InjuryType, Severity,
+    decision_to_json,
+)
+from injury_screening import BatchScreener, ndjson_lines  # noqa: E402
+
+N_MEMBERS = 5000
+
+
+def random_injury(rng):
+    return {
+        "injury_region": rng.choice(list(InjuryRegion)).value,
+        "injury_type": rng.choice(list(InjuryType)).value,
+        "severity": rng.choice(list(Severity)).value,
+        "duration_category": rng.choice(list(DurationCategory)).value,
+        "pain_now": rng.randint(0, 8),
+        "doctor_cleared": rng.random() < 0.3,
+        "range_of_motion_limited": rng.random() < 0.4,
+    }
+
+
+def make_upload(rng, n):
+    common = [[]] + [[random_injury(rng)] for _ in range(7)]
+    members = []
+    for i in range(n):
+        if rng.random() < 0.8:
+            injuries = rng.choice(common)
+        else:
+            injuries = [random_injury(rng) for _ in range(rng.randint(1, 2))]
+        members.append({"member_id": f"m-{i:05d}", "injuries": injuries})
+    return members
+
+
+def naive(members):
+    engine = InjuryRulesEngine(cache_size=0)
+    return [
+        decision_to_json(engine.evaluate(
+            [InjuryRulesEngine.from_dict(i) for i in m["injuries"]]), indent=None)
+        for m in members
+    ]
+
+
+async def _body(payload, chunk_size=8192):
+    for i in range(0, len(payload), chunk_size):
+        yield payload[i:i + chunk_size]
+
+
+async def screen(screener, payload):
+    return [line async for line in screener.screen(ndjson_lines(_body(payload)))]
+
+
+def main():
+    rng = random.Random(17)
+    members = make_upload(rng, N_MEMBERS)
+    payload = "\n".join(json.dumps(m) for m in members).encode()  # no trailing \n
+
+    inline = BatchScreener(workers=0)
+    pooled = BatchScreener(workers=2, pool_min_profiles=16)
+    pooled.start()
+    try:
+        expected = naive(members)
+        distinct = len({json.dumps(m["injuries"]) for m in members})
+        for screener in (inline, pooled):
+            out = [json.loads(line) for line in asyncio.run(screen(screener, payload))]
+            assert [o["line"] for o in out] == list(range(1, N_MEMBERS + 1))
+            assert [o["member_id"] for o in out] == [m["member_id"] for m in members]
+            assert [o["decision"] for o in out] == [json.loads(e) for e in expected]
+        bad = asyncio.run(screen(inline, b'{"member_id": 1, "injuries": []}\nnot json\n[1]\n'))
+        assert "decision" in json.loads(bad[0])
+        assert [json.loads(b)["line"] for b in bad[1:]] == [2, 3]
+        assert all("error" in json.loads(b) for b in bad[1:])
+        print(f"✅ Parity: {N_MEMBERS} members (≤{distinct} distinct profiles), "
+              f"inline and pooled; malformed lines reported in place")
+
+        t0 = time.perf_counter()
+        naive(members)
+        before = time.perf_counter() - t0
+        print(f"before (per member)      {before * 1000:8.1f} ms")
+        for label, screener in (("after (inline)", inline), ("after (2 processes)", pooled)):
+            t0 = time.perf_counter()
+            asyncio.run(screen(screener, payload))
+            after = time.perf_counter() - t0
+            print(f"{label:<24} {after * 1000:8.1f} ms  ({before / after:.1f}x)")
+    finally:
+        pooled.shutdown()
+
+
+if __name__ == "__main__":
+    main()
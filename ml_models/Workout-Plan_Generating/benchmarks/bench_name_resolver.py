@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for ExerciseNameResolver vs. the old linear DB_BY_NAME scan.
+
+Queries are the names flan-t5 tends to emit (the EXERCISE_METADATA_FALLBACK
+names plus a few typos).  Reports per-query latency for the legacy
+substring scan, the uncached resolver and the LRU-cached resolver, and
+checks that repeated resolution is deterministic.
+
+Run with: python benchmarks/bench_name_resolver.py
+"""
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import load_unique_exercises  # noqa: E402
+from exercise_name_resolver import ExerciseNameResolver  # noqa: E402
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+
+QUERIES = [
+    "Bench Press", "Incline Dumbbell Press", "Cable Flyes", "Push-Ups", "Flat Db Press",
+    "Dumbbell Flyes", "Barbell Rows", "Lat Pulldown", "Seated Cable Row", "Face Pulls",
+    "Pull-Ups", "Dumbbell Rows", "Overhead Press", "Lateral Raises", "Front Raises",
+    "Rear Delt Flyes", "Dumbbell Shoulder Press", "Tricep Pushdown",
+    "Overhead Tricep Extension", "Barbell Curls", "Hammer Curls", "Dumbbell Curls",
+    "Barbell Squat", "Leg Press", "Leg Extension", "Romanian Deadlift", "Leg Curl",
+    "Hip Thrust", "Bulgarian Split Squat", "Standing Calf Raises", "Goblet Squat",
+    "Dumbbell Lunges", "Plank", "Cable Woodchoppers", "Hanging Leg Raises",
+    "Treadmill HIIT", "Sternal Push-Up", "Reverse Pec Deck", "Deadlift",
+    # typos / transliterations the model produces on long outputs
+    "Dumbell Shoulder Press", "Arnold Pres", "Latpulldown", "Skullcrushers",
+]
+
+
+def legacy_lookup(db_by_name, name):
+    name_lower = name.lower().strip()
+    if name_lower in db_by_name:
+        return name_lower
+    for key in db_by_name:
+        if (name_lower in key or key in name_lower) and len(min(name_lower, key, key=len)) > 5:
+            return key
+    return None
+
+
+def main():
+    db = load_unique_exercises(CSV_PATH)
+    db_by_name = {ex["name"].lower().strip(): ex for ex in db}
+    t0 = time.perf_counter()
+    resolver = ExerciseNameResolver(db_by_name.keys())
+    print(f"Catalog: {len(resolver)} names, resolver build {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+    first = [resolver._resolve(q.lower()) for q in QUERIES]
+    assert first == [resolver._resolve(q.lower()) for q in QUERIES], "non-deterministic"
+    resolved = sum(1 for r in first if r)
+    legacy_resolved = sum(1 for q in QUERIES if legacy_lookup(db_by_name, q))
+    print(f"Resolved: {resolved}/{len(QUERIES)} (legacy substring scan: {legacy_resolved}/{len(QUERIES)})")
+
+    def bench(fn, repeat):
+        t = time.perf_counter()
+        for _ in range(repeat):
+            for q in QUERIES:
+                fn(q)
+        return (time.perf_counter() - t) / (repeat * len(QUERIES)) * 1e6
+
+    print(f"legacy scan      : {bench(lambda q: legacy_lookup(db_by_name, q), 20):8.1f} µs / query")
+    print(f"resolver uncached: {bench(lambda q: resolver._resolve(q.lower()), 20):8.1f} µs / query")
+    print(f"resolver cached  : {bench(resolver.resolve, 200):8.1f} µs / query")
+    for q, r in zip(QUERIES, first):
+        print(f"   {q:28s} → {r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Fuzz + benchmark corpus for model_output_scanner vs. the old regex parser.
+
+Corpus:
+  * archive/test_output_sample.json – a real flan-t5 output (truncated at
+    max_length, like most long generations)
+  * synthetic outputs in the same brace-less format, built from
+    unique_exercises.csv with the training script's field layout, plus the
+    same plans as strict JSON
+  * every synthetic output truncated at random offsets
+
+Checks:
+  1. Parity – on complete outputs the scanner extracts exactly what the
+     regex passes did (metadata, global exercises, per-day exercises and
+     their extra fields).  On truncated outputs it must find at least as
+     many days and exercises.
+  2. Fuzz – random deletions / insertions of quotes, brackets, colons and
+     commas; the scanner must not raise, and feeding the text in random
+     chunks must give the same events as feeding it whole, and as passing
+     it straight to close() (the scan_model_output path).
+  3. Adversarial – '"name" … "sets" … "reps" …' repeated with no "rest",
+     which makes ``"name".*?"sets".*?"reps".*?"rest"`` backtrack in
+     O(n^4).  The regex is stopped once a run exceeds REGEX_BUDGET_S.
+
+Run with: python benchmarks/bench_output_scanner.py
+"""
+import json
+import os
+import random
+import re
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import load_unique_exercises  # noqa: E402
+from model_output_scanner import ModelOutputScanner, scan_model_output  # noqa: E402
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+REAL_SAMPLE = os.path.join(SCRIPT_DIR, "archive", "test_output_sample.json")
+
+N_PLANS = 200
+TRUNCATIONS_PER_PLAN = 5
+FUZZ_CASES = 2000
+REGEX_BUDGET_S = 2.0
+
+SPLITS = {
+    3: [("Push", ["chest", "shoulders", "triceps"]), ("Pull", ["back", "biceps", "rear delts"]),
+        ("Legs", ["quads", "hamstrings", "glutes", "calves"])],
+    4: [("Push", ["chest", "shoulders", "triceps"]), ("Pull", ["back", "biceps", "rear delts"]),
+        ("Legs", ["quads", "hamstrings", "glutes", "calves"]), ("Upper Mix", ["chest", "back", "shoulders"])],
+    5: [("Chest", ["chest"]), ("Back", ["back", "lats"]), ("Shoulders & Arms", ["shoulders", "biceps", "triceps"]),
+        ("Legs", ["quads", "hamstrings", "glutes", "calves"]), ("Arms & Abs", ["biceps", "triceps", "core"])],
+    6: [("Push A", ["chest", "triceps"]), ("Pull A", ["back", "biceps"]), ("Legs A", ["quads", "calves"]),
+        ("Push B", ["shoulders", "triceps"]), ("Pull B", ["back", "rear delts"]),
+        ("Legs B", ["hamstrings", "glutes"])],
+}
+NOTES = ["Focus on controlled movement", "Mind-muscle connection", "Full range of motion",
+         "Squeeze at the top", "Keep core braced"]
+PATTERNS = ["horizontal_push", "vertical_push", "horizontal_pull", "vertical_pull",
+            "squat", "hinge", "elbow_extension", "elbow_flexion", "core"]
+
+
+# ── Legacy regex parser (the passes the scanner replaces) ─────────────────────
+
+EXERCISE_PATTERN = r'"name":\s*"([^"]+)".*?"sets":\s*"?(\d+)"?.*?"reps":\s*"([^"]+)".*?"rest":\s*"([^"]+)"'
+DAY_PATTERN = r'"day_number":\s*(\d+).*?"day_name":\s*"([^"]+)".*?"focus_areas":\s*\[([^\]]+)\]'
+
+
+def _legacy_fields(exercise, window):
+    m = re.search(r'"target_muscles":\s*\[([^\]]+)\]', window)
+    if m:
+        exercise["target_muscles"] = re.findall(r'"([^"]+)"', m.group(1))
+    for key in ("equipment", "notes", "movement_pattern", "exercise_type"):
+        m = re.search(rf'"{key}":\s*"([^"]+)"', window)
+        if m:
+            exercise[key] = m.group(1)
+
+
+def legacy_parse(text):
+    out = {"exercises": [], "days": []}
+    m = re.search(r'"plan_name":\s*"([^"]+)"', text)
+    out["plan_name"] = m.group(1) if m else None
+
+    seen = set()
+    for match in re.finditer(EXERCISE_PATTERN, text):
+        name = match.group(1).strip()
+        if name.lower() in seen:
+            continue
+        seen.add(name.lower())
+        ex = {"name": name, "sets": match.group(2), "reps": match.group(3), "rest": match.group(4)}
+        nxt = text.find('"name":', match.end())
+        _legacy_fields(ex, text[match.start():nxt if nxt > 0 else min(len(text), match.start() + 500)])
+        out["exercises"].append(ex)
+
+    day_matches = list(re.finditer(DAY_PATTERN, text))
+    for i, match in enumerate(day_matches):
+        day_text = text[match.end():day_matches[i + 1].start() if i + 1 < len(day_matches) else len(text)]
+        day = {"day_number": int(match.group(1)), "day_name": match.group(2),
+               "focus_areas": re.findall(r'"([^"]+)"', match.group(3)), "exercises": []}
+        m = re.search(r'"estimated_duration_minutes":\s*(\d+)', day_text)
+        if m:
+            day["estimated_duration_minutes"] = int(m.group(1))
+        seen_day = set()
+        for em in re.finditer(EXERCISE_PATTERN, day_text):
+            name = em.group(1).strip()
+            if name.lower() in seen_day:
+                continue
+            seen_day.add(name.lower())
+            ex = {"name": name, "sets": em.group(2), "reps": em.group(3), "rest": em.group(4)}
+            nxt = day_text.find('"name":', em.end())
+            _legacy_fields(ex, day_text[em.start():nxt if nxt > 0 else len(day_text)])
+            day["exercises"].append(ex)
+        out["days"].append(day)
+
+    m = re.search(r'"program_duration_weeks":\s*(\d+)', text)
+    out["program_duration_weeks"] = int(m.group(1)) if m else None
+    m = re.search(r'"notes":\s*"([^"]+)"', text)
+    out["notes"] = m.group(1) if m else None
+    m = re.search(r'"progressive_overload":\s*\{([^}]+)\}', text)
+    overload = {}
+    if m:
+        for key in ("type", "progression", "deload"):
+            km = re.search(rf'"{key}":\s*"([^"]+)"', m.group(1))
+            if km:
+                overload[key] = km.group(1)
+    out["progressive_overload"] = overload or None
+    return out
+
+
+def scanner_parse(text):
+    scanned = scan_model_output(text)
+    return {
+        "plan_name": scanned.plan_name,
+        "exercises": scanned.exercises,
+        "days": scanned.days,
+        "program_duration_weeks": scanned.program_duration_weeks,
+        "notes": scanned.notes,
+        "progressive_overload": scanned.progressive_overload,
+    }
+
+
+# ── Corpus ────────────────────────────────────────────────────────────────────
+
+def build_plan(rng, db):
+    days_per_week = rng.choice(sorted(SPLITS))
+    plan = {
+        "plan_name": f"{days_per_week}-Day {rng.choice(['Strength', 'Hypertrophy', 'Fat Loss'])} Plan",
+        "fitness_level": rng.choice(["Beginner", "Intermediate", "Advanced"]),
+        "goal": rng.choice(["Strength", "Muscle", "Fat Loss"]),
+        "days_per_week": days_per_week,
+        "program_duration_weeks": rng.randint(4, 12),
+        "days": [],
+    }
+    for i, (name, focus) in enumerate(SPLITS[days_per_week], 1):
+        exercises = []
+        for ex in rng.sample(db, rng.randint(4, 7)):
+            sets = rng.randint(3, 5)
+            exercises.append({
+                "name": ex["name"],
+                # Like the training data, a few outputs carry sets as a number
+                "sets": str(sets) if rng.random() < 0.8 else sets,
+                "reps": rng.choice(["4-6", "6-8", "8-12", "12-15"]),
+                "rest": f"{rng.choice([60, 90, 120, 180])} sec",
+                "target_muscles": ex.get("targetMuscles", [])[:3] or [""],
+                "equipment": (ex.get("equipments") or ["body weight"])[0],
+                "movement_pattern": rng.choice(PATTERNS),
+                "exercise_type": rng.choice(["compound", "isolation"]),
+                "notes": rng.choice(NOTES),
+            })
+        if rng.random() < 0.2:
+            exercises.append(dict(exercises[0]))  # the model repeats itself
+        plan["days"].append({
+            "day_number": i, "day_name": f"Day {i}: {name}", "focus_areas": focus,
+            "estimated_duration_minutes": rng.randint(45, 75), "exercises": exercises,
+        })
+    plan["progressive_overload"] = {"type": "Double Progression",
+                                    "progression": "Add reps, then weight", "deload": "Every 5th week"}
+    return plan
+
+
+def braceless(plan):
+    """Serialize like flan-t5 does: no braces around array elements."""
+    text = json.dumps(plan, ensure_ascii=False)[1:-1]
+    return text.replace("[{", "[").replace("}, {", ", ").replace("}]", "]")
+
+
+def build_corpus(rng, db):
+    complete, truncated = [], []
+    for _ in range(N_PLANS):
+        plan = build_plan(rng, db)
+        for text in (braceless(plan), json.dumps(plan)):
+            complete.append(text)
+            for _ in range(TRUNCATIONS_PER_PLAN):
+                truncated.append(text[:rng.randint(1, len(text) - 1)])
+    with open(REAL_SAMPLE, "r", encoding="utf-8") as f:
+        truncated.append(f.read())
+    return complete, truncated
+
+
+def mutate(rng, text):
+    chars = list(text)
+    for _ in range(rng.randint(1, 12)):
+        i = rng.randrange(len(chars) + 1)
+        op = rng.random()
+        if op < 0.4 and i < len(chars):
+            del chars[i]
+        elif op < 0.8:
+            chars.insert(i, rng.choice('"[]{}:,\\ '))
+        else:
+            chars.insert(i, chr(rng.randint(32, 0x2FF)))
+    return "".join(chars)
+
+
+def events_in_chunks(rng, text):
+    scanner = ModelOutputScanner()
+    events = []
+    pos = 0
+    while pos < len(text):
+        step = rng.randint(1, 12)
+        events.extend(scanner.feed(text[pos:pos + step]))
+        pos += step
+    events.extend(scanner.close())
+    return events
+
+
+def events_whole(text):
+    scanner = ModelOutputScanner()
+    return scanner.feed(text) + scanner.close()
+
+
+def time_per_call(fn, texts, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(texts) * 1000
+
+
+def main():
+    rng = random.Random(7)
+    db = load_unique_exercises(CSV_PATH)
+    complete, truncated = build_corpus(rng, db)
+    avg_len = sum(map(len, complete)) / len(complete)
+    print(f"Corpus: {len(complete)} complete + {len(truncated)} truncated outputs "
+          f"(avg {avg_len:.0f} chars)")
+
+    # ── 1. Parity ──
+    mismatches = [t for t in complete if legacy_parse(t) != scanner_parse(t)]
+    print(f"Parity on complete outputs: {len(complete) - len(mismatches)}/{len(complete)}")
+    assert not mismatches, mismatches[0][:300]
+
+    fewer = recovered = 0
+    for t in truncated:
+        old, new = legacy_parse(t), scanner_parse(t)
+        old_n = (len(old["days"]), sum(len(d["exercises"]) for d in old["days"]), len(old["exercises"]))
+        new_n = (len(new["days"]), sum(len(d["exercises"]) for d in new["days"]), len(new["exercises"]))
+        if any(n < o for n, o in zip(new_n, old_n)):
+            fewer += 1
+        elif new_n != old_n:
+            recovered += 1
+    print(f"Truncated outputs: {recovered} with more days/exercises recovered, "
+          f"{fewer} with fewer")
+    assert fewer == 0
+
+    # ── 2. Fuzz ──
+    fuzz_texts = [mutate(rng, rng.choice(complete + truncated)) for _ in range(FUZZ_CASES)]
+    for t in fuzz_texts:
+        whole = events_whole(t)
+        assert events_in_chunks(rng, t) == whole == ModelOutputScanner().close(t), t[:300]
+    print(f"Fuzz: {FUZZ_CASES} mutated outputs, chunked == whole == close(), no exceptions")
+
+    # ── 3. Throughput on realistic outputs ──
+    print("\nRealistic outputs (ms per output):")
+    print(f"  regex passes   {time_per_call(legacy_parse, complete):7.3f}")
+    print(f"  scanner        {time_per_call(scanner_parse, complete):7.3f}")
+    real = truncated[-1:] * 200
+    print(f"Real flan-t5 output ({len(real[0])} chars, ms per output):")
+    print(f"  regex passes   {time_per_call(legacy_parse, real):7.3f}")
+    print(f"  scanner        {time_per_call(scanner_parse, real):7.3f}")
+
+    # ── 4. Adversarial backtracking ──
+    print("\nAdversarial: name/sets/reps repeated n times with no \"rest\"")
+    print(f"  {'n':>6} {'chars':>7} {'regex ms':>10} {'scanner ms':>11}")
+    regex_alive = True
+    for n in (10, 20, 40, 80, 160, 1000, 10000):
+        text = '"name": "x", "sets": 3, "reps": "8", ' * n
+        regex_ms = "skipped"
+        if regex_alive:
+            t0 = time.perf_counter()
+            list(re.finditer(EXERCISE_PATTERN, text))
+            elapsed = time.perf_counter() - t0
+            regex_ms = f"{elapsed * 1000:.1f}"
+            regex_alive = elapsed < REGEX_BUDGET_S / 16  # next doubling ~16x
+        scan_ms = time_per_call(scan_model_output, [text], repeat=1)
+        print(f"  {n:>6} {len(text):>7} {regex_ms:>10} {scan_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
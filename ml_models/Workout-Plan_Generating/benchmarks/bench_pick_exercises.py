@@ -0,0 +1,155 @@
+"""
+Before/after micro-benchmark for _pick_exercises_for_focus candidate selection.
+
+"before" is the original full-catalog scan (rebuilding combined_text and
+running keyword substring checks per exercise); "after" is ExerciseIndex.
+Both are run on the full Dataset/unique_exercises.csv and their ordered
+candidate lists are checked for parity before timing.
+
+Run with: python benchmarks/bench_pick_exercises.py
+"""
+import os
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import (  # noqa: E402
+    FOCUS_KEYWORDS, LEG_FOCUSES, LEG_TARGET_MUSCLES, PULL_FOCUSES, PUSH_FOCUSES,
+    UPPER_PULL_TARGET_MUSCLES, UPPER_PUSH_TARGET_MUSCLES, ExerciseIndex,
+    base_name, equipment_aliases, load_unique_exercises,
+)
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+
+# Focus lists as produced by the 3–6 day templates in extract_workout_from_model_output
+FOCUS_CASES = [
+    ["chest", "shoulders", "triceps"],
+    ["back", "biceps", "rear delts"],
+    ["quads", "hamstrings", "glutes", "calves"],
+    ["chest", "back", "shoulders"],
+    ["chest"], ["back", "lats"],
+    ["shoulders", "biceps", "triceps"],
+    ["biceps", "triceps", "core"],
+    ["chest", "triceps"], ["back", "biceps"], ["quads", "calves"],
+    ["shoulders", "triceps"], ["back", "rear delts"], ["hamstrings", "glutes"],
+    ["mobility"],
+]
+EQUIPMENT_CASES = [[], ["Dumbbell", "Barbell"], ["Machine", "Cable"], ["Bodyweight"]]
+
+
+def legacy_candidates(db, focus_areas, equipment):
+    """The pre-index selection loop, up to (but excluding) the random shuffle."""
+    focus_set = {f.lower() for f in focus_areas}
+    excluded_patterns, excluded_body_parts, excluded_target_muscles = set(), set(), set()
+    if focus_set & PULL_FOCUSES and not (focus_set & PUSH_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        excluded_patterns = {"push", "elbow_extension", "horizontal_push", "vertical_push",
+                             "squat", "lunge", "hinge", "plyometric"}
+        excluded_body_parts = {"upper legs", "lower legs"}
+        excluded_target_muscles = LEG_TARGET_MUSCLES
+    elif focus_set & PUSH_FOCUSES and not (focus_set & PULL_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        excluded_patterns = {"pull", "elbow_flexion", "horizontal_pull", "vertical_pull",
+                             "squat", "lunge", "hinge", "plyometric"}
+        excluded_body_parts = {"upper legs", "lower legs"}
+        excluded_target_muscles = LEG_TARGET_MUSCLES
+    elif focus_set & LEG_FOCUSES and not (focus_set & (PUSH_FOCUSES | PULL_FOCUSES)):
+        excluded_patterns = {"horizontal_push", "vertical_push", "horizontal_pull",
+                             "vertical_pull", "elbow_extension", "elbow_flexion"}
+        excluded_target_muscles = UPPER_PUSH_TARGET_MUSCLES | UPPER_PULL_TARGET_MUSCLES
+    user_equipment = equipment_aliases(equipment)
+
+    candidates = []
+    for focus in focus_areas:
+        keywords = FOCUS_KEYWORDS.get(focus.lower(), [focus.lower()])
+        for ex in db:
+            real_muscles = [m for m in ex.get("targetMuscles", []) if m and m.strip()]
+            if not real_muscles:
+                continue
+            body_parts = ex.get("bodyParts", [])
+            if any(bp.lower() in ("full body", "other", "cardio") for bp in body_parts):
+                continue
+            ex_pattern = ex.get("movement_pattern", "").lower()
+            if excluded_patterns and any(excl in ex_pattern for excl in excluded_patterns):
+                continue
+            if excluded_body_parts and any(bp.lower() in excluded_body_parts for bp in body_parts):
+                continue
+            if excluded_target_muscles and any(m.lower().strip() in excluded_target_muscles for m in real_muscles):
+                continue
+            combined_text = " ".join([" ".join(real_muscles), " ".join(body_parts), ex_pattern]).lower()
+            if any(kw in combined_text for kw in keywords):
+                candidates.append(ex)
+
+    seen, unique = set(), []
+    for ex in candidates:
+        base = base_name(ex["name"])
+        if base not in seen:
+            seen.add(base)
+            unique.append(ex)
+
+    def has_equip(ex, skip_bw):
+        return any(ueq in e.lower() or e.lower() in ueq
+                   for e in ex.get("equipments", ["body weight"])
+                   for ueq in user_equipment if not (skip_bw and ueq == "body weight"))
+    unique = [ex for ex in unique if has_equip(ex, False)] + \
+             [ex for ex in unique if not has_equip(ex, False)]
+    unique.sort(key=lambda ex: ex["goal_suitability"]["Muscle"]
+                + (3 if ex["exercise_type"] == "compound" else 0)
+                + (2 if has_equip(ex, True) else 0), reverse=True)
+    return [ex["name"] for ex in unique]
+
+
+def indexed_candidates(index, focus_areas, equipment):
+    """The ExerciseIndex path used by _pick_exercises_for_focus."""
+    db = index.exercises
+    seen, ids = set(), []
+    for i in index.candidate_ids(focus_areas):
+        if index.base_names[i] not in seen:
+            seen.add(index.base_names[i])
+            ids.append(i)
+    user_equipment = equipment_aliases(equipment)
+    equip_mask = index.matching_equipment_ids(user_equipment)
+    bonus_mask = index.matching_equipment_ids(user_equipment, skip_body_weight=True)
+    ids = [i for i in ids if equip_mask >> i & 1] + [i for i in ids if not equip_mask >> i & 1]
+    goal_scores = index.goal_scores("Muscle")
+    ids.sort(key=lambda i: goal_scores[i] + (2 if bonus_mask >> i & 1 else 0), reverse=True)
+    return [db[i]["name"] for i in ids]
+
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for focus in FOCUS_CASES:
+            for eq in EQUIPMENT_CASES:
+                fn(focus, eq)
+    calls = repeat * len(FOCUS_CASES) * len(EQUIPMENT_CASES)
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def main():
+    t0 = time.perf_counter()
+    db = load_unique_exercises(CSV_PATH)
+    t_load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    index = ExerciseIndex(db)
+    t_index = time.perf_counter() - t0
+    print(f"Catalog: {len(db)} exercises (CSV load {t_load * 1000:.1f} ms, "
+          f"index build {t_index * 1000:.1f} ms)")
+
+    for focus in FOCUS_CASES:
+        for eq in EQUIPMENT_CASES:
+            before = legacy_candidates(db, focus, eq)
+            after = indexed_candidates(index, focus, eq)
+            assert before == after, f"parity mismatch for {focus} / {eq}"
+    print(f"✅ Parity: identical ranked candidates for "
+          f"{len(FOCUS_CASES) * len(EQUIPMENT_CASES)} focus/equipment cases")
+
+    before_us = _time(lambda f, e: legacy_candidates(db, f, e), 5)
+    after_us = _time(lambda f, e: indexed_candidates(index, f, e), 50)
+    print(f"before (full scan): {before_us:9.1f} µs / call")
+    print(f"after  (index)    : {after_us:9.1f} µs / call")
+    print(f"speedup           : {before_us / after_us:9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Startup-time profile for workout_api_direct.py, broken down by phase.
+
+Runs in a fresh interpreter each time (so module imports are cold) and
+times the same steps the service performs at startup:
+
+  imports    torch, transformers, peft, fastapi, asyncpg
+  tokenizer  AutoTokenizer.from_pretrained
+  weights    flan-t5 base weights (or the pre-merged checkpoint)
+  adapter    PeftModel.from_pretrained + merge_and_unload (0 when pre-merged)
+  device     .to(device) + eval()
+  datasets   exercise catalog (compiled or CSV), ExerciseIndex, name resolver
+
+and prints how long until the port can bind in each load mode:
+  eager       imports + model + datasets (model loads before FastAPI exists)
+  background  imports + datasets (model keeps loading after the port is up)
+
+Run with: python benchmarks/bench_startup.py [--runs 3] [--skip-model]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, {script_dir!r})
+phases = {{}}
+
+t = time.perf_counter()
+import torch, transformers, peft, fastapi, asyncpg  # noqa: F401
+phases["imports"] = time.perf_counter() - t
+
+if not {skip_model!r}:
+    from model_loader import ModelLoader
+    loader = ModelLoader("google/flan-t5-small",
+                         os.path.join({script_dir!r}, "models", "workout-generator-v3"),
+                         merged_dir={merged_dir!r})
+    loader.load()
+    for name, ms in loader.timer.as_ms().items():
+        if name != "imports":  # already paid above
+            phases[name] = ms / 1000
+    phases.setdefault("adapter", 0.0)
+
+t = time.perf_counter()
+from compiled_catalog import CompiledCatalog
+from exercise_catalog import ExerciseIndex, load_unique_exercises
+from exercise_name_resolver import ExerciseNameResolver
+dataset_dir = os.path.join({script_dir!r}, "Dataset")
+cat = CompiledCatalog.open(os.path.join(dataset_dir, "exercise_catalog.bin"), dataset_dir)
+db = cat.exercises() if cat else load_unique_exercises(os.path.join(dataset_dir, "unique_exercises.csv"))
+by_name = {{ex.get("name", "").lower().strip(): ex for ex in db}}
+ExerciseIndex(db)
+ExerciseNameResolver(by_name.keys())
+phases["datasets"] = time.perf_counter() - t
+phases["catalog_compiled"] = 1.0 if cat else 0.0
+print(json.dumps(phases))
+"""
+
+ORDER = ("imports", "tokenizer", "weights", "adapter", "device", "datasets")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=3)
+    ap.add_argument("--skip-model", action="store_true",
+                    help="only time imports and datasets")
+    ap.add_argument("--merged-dir", default=os.path.join(
+        SCRIPT_DIR, "models", "workout-generator-v3-merged"))
+    args = ap.parse_args()
+
+    code = _CHILD.format(script_dir=SCRIPT_DIR, skip_model=args.skip_model,
+                         merged_dir=args.merged_dir)
+    runs = []
+    for _ in range(args.runs):
+        proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(proc.stderr.strip().splitlines()[-1] if proc.stderr else "child failed")
+            sys.exit(1)
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    med = {k: statistics.median(r.get(k, 0.0) for r in runs) for k in runs[0]}
+    print(f"Startup phases (median of {args.runs} cold processes, "
+          f"catalog={'compiled' if med.get('catalog_compiled') else 'csv'}):")
+    for phase in ORDER:
+        if phase in med:
+            print(f"  {phase:<10}{med[phase] * 1000:>10.1f} ms")
+    model = sum(med.get(p, 0.0) for p in ("tokenizer", "weights", "adapter", "device"))
+    base = med["imports"] + med["datasets"]
+    print(f"\nPort can bind after:  eager {(base + model) * 1000:.0f} ms   "
+          f"background {base * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Latency benchmark for retrieve_user_context.
+
+Compares three strategies:
+  sequential — the original three queries one after another on one connection
+  parallel   — fetch_user_context_parallel (asyncio.gather, one connection each)
+  combined   — fetch_user_context (single LATERAL statement, one round-trip)
+
+By default it runs against an in-process Postgres stand-in that models a
+pool of --pool-size connections, a network round-trip of --rtt-ms and a
+per-statement server time of --server-ms.  Pass --dsn to run against a real
+local Postgres that has the IntelliFit schema instead.
+
+Run with: python benchmarks/bench_user_context.py [--concurrency 20] [--dsn postgresql://...]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+import user_context  # noqa: E402
+from user_context import (  # noqa: E402
+    INBODY_SQL, SCAN_SQL, STRENGTH_SQL, USER_CONTEXT_SQL,
+    fetch_user_context, fetch_user_context_parallel,
+)
+
+_STRENGTH_ROWS = [{"ExerciseName": f"Lift {i}", "OneRepMax": 100 - i, "ConfidenceScore": 0.9}
+                  for i in range(10)]
+
+
+class StandInConnection:
+    def __init__(self, rtt_s, server_s):
+        self.rtt_s = rtt_s
+        self.server_s = server_s
+
+    async def _roundtrip(self, sql):
+        # The combined statement does three index lookups server-side
+        work = self.server_s * (3 if sql is USER_CONTEXT_SQL else 1)
+        await asyncio.sleep(self.rtt_s * random.uniform(0.8, 1.3) + work)
+
+    async def fetchrow(self, sql, user_id):
+        await self._roundtrip(sql)
+        if sql is INBODY_SQL:
+            return {"MuscleMass": 35.2, "BodyFatPercentage": 21.0}
+        if sql is SCAN_SQL:
+            return {"UnderdevelopedMuscles": ["calves"], "WellDevelopedMuscles": ["chest"]}
+        return {"MuscleMass": 35.2, "BodyFatPercentage": 21.0, "inbody_found": True,
+                "UnderdevelopedMuscles": ["calves"], "WellDevelopedMuscles": ["chest"],
+                "scan_found": True,
+                "strength": [{"exercise": r["ExerciseName"], "one_rep_max": r["OneRepMax"],
+                              "confidence": r["ConfidenceScore"]} for r in _STRENGTH_ROWS]}
+
+    async def fetch(self, sql, user_id):
+        await self._roundtrip(sql)
+        return _STRENGTH_ROWS
+
+
+class StandInPool:
+    """Bounded pool: acquiring waits when all connections are checked out."""
+
+    def __init__(self, size, rtt_ms, server_ms):
+        self._sem = asyncio.Semaphore(size)
+        self._conn = StandInConnection(rtt_ms / 1000, server_ms / 1000)
+
+    @asynccontextmanager
+    async def acquire(self):
+        async with self._sem:
+            yield self._conn
+
+
+async def fetch_sequential(pool, user_id):
+    """The pre-change retrieve_user_context: three awaits on one connection."""
+    context = {}
+    async with pool.acquire() as conn:
+        row = await conn.fetchrow(INBODY_SQL, user_id)
+        if row:
+            context["inbody_data"] = dict(row)
+        row = await conn.fetchrow(SCAN_SQL, user_id)
+        if row:
+            context["muscle_scan"] = dict(row)
+        rows = await conn.fetch(STRENGTH_SQL, user_id)
+        if rows:
+            context["strength_profile"] = list(rows)
+    return context
+
+
+async def run(fn, pool, requests, concurrency):
+    latencies = []
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(uid):
+        async with sem:
+            t0 = time.perf_counter()
+            await fn(pool, uid)
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    await asyncio.gather(*(one(i % 500 + 1) for i in range(requests)))
+    latencies.sort()
+    return (statistics.median(latencies),
+            latencies[int(len(latencies) * 0.99) - 1],
+            latencies[-1])
+
+
+async def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=2000)
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--pool-size", type=int, default=10)
+    ap.add_argument("--rtt-ms", type=float, default=1.0)
+    ap.add_argument("--server-ms", type=float, default=0.3)
+    ap.add_argument("--dsn", default=None, help="real Postgres DSN instead of the stand-in")
+    args = ap.parse_args()
+
+    if args.dsn:
+        import asyncpg
+        pool = await asyncpg.create_pool(args.dsn, min_size=args.pool_size, max_size=args.pool_size)
+        target = f"Postgres at {args.dsn}"
+    else:
+        pool = StandInPool(args.pool_size, args.rtt_ms, args.server_ms)
+        target = (f"stand-in (pool={args.pool_size}, rtt={args.rtt_ms}ms, "
+                  f"server={args.server_ms}ms/lookup)")
+
+    # Silence the per-request ✅ prints while timing
+    user_context.print = lambda *a, **k: None
+    print(f"Target: {target}; {args.requests} requests @ concurrency {args.concurrency}")
+    for name, fn in (("sequential", fetch_sequential),
+                     ("parallel  ", fetch_user_context_parallel),
+                     ("combined  ", fetch_user_context)):
+        p50, p99, worst = await run(fn, pool, args.requests, args.concurrency)
+        print(f"{name}: p50 {p50:7.2f} ms   p99 {p99:7.2f} ms   max {worst:7.2f} ms")
+
+    if args.dsn:
+        await pool.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,252 @@
+"""
+Before/after micro-benchmark for Step 2b day-focus validation.
+
+"before" is the original _validate_day_focus loop (per exercise: join the
+DB entry's muscles/body parts/pattern into a string, then substring-test
+every exclusion and FOCUS_MUSCLE_MAP keyword); "after" is the
+ExerciseIndex path (one name → id lookup and a few bit tests against the
+precomputed focus / exclusion masks).  Both run on the full
+Dataset/unique_exercises.csv over days built from catalog names, fuzzy
+model-style names and names the catalog doesn't know; the kept exercises
+and the removal log lines are checked for parity before timing.
+
+Run with: python benchmarks/bench_validate_focus.py
+"""
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import (  # noqa: E402
+    DAY_EXCLUSIONS, FOCUS_MUSCLE_MAP, LEG_FOCUSES, LEG_TARGET_MUSCLES, PULL_FOCUSES,
+    PUSH_FOCUSES, UPPER_PULL_TARGET_MUSCLES, UPPER_PUSH_TARGET_MUSCLES, ExerciseIndex,
+    load_unique_exercises,
+)
+from exercise_name_resolver import ExerciseNameResolver  # noqa: E402
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "unique_exercises.csv")
+
+# The 6-day template split plus the other template focus lists
+FOCUS_CASES = [
+    ["chest", "triceps"], ["back", "biceps"], ["quads", "calves"],
+    ["shoulders", "triceps"], ["back", "rear delts"], ["hamstrings", "glutes"],
+    ["chest", "shoulders", "triceps"], ["back", "biceps", "rear delts"],
+    ["quads", "hamstrings", "glutes", "calves"], ["chest", "back", "shoulders"],
+    ["biceps", "triceps", "core"], ["mobility"],
+]
+MODEL_ONLY = [
+    {"name": "Cable Woodchoppers X", "target_muscles": ["core", "obliques"]},
+    {"name": "Band Pull Apart Xyz", "target_muscles": ["rear delts", "upper back"],
+     "movement_pattern": "horizontal_pull"},
+    {"name": "Sled Push Xyz", "target_muscles": ["quads", "glutes"]},
+]
+EXERCISES_PER_DAY = 8
+DAYS = 300
+
+
+def legacy_validate(day, db_by_name, resolver):
+    """The pre-index Step 2b loop (log lines kept, for parity)."""
+    focus_areas = day.get("focus_areas", [])
+    focus_set = {fa.lower() for fa in focus_areas}
+    allowed = set()
+    for fa in focus_areas:
+        for kw in FOCUS_MUSCLE_MAP.get(fa.lower(), [fa.lower()]):
+            allowed.add(kw)
+    excluded_patterns, excluded_body_parts, excluded_target_muscles = set(), set(), set()
+    if focus_set & PULL_FOCUSES and not (focus_set & PUSH_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        excluded_patterns = {"push", "elbow_extension", "horizontal_push", "vertical_push",
+                             "squat", "lunge", "hinge", "plyometric"}
+        excluded_body_parts = {"upper legs", "lower legs"}
+        excluded_target_muscles = LEG_TARGET_MUSCLES
+    elif focus_set & PUSH_FOCUSES and not (focus_set & PULL_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        excluded_patterns = {"pull", "elbow_flexion", "horizontal_pull", "vertical_pull",
+                             "squat", "lunge", "hinge", "plyometric"}
+        excluded_body_parts = {"upper legs", "lower legs"}
+        excluded_target_muscles = LEG_TARGET_MUSCLES
+    elif focus_set & LEG_FOCUSES and not (focus_set & (PUSH_FOCUSES | PULL_FOCUSES)):
+        excluded_patterns = {"horizontal_push", "vertical_push", "horizontal_pull",
+                             "vertical_pull", "elbow_extension", "elbow_flexion"}
+        excluded_target_muscles = UPPER_PUSH_TARGET_MUSCLES | UPPER_PULL_TARGET_MUSCLES
+
+    validated = []
+    for ex in day.get("exercises", []):
+        ex_name = ex.get("name", "").strip()
+        ex_name_lower = ex_name.lower()
+        db_entry = db_by_name.get(ex_name_lower)
+        if not db_entry:
+            resolved = resolver.resolve(ex_name_lower)
+            if resolved:
+                db_entry = db_by_name.get(resolved)
+        if db_entry:
+            real_muscles = " ".join(db_entry.get("targetMuscles", [])).lower()
+            body_parts_str = " ".join(db_entry.get("bodyParts", [])).lower()
+            ex_pattern = db_entry.get("movement_pattern", "").lower()
+            combined = f"{real_muscles} {body_parts_str} {ex_pattern}"
+            if excluded_patterns and any(excl in ex_pattern for excl in excluded_patterns):
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (movement pattern conflict: {ex_pattern})")
+                continue
+            if excluded_body_parts and any(bp in excluded_body_parts for bp in [b.lower() for b in db_entry.get("bodyParts", [])]):
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (body part '{body_parts_str}' excluded for this day)")
+                continue
+            if excluded_target_muscles:
+                ex_target_muscles = {m.lower().strip() for m in db_entry.get("targetMuscles", [])}
+                if ex_target_muscles & excluded_target_muscles:
+                    print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (target muscle {ex_target_muscles & excluded_target_muscles} excluded for this day)")
+                    continue
+        else:
+            muscles_text = " ".join(ex.get("target_muscles", [])).lower()
+            movement = ex.get("movement_pattern", "").lower()
+            combined = f"{muscles_text} {movement}"
+            if excluded_target_muscles:
+                ex_muscles_set = {m.lower().strip() for m in ex.get("target_muscles", [])}
+                if ex_muscles_set & excluded_target_muscles:
+                    print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (model target muscle excluded for this day)")
+                    continue
+        if any(kw in combined for kw in allowed):
+            validated.append(ex)
+        else:
+            print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {combined[:80]})")
+    day["exercises"] = validated
+
+
+def indexed_validate(day, index, resolver):
+    """The ExerciseIndex path used by _validate_day_focus."""
+    focus_areas = day.get("focus_areas", [])
+    if not focus_areas:
+        return
+    day_type, allowed_ids = index.day_focus_masks(focus_areas)
+    pattern_ids, body_part_ids, target_ids = index.excluded_by.get(day_type, (0, 0, 0))
+    excluded_ids = pattern_ids | body_part_ids | target_ids
+    excluded_target_muscles = DAY_EXCLUSIONS[day_type][2] if day_type else set()
+    allowed = None
+    validated = []
+    for ex in day.get("exercises", []):
+        ex_name = ex.get("name", "").strip()
+        ex_name_lower = ex_name.lower()
+        i = index.id_by_name.get(ex_name_lower)
+        if i is None:
+            resolved = resolver.resolve(ex_name_lower)
+            if resolved:
+                i = index.id_by_name.get(resolved)
+        if i is not None:
+            bit = 1 << i
+            if not bit & excluded_ids:
+                if bit & allowed_ids:
+                    validated.append(ex)
+                else:
+                    print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {index.texts[i][:80]})")
+                continue
+            db_entry = index.exercises[i]
+            if bit & pattern_ids:
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (movement pattern conflict: {db_entry.get('movement_pattern', '').lower()})")
+            elif bit & body_part_ids:
+                body_parts_str = " ".join(db_entry.get("bodyParts", [])).lower()
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (body part '{body_parts_str}' excluded for this day)")
+            else:
+                ex_target_muscles = {m.lower().strip() for m in db_entry.get("targetMuscles", [])}
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (target muscle {ex_target_muscles & excluded_target_muscles} excluded for this day)")
+            continue
+        muscles_text = " ".join(ex.get("target_muscles", [])).lower()
+        movement = ex.get("movement_pattern", "").lower()
+        combined = f"{muscles_text} {movement}"
+        if excluded_target_muscles:
+            ex_muscles_set = {m.lower().strip() for m in ex.get("target_muscles", [])}
+            if ex_muscles_set & excluded_target_muscles:
+                print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (model target muscle excluded for this day)")
+                continue
+        if allowed is None:
+            allowed = {kw for fa in focus_areas for kw in FOCUS_MUSCLE_MAP.get(fa.lower(), [fa.lower()])}
+        if any(kw in combined for kw in allowed):
+            validated.append(ex)
+        else:
+            print(f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {combined[:80]})")
+    day["exercises"] = validated
+
+
+def build_days(db, index, rng):
+    """
+    Days mixing exact catalog names, model-style variants and unknown names;
+    most picks are on-focus, like real model output.
+    """
+    days = []
+    for d in range(DAYS):
+        focus_areas = FOCUS_CASES[d % len(FOCUS_CASES)]
+        on_focus = index.candidate_ids(focus_areas) or range(len(db))
+        exercises = []
+        for _ in range(EXERCISES_PER_DAY):
+            roll = rng.random()
+            if roll < 0.1:
+                exercises.append(dict(rng.choice(MODEL_ONLY)))
+                continue
+            pick = rng.choice(on_focus) if rng.random() < 0.75 else rng.randrange(len(db))
+            name = db[pick]["name"]
+            if roll < 0.3:
+                name = name.upper() + " "           # case / whitespace noise
+            elif roll < 0.4:
+                name = name.replace("Dumbbell", "Db").replace("Barbell", "Bb")
+            exercises.append({"name": name, "sets": "3", "reps": "10", "rest": "60 sec"})
+        days.append({"day_name": f"Day {d + 1}", "focus_areas": focus_areas,
+                     "exercises": exercises})
+    return days
+
+
+def _run(fn, days):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        kept = []
+        for day in days:
+            day = dict(day, exercises=list(day["exercises"]))
+            fn(day)
+            kept.append([ex["name"] for ex in day["exercises"]])
+    return kept, out.getvalue()
+
+
+def _time(fn, days, repeat):
+    sink = io.StringIO()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(sink):
+        for _ in range(repeat):
+            for day in days:
+                fn(dict(day, exercises=list(day["exercises"])))
+    return (time.perf_counter() - t0) / (repeat * len(days)) * 1e6
+
+
+def main():
+    db = load_unique_exercises(CSV_PATH)
+    db_by_name = {}
+    for ex in db:
+        nm = ex.get("name", "").lower().strip()
+        if nm:
+            db_by_name[nm] = ex
+    t0 = time.perf_counter()
+    index = ExerciseIndex(db)
+    t_index = time.perf_counter() - t0
+    resolver = ExerciseNameResolver(db_by_name.keys())
+    print(f"Catalog: {len(db)} exercises (index build {t_index * 1000:.1f} ms)")
+
+    days = build_days(db, index, random.Random(13))
+    before = _run(lambda day: legacy_validate(day, db_by_name, resolver), days)
+    after = _run(lambda day: indexed_validate(day, index, resolver), days)
+    assert before[0] == after[0], "parity mismatch: kept exercises differ"
+    assert before[1] == after[1], "parity mismatch: removal log differs"
+    n_kept = sum(len(k) for k in after[0])
+    print(f"✅ Parity: identical kept exercises ({n_kept}/{DAYS * EXERCISES_PER_DAY}) "
+          f"and removal log for {DAYS} days")
+
+    # Resolver results are LRU-cached in both paths, so this times the
+    # per-day validation work itself
+    before_us = _time(lambda day: legacy_validate(day, db_by_name, resolver), days, 5)
+    after_us = _time(lambda day: indexed_validate(day, index, resolver), days, 5)
+    print(f"before (string scan): {before_us:8.1f} µs / day")
+    print(f"after  (bitmasks)   : {after_us:8.1f} µs / day")
+    print(f"speedup             : {before_us / after_us:8.1f}x")
+    print(f"6-day plan          : {6 * before_us / 1000:.2f} ms → {6 * after_us / 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
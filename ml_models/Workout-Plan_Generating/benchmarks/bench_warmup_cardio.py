@@ -0,0 +1,197 @@
+"""
+Before/after micro-benchmark for warm-up / cardio selection.
+
+"before" is the original ``generate_warmup_and_cardio``: rebuild the
+excluded-category set, copy + shuffle each warm-up category, and for an
+excluded cardio category flatten and shuffle every safe entry — once per
+plan, with every day sharing the result.  "after" is
+``generate_warmup_and_cardio_days`` over the precomputed
+``WarmupCardioPools`` (``random.sample``, no full-list shuffles), timed
+for a single day and for a whole 5-day plan with a different warm-up per
+day.  The maps and the new function are read straight from
+workout_api_direct.py so the benchmark can't drift from the service.
+
+Checks, before timing, for every injury combination × goal × level:
+  - the same number of warm-ups per category and cardio picks as before
+  - every pick comes from the same injury-safe pool as before
+  - per-day warm-ups are distinct within a day, differ between days while
+    the pool lasts, and share no list or dict objects
+  - the same seeded ``random.Random`` gives the same selection
+
+Run with: python benchmarks/bench_warmup_cardio.py
+"""
+import ast
+import itertools
+import os
+import random
+import sys
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+SCRIPT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SCRIPT_DIR)
+
+from exercise_catalog import WarmupCardioPools, load_calisthenics  # noqa: E402
+
+CSV_PATH = os.path.join(SCRIPT_DIR, "Dataset", "calisthenics-exercises-training-data.csv")
+SERVICE_PATH = os.path.join(SCRIPT_DIR, "workout_api_direct.py")
+SERVICE_NAMES = ("_GOAL_TO_CARDIO_CATEGORY", "_WARMUP_CATEGORY_ORDER",
+                 "_INJURY_UNSAFE_CALISTHENICS_CATS")
+
+
+def load_service(by_category):
+    """The maps and generate_warmup_and_cardio_days from the service source (no torch import)."""
+    with open(SERVICE_PATH, encoding="utf-8") as f:
+        source = f.read()
+    ns: Dict[str, Any] = {"Any": Any, "Dict": Dict, "List": List, "Optional": Optional,
+                          "random": random}
+    for node in ast.parse(source).body:
+        if isinstance(node, (ast.Assign, ast.AnnAssign)):
+            target = node.target if isinstance(node, ast.AnnAssign) else node.targets[0]
+            if isinstance(target, ast.Name) and target.id in SERVICE_NAMES:
+                ns[target.id] = ast.literal_eval(node.value)
+        elif isinstance(node, ast.FunctionDef) and node.name == "generate_warmup_and_cardio_days":
+            func_source = ast.get_source_segment(source, node)
+    ns["WARMUP_CARDIO_POOLS"] = WarmupCardioPools(
+        by_category, ns["_WARMUP_CATEGORY_ORDER"], ns["_INJURY_UNSAFE_CALISTHENICS_CATS"],
+        sorted(set(ns["_GOAL_TO_CARDIO_CATEGORY"].values())))
+    exec(func_source, ns)
+    return ns
+
+
+def legacy(ns, by_category, goal, fitness_level, injuries=None, n_warmup=3, n_cardio=1):
+    """The pre-pool generate_warmup_and_cardio."""
+    import random as _rand
+
+    injuries = injuries or []
+    excluded_cats: set = set()
+    for inj in injuries:
+        excluded_cats.update(ns["_INJURY_UNSAFE_CALISTHENICS_CATS"].get(inj, set()))
+    level_lower = fitness_level.lower()
+    prog_idx = 0 if "beginner" in level_lower else (
+        2 if "advanced" in level_lower else 1)
+
+    warmup_exercises: List[Dict[str, Any]] = []
+    for cat in ns["_WARMUP_CATEGORY_ORDER"]:
+        if cat in excluded_cats:
+            continue
+        pool = [e for e in by_category.get(cat, [])]
+        _rand.shuffle(pool)
+        for entry in pool:
+            if len(warmup_exercises) >= n_warmup:
+                break
+            progression = entry["progressions"][prog_idx] if entry["progressions"] else entry["name"]
+            warmup_exercises.append({
+                "name": entry["name"], "category": cat, "sets": "2", "reps": "10-12",
+                "rest": "30s", "target_muscles": entry["primary_muscles"][:3],
+                "description": entry["description"], "progression_cue": progression,
+                "notes": "Warm-up: perform with controlled tempo",
+            })
+        if len(warmup_exercises) >= n_warmup:
+            break
+
+    cardio_exercises: List[Dict[str, Any]] = []
+    goal_key = goal if goal in ns["_GOAL_TO_CARDIO_CATEGORY"] else "General"
+    pref_cat = ns["_GOAL_TO_CARDIO_CATEGORY"][goal_key]
+    cardio_candidates = [e for e in by_category.get(pref_cat, [])
+                         if pref_cat not in excluded_cats]
+    if not cardio_candidates:
+        cardio_candidates = [
+            e for cat, entries in by_category.items()
+            if cat not in excluded_cats
+            for e in entries
+        ]
+    _rand.shuffle(cardio_candidates)
+    for entry in cardio_candidates[:n_cardio]:
+        progression = entry["progressions"][prog_idx] if entry["progressions"] else entry["name"]
+        duration = "10-15 min" if goal_key in {"WeightLoss", "Endurance"} else "5-8 min"
+        cardio_exercises.append({
+            "name": entry["name"], "category": entry["category"], "sets": "1",
+            "reps": duration, "rest": "none", "target_muscles": entry["primary_muscles"][:3],
+            "description": entry["description"], "progression_cue": progression,
+            "notes": "Cardio/finisher: maintain consistent pace",
+        })
+    return {"warmup": warmup_exercises, "cardio": cardio_exercises}
+
+
+def safe_names(ns, by_category, injuries, goal):
+    excluded = set().union(*(ns["_INJURY_UNSAFE_CALISTHENICS_CATS"].get(i, set())
+                             for i in injuries))
+    warm = {e["name"] for cat in ns["_WARMUP_CATEGORY_ORDER"] if cat not in excluded
+            for e in by_category.get(cat, [])}
+    pref = ns["_GOAL_TO_CARDIO_CATEGORY"].get(goal, ns["_GOAL_TO_CARDIO_CATEGORY"]["General"])
+    if pref not in excluded and by_category.get(pref):
+        cardio = {e["name"] for e in by_category[pref]}
+    else:
+        cardio = {e["name"] for cat, es in by_category.items() if cat not in excluded for e in es}
+    return warm, cardio
+
+
+def check(ns, by_category):
+    gen = ns["generate_warmup_and_cardio_days"]
+    injuries_all = list(ns["_INJURY_UNSAFE_CALISTHENICS_CATS"]) + ["Neck"]
+    goals = list(ns["_GOAL_TO_CARDIO_CATEGORY"]) + ["Unknown"]
+    combos = [list(c) for k in range(4) for c in itertools.combinations(injuries_all, k)]
+    n = 0
+    for injuries, goal, level in itertools.product(combos, goals, ["Beginner", "Advanced"]):
+        old = legacy(ns, by_category, goal, level, injuries)
+        days = gen(goal, level, injuries, 3, 1, n_days=5)
+        warm_pool, cardio_pool = safe_names(ns, by_category, injuries, goal)
+        for day in days:
+            assert Counter(w["category"] for w in day["warmup"]) == \
+                Counter(w["category"] for w in old["warmup"]), (injuries, goal)
+            assert len(day["cardio"]) == len(old["cardio"])
+            assert {w["name"] for w in day["warmup"]} <= warm_pool
+            assert {c["name"] for c in day["cardio"]} <= cardio_pool
+            assert len({w["name"] for w in day["warmup"]}) == len(day["warmup"])
+            assert [w.keys() for w in day["warmup"]] == [w.keys() for w in old["warmup"]]
+        objs = [id(x) for d in days for x in (d["warmup"], d["cardio"], *d["warmup"])]
+        assert len(objs) == len(set(objs))
+        if len(warm_pool) >= 15:
+            names = [w["name"] for d in days for w in d["warmup"]]
+            assert len(set(names)) == len(names), (injuries, names)
+        n += 1
+    return n
+
+
+def _time(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6
+
+
+def main():
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in load_calisthenics(CSV_PATH):
+        by_category.setdefault(entry["category"], []).append(entry)
+    ns = load_service(by_category)
+    t0 = time.perf_counter()
+    pools = WarmupCardioPools(
+        by_category, ns["_WARMUP_CATEGORY_ORDER"], ns["_INJURY_UNSAFE_CALISTHENICS_CATS"],
+        sorted(set(ns["_GOAL_TO_CARDIO_CATEGORY"].values())))
+    print(f"Pools for {len(pools._by_injuries)} injury combinations "
+          f"({len(pools._by_excluded)} distinct) built in "
+          f"{(time.perf_counter() - t0) * 1000:.2f} ms")
+    random.seed(19)
+    print(f"✅ Checked {check(ns, by_category)} injury × goal × level cases (5 days each)")
+    gen = ns["generate_warmup_and_cardio_days"]
+    runs = [gen("WeightLoss", "Beginner", ["Knee"], 3, 1, 5, random.Random(20)) for _ in range(2)]
+    assert runs[0] == runs[1]
+    print("✅ Same seed → same warm-ups and cardio")
+
+    rng = random.Random(19)  # the service passes its per-request RNG
+    cases = [([], "Muscle"), (["Knee"], "WeightLoss"),
+             (["Shoulder", "Elbow", "Lower Back"], "Endurance")]
+    print(f"{'injuries / goal':<40}{'before':>10}{'1 day':>10}{'5 days':>10}  (µs per plan)")
+    for injuries, goal in cases:
+        before = _time(lambda: legacy(ns, by_category, goal, "Intermediate", injuries), 5000)
+        one = _time(lambda: gen(goal, "Intermediate", injuries, 3, 1, 1, rng), 5000)
+        five = _time(lambda: gen(goal, "Intermediate", injuries, 3, 1, 5, rng), 5000)
+        label = f"{', '.join(injuries) or '-'} / {goal}"
+        print(f"{label:<40}{before:>10.1f}{one:>10.1f}{five:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+compiled_catalog.py
+===================
+
+Columnar binary exercise catalog, compiled offline and memory-mapped at startup.
+
+Parsing ``unique_exercises.csv`` with ``csv.DictReader`` builds a full dict
+per row (plus its own copies of ``goal_suitability`` and
+``rep_ranges_by_goal``) in every uvicorn worker.  The compiled catalog
+stores the same data once, on disk:
+
+  - an interned string table (every distinct string once, UTF-8 blob +
+    ``uint32`` offsets),
+  - one ``uint32`` string-id column per text field and ``uint8`` columns for
+    difficulty / exercise type,
+  - list fields (secondary muscles, calisthenics muscles) as offset + id
+    columns,
+  - ``_GOAL_REP_SCHEMES``, the two ``goal_suitability`` tables, the
+    ``workout_dataset.csv`` goal templates and source hashes in a small JSON
+    header.
+
+``CompiledCatalog.open`` maps the file read-only, so workers share its pages
+through the OS page cache.  ``exercises()`` returns ``ExerciseRecord`` views:
+read-only mappings that decode fields from the map on access, so large text
+such as ``instructions`` is only decoded for exercises actually enriched.
+
+Compile (re-run after editing any of the CSVs)::
+
+    python compiled_catalog.py [--out Dataset/exercise_catalog.bin]
+
+``open`` returns None when the file is missing, was written by a different
+format version / byte order, or no longer matches the CSV hashes — the
+service then parses the CSVs as before.  The header also records each
+CSV's size and mtime; a CSV whose size and mtime are unchanged is not
+re-hashed on startup.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from exercise_catalog import (
+    _GOAL_REP_SCHEMES, load_calisthenics, load_unique_exercises,
+    load_workout_goal_templates,
+)
+
+MAGIC = b"IFCATLG\x00"
+FORMAT_VERSION = 1
+_NONE = 0xFFFFFFFF  # string id for "no value"
+_ALIGN = 8
+
+SOURCE_FILES = {
+    "unique_exercises": "unique_exercises.csv",
+    "calisthenics": "calisthenics-exercises-training-data.csv",
+    "workout_dataset": "workout_dataset.csv",
+}
+DEFAULT_FILENAME = "exercise_catalog.bin"
+
+# uint32 string-id columns per exercise / calisthenics entry
+_EX_STR_COLUMNS = ("name", "target", "equipment", "instructions", "video_url",
+                   "movement_pattern")
+_CAL_STR_COLUMNS = ("name", "category", "description",
+                    "progression_1", "progression_2", "progression_3")
+
+
+def _file_sha256(path: str) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def source_hashes(dataset_dir: str) -> Dict[str, Optional[str]]:
+    """SHA-256 of each source CSV (None if absent) — the staleness check."""
+    return {key: _file_sha256(os.path.join(dataset_dir, fname))
+            for key, fname in SOURCE_FILES.items()}
+
+
+def source_stats(dataset_dir: str) -> Dict[str, Optional[List[int]]]:
+    """[size, mtime_ns] of each source CSV (None if absent) — the cheap pre-check."""
+    stats: Dict[str, Optional[List[int]]] = {}
+    for key, fname in SOURCE_FILES.items():
+        try:
+            st = os.stat(os.path.join(dataset_dir, fname))
+            stats[key] = [st.st_size, st.st_mtime_ns]
+        except FileNotFoundError:
+            stats[key] = None
+    return stats
+
+
+def sources_match(header: Dict[str, Any], dataset_dir: str) -> bool:
+    """
+    True if the CSVs in *dataset_dir* are the ones *header* was compiled
+    from.  A file whose size and mtime are unchanged is trusted without
+    reading it; only the others are hashed (a fresh checkout or COPY
+    changes mtimes but not contents, so those still match).
+    """
+    hashes = header.get("sources") or {}
+    recorded = header.get("source_stats") or {}
+    if set(hashes) != set(SOURCE_FILES):
+        return False
+    for key, stat in source_stats(dataset_dir).items():
+        if stat is not None and stat == recorded.get(key):
+            continue
+        if _file_sha256(os.path.join(dataset_dir, SOURCE_FILES[key])) != hashes[key]:
+            return False
+    return True
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  COMPILE
+# ══════════════════════════════════════════════════════════════════════════════
+
+
+class _StringTable:
+    def __init__(self) -> None:
+        self.ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, s: Optional[str]) -> int:
+        if s is None:
+            return _NONE
+        sid = self.ids.get(s)
+        if sid is None:
+            sid = self.ids[s] = len(self.strings)
+            self.strings.append(s)
+        return sid
+
+
+def _list_column(table: _StringTable, lists: List[List[str]]) -> Tuple[array, array]:
+    offsets = array("I", [0])
+    ids = array("I")
+    for items in lists:
+        ids.extend(table.intern(s) for s in items)
+        offsets.append(len(ids))
+    return offsets, ids
+
+
+def compile_catalog(dataset_dir: str, out_path: str) -> Dict[str, Any]:
+    """Parse the dataset CSVs and write the binary catalog to *out_path*."""
+    table = _StringTable()
+
+    exercises = load_unique_exercises(
+        os.path.join(dataset_dir, SOURCE_FILES["unique_exercises"]))
+
+    cal_path = os.path.join(dataset_dir, SOURCE_FILES["calisthenics"])
+    calisthenics = load_calisthenics(cal_path) if os.path.exists(cal_path) else []
+    wd_path = os.path.join(dataset_dir, SOURCE_FILES["workout_dataset"])
+    goal_templates = load_workout_goal_templates(wd_path) if os.path.exists(wd_path) else {}
+
+    sections: Dict[str, Tuple[str, bytes]] = {}
+
+    ex_cols = {c: array("I") for c in _EX_STR_COLUMNS}
+    difficulty = array("B")
+    compound = array("B")
+    goal_suitability: Dict[str, Dict[str, int]] = {}
+    for ex in exercises:
+        target = ex["targetMuscles"][0] if ex["targetMuscles"] else None
+        ex_cols["name"].append(table.intern(ex["name"]))
+        ex_cols["target"].append(table.intern(target))
+        ex_cols["equipment"].append(table.intern(ex["equipments"][0]))
+        ex_cols["instructions"].append(table.intern(ex["instructions"]))
+        ex_cols["video_url"].append(table.intern(ex["video_url"]))
+        ex_cols["movement_pattern"].append(table.intern(ex["movement_pattern"]))
+        difficulty.append(ex["difficulty_level"])
+        compound.append(1 if ex["exercise_type"] == "compound" else 0)
+        goal_suitability.setdefault(ex["exercise_type"], ex["goal_suitability"])
+    for c, col in ex_cols.items():
+        sections[f"ex_{c}"] = ("I", col.tobytes())
+    sections["ex_difficulty"] = ("B", difficulty.tobytes())
+    sections["ex_compound"] = ("B", compound.tobytes())
+    sec_off, sec_ids = _list_column(table, [ex["secondaryMuscles"] for ex in exercises])
+    sections["ex_secondary_offsets"] = ("I", sec_off.tobytes())
+    sections["ex_secondary_ids"] = ("I", sec_ids.tobytes())
+
+    cal_cols = {c: array("I") for c in _CAL_STR_COLUMNS}
+    for entry in calisthenics:
+        cal_cols["name"].append(table.intern(entry["name"]))
+        cal_cols["category"].append(table.intern(entry["category"]))
+        cal_cols["description"].append(table.intern(entry["description"]))
+        for k in range(3):
+            cal_cols[f"progression_{k + 1}"].append(table.intern(entry["progressions"][k]))
+    for c, col in cal_cols.items():
+        sections[f"cal_{c}"] = ("I", col.tobytes())
+    mus_off, mus_ids = _list_column(table, [e["primary_muscles"] for e in calisthenics])
+    sections["cal_muscle_offsets"] = ("I", mus_off.tobytes())
+    sections["cal_muscle_ids"] = ("I", mus_ids.tobytes())
+
+    # String table last (interning above is complete)
+    blob = bytearray()
+    str_off = array("I", [0])
+    for s in table.strings:
+        blob += s.encode("utf-8")
+        str_off.append(len(blob))
+    sections["str_offsets"] = ("I", str_off.tobytes())
+    sections["str_blob"] = ("B", bytes(blob))
+
+    # Lay out sections after the header, each 8-byte aligned
+    layout: Dict[str, List[Any]] = {}
+    pos = 0
+    for name, (typecode, data) in sections.items():
+        layout[name] = [pos, len(data), typecode]
+        pos += len(data) + (-len(data) % _ALIGN)
+
+    header = {
+        "format_version": FORMAT_VERSION,
+        "byteorder": sys.byteorder,
+        "sources": source_hashes(dataset_dir),
+        "source_stats": source_stats(dataset_dir),
+        "counts": {"exercises": len(exercises), "calisthenics": len(calisthenics),
+                   "strings": len(table.strings)},
+        "goal_rep_schemes": _GOAL_REP_SCHEMES,
+        "goal_suitability": goal_suitability,
+        "goal_templates": goal_templates,
+        "sections": layout,
+    }
+    header_bytes = json.dumps(header, sort_keys=True).encode("utf-8")
+    data_start = len(MAGIC) + 4 + len(header_bytes)
+    data_start += -data_start % _ALIGN
+
+    tmp = f"{out_path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\x00" * (data_start - f.tell()))
+        for name, (_, data) in sections.items():
+            f.write(data)
+            f.write(b"\x00" * (-len(data) % _ALIGN))
+    os.replace(tmp, out_path)
+    return header
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  LOAD
+# ══════════════════════════════════════════════════════════════════════════════
+
+
+class CompiledCatalog:
+    """Read-only view over a memory-mapped compiled catalog."""
+
+    def __init__(self, mm: mmap.mmap, header: Dict[str, Any], data_start: int) -> None:
+        self._mm = mm
+        self.header = header
+        self.path: Optional[str] = None
+        buf = memoryview(mm)
+        self._cols: Dict[str, memoryview] = {}
+        for name, (offset, length, typecode) in header["sections"].items():
+            view = buf[data_start + offset:data_start + offset + length]
+            self._cols[name] = view.cast(typecode)
+        self._blob = self._cols["str_blob"]
+        self._str_offsets = self._cols["str_offsets"]
+        # Decoded strings, filled on first access
+        self._decoded: List[Optional[str]] = [None] * header["counts"]["strings"]
+
+        def _freeze(d: Dict[str, Any]) -> MappingProxyType:
+            return MappingProxyType({k: MappingProxyType(v) if isinstance(v, dict) else v
+                                     for k, v in d.items()})
+
+        # Shared tables — one object for the whole catalog, not one per exercise
+        self.goal_rep_schemes = _freeze(header["goal_rep_schemes"])
+        self.goal_suitability = {k: MappingProxyType(v)
+                                 for k, v in header["goal_suitability"].items()}
+        self.goal_templates: Dict[str, Dict[str, Any]] = header["goal_templates"]
+
+    @classmethod
+    def open(cls, path: str, dataset_dir: Optional[str] = None) -> Optional["CompiledCatalog"]:
+        """Map *path*; None if missing, incompatible or stale vs. *dataset_dir* CSVs."""
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        with f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                return None
+        if mm[:len(MAGIC)] != MAGIC:
+            mm.close()
+            return None
+        (header_len,) = struct.unpack_from("<I", mm, len(MAGIC))
+        header_end = len(MAGIC) + 4 + header_len
+        header = json.loads(mm[len(MAGIC) + 4:header_end].decode("utf-8"))
+        if (header.get("format_version") != FORMAT_VERSION
+                or header.get("byteorder") != sys.byteorder):
+            mm.close()
+            return None
+        if dataset_dir is not None and not sources_match(header, dataset_dir):
+            mm.close()
+            return None
+        catalog = cls(mm, header, header_end + (-header_end % _ALIGN))
+        catalog.path = path
+        return catalog
+
+    # ── Strings ──────────────────────────────────────────────────────────────
+
+    def string(self, sid: int) -> str:
+        if sid == _NONE:
+            return ""
+        s = self._decoded[sid]
+        if s is None:
+            s = str(self._blob[self._str_offsets[sid]:self._str_offsets[sid + 1]], "utf-8")
+            self._decoded[sid] = s
+        return s
+
+    def _string_list(self, offsets: str, ids: str, i: int) -> List[str]:
+        off, col = self._cols[offsets], self._cols[ids]
+        return [self.string(col[k]) for k in range(off[i], off[i + 1])]
+
+    # ── Exercises ────────────────────────────────────────────────────────────
+
+    @property
+    def n_exercises(self) -> int:
+        return self.header["counts"]["exercises"]
+
+    def exercises(self) -> List["ExerciseRecord"]:
+        return [ExerciseRecord(self, i) for i in range(self.n_exercises)]
+
+    # ── Calisthenics ─────────────────────────────────────────────────────────
+
+    def calisthenics(self) -> List[Dict[str, Any]]:
+        """Warmup/cardio pool as plain dicts (a few hundred small rows)."""
+        cols = self._cols
+        out = []
+        for i in range(self.header["counts"]["calisthenics"]):
+            out.append({
+                "name":            self.string(cols["cal_name"][i]),
+                "category":        self.string(cols["cal_category"][i]),
+                "primary_muscles": self._string_list("cal_muscle_offsets", "cal_muscle_ids", i),
+                "description":     self.string(cols["cal_description"][i]),
+                "progressions": [self.string(cols[f"cal_progression_{k}"][i])
+                                 for k in (1, 2, 3)],
+            })
+        return out
+
+
+_EXERCISE_KEYS = (
+    "name", "targetMuscles", "bodyParts", "equipments", "secondaryMuscles",
+    "instructions", "video_url", "movement_pattern", "difficulty_level",
+    "exercise_type", "goal_suitability", "rep_ranges_by_goal", "unilateral",
+)
+
+
+class ExerciseRecord(Mapping):
+    """
+    Read-only EXERCISE_DB entry backed by the compiled catalog.
+
+    Behaves like the dict built by ``exercise_catalog.exercise_from_row``;
+    list fields are returned as fresh lists and the goal tables are shared
+    read-only mappings.
+    """
+
+    __slots__ = ("_cat", "_i")
+
+    def __init__(self, catalog: CompiledCatalog, i: int) -> None:
+        self._cat = catalog
+        self._i = i
+
+    def __getitem__(self, key: str) -> Any:
+        cat, i = self._cat, self._i
+        cols = cat._cols
+        if key == "name":
+            return cat.string(cols["ex_name"][i])
+        if key in ("targetMuscles", "bodyParts"):
+            sid = cols["ex_target"][i]
+            return [cat.string(sid)] if sid != _NONE else []
+        if key == "equipments":
+            return [cat.string(cols["ex_equipment"][i])]
+        if key == "secondaryMuscles":
+            return cat._string_list("ex_secondary_offsets", "ex_secondary_ids", i)
+        if key == "instructions":
+            return cat.string(cols["ex_instructions"][i])
+        if key == "video_url":
+            return cat.string(cols["ex_video_url"][i])
+        if key == "movement_pattern":
+            return cat.string(cols["ex_movement_pattern"][i])
+        if key == "difficulty_level":
+            return cols["ex_difficulty"][i]
+        if key == "exercise_type":
+            return "compound" if cols["ex_compound"][i] else "isolation"
+        if key == "goal_suitability":
+            return cat.goal_suitability[self["exercise_type"]]
+        if key == "rep_ranges_by_goal":
+            return cat.goal_rep_schemes
+        if key == "unilateral":
+            return False
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_EXERCISE_KEYS)
+
+    def __len__(self) -> int:
+        return len(_EXERCISE_KEYS)
+
+    def __repr__(self) -> str:
+        return f"ExerciseRecord({self._i}, {self['name']!r})"
+
+
+def main() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    dataset_dir = os.path.join(here, "Dataset")
+    ap = argparse.ArgumentParser(description="Compile the exercise catalog")
+    ap.add_argument("--dataset-dir", default=dataset_dir)
+    ap.add_argument("--out", default=os.path.join(dataset_dir, DEFAULT_FILENAME))
+    args = ap.parse_args()
+
+    header = compile_catalog(args.dataset_dir, args.out)
+    counts = header["counts"]
+    print(f"✅ Compiled {counts['exercises']} exercises, {counts['calisthenics']} "
+          f"calisthenics entries, {counts['strings']} strings → {args.out} "
+          f"({os.path.getsize(args.out) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
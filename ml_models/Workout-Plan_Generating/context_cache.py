@@ -0,0 +1,253 @@
+"""
+context_cache.py
+================
+
+TTL + LRU cache for RAG user context, keyed by ``user_id``.
+
+Members regenerate plans several times per session and every regeneration
+with ``include_user_context=True`` would otherwise re-read the same InBody,
+scan and strength rows.  ``UserContextCache.get_or_load`` answers from:
+
+1. **Local tier** – an in-process ``OrderedDict`` with per-entry expiry and
+   LRU eviction at ``max_entries``.
+2. **Shared tier** (optional) – any ``ContextCacheBackend`` (``RedisBackend``
+   is provided) so several uvicorn workers reuse each other's lookups.
+3. **Loader** – the database query.  Concurrent misses for the same user
+   share one in-flight load.
+
+``invalidate(user_id)`` drops the entry from both tiers; the .NET backend
+calls it when a new InBody measurement or scan is saved.  It reaches only
+the worker that serves the call: another worker's local copy cannot be
+dropped from here.  Invalidation therefore holds across workers only
+through the shared tier, and the local tier keeps entries for at most
+``local_ttl_s`` whenever other workers may hold copies — with a shared
+backend, or with ``workers > 1`` and none (then a member's new scan can
+take up to ``local_ttl_s`` to show up on the other workers).  Only a
+single worker without a backend keeps local entries for the full TTL.
+
+Empty contexts are not cached: ``fetch_user_context`` also returns ``{}``
+when the database is unreachable, and that should not stick for a full TTL.
+
+Only Python standard library is required; ``redis`` is imported lazily.
+"""
+
+from __future__ import annotations
+
+import abc
+import asyncio
+import copy
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+
+class ContextCacheBackend(abc.ABC):
+    """Interface for a shared cache tier.  Values are JSON strings."""
+
+    name = "none"
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abc.abstractmethod
+    async def set(self, key: str, value: str, ttl_s: float) -> None:
+        ...
+
+    @abc.abstractmethod
+    async def delete(self, key: str) -> None:
+        ...
+
+
+class RedisBackend(ContextCacheBackend):
+    """Shared tier on Redis (``pip install redis``)."""
+
+    name = "redis"
+
+    def __init__(self, url: str) -> None:
+        import redis.asyncio as aioredis  # optional dependency
+        self._client = aioredis.from_url(url, decode_responses=True)
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._client.get(key)
+
+    async def set(self, key: str, value: str, ttl_s: float) -> None:
+        await self._client.set(key, value, ex=max(1, int(ttl_s)))
+
+    async def delete(self, key: str) -> None:
+        await self._client.delete(key)
+
+
+class UserContextCache:
+    """Two-tier user-context cache; see module docstring."""
+
+    def __init__(
+        self,
+        ttl_s: float = 300.0,
+        max_entries: int = 2048,
+        backend: Optional[ContextCacheBackend] = None,
+        local_ttl_s: float = 5.0,
+        key_prefix: str = "workout:user_context:",
+        workers: int = 1,
+    ) -> None:
+        self.ttl_s = float(ttl_s)
+        self.max_entries = int(max_entries)
+        self.backend = backend
+        self.workers = max(1, int(workers))
+        # Only a lone worker without a shared tier sees every invalidation itself
+        if backend is None and self.workers == 1:
+            self.local_ttl_s = self.ttl_s
+        else:
+            self.local_ttl_s = min(self.ttl_s, float(local_ttl_s))
+        self.key_prefix = key_prefix
+
+        self._entries: "OrderedDict[int, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[int, asyncio.Future] = {}
+        # Users invalidated while their load was in flight — don't store that result
+        self._stale: Set[int] = set()
+
+        # ── Metrics ──
+        self.local_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.backend_errors = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0 and self.max_entries > 0
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    async def get_or_load(
+        self,
+        user_id: int,
+        loader: Callable[[int], Awaitable[Dict[str, Any]]],
+    ) -> Dict[str, Any]:
+        """Cached context for *user_id*, calling ``loader(user_id)`` on a miss."""
+        if not self.enabled:
+            self.misses += 1
+            return await loader(user_id)
+
+        cached = self._local_get(user_id)
+        if cached is not None:
+            self.local_hits += 1
+            return copy.deepcopy(cached)
+
+        pending = self._inflight.get(user_id)
+        if pending is not None:
+            # Another request is already loading this user — share its result
+            self.local_hits += 1
+            return copy.deepcopy(await asyncio.shield(pending))
+
+        fut = asyncio.get_running_loop().create_future()
+        self._inflight[user_id] = fut
+        try:
+            context = await self._shared_get(user_id)
+            if context is not None:
+                self.shared_hits += 1
+            else:
+                self.misses += 1
+                context = await loader(user_id)
+                if context and user_id not in self._stale:
+                    await self._shared_set(user_id, context)
+            if context and user_id not in self._stale:
+                self._local_set(user_id, context)
+            fut.set_result(context)
+        except asyncio.CancelledError:
+            fut.cancel()
+            raise
+        except Exception as e:
+            fut.set_exception(e)
+            # Mark retrieved so an unawaited future doesn't log a warning
+            fut.exception()
+            raise
+        finally:
+            self._inflight.pop(user_id, None)
+            self._stale.discard(user_id)
+        return copy.deepcopy(context)
+
+    async def invalidate(self, user_id: int) -> bool:
+        """Drop *user_id* from both tiers.  Returns True if a local entry existed."""
+        self.invalidations += 1
+        existed = self._entries.pop(user_id, None) is not None
+        if user_id in self._inflight:
+            self._stale.add(user_id)
+        if self.backend is not None:
+            try:
+                await self.backend.delete(self._key(user_id))
+            except Exception as e:
+                self.backend_errors += 1
+                print(f"⚠️ Context cache backend delete failed: {e}")
+        return existed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss ratios for /health."""
+        hits = self.local_hits + self.shared_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "backend": self.backend.name if self.backend else "none",
+            "workers": self.workers,
+            "ttl_s": self.ttl_s,
+            "local_ttl_s": self.local_ttl_s,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "lookups": lookups,
+            "local_hits": self.local_hits,
+            "shared_hits": self.shared_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "miss_ratio": round(self.misses / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "backend_errors": self.backend_errors,
+        }
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _key(self, user_id: int) -> str:
+        return f"{self.key_prefix}{user_id}"
+
+    def _local_get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        expires_at, context = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return context
+
+    def _local_set(self, user_id: int, context: Dict[str, Any]) -> None:
+        self._entries[user_id] = (time.monotonic() + self.local_ttl_s, context)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def _shared_get(self, user_id: int) -> Optional[Dict[str, Any]]:
+        if self.backend is None:
+            return None
+        try:
+            raw = await self.backend.get(self._key(user_id))
+            return json.loads(raw) if raw else None
+        except Exception as e:
+            self.backend_errors += 1
+            print(f"⚠️ Context cache backend read failed: {e}")
+            return None
+
+    async def _shared_set(self, user_id: int, context: Dict[str, Any]) -> None:
+        if self.backend is None:
+            return
+        try:
+            await self.backend.set(self._key(user_id), json.dumps(context), self.ttl_s)
+        except Exception as e:
+            self.backend_errors += 1
+            print(f"⚠️ Context cache backend write failed: {e}")
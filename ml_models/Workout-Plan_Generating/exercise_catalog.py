@@ -0,0 +1,589 @@
+"""
+exercise_catalog.py
+===================
+
+Exercise catalog loading and precomputed selection indexes.
+
+``load_unique_exercises`` turns ``Dataset/unique_exercises.csv`` into the
+exercise dicts used throughout ``workout_api_direct.py``;
+``load_calisthenics`` and ``load_workout_goal_templates`` parse the warmup
+pool and the goal rep/set overrides.  ``compiled_catalog.py`` compiles all
+three into one memory-mapped file.
+
+``ExerciseIndex`` is built once at load time and answers the candidate
+queries made by ``_pick_exercises_for_focus`` and the day-focus checks made
+by ``_validate_day_focus`` without scanning the whole catalog or rebuilding
+strings per request:
+
+  - focus keyword      → exercise ids  (substring match over muscles/body parts/pattern)
+  - equipment value    → exercise ids  (alias matching resolved per user equipment set)
+  - movement pattern   → exercise ids
+  - push/pull/leg day  → excluded ids  (pattern, body-part and target-muscle exclusions,
+                                        kept apart so callers can report the reason)
+  - difficulty ≤ 3     → beginner ids
+  - exercise name      → id
+
+Id sets are stored as Python ``int`` bitmasks (bit *i* = ``exercises[i]``),
+so combining them is a handful of ``&`` / ``|`` / ``~`` operations and
+iterating the result yields ids in catalog order.
+
+``WarmupCardioPools`` does the same for the calisthenics warm-up and cardio
+picks: the injury-safe pools for every injury combination are resolved at
+load time and each request only samples from them.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import csv
+import random
+import re
+from functools import lru_cache
+from typing import Any, Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  CSV LOADING
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Movement-pattern inference for unique_exercises.csv
+# The CSV has mechanics (Compound/Isolation) and force_type (Push/Pull) but no
+# explicit movement_pattern column, so we derive one deterministically.
+_MECHANICS_FORCE_TO_PATTERN: Dict[str, str] = {
+    "compound_push": "horizontal_push",
+    "compound_pull": "horizontal_pull",
+    "isolation_push": "elbow_extension",
+    "isolation_pull": "elbow_flexion",
+    "compound_push (bilateral)": "horizontal_push",
+}
+_MUSCLE_TO_PATTERN: Dict[str, str] = {
+    "quads": "squat",
+    "hamstrings": "hip_hinge",
+    "glutes": "hip_hinge",
+    "calves": "calf",
+    "abs": "core_flexion",
+    "shoulders": "vertical_push",
+    "chest": "horizontal_push",
+    "back": "horizontal_pull",
+    "lats": "vertical_pull",
+    "biceps": "elbow_flexion",
+    "triceps": "elbow_extension",
+    "forearms": "elbow_flexion",
+}
+_GOAL_REP_SCHEMES: Dict[str, Dict[str, Any]] = {
+    "Strength":   {"min_reps": 3,  "max_reps": 6,  "rest_seconds": 180, "sets": 5},
+    "Power":      {"min_reps": 1,  "max_reps": 5,  "rest_seconds": 240, "sets": 3},
+    "Muscle":     {"min_reps": 8,  "max_reps": 12, "rest_seconds": 90,  "sets": 4},
+    "WeightLoss": {"min_reps": 12, "max_reps": 15, "rest_seconds": 60,  "sets": 3},
+    "Endurance":  {"min_reps": 15, "max_reps": 20, "rest_seconds": 45,  "sets": 3},
+}
+
+
+def _derive_movement_pattern(mechanics: str, force_type: str, target_muscle: str) -> str:
+    """Derive a movement_pattern string from unique_exercises.csv columns."""
+    m = mechanics.strip().lower()
+    f = force_type.strip().lower()
+    t = target_muscle.strip().lower()
+
+    # Check combined key first
+    key = f"{m}_{f}"
+    if key in _MECHANICS_FORCE_TO_PATTERN:
+        return _MECHANICS_FORCE_TO_PATTERN[key]
+
+    # Muscle-specific overrides (legs, core, etc.)
+    for muscle_kw, pattern in _MUSCLE_TO_PATTERN.items():
+        if muscle_kw in t:
+            return pattern
+
+    # Generic fallback using just force
+    if "push" in f:
+        return "horizontal_push"
+    if "pull" in f:
+        return "horizontal_pull"
+    return "general"
+
+
+def exercise_from_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Convert one unique_exercises.csv row into an EXERCISE_DB entry."""
+    mechanics = row.get("mechanics", "").strip()
+    force_type = row.get("force_type", "").strip()
+    target_muscle = row.get("target_muscle", "").strip()
+    difficulty = row.get("difficulty", "Intermediate").strip().lower()
+    difficulty_level = {
+        "beginner": 1, "intermediate": 2, "advanced": 3}.get(difficulty, 2)
+    exercise_type = "compound" if mechanics.lower() == "compound" else "isolation"
+
+    # Secondary muscles: stored as comma-separated string
+    secondary_raw = row.get("secondary_muscles", "")
+    secondary_muscles = [m.strip()
+                         for m in secondary_raw.split(",") if m.strip()]
+
+    movement_pattern = _derive_movement_pattern(
+        mechanics, force_type, target_muscle)
+
+    # Goal suitability: compounds are better for Strength/Muscle
+    if exercise_type == "compound":
+        goal_suit = {"Strength": 8, "Muscle": 8,
+                     "WeightLoss": 7, "Endurance": 6, "Power": 8}
+    else:
+        goal_suit = {"Strength": 4, "Muscle": 7,
+                     "WeightLoss": 6, "Endurance": 7, "Power": 3}
+
+    return {
+        "name":             row.get("exercise_name", "").strip(),
+        "targetMuscles":    [target_muscle] if target_muscle else [],
+        # fallback
+        "bodyParts":        [target_muscle] if target_muscle else [],
+        "equipments":       [row.get("equipment", "Bodyweight").strip() or "Bodyweight"],
+        "secondaryMuscles": secondary_muscles,
+        "instructions":     row.get("instructions", ""),
+        "video_url":        row.get("video_url", ""),
+        "movement_pattern": movement_pattern,
+        "difficulty_level": difficulty_level,
+        "exercise_type":    exercise_type,
+        "goal_suitability": goal_suit,
+        "rep_ranges_by_goal": {g: dict(v) for g, v in _GOAL_REP_SCHEMES.items()},
+        "unilateral":       False,
+    }
+
+
+def load_unique_exercises(path: str) -> List[Dict[str, Any]]:
+    """Parse unique_exercises.csv; rows without a name are skipped."""
+    exercises: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            ex = exercise_from_row(row)
+            if ex["name"]:
+                exercises.append(ex)
+    return exercises
+
+
+def calisthenics_from_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Convert one calisthenics-exercises-training-data.csv row into a CALISTHENICS_DB entry."""
+    cat = row.get("category", "core").strip().lower()
+    # Parse primary_muscles — stored as "[muscle1, muscle2]" string
+    muscles_raw = row.get("primary_muscles", "")
+    muscles = [m.strip().strip('[').strip(']').strip('"')
+               for m in re.split(r'[,\[\]]', muscles_raw) if m.strip()]
+    return {
+        "name":            row.get("name", "").strip(),
+        "category":        cat,
+        "primary_muscles": muscles,
+        "description":     row.get("description", ""),
+        "progressions": [
+            row.get("progression_1", ""),
+            row.get("progression_2", ""),
+            row.get("progression_3", ""),
+        ],
+    }
+
+
+def load_calisthenics(path: str) -> List[Dict[str, Any]]:
+    """Parse the calisthenics CSV (warmup & cardio pool); rows without a name are skipped."""
+    entries: List[Dict[str, Any]] = []
+    with open(path, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            entry = calisthenics_from_row(row)
+            if entry["name"]:
+                entries.append(entry)
+    return entries
+
+
+def load_workout_goal_templates(path: str) -> Dict[str, Dict[str, Any]]:
+    """
+    Goal-specific rep/set scheme overrides parsed from workout_dataset.csv.
+
+    Columns: title, main_goal, workout_type, training_level, program_duration,
+    days_per_week, ..., pdf_text.  The first usable "min-max" rep range in each
+    goal's pdf_text wins; "Ramped" programs get 5 sets.
+    """
+    templates: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            goal = row.get("main_goal", "").strip()
+            if not goal or goal in templates:
+                continue
+            pdf_text = row.get("pdf_text", "")
+            # Detect ramped set programs (e.g. "5 5" pattern with Ramped keyword)
+            is_ramped = "Ramped" in pdf_text or "ramped" in pdf_text
+            # Extract rep numbers from pdf_text for heuristic detection
+            rep_pattern_match = re.search(
+                r'\b(\d+)\s*[-–]\s*(\d+)\b', pdf_text)
+            if rep_pattern_match:
+                min_r = int(rep_pattern_match.group(1))
+                max_r = int(rep_pattern_match.group(2))
+                if 1 < min_r < max_r < 30:
+                    technique = "Ramped Sets" if is_ramped else "Straight Sets"
+                    rest_s = "180s" if max_r <= 6 else (
+                        "90s" if max_r <= 12 else "60s")
+                    templates[goal] = {
+                        "sets":      5 if is_ramped else 3,
+                        "rep_range": f"{min_r}-{max_r}",
+                        "rest":      rest_s,
+                        "technique": technique,
+                    }
+    return templates
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  FOCUS / DAY-TYPE TABLES
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Focus area → possible targetMuscle/bodyPart/pattern substrings
+# Updated for IntelliFit CSV format (targetMuscles: "pectorals", "delts", etc.)
+FOCUS_KEYWORDS: Dict[str, List[str]] = {
+    "chest": ["chest", "pectoral"],
+    "shoulders": ["shoulder", "delt"],
+    "triceps": ["tricep"],
+    "back": ["back", "lat", "rhomboid", "trap", "spine"],
+    "biceps": ["bicep"],
+    "quads": ["quad"],
+    "hamstrings": ["hamstring"],
+    "glutes": ["glute"],
+    "core": ["abs", "abdomin", "oblique", "core", "waist"],
+    "calves": ["calf", "calves", "soleus", "gastrocnemius", "lower legs"],
+    "rear delts": ["rear delt", "posterior delt", "upper back"],
+    "cardio": ["cardio", "cardiovascular"],
+    "legs": ["quad", "hamstring", "glute", "calf", "upper legs", "lower legs", "adductor", "abductor"],
+    "front delts": ["front delt", "anterior delt", "delt"],
+    "forearms": ["forearm", "lower arms", "wrist"],
+    "lats": ["lat"],
+}
+
+# Focus area → keywords an exercise must hit to STAY on a day (Step 2b
+# validation of model output — a little looser than FOCUS_KEYWORDS)
+FOCUS_MUSCLE_MAP: Dict[str, List[str]] = {
+    "chest": ["chest", "pec", "pectoral"],
+    "shoulders": ["shoulder", "delt"],
+    "triceps": ["tricep"],
+    "back": ["back", "lat", "rhomboid", "trapez", "upper back", "spine"],
+    "biceps": ["bicep", "brachialis"],
+    "rear delts": ["rear delt", "posterior delt", "upper back"],
+    "quads": ["quad"],
+    "hamstrings": ["hamstring"],
+    "glutes": ["glute"],
+    "calves": ["calf", "calves", "soleus", "gastrocnemius", "lower legs"],
+    "core": ["abs", "abdomin", "oblique", "core", "waist"],
+    "lats": ["lat", "latissimus"],
+    "legs": ["quad", "hamstring", "glute", "calf", "upper legs", "lower legs",
+             "adductor", "abductor"],
+    "front delts": ["front delt", "anterior delt", "delt"],
+    "forearms": ["forearm", "lower arms", "wrist"],
+}
+
+# Movement pattern exclusion: prevent push exercises on pull days, etc.
+PUSH_FOCUSES = {"chest", "shoulders", "triceps", "front delts"}
+PULL_FOCUSES = {"back", "biceps", "rear delts", "lats"}
+LEG_FOCUSES = {"quads", "hamstrings", "glutes", "calves", "legs"}
+
+# Target muscle exclusion sets (catches mislabeled exercises in CSV)
+LEG_TARGET_MUSCLES = {"glutes", "quads",
+                      "hamstrings", "calves", "adductors", "abductors"}
+UPPER_PUSH_TARGET_MUSCLES = {"pectorals", "delts", "triceps", "serratus anterior"}
+UPPER_PULL_TARGET_MUSCLES = {
+    "lats", "traps", "upper back", "biceps", "forearms", "levator scapulae", "spine"}
+
+# Day type → (excluded pattern substrings, excluded body parts, excluded target muscles)
+DAY_EXCLUSIONS: Dict[str, Tuple[Set[str], Set[str], Set[str]]] = {
+    # Pull day: no push, no leg/hip exercises
+    "pull": ({"push", "elbow_extension", "horizontal_push", "vertical_push",
+              "squat", "lunge", "hinge", "plyometric"},
+             {"upper legs", "lower legs"},
+             LEG_TARGET_MUSCLES),
+    # Push day: no pull, no leg/hip exercises
+    "push": ({"pull", "elbow_flexion", "horizontal_pull", "vertical_pull",
+              "squat", "lunge", "hinge", "plyometric"},
+             {"upper legs", "lower legs"},
+             LEG_TARGET_MUSCLES),
+    # Leg day: no upper body exercises
+    "legs": ({"horizontal_push", "vertical_push", "horizontal_pull",
+              "vertical_pull", "elbow_extension", "elbow_flexion"},
+             set(),
+             UPPER_PUSH_TARGET_MUSCLES | UPPER_PULL_TARGET_MUSCLES),
+}
+
+# Generic/full-body exercises are too unspecific for focused days
+_GENERIC_BODY_PARTS = ("full body", "other", "cardio")
+
+
+def day_type_for_focus(focus_set: Set[str]) -> Optional[str]:
+    """Classify a day's lowercased focus set as 'pull', 'push', 'legs' or None (mixed)."""
+    if focus_set & PULL_FOCUSES and not (focus_set & PUSH_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        return "pull"
+    if focus_set & PUSH_FOCUSES and not (focus_set & PULL_FOCUSES) and not (focus_set & LEG_FOCUSES):
+        return "push"
+    if focus_set & LEG_FOCUSES and not (focus_set & (PUSH_FOCUSES | PULL_FOCUSES)):
+        return "legs"
+    return None
+
+
+def equipment_aliases(equipment: Optional[List[str]]) -> FrozenSet[str]:
+    """Normalize the user's equipment list and add common aliases."""
+    user_equipment = set()
+    for eq in equipment or []:
+        eq_low = eq.lower().strip()
+        user_equipment.add(eq_low)
+        if "dumbbell" in eq_low:
+            user_equipment.add("dumbbell")
+        if "barbell" in eq_low:
+            user_equipment.add("barbell")
+        if "cable" in eq_low:
+            user_equipment.add("cable")
+        if "machine" in eq_low:
+            user_equipment.update(
+                {"machine", "leverage machine", "smith machine"})
+    user_equipment.add("body weight")  # always available
+    return frozenset(user_equipment)
+
+
+def base_name(name: str) -> str:
+    """Normalize name for dedup: lowercase, strip version suffixes."""
+    n = name.lower().strip()
+    n = re.sub(r'\s*v\.?\s*\d+\s*$', '', n)  # Strip "V. 2", "v2" etc.
+    # Strip trailing parenthesized
+    n = re.sub(r'\s*\(.*?\)\s*$', '', n)
+    return n.strip()
+
+
+def iter_ids(mask: int) -> Iterator[int]:
+    """Yield the set bit positions of *mask* in ascending (catalog) order."""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  INDEX
+# ══════════════════════════════════════════════════════════════════════════════
+
+
+class ExerciseIndex:
+    """Bitmask indexes over an exercise list, built once at load time."""
+
+    def __init__(self, exercises: List[Dict[str, Any]]) -> None:
+        self.exercises = exercises
+        n = len(exercises)
+        self.all_ids = (1 << n) - 1
+
+        # Per-id precomputed strings (never rebuilt per request)
+        self.name_lower: List[str] = [ex.get("name", "").lower() for ex in exercises]
+        self.base_names: List[str] = [base_name(ex.get("name", "")) for ex in exercises]
+        # NOTE: secondaryMuscles are intentionally excluded — "lower back"
+        # secondaries make glute/hamstring moves match "back" on Pull days.
+        self.texts: List[str] = [" ".join([
+            " ".join(ex.get("targetMuscles", [])),
+            " ".join(ex.get("bodyParts", [])),
+            ex.get("movement_pattern", ""),
+        ]).lower() for ex in exercises]
+        # Same key normalization as DB_BY_NAME (last duplicate wins)
+        self.id_by_name: Dict[str, int] = {}
+
+        # Ids usable for focused days: real target muscles, not generic/full-body
+        self.eligible = 0
+        self.easy_ids = 0   # difficulty_level ≤ 3 (beginner-friendly)
+        self.pattern_ids: Dict[str, int] = {}
+        self.equipment_ids: Dict[str, int] = {}
+        # Day type → ids excluded by (pattern, body part, target muscle); every id
+        self.excluded_by: Dict[str, Tuple[int, int, int]] = {}
+        self._keyword_ids: Dict[str, int] = {}
+        self._goal_scores: Dict[str, List[int]] = {}
+
+        excluded = {day_type: [0, 0, 0] for day_type in DAY_EXCLUSIONS}
+        for i, ex in enumerate(exercises):
+            bit = 1 << i
+            name_key = self.name_lower[i].strip()
+            if name_key:
+                self.id_by_name[name_key] = i
+            if ex.get("difficulty_level", 3) <= 3:
+                self.easy_ids |= bit
+            pattern = ex.get("movement_pattern", "").lower()
+            self.pattern_ids[pattern] = self.pattern_ids.get(pattern, 0) | bit
+            for eq in ex.get("equipments", ["body weight"]):
+                eq_low = eq.lower()
+                self.equipment_ids[eq_low] = self.equipment_ids.get(eq_low, 0) | bit
+
+            body_parts = [bp.lower() for bp in ex.get("bodyParts", [])]
+            target_set = {m.lower().strip() for m in ex.get("targetMuscles", [])}
+            for day_type, (patterns, parts, targets) in DAY_EXCLUSIONS.items():
+                masks = excluded[day_type]
+                if any(excl in pattern for excl in patterns):
+                    masks[0] |= bit
+                if any(bp in parts for bp in body_parts):
+                    masks[1] |= bit
+                if target_set & targets:
+                    masks[2] |= bit
+
+            real_muscles = [m for m in ex.get("targetMuscles", []) if m and m.strip()]
+            if not real_muscles:
+                continue
+            if any(bp in _GENERIC_BODY_PARTS for bp in body_parts):
+                continue
+            self.eligible |= bit
+
+        self.excluded_by = {day_type: tuple(masks) for day_type, masks in excluded.items()}
+        self.excluded_ids: Dict[str, int] = {
+            day_type: p | b | t for day_type, (p, b, t) in self.excluded_by.items()}
+
+        for table in (FOCUS_KEYWORDS, FOCUS_MUSCLE_MAP):
+            for keywords in table.values():
+                for kw in keywords:
+                    self.keyword_ids(kw)
+
+        self._matching_equipment = lru_cache(maxsize=256)(self._matching_equipment_uncached)
+        self.allowed_ids = lru_cache(maxsize=256)(self._allowed_ids_uncached)
+
+    # ── Lookups ──────────────────────────────────────────────────────────────
+
+    def keyword_ids(self, keyword: str) -> int:
+        """Ids whose muscle/body-part/pattern text contains *keyword*."""
+        mask = self._keyword_ids.get(keyword)
+        if mask is None:
+            # Unknown focus areas fall back to their own name — index on first use
+            mask = 0
+            for i, text in enumerate(self.texts):
+                if keyword in text:
+                    mask |= 1 << i
+            self._keyword_ids[keyword] = mask
+        return mask
+
+    def focus_ids(self, focus: str) -> int:
+        focus_lower = focus.lower()
+        mask = 0
+        for kw in FOCUS_KEYWORDS.get(focus_lower, [focus_lower]):
+            mask |= self.keyword_ids(kw)
+        return mask
+
+    def _allowed_ids_uncached(self, focus_areas: Tuple[str, ...]) -> int:
+        mask = 0
+        for focus in focus_areas:
+            for kw in FOCUS_MUSCLE_MAP.get(focus, [focus]):
+                mask |= self.keyword_ids(kw)
+        return mask
+
+    def goal_scores(self, goal_key: str) -> List[int]:
+        """Per-id goal suitability (default 5) + 3 for compound exercises."""
+        scores = self._goal_scores.get(goal_key)
+        if scores is None:
+            scores = [ex.get("goal_suitability", {}).get(goal_key, 5)
+                      + (3 if ex.get("exercise_type") == "compound" else 0)
+                      for ex in self.exercises]
+            self._goal_scores[goal_key] = scores
+        return scores
+
+    def _matching_equipment_uncached(self, user_equipment: FrozenSet[str],
+                                     skip_body_weight: bool) -> int:
+        mask = 0
+        for ex_eq, ids in self.equipment_ids.items():
+            if any(ueq in ex_eq or ex_eq in ueq
+                   for ueq in user_equipment
+                   if not (skip_body_weight and ueq == "body weight")):
+                mask |= ids
+        return mask
+
+    def matching_equipment_ids(self, user_equipment: FrozenSet[str],
+                               skip_body_weight: bool = False) -> int:
+        """Ids whose equipment matches any of *user_equipment* (substring either way)."""
+        return self._matching_equipment(user_equipment, skip_body_weight)
+
+    def candidate_ids(self, focus_areas: List[str], exclude_ids: int = 0) -> List[int]:
+        """
+        Ids matching each focus area (in focus order, then catalog order) with
+        the day-type exclusions and *exclude_ids* applied.  Duplicates across
+        focus areas are kept so callers can dedupe with their own rules.
+        """
+        day_type = day_type_for_focus({f.lower() for f in focus_areas})
+        allowed = self.eligible & ~exclude_ids
+        if day_type:
+            allowed &= ~self.excluded_ids[day_type]
+        ids: List[int] = []
+        for focus in focus_areas:
+            ids.extend(iter_ids(self.focus_ids(focus) & allowed))
+        return ids
+
+    def day_focus_masks(self, focus_areas: List[str]) -> Tuple[Optional[str], int]:
+        """
+        (day type, allowed ids) for validating a day's exercises: an id stays
+        if it is in *allowed* and not in ``excluded_by[day_type]``.
+        """
+        focus = tuple(f.lower() for f in focus_areas)
+        return day_type_for_focus(set(focus)), self.allowed_ids(focus)
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  WARM-UP / CARDIO POOLS
+# ══════════════════════════════════════════════════════════════════════════════
+
+
+class WarmupCardioPools:
+    """
+    Injury-safe calisthenics pools for warm-ups and cardio finishers.
+
+    For every combination of the injuries in *unsafe_categories* the safe
+    warm-up categories (in *warmup_order*, as ``(category, entries)``) and
+    the cardio candidates per preferred category are resolved once, so a
+    request only has to look its injuries up and sample.  Combinations that
+    exclude the same categories share one set of pools.
+    """
+
+    def __init__(self, by_category: Dict[str, List[Dict[str, Any]]],
+                 warmup_order: List[str],
+                 unsafe_categories: Dict[str, Set[str]],
+                 cardio_categories: List[str]) -> None:
+        self.injuries: Tuple[str, ...] = tuple(unsafe_categories)
+        self._by_excluded: Dict[FrozenSet[str], Tuple[tuple, Dict[str, tuple]]] = {}
+        self._by_injuries: Dict[FrozenSet[str], Tuple[tuple, Dict[str, tuple]]] = {}
+
+        for combo in range(1 << len(self.injuries)):
+            injuries = frozenset(inj for j, inj in enumerate(self.injuries) if combo >> j & 1)
+            excluded = frozenset().union(*(unsafe_categories[inj] for inj in injuries))
+            pools = self._by_excluded.get(excluded)
+            if pools is None:
+                warmup = tuple((cat, tuple(by_category[cat])) for cat in warmup_order
+                               if cat not in excluded and by_category.get(cat))
+                # Preferred category, else every safe entry in catalog order
+                fallback = tuple(entry for cat, entries in by_category.items()
+                                 if cat not in excluded for entry in entries)
+                cardio = {cat: (tuple(by_category[cat])
+                                if cat not in excluded and by_category.get(cat) else fallback)
+                          for cat in cardio_categories}
+                pools = self._by_excluded[excluded] = (warmup, cardio)
+            self._by_injuries[injuries] = pools
+
+    def _pools(self, injuries: Optional[List[str]]) -> Tuple[tuple, Dict[str, tuple]]:
+        return self._by_injuries[frozenset(inj for inj in injuries or () if inj in self.injuries)]
+
+    @staticmethod
+    def _deal(pool: tuple, k: int, n_days: int, rng) -> List[List[Any]]:
+        """
+        *k* distinct entries of *pool* per day, spread so consecutive days
+        repeat an entry only once the pool runs out.
+        """
+        k = min(k, len(pool))
+        if not k:
+            return [[] for _ in range(n_days)]
+        deck = rng.sample(pool, min(len(pool), k * n_days))
+        size = len(deck)
+        return [[deck[(d * k + j) % size] for j in range(k)] for d in range(n_days)]
+
+    def warmups(self, injuries: Optional[List[str]], n: int, n_days: int = 1,
+                rng=random) -> List[List[Tuple[str, Dict[str, Any]]]]:
+        """
+        Per day, *n* ``(category, entry)`` warm-ups: filled from the first
+        safe category in warm-up order, then the next, as before.
+        """
+        days: List[List[Tuple[str, Dict[str, Any]]]] = [[] for _ in range(n_days)]
+        remaining = n
+        for cat, entries in self._pools(injuries)[0]:
+            if remaining <= 0:
+                break
+            # Every day takes the same count from each category
+            for day, picks in zip(days, self._deal(entries, remaining, n_days, rng)):
+                day.extend((cat, entry) for entry in picks)
+            remaining -= min(remaining, len(entries))
+        return days
+
+    def cardio(self, injuries: Optional[List[str]], preferred: str, n: int,
+               n_days: int = 1, rng=random) -> List[List[Dict[str, Any]]]:
+        """Per day, up to *n* cardio entries (preferred category, else any safe one)."""
+        return self._deal(self._pools(injuries)[1][preferred], n, n_days, rng)
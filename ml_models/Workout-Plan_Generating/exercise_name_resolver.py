@@ -0,0 +1,261 @@
+"""
+exercise_name_resolver.py
+=========================
+
+Fuzzy resolution of model-emitted exercise names to catalog keys.
+
+flan-t5 rarely emits a catalog name verbatim ("Flat Db Press",
+"Push-Ups", "Barbell Rows").  ``ExerciseNameResolver`` is built once at
+startup from the catalog keys and resolves such names in three steps:
+
+1. **Exact** – normalized name equals a normalized catalog name.
+2. **Containing** – catalog names that contain every query token
+   (intersection of the token index).  The fewest extra tokens wins, where
+   an unrequested barbell/dumbbell costs least (the canonical variant:
+   "Bench Press" → "barbell bench press"), a generic descriptor ("back",
+   "bent over", "rope") a little more, a named variant ("meadows",
+   "upright") more again, and an unrequested cable/machine prefix — or,
+   worse, a band/trx home substitute — most: that equipment changes the
+   instructions.
+3. **Fuzzy** – otherwise, the catalog names sharing the most character
+   trigrams and tokens with the query, ranked by token overlap + trigram
+   Dice similarity, minus the same equipment penalty.
+
+Ties fall back to length difference and then alphabetical order, so the
+same query always resolves to the same catalog entry.
+
+Results (including misses) are kept in an LRU cache.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import Counter
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# Shorthand the model (and the legacy metadata dict) uses for equipment
+_TOKEN_ALIASES: Dict[str, str] = {
+    "db": "dumbbell",
+    "bb": "barbell",
+    "kb": "kettlebell",
+    "bw": "bodyweight",
+    "ups": "up",         # push ups / pull ups / sit ups: too short for _singular
+}
+
+# "Flat" in a model name means the flat bench ("Flat Db Press"); the
+# catalog spells those "... bench press".  HIIT on a machine is the
+# catalog's sprint ("Treadmill HIIT").  Query side only.
+_QUERY_ALIASES: Dict[str, str] = {"flat": "bench", "hiit": "sprint"}
+
+# Equipment that is the default for a free-weight movement vs. equipment
+# that turns it into a different exercise when the query didn't ask for it
+_CANONICAL_EQUIPMENT = ("barbell", "dumbbell")
+_OTHER_EQUIPMENT = frozenset({
+    "band", "cable", "trx", "machine", "kettlebell", "smith", "landmine", "ring",
+    "plate", "medicine", "bosu", "vitruvian", "ez", "exercise", "stability",
+    "mini", "sled", "suspension", "cardio", "pilates",
+})
+# Home substitutes for a cable/machine movement ("band face pull" for a
+# face pull): cost more than the gym equipment they stand in for
+_SUBSTITUTE_EQUIPMENT = frozenset({"band", "mini", "trx", "suspension"})
+_ANY_EQUIPMENT = _OTHER_EQUIPMENT | frozenset(_CANONICAL_EQUIPMENT)
+# Generic descriptors of the default form — the stance, the default rope
+# attachment, the muscle a fly already works.  Cheaper than a named
+# variant ("barbell bent over row", not "barbell meadows row").
+_NEUTRAL_MODIFIERS = frozenset({
+    "back", "standing", "flat", "conventional", "bilateral", "bent", "over",
+    "rope", "pec", "chest",
+})
+_EQUIPMENT_PENALTY = 0.15
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def _singular(token: str) -> str:
+    """Cheap plural folding: rows→row, flyes→fly, raises→raise, press stays press."""
+    if len(token) > 4 and token.endswith("yes"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def normalize_tokens(name: str) -> Tuple[str, ...]:
+    """Lowercase, split on non-alphanumerics, expand aliases, fold plurals."""
+    tokens = []
+    for tok in _NON_ALNUM.split(name.lower()):
+        if not tok:
+            continue
+        tokens.append(_singular(_TOKEN_ALIASES.get(tok, tok)))
+    return tuple(tokens)
+
+
+def _trigrams(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+class ExerciseNameResolver:
+    """
+    Resolve free-text exercise names to keys of a catalog dict.
+
+    ``resolve(name)`` returns the best-matching key or ``None`` when no
+    candidate scores at least ``min_score``.
+    """
+
+    def __init__(self, keys: Iterable[str], min_score: float = 0.5,
+                 min_query_len: int = 4, max_candidates: int = 40,
+                 cache_size: int = 4096) -> None:
+        self.min_score = min_score
+        self.min_query_len = min_query_len
+        self.max_candidates = max_candidates
+
+        # Sorted for deterministic ids (and therefore deterministic ties)
+        self._keys: List[str] = sorted(set(keys))
+        self._norm: List[str] = []
+        self._tokens: List[FrozenSet[str]] = []
+        self._grams: List[FrozenSet[str]] = []
+        self._exact: Dict[str, int] = {}
+        self._token_index: Dict[str, List[int]] = {}
+        self._gram_index: Dict[str, List[int]] = {}
+
+        for i, key in enumerate(self._keys):
+            tokens = normalize_tokens(key)
+            norm = " ".join(tokens)
+            grams = _trigrams(norm)
+            self._norm.append(norm)
+            self._tokens.append(frozenset(tokens))
+            self._grams.append(grams)
+            self._exact.setdefault(norm, i)
+            for tok in set(tokens):
+                self._token_index.setdefault(tok, []).append(i)
+            for g in grams:
+                self._gram_index.setdefault(g, []).append(i)
+
+        self._resolve_cached = lru_cache(maxsize=cache_size)(self._resolve)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Best catalog key for *name*, or None."""
+        return self._resolve_cached(name.lower().strip())
+
+    def rank(self, name: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Top *limit* (key, score) pairs — for debugging and benchmarks."""
+        query = self._query(name.lower().strip())
+        if query is None:
+            return []
+        return [(self._keys[i], round(score, 4))
+                for score, i in self._scored(*query)[:limit]]
+
+    def cache_info(self):
+        return self._resolve_cached.cache_info()
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _query(self, name: str) -> Optional[Tuple[str, FrozenSet[str], FrozenSet[str]]]:
+        tokens = tuple(dict.fromkeys(_QUERY_ALIASES.get(t, t) for t in normalize_tokens(name)))
+        norm = " ".join(tokens)
+        if len(norm) < self.min_query_len:
+            return None
+        return norm, frozenset(tokens), _trigrams(norm)
+
+    def _candidates(self, tokens: FrozenSet[str], grams: FrozenSet[str]) -> List[int]:
+        # Shared trigrams + shared whole tokens, counted at C speed.  Postings
+        # are fed in sorted order so ties (most_common keeps first-seen
+        # order) don't depend on per-process string hashing.
+        counts: Counter = Counter(chain.from_iterable(
+            self._gram_index.get(g, ()) for g in sorted(grams)))
+        counts.update(chain.from_iterable(
+            self._token_index.get(t, ()) for t in sorted(tokens)))
+        return [i for i, _ in counts.most_common(self.max_candidates)]
+
+    @staticmethod
+    def _extra_cost(tokens: FrozenSet[str], ctokens: FrozenSet[str]) -> float:
+        """How far a catalog name that contains the query strays from it."""
+        asked_equipment = bool(tokens & _ANY_EQUIPMENT)
+        cost = 0.0
+        for tok in ctokens - tokens:
+            if tok in _CANONICAL_EQUIPMENT:
+                cost += 2.0 if asked_equipment else 0.25
+            elif tok in _SUBSTITUTE_EQUIPMENT:
+                cost += 3.0
+            elif tok in _OTHER_EQUIPMENT:
+                cost += 2.0
+            elif tok in _NEUTRAL_MODIFIERS:
+                cost += 0.4
+            else:
+                cost += 1.0
+        return cost
+
+    def _containing(self, norm: str, tokens: FrozenSet[str]) -> List[Tuple[float, int]]:
+        """Catalog names containing every query token, best first, as (cost, id)."""
+        postings = sorted((self._token_index.get(t, ()) for t in tokens), key=len)
+        if not postings or not postings[0]:
+            return []
+        ids = set(postings[0]).intersection(*postings[1:])
+        ranked = [(self._extra_cost(tokens, self._tokens[i]), i) for i in ids]
+        # Fewest (weighted) extra tokens, barbell before dumbbell, closest length, key
+        ranked.sort(key=lambda ci: (
+            ci[0],
+            next((k for k, eq in enumerate(_CANONICAL_EQUIPMENT) if eq in self._tokens[ci[1]]),
+                 len(_CANONICAL_EQUIPMENT)),
+            abs(len(self._norm[ci[1]]) - len(norm)),
+            ci[1]))
+        return ranked
+
+    def _similarity(self, norm: str, tokens: FrozenSet[str], grams: FrozenSet[str],
+                    i: int, equipment_penalty: bool = True) -> float:
+        ctokens = self._tokens[i]
+        shared = len(tokens & ctokens)
+        token_score = shared / max(len(tokens), len(ctokens)) if ctokens else 0.0
+        cgrams = self._grams[i]
+        dice = 2 * len(grams & cgrams) / (len(grams) + len(cgrams))
+        score = 0.5 * token_score + 0.5 * dice
+        # Whole-name containment ("bench press" ⊂ "barbell bench press")
+        cnorm = self._norm[i]
+        if norm in cnorm or cnorm in norm:
+            score += 0.1
+        if equipment_penalty and (ctokens - tokens) & _OTHER_EQUIPMENT:
+            score -= _EQUIPMENT_PENALTY
+        return score
+
+    def _scored(self, norm: str, tokens: FrozenSet[str],
+                grams: FrozenSet[str]) -> List[Tuple[float, int]]:
+        """All ranked candidates as (score, id): containing names first, then fuzzy."""
+        contained = [(self._similarity(norm, tokens, grams, i), i)
+                     for _, i in self._containing(norm, tokens)]
+        seen = {i for _, i in contained}
+        fuzzy = [(self._similarity(norm, tokens, grams, i), i)
+                 for i in self._candidates(tokens, grams) if i not in seen]
+        # Highest score, then closest length, then alphabetical key
+        fuzzy.sort(key=lambda si: (-si[0], abs(len(self._norm[si[1]]) - len(norm)), si[1]))
+        return contained + fuzzy
+
+    def _resolve(self, name: str) -> Optional[str]:
+        query = self._query(name)
+        if query is None:
+            return None
+        norm, tokens, grams = query
+        exact = self._exact.get(norm)
+        if exact is not None:
+            return self._keys[exact]
+        # _extra_cost has already priced the equipment of a containing name
+        for _, i in self._containing(norm, tokens)[:1]:
+            score = self._similarity(norm, tokens, grams, i, equipment_penalty=False)
+            if score >= self.min_score:
+                return self._keys[i]
+        best: Optional[Tuple[tuple, int]] = None
+        for i in self._candidates(tokens, grams):
+            score = self._similarity(norm, tokens, grams, i)
+            key = (-score, abs(len(self._norm[i]) - len(norm)), i)
+            if score >= self.min_score and (best is None or key < best[0]):
+                best = (key, i)
+        return self._keys[best[1]] if best is not None else None
@@ -0,0 +1,115 @@
+"""
+injury_keyword_matcher.py
+=========================
+
+Multi-pattern matcher for the injury keyword blacklists.
+
+``INJURY_EXERCISE_BLACKLIST`` maps each injury to the substrings that make
+an exercise name unsafe for it ("deadlift", "overhead press", ...).
+Checking a name used to loop over every keyword of every reported injury.
+``InjuryKeywordMatcher`` compiles all blacklists once into one
+Aho–Corasick automaton, so each name is scanned once, left to right, and
+the result is every injury it triggers at the same time.
+
+Results are bitmasks: bit *j* stands for ``matcher.injuries[j]`` (the
+blacklist's key order).  ``id_masks`` goes the other way for a catalog:
+injury → bitmask of catalog ids whose name is unsafe for it (bit *i* =
+``names[i]``, the same layout as ``ExerciseIndex``), so candidate selection
+can mask unsafe exercises out before picking instead of filtering after.
+
+Matching is case-insensitive substring matching — the same rule as the old
+``keyword.lower() in name.lower()`` loop.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+
+class InjuryKeywordMatcher:
+    """Aho–Corasick automaton over every injury's blacklist keywords."""
+
+    def __init__(self, blacklist: Mapping[str, Sequence[str]]) -> None:
+        self.injuries: Tuple[str, ...] = tuple(blacklist)
+        self.bit_by_injury: Dict[str, int] = {
+            injury: 1 << j for j, injury in enumerate(self.injuries)}
+
+        # Trie: per state, char → next state; out[state] = injuries ending here
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[int] = [0]
+        for injury, keywords in blacklist.items():
+            bit = self.bit_by_injury[injury]
+            for keyword in keywords:
+                state = 0
+                for ch in keyword.lower():
+                    nxt = self._goto[state].get(ch)
+                    if nxt is None:
+                        nxt = len(self._goto)
+                        self._goto[state][ch] = nxt
+                        self._goto.append({})
+                        self._out.append(0)
+                    state = nxt
+                self._out[state] |= bit
+
+        # Failure links (BFS); each state's output absorbs its fail chain's
+        self._fail: List[int] = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+        self.bits = lru_cache(maxsize=4096)(self._bits_uncached)
+
+    # ── Matching ─────────────────────────────────────────────────────────────
+
+    def _bits_uncached(self, text: str) -> int:
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        found = 0
+        for ch in text.lower():
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            found |= out[state]
+        return found
+
+    def triggered(self, text: str) -> List[str]:
+        """Every injury whose blacklist matches *text*, in blacklist order."""
+        found = self.bits(text)
+        return [inj for inj in self.injuries if found & self.bit_by_injury[inj]]
+
+    def is_unsafe(self, text: str, injury: str) -> bool:
+        return bool(self.bits(text) & self.bit_by_injury.get(injury, 0))
+
+    def first_unsafe(self, text: str, injuries: Sequence[str]) -> Optional[str]:
+        """First injury of *injuries* (caller's order) that *text* is unsafe for."""
+        found = self.bits(text)
+        if found:
+            for injury in injuries:
+                if found & self.bit_by_injury.get(injury, 0):
+                    return injury
+        return None
+
+    # ── Catalog bitmaps ──────────────────────────────────────────────────────
+
+    def id_masks(self, names: Sequence[str]) -> Dict[str, int]:
+        """Injury → bitmask of ids in *names* that are unsafe for it."""
+        masks = {injury: 0 for injury in self.injuries}
+        for i, name in enumerate(names):
+            found = self._bits_uncached(name)
+            if not found:
+                continue
+            for injury, bit in self.bit_by_injury.items():
+                if found & bit:
+                    masks[injury] |= 1 << i
+        return masks
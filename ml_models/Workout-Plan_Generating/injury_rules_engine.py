@@ -6,7 +6,7 @@ Role
 ----
 Pre-processing guard that sits **before** the workout-plan generator model in
 the inference pipeline.  It receives structured injury data reported by the
-user, applies a battery of deterministic if/else rules, and returns an
+user, applies a battery of deterministic rules, and returns an
 ``InjuryDecision`` object that tells the downstream model exactly which
 movement patterns are safe, restricted, or forbidden — and by how much load
 and range-of-motion should be dialled back.
@@ -35,8 +35,8 @@ API Flow
     InjuryRulesEngine.from_dict(raw_dict)  →  InjuryInput
          │
          ▼
-    InjuryRulesEngine.evaluate([InjuryInput, ...])  →  InjuryDecision
-         │  (red-flag check + region-specific rules + merge)
+    InjuryRulesEngine.evaluate([InjuryInput, ...])  →  FrozenInjuryDecision
+         │  (red-flag check + region-specific rules + merge; memoized)
          ▼
     InjuryRulesEngine.filter_exercises(exercise_pool, decision)
          │  (removes contraindicated, annotates restricted)
@@ -46,10 +46,30 @@ API Flow
          ▼
     InjuryRulesEngine.explain(decision)  →  str  →  User-facing note
 
+Rule tables
+-----------
+The rules are data, not code: ``RED_FLAG_RULES`` lists the clinical red
+flags (predicate + message) and ``REGION_RULES`` holds one ``RegionRule``
+row per (region, severity) pair.  ``compile_region_rules()`` validates the
+table and freezes it at import, so evaluating an injury is one dict lookup
+plus a merge into the running decision.  ``test_injury_rule_table.py``
+checks the table against the original per-region if/else methods.
+
+Memoization
+-----------
+Because the rules are deterministic, ``evaluate()`` is memoized: the injury
+list is reduced to a canonical, hashable key (``canonical_injuries`` — one
+tuple per injury, sorted, so the order injuries are reported in doesn't
+matter) and decisions are kept in an LRU cache.  Cached decisions are
+``FrozenInjuryDecision`` objects (tuples / frozensets / a read-only
+mapping) so no caller can corrupt another caller's result.  Use
+``evaluate_uncached()`` for a fresh, mutable ``InjuryDecision`` evaluated in
+the given order.  ``DEFAULT_ENGINE`` is a module-level instance to share.
+
 Modules used
 ------------
-Only Python standard library: ``dataclasses``, ``enum``, ``typing``, ``json``.
-No ML / numerical libraries required.
+Only Python standard library: ``dataclasses``, ``enum``, ``functools``,
+``typing``, ``json``.  No ML / numerical libraries required.
 """
 
 from __future__ import annotations
@@ -57,9 +77,13 @@ from __future__ import annotations
 import io
 import json
 import sys
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, replace
 from enum import Enum
-from typing import Callable, Dict, List, Optional, Set
+from functools import lru_cache
+from types import MappingProxyType
+from typing import (
+    Any, Callable, Collection, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple,
+)
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  ENUMERATIONS
@@ -235,6 +259,85 @@ class InjuryDecision:
     tags: List[str] = field(default_factory=list)
 
 
+@dataclass(frozen=True)
+class FrozenInjuryDecision:
+    """
+    Immutable ``InjuryDecision`` — what the memoized ``evaluate()`` returns.
+
+    Same fields and meaning as ``InjuryDecision``; lists become tuples, sets
+    become frozensets and ``substitutions`` is a read-only mapping, so one
+    cached decision can be shared by every request that produced it.
+    """
+
+    requires_clearance: bool
+    clearance_reasons: Tuple[str, ...]
+    contraindicated_patterns: FrozenSet[str]
+    restricted_patterns: FrozenSet[str]
+    allowed_patterns: FrozenSet[str]
+    load_modifier: float
+    rom_modifier: ROMModifier
+    coaching_notes: Tuple[str, ...]
+    red_flags: Tuple[str, ...]
+    substitutions: Mapping[str, str] = field(hash=False)
+    tags: Tuple[str, ...]
+
+    @classmethod
+    def from_decision(cls, decision: InjuryDecision) -> "FrozenInjuryDecision":
+        return cls(
+            requires_clearance=decision.requires_clearance,
+            clearance_reasons=tuple(decision.clearance_reasons),
+            contraindicated_patterns=frozenset(decision.contraindicated_patterns),
+            restricted_patterns=frozenset(decision.restricted_patterns),
+            allowed_patterns=frozenset(decision.allowed_patterns),
+            load_modifier=decision.load_modifier,
+            rom_modifier=decision.rom_modifier,
+            coaching_notes=tuple(decision.coaching_notes),
+            red_flags=tuple(decision.red_flags),
+            substitutions=MappingProxyType(dict(decision.substitutions)),
+            tags=tuple(decision.tags),
+        )
+
+    def thaw(self) -> InjuryDecision:
+        """A mutable ``InjuryDecision`` copy."""
+        return InjuryDecision(
+            requires_clearance=self.requires_clearance,
+            clearance_reasons=list(self.clearance_reasons),
+            contraindicated_patterns=set(self.contraindicated_patterns),
+            restricted_patterns=set(self.restricted_patterns),
+            allowed_patterns=set(self.allowed_patterns),
+            load_modifier=self.load_modifier,
+            rom_modifier=self.rom_modifier,
+            coaching_notes=list(self.coaching_notes),
+            red_flags=list(self.red_flags),
+            substitutions=dict(self.substitutions),
+            tags=list(self.tags),
+        )
+
+
+# ── Canonical (hashable) injury lists ─────────────────────────────────────────
+
+InjuryKey = Tuple[Any, ...]
+_INPUT_FIELDS = tuple(f.name for f in fields(InjuryInput))
+
+
+def injury_key(injury: InjuryInput) -> InjuryKey:
+    """All ``InjuryInput`` fields in declaration order (lists → tuples)."""
+    return tuple(
+        tuple(value) if isinstance(value, list) else value
+        for value in (getattr(injury, name) for name in _INPUT_FIELDS)
+    )
+
+
+def canonical_injuries(injuries: List[InjuryInput]) -> Tuple[InjuryKey, ...]:
+    """Order-insensitive, hashable form of an injury list (sorted ``injury_key``s)."""
+    return tuple(sorted(injury_key(injury) for injury in injuries))
+
+
+def injury_from_key(key: InjuryKey) -> InjuryInput:
+    return InjuryInput(*(list(value) if isinstance(value, tuple) else value
+                         for value in key))
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  CONSTANTS
 # ══════════════════════════════════════════════════════════════════════════════
@@ -264,6 +367,625 @@ RED_FLAG_INJURY_TYPES: Set[InjuryType] = {
 }
 
 
+# ══════════════════════════════════════════════════════════════════════════════
+#  RULE TABLES
+# ══════════════════════════════════════════════════════════════════════════════
+
+
+@dataclass(frozen=True)
+class RedFlagRule:
+    """
+    One clinical red flag: ``applies(injury)`` → ``message`` (a ``str.format``
+    template; ``{i}`` is the ``InjuryInput``).
+    """
+
+    applies: Callable[[InjuryInput], bool]
+    message: str
+
+
+@dataclass(frozen=True)
+class RegionRule:
+    """
+    One row of ``REGION_RULES``: what a (region, severity) pair adds to the
+    running decision.
+
+    ``clearance_reason`` doubles as the clearance switch — a row that sets
+    it also sets ``requires_clearance``.  Defaults leave the decision as is.
+    """
+
+    contraindicated: Collection[str] = ()
+    restricted: Collection[str] = ()
+    load_modifier: float = 1.0
+    rom_modifier: ROMModifier = ROMModifier.FULL
+    clearance_reason: Optional[str] = None
+    coaching_note: Optional[str] = None
+    substitutions: Mapping[str, str] = field(default_factory=dict, hash=False)
+    tags: Tuple[str, ...] = ()
+
+    def apply(self, decision: InjuryDecision) -> None:
+        """Merge this row into ``decision`` (most-restrictive-wins)."""
+        decision.contraindicated_patterns.update(self.contraindicated)
+        decision.restricted_patterns.update(self.restricted)
+        decision.load_modifier = min(decision.load_modifier, self.load_modifier)
+        decision.rom_modifier = _more_restrictive_rom(decision.rom_modifier, self.rom_modifier)
+        if self.clearance_reason:
+            decision.requires_clearance = True
+            decision.clearance_reasons.append(self.clearance_reason)
+        if self.coaching_note:
+            decision.coaching_notes.append(self.coaching_note)
+        if self.substitutions:
+            decision.substitutions.update(self.substitutions)
+        decision.tags.extend(self.tags)
+
+
+# Checked in order for every injury; each hit adds its message to red_flags.
+RED_FLAG_RULES: Tuple[RedFlagRule, ...] = (
+    RedFlagRule(
+        lambda i: i.pain_now >= 8,
+        "Pain level {i.pain_now}/10 is too high for unsupervised exercise "
+        "(threshold: 8/10).  Rest and seek medical evaluation.",
+    ),
+    RedFlagRule(
+        lambda i: i.injury_type in RED_FLAG_INJURY_TYPES,
+        "Injury type '{i.injury_type.value}' (region: {i.injury_region.value}) "
+        "requires documented medical clearance before any structured training.",
+    ),
+    RedFlagRule(
+        lambda i: i.recent_trauma and i.severity != Severity.MILD,
+        "Recent trauma (within 72 h) combined with moderate-to-severe severity "
+        "requires medical evaluation before loading the affected region.",
+    ),
+    RedFlagRule(
+        lambda i: i.unexplained_swelling,
+        "Unexplained swelling is a red flag — could indicate acute synovitis, "
+        "haematoma, or infection.  Do not exercise until cause is identified.",
+    ),
+    RedFlagRule(
+        lambda i: i.major_weakness,
+        "Significant muscle strength deficit detected — possible nerve impingement, "
+        "muscle tear, or structural damage.  Neurological screening recommended.",
+    ),
+    RedFlagRule(
+        lambda i: i.systemic_symptoms,
+        "Systemic symptoms (fever, widespread pain, fatigue) contraindicate exercise. "
+        "Seek medical review to rule out systemic or inflammatory pathology.",
+    ),
+    RedFlagRule(
+        lambda i: i.worsening and i.duration_category != DurationCategory.ACUTE,
+        "Progressive worsening of a {i.duration_category.value} injury "
+        "suggests inadequate recovery or underlying pathology.  Reassessment required.",
+    ),
+)
+
+
+# Region × severity restrictions.  Patterns are written as tuples for
+# readability; compile_region_rules() turns them into frozensets.
+REGION_RULES: Dict[Tuple[InjuryRegion, Severity], RegionRule] = {
+    # Shoulder injury restrictions (ACSM shoulder-impingement and rotator-cuff
+    # return-to-activity guidelines).
+    #   MILD     → restrict overhead; reduce load 25 %
+    #   MODERATE → ban all overhead; restrict horizontal pressing/pulling
+    #   SEVERE   → ban all upper-body pushing; medical clearance required
+    (InjuryRegion.SHOULDER, Severity.MILD): RegionRule(
+        restricted=("vertical_push", "shoulder_raise"),
+        load_modifier=0.75,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Shoulder – Mild] Reduce overhead pressing load 25 %.  Stop if pain > 3/10.  "
+            "Prefer neutral-grip pressing over pronated.  No kipping movements or "
+            "ballistic shoulder actions."
+        ),
+        substitutions={"vertical_push": "horizontal_push"},
+        tags=("reduce_overhead_load", "pain_free_rom"),
+    ),
+    (InjuryRegion.SHOULDER, Severity.MODERATE): RegionRule(
+        contraindicated=("vertical_push", "shoulder_raise"),
+        restricted=("horizontal_push", "horizontal_pull"),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Shoulder – Moderate] Avoid ALL overhead pressing.  Machine chest press "
+            "preferred over barbell flat bench.  No upright rows or dips behind neck.  "
+            "Pain-free cable/machine rows only — stop if shoulder impingement occurs."
+        ),
+        substitutions={
+            "vertical_push": "horizontal_push",
+            "shoulder_raise": "core_flexion",
+        },
+        tags=("no_overhead", "machine_preferred", "avoid_upright_rows"),
+    ),
+    (InjuryRegion.SHOULDER, Severity.SEVERE): RegionRule(
+        contraindicated=("vertical_push", "shoulder_raise", "horizontal_push"),
+        restricted=("horizontal_pull",),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe shoulder injury — all upper-body pushing is contraindicated until "
+            "the treating physician or physiotherapist provides written clearance."
+        ),
+        coaching_note=(
+            "[Shoulder – Severe] Medical clearance required before any upper-body "
+            "pushing.  Lower body and seated cable pulling are permitted within a "
+            "completely pain-free range only.  Abort set immediately on any shoulder pain."
+        ),
+        tags=("clearance_required", "upper_body_restricted"),
+    ),
+
+    # Knee injury restrictions (ACSM patellofemoral and ACL return-to-sport
+    # load-management guidelines).
+    #   MILD     → restrict squats/lunges; limit depth
+    #   MODERATE → ban lunges; restrict knee-isolation work
+    #   SEVERE   → ban all direct leg patterns; medical clearance required
+    (InjuryRegion.KNEE, Severity.MILD): RegionRule(
+        restricted=("squat", "lunge"),
+        load_modifier=0.75,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Knee – Mild] Limit squat depth to pain-free range (typically above parallel).  "
+            "Avoid jumping and plyometric loading.  Leg press preferred over barbell squat.  "
+            "Monitor for post-session swelling — if present, reduce load further next session."
+        ),
+        substitutions={
+            "squat": "squat (half-depth, controlled tempo)",
+            "lunge": "hip_hinge",
+        },
+        tags=("limit_squat_depth", "no_plyometrics"),
+    ),
+    (InjuryRegion.KNEE, Severity.MODERATE): RegionRule(
+        contraindicated=("lunge",),
+        restricted=("squat", "knee_extension", "knee_flexion"),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Knee – Moderate] Replace barbell squats with leg press or box squat.  "
+            "No lunges in any variation.  Seated leg curl only if completely pain-free — "
+            "otherwise omit.  Focus programme on upper body and hip-hinge patterns that "
+            "do not stress the knee joint."
+        ),
+        substitutions={"squat": "hip_hinge", "lunge": "hip_hinge"},
+        tags=("no_lunges", "leg_press_preferred"),
+    ),
+    (InjuryRegion.KNEE, Severity.SEVERE): RegionRule(
+        contraindicated=("squat", "lunge", "knee_extension", "knee_flexion", "calf"),
+        restricted=("hip_hinge",),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe knee injury — all direct leg loading is contraindicated until "
+            "a physiotherapist clears progressive weight-bearing."
+        ),
+        coaching_note=(
+            "[Knee – Severe] No direct leg work until physiotherapist clearance.  "
+            "Upper body and seated exercises only.  Hip hinges permitted only if the "
+            "knee is completely unloaded and pain-free throughout the movement."
+        ),
+        tags=("clearance_required", "upper_body_only"),
+    ),
+
+    # Lumbar spine restrictions (ACSM low-back pain exercise prescription and
+    # McGill spinal-stability guidelines).
+    #   MILD     → restrict hip hinge / squat; demand neutral spine
+    #   MODERATE → ban free-weight hip hinge; restrict squat and row
+    #   SEVERE   → ban all axial loading; medical clearance required
+    (InjuryRegion.LOWER_BACK, Severity.MILD): RegionRule(
+        restricted=("hip_hinge", "squat"),
+        load_modifier=0.70,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Lower Back – Mild] Brace core (intra-abdominal pressure) on ALL movements.  "
+            "Avoid any spinal rounding or flexion under load.  Prefer Romanian deadlift "
+            "over conventional deadlift.  Eliminate good mornings, hyperextensions, and "
+            "Jefferson curls from the session."
+        ),
+        substitutions={
+            "hip_hinge": "hip_hinge (light load, strict neutral spine only)",
+        },
+        tags=("brace_core", "neutral_spine_only", "rdl_preferred"),
+    ),
+    (InjuryRegion.LOWER_BACK, Severity.MODERATE): RegionRule(
+        contraindicated=("hip_hinge",),
+        restricted=("squat", "horizontal_pull"),
+        load_modifier=0.55,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Lower Back – Moderate] Remove ALL free-weight deadlift variations.  Use "
+            "hip thrust or cable pull-through as hip-extension alternatives.  Eliminate "
+            "bent-over rows — substitute with seated cable row (supported lumbar).  "
+            "Leg press preferred over barbell squat to reduce spinal compression."
+        ),
+        substitutions={
+            "hip_hinge": "core_flexion",
+            "horizontal_pull": "horizontal_pull (seated cable, supported back only)",
+        },
+        tags=("no_deadlift", "seated_cable_rows_only", "machine_preferred"),
+    ),
+    (InjuryRegion.LOWER_BACK, Severity.SEVERE): RegionRule(
+        contraindicated=("hip_hinge", "squat", "lunge"),
+        restricted=("core_flexion", "horizontal_pull"),
+        load_modifier=0.40,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe lower back injury — axial spinal loading is contraindicated.  "
+            "Medical imaging and specialist clearance required before resuming "
+            "any free-weight compound lower-body or posterior-chain work."
+        ),
+        coaching_note=(
+            "[Lower Back – Severe] Medical clearance required.  Supine and seated exercises "
+            "only.  Zero axial spinal loading (no bar on back, no standing lifts).  "
+            "Focus exclusively on pain-free upper-body pressing and pulling in supported "
+            "positions."
+        ),
+        tags=("clearance_required", "no_axial_load", "supine_seated_only"),
+    ),
+
+    # Elbow injury restrictions (lateral/medial epicondylitis and elbow
+    # tendinopathy management guidelines).
+    #   MILD     → restrict direct arm work; reduce volume 35 %
+    #   MODERATE → ban all arm isolation; restrict compounds
+    #   SEVERE   → rest elbow completely; medical clearance required
+    (InjuryRegion.ELBOW, Severity.MILD): RegionRule(
+        restricted=("elbow_flexion", "elbow_extension"),
+        load_modifier=0.65,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Elbow – Mild] Reduce direct arm isolation volume by 35 %.  Use a neutral "
+            "(hammer) grip wherever possible.  Avoid full elbow lock-out on extension "
+            "exercises (stop 10–15° short of full extension).  "
+            "Ice elbow for 10 min post-session if soreness persists."
+        ),
+        tags=("neutral_grip", "reduce_arm_volume", "avoid_elbow_lockout"),
+    ),
+    (InjuryRegion.ELBOW, Severity.MODERATE): RegionRule(
+        contraindicated=("elbow_flexion", "elbow_extension"),
+        restricted=("horizontal_push", "horizontal_pull"),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Elbow – Moderate] Skip ALL direct arm isolation exercises.  Compound "
+            "pressing (bench) and pulling (row) permitted only if completely pain-free "
+            "throughout the full movement.  Use wrist wraps if gripping under load "
+            "aggravates symptoms.  Monitor for pain radiation into forearm or wrist."
+        ),
+        substitutions={
+            "elbow_flexion": "horizontal_pull",
+            "elbow_extension": "horizontal_push",
+        },
+        tags=("no_arm_isolation", "compounds_only", "wrist_wraps_advised"),
+    ),
+    (InjuryRegion.ELBOW, Severity.SEVERE): RegionRule(
+        contraindicated=(
+            "elbow_flexion",
+            "elbow_extension",
+            "horizontal_push",
+            "horizontal_pull",
+        ),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe elbow injury — complete elbow rest required.  "
+            "Medical review needed before resuming any upper-body pushing or pulling."
+        ),
+        coaching_note=(
+            "[Elbow – Severe] Rest elbow completely — no grip-loaded upper-body work.  "
+            "Lower body and core exercises only.  Medical review required before returning "
+            "to any pushing, pulling, or carrying exercise."
+        ),
+        tags=("clearance_required", "elbow_rest", "lower_body_core_only"),
+    ),
+
+    # Wrist injury restrictions (TFCC, carpal tunnel, and wrist tendinopathy
+    # exercise modification protocols).
+    #   MILD     → restrict horizontal pressing; use neutral grip + wraps
+    #   MODERATE → ban pressing; restrict pulling and curls; cables/machines only
+    #   SEVERE   → ban all grip-intensive pushing and pulling; clearance required
+    (InjuryRegion.WRIST, Severity.MILD): RegionRule(
+        restricted=("horizontal_push",),
+        load_modifier=0.75,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Wrist – Mild] Use neutral grip wherever possible.  Wear wrist wraps on all "
+            "pressing movements.  Avoid extreme wrist extension under load (flat bar bench).  "
+            "Reduce pressing volume by 25 %.  Dumbbell pressing preferred over barbell."
+        ),
+        substitutions={
+            "horizontal_push": "horizontal_push (neutral-grip dumbbells or cable press)",
+        },
+        tags=("neutral_grip", "wrist_wraps_recommended", "dumbbell_over_barbell"),
+    ),
+    (InjuryRegion.WRIST, Severity.MODERATE): RegionRule(
+        contraindicated=("horizontal_push",),
+        restricted=("elbow_flexion", "horizontal_pull"),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Wrist – Moderate] No barbell or dumbbell pressing — cables and machines with "
+            "neutral grip only.  Minimise wrist flexion/extension under any load.  "
+            "Avoid heavy gripping exercises (shrugs, farmer carries, heavy pull-downs).  "
+            "Straps permitted for pulling movements if wrist is pain-free when used."
+        ),
+        substitutions={
+            "horizontal_push": "vertical_pull",
+            "horizontal_pull": "horizontal_pull (cable, neutral grip with straps)",
+        },
+        tags=("cables_machines_only", "no_barbell_pressing", "straps_permitted"),
+    ),
+    (InjuryRegion.WRIST, Severity.SEVERE): RegionRule(
+        contraindicated=("horizontal_push", "horizontal_pull", "elbow_flexion"),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe wrist injury — all grip-intensive upper-body pushing and pulling "
+            "is contraindicated until wrist stability and pain-free ROM are restored."
+        ),
+        coaching_note=(
+            "[Wrist – Severe] Avoid all grip-loaded exercises.  Lower body, core, and "
+            "machine-isolated leg work only.  Medical clearance required before returning "
+            "to any upper-body training.  Consider splinting during daily activities."
+        ),
+        tags=("clearance_required", "no_grip_loading", "lower_body_only"),
+    ),
+
+    # Ankle injury restrictions (lateral ankle sprain and Achilles tendinopathy
+    # progressive loading protocols).
+    #   MILD     → restrict squats/lunges/calf; avoid impact; heel elevation
+    #   MODERATE → ban lunges and calf; restrict squats; prefer seated
+    #   SEVERE   → ban all weight-bearing lower-body; clearance required
+    (InjuryRegion.ANKLE, Severity.MILD): RegionRule(
+        restricted=("squat", "calf", "lunge"),
+        load_modifier=0.75,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Ankle – Mild] Avoid all jumping and impact activities.  Use a heel elevation "
+            "(25 mm plate under heels) for squats to reduce dorsiflexion demand.  "
+            "Seated calf raises only — no standing single or double calf raises.  "
+            "Shorten lunge stride to reduce ankle loading.  Monitor for swelling after sessions."
+        ),
+        substitutions={
+            "squat": "squat (heel-elevated, bilateral only)",
+            "lunge": "hip_hinge",
+            "calf": "calf (seated machine only)",
+        },
+        tags=("no_impact", "heel_elevation", "seated_calf_only"),
+    ),
+    (InjuryRegion.ANKLE, Severity.MODERATE): RegionRule(
+        contraindicated=("lunge", "calf"),
+        restricted=("squat",),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Ankle – Moderate] No lunges in any form (walking, reverse, lateral).  "
+            "No calf raises.  Limit squat range to pain-free depth — leg press preferred.  "
+            "Avoid single-leg loading entirely.  Upper body seated exercises and hip "
+            "thrusts are preferred alternatives for this phase."
+        ),
+        substitutions={
+            "lunge": "hip_hinge",
+            "calf": "hip_hinge",
+            "squat": "squat (leg press alternative)",
+        },
+        tags=("no_lunges", "no_calf_raises", "bilateral_only", "leg_press_preferred"),
+    ),
+    (InjuryRegion.ANKLE, Severity.SEVERE): RegionRule(
+        contraindicated=("squat", "lunge", "calf", "hip_hinge"),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe ankle injury — all weight-bearing lower-body movement is "
+            "contraindicated until bone and ligament integrity is confirmed by imaging "
+            "and the treating physiotherapist clears progressive loading."
+        ),
+        coaching_note=(
+            "[Ankle – Severe] Upper body only.  No weight-bearing on injured ankle.  "
+            "All exercises must be performed seated or supine.  "
+            "Physiotherapist clearance and progressive weight-bearing protocol required "
+            "before returning to any standing exercise."
+        ),
+        tags=("clearance_required", "upper_body_only", "non_weight_bearing"),
+    ),
+
+    # Hip injury restrictions (FAI, labral tear, hip flexor strain, and greater
+    # trochanteric pain syndrome guidelines).
+    #   MILD     → restrict squat/hinge/lunge; limit end-range hip positions
+    #   MODERATE → ban all hip-dominant patterns; machine-based isolation only
+    #   SEVERE   → ban all lower-body compound and isolation; clearance required
+    (InjuryRegion.HIP, Severity.MILD): RegionRule(
+        restricted=("squat", "hip_hinge", "lunge"),
+        load_modifier=0.70,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Hip – Mild] Limit hip flexion depth (avoid deep squat / full hip hinge).  "
+            "Avoid end-range hip positions under any load.  "
+            "Prefer machines over free weights to control ROM precisely.  "
+            "Monitor for clicking, catching, or groin pain — stop if present."
+        ),
+        substitutions={
+            "squat": "squat (limited depth, no below-parallel)",
+            "hip_hinge": "hip_hinge (shallow, no full hip flexion)",
+            "lunge": "core_flexion",
+        },
+        tags=("limit_hip_rom", "no_end_range_loading", "no_deep_squat"),
+    ),
+    (InjuryRegion.HIP, Severity.MODERATE): RegionRule(
+        contraindicated=("squat", "hip_hinge", "lunge"),
+        restricted=("knee_extension", "knee_flexion"),
+        load_modifier=0.55,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Hip – Moderate] No free-weight squat, hip hinge, or lunge variations.  "
+            "Machine-based knee isolation (leg extension, leg curl) permitted only if the "
+            "hip setup position is entirely pain-free.  "
+            "Seated exercises and upper body work are the focus for this phase."
+        ),
+        substitutions={
+            "squat": "knee_extension",
+            "hip_hinge": "core_flexion",
+            "lunge": "core_flexion",
+        },
+        tags=("no_squat_hinge_lunge", "machine_based_only"),
+    ),
+    (InjuryRegion.HIP, Severity.SEVERE): RegionRule(
+        contraindicated=(
+            "squat",
+            "hip_hinge",
+            "lunge",
+            "knee_extension",
+            "knee_flexion",
+        ),
+        load_modifier=0.40,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe hip injury — all lower-body compound and isolation work is "
+            "contraindicated.  Imaging (X-ray / MRI) and orthopaedic or sports-medicine "
+            "specialist review required before progressive loading."
+        ),
+        coaching_note=(
+            "[Hip – Severe] No lower-body loading of any kind.  Upper body only — "
+            "all exercises performed seated or supine.  "
+            "Specialist review and imaging are strongly recommended before resuming."
+        ),
+        tags=("clearance_required", "upper_body_only", "specialist_review"),
+    ),
+
+    # Cervical spine restrictions (cervical radiculopathy, whiplash, and neck
+    # muscle strain exercise modification guidelines).
+    #   MILD     → no contraindications; reduce neck-loading movements
+    #   MODERATE → ban overhead pressing; restrict shoulder raises and vertical pull
+    #   SEVERE   → ban all overhead and compressive cervical loading; clearance required
+    (InjuryRegion.NECK, Severity.MILD): RegionRule(
+        load_modifier=0.80,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Neck – Mild] Maintain strict neutral cervical spine on all exercises.  "
+            "Avoid heavy shrugs, heavy upper-trap work, and behind-the-neck pressing or "
+            "pulling.  Reduce overall upper-trap loading by 20 %.  "
+            "No axial cervical compression (no barbell back squats without a foam pad)."
+        ),
+        tags=("neutral_neck", "avoid_neck_strain", "no_behind_neck"),
+    ),
+    (InjuryRegion.NECK, Severity.MODERATE): RegionRule(
+        contraindicated=("vertical_push",),
+        restricted=("shoulder_raise", "vertical_pull"),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Neck – Moderate] No overhead pressing — compressive cervical force risk.  "
+            "No behind-the-neck lat pulldown.  Restrict shoulder shrugs.  "
+            "All exercises performed with head in neutral (no chin-tuck or jutting).  "
+            "Seated, fully-supported spine preferred throughout the session."
+        ),
+        substitutions={
+            "vertical_push": "horizontal_push",
+            "vertical_pull": "horizontal_pull",
+        },
+        tags=("no_overhead_press", "neutral_cervical_spine", "seated_supported"),
+    ),
+    (InjuryRegion.NECK, Severity.SEVERE): RegionRule(
+        contraindicated=("vertical_push", "shoulder_raise"),
+        restricted=("vertical_pull", "horizontal_pull"),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe neck injury — all overhead and compressive cervical loading requires "
+            "medical imaging (MRI/CT) and specialist clearance before exercise."
+        ),
+        coaching_note=(
+            "[Neck – Severe] Medical clearance required before any overhead or heavy "
+            "upper-back loading.  Lower body and light core work permitted if pain-free.  "
+            "CRITICAL: tingling, numbness, or weakness in arms/hands = stop immediately "
+            "and seek emergency medical attention."
+        ),
+        tags=("clearance_required", "no_cervical_compression", "neurological_watch"),
+    ),
+
+    # Thoracic spine / upper back restrictions (thoracic facet joint, rhomboid
+    # strain, and mid-back disc guidelines).
+    #   MILD     → restrict horizontal pulling; reduce row load
+    #   MODERATE → ban horizontal pull; restrict vertical pull
+    #   SEVERE   → ban all pulling patterns; medical clearance required
+    (InjuryRegion.UPPER_BACK, Severity.MILD): RegionRule(
+        restricted=("horizontal_pull",),
+        load_modifier=0.75,
+        rom_modifier=ROMModifier.PAIN_FREE_ONLY,
+        coaching_note=(
+            "[Upper Back – Mild] Reduce rowing volume and load.  "
+            "Cable rows preferred over barbell bent-over rows.  "
+            "Avoid extreme scapular protraction under load.  "
+            "Monitor for thoracic pain or stiffness during and after sessions."
+        ),
+        substitutions={"horizontal_pull": "horizontal_pull (seated cable, light load)"},
+        tags=("reduce_row_volume", "cable_rows_preferred"),
+    ),
+    (InjuryRegion.UPPER_BACK, Severity.MODERATE): RegionRule(
+        contraindicated=("horizontal_pull",),
+        restricted=("vertical_pull",),
+        load_modifier=0.60,
+        rom_modifier=ROMModifier.PARTIAL,
+        coaching_note=(
+            "[Upper Back – Moderate] No rowing movements of any kind.  "
+            "Lat pulldown permissible only if the thoracic spine remains unloaded and "
+            "pain-free throughout.  Avoid any exercise compressing the thoracic spine.  "
+            "Focus programme on lower body, core, and horizontal pressing."
+        ),
+        substitutions={
+            "horizontal_pull": "core_flexion",
+            "vertical_pull": "vertical_pull (light lat pulldown, pain-free only)",
+        },
+        tags=("no_rows", "thoracic_deloaded"),
+    ),
+    (InjuryRegion.UPPER_BACK, Severity.SEVERE): RegionRule(
+        contraindicated=("horizontal_pull", "vertical_pull"),
+        load_modifier=0.50,
+        rom_modifier=ROMModifier.NONE_UNTIL_CLEARED,
+        clearance_reason=(
+            "Severe upper back injury — all pulling movements are contraindicated until "
+            "the treating clinician confirms structural integrity and clears exercise."
+        ),
+        coaching_note=(
+            "[Upper Back – Severe] No pulling movements.  Lower body, core, and "
+            "pain-free horizontal pressing are the only permitted training domains.  "
+            "Medical clearance required before returning to any rowing or pulling work."
+        ),
+        tags=("clearance_required", "no_pulling_movements"),
+    ),
+}
+
+
+def compile_region_rules(
+    table: Mapping[Tuple[InjuryRegion, Severity], RegionRule],
+) -> Dict[Tuple[InjuryRegion, Severity], RegionRule]:
+    """
+    Validate ``table`` and freeze its rows for lookup by ``evaluate()``.
+
+    Every (region, severity) pair must have a row and every pattern must be
+    one of ``ALL_PATTERNS``; a typo in the table raises ``ValueError`` at
+    import instead of silently never matching an exercise.
+    """
+    missing = [
+        (region.value, severity.value)
+        for region in InjuryRegion for severity in Severity
+        if (region, severity) not in table
+    ]
+    if missing:
+        raise ValueError(f"REGION_RULES has no row for {missing}")
+
+    compiled: Dict[Tuple[InjuryRegion, Severity], RegionRule] = {}
+    for key, rule in table.items():
+        unknown = (set(rule.contraindicated) | set(rule.restricted)) - ALL_PATTERNS
+        if unknown:
+            raise ValueError(
+                f"REGION_RULES[{key[0].value}, {key[1].value}] uses unknown "
+                f"pattern(s) {sorted(unknown)}"
+            )
+        compiled[key] = replace(
+            rule,
+            contraindicated=frozenset(rule.contraindicated),
+            restricted=frozenset(rule.restricted),
+            substitutions=MappingProxyType(dict(rule.substitutions)),
+            tags=tuple(rule.tags),
+        )
+    return compiled
+
+
 # ══════════════════════════════════════════════════════════════════════════════
 #  RULES ENGINE
 # ══════════════════════════════════════════════════════════════════════════════
@@ -281,10 +1003,14 @@ class InjuryRulesEngine:
     - Filter a concrete exercise pool and annotate restricted entries.
     - Produce human-readable explanations for the API response layer.
 
-    No state is stored between calls; all methods are pure functions over their
-    arguments except for the ``_REGION_DISPATCH`` lookup table.
+    The only state is the ``evaluate()`` memo cache (keyed by canonical
+    input, so it never changes a result); all methods are pure functions over
+    their arguments except for the ``_REGION_RULES`` lookup table.
     """
 
+    def __init__(self, cache_size: int = 1024) -> None:
+        self._evaluate_cached = lru_cache(maxsize=cache_size)(self._evaluate_key)
+
     # ──────────────────────────────────────────────────────────────────────────
     #  RED-FLAG DETECTION
     # ──────────────────────────────────────────────────────────────────────────
@@ -293,9 +1019,9 @@ class InjuryRulesEngine:
         """
         Screen for clinical red flags that contraindicate unsupervised exercise.
 
-        Returns a (possibly empty) list of plain-English flag descriptions.
-        Any non-empty return value will set ``requires_clearance = True`` on
-        the merged decision.
+        Returns a (possibly empty) list of plain-English flag descriptions, one
+        per matching ``RED_FLAG_RULES`` entry.  Any non-empty return value will
+        set ``requires_clearance = True`` on the merged decision.
 
         Triggers
         --------
@@ -307,747 +1033,37 @@ class InjuryRulesEngine:
         - systemic_symptoms
         - worsening AND duration_category != ACUTE
         """
-        flags: List[str] = []
-
-        if injury.pain_now >= 8:
-            flags.append(
-                f"Pain level {injury.pain_now}/10 is too high for unsupervised exercise "
-                "(threshold: 8/10).  Rest and seek medical evaluation."
-            )
-
-        if injury.injury_type in RED_FLAG_INJURY_TYPES:
-            flags.append(
-                f"Injury type '{injury.injury_type.value}' (region: {injury.injury_region.value}) "
-                "requires documented medical clearance before any structured training."
-            )
-
-        if injury.recent_trauma and injury.severity != Severity.MILD:
-            flags.append(
-                "Recent trauma (within 72 h) combined with moderate-to-severe severity "
-                "requires medical evaluation before loading the affected region."
-            )
-
-        if injury.unexplained_swelling:
-            flags.append(
-                "Unexplained swelling is a red flag — could indicate acute synovitis, "
-                "haematoma, or infection.  Do not exercise until cause is identified."
-            )
-
-        if injury.major_weakness:
-            flags.append(
-                "Significant muscle strength deficit detected — possible nerve impingement, "
-                "muscle tear, or structural damage.  Neurological screening recommended."
-            )
-
-        if injury.systemic_symptoms:
-            flags.append(
-                "Systemic symptoms (fever, widespread pain, fatigue) contraindicate exercise. "
-                "Seek medical review to rule out systemic or inflammatory pathology."
-            )
-
-        if injury.worsening and injury.duration_category != DurationCategory.ACUTE:
-            flags.append(
-                f"Progressive worsening of a {injury.duration_category.value} injury "
-                "suggests inadequate recovery or underlying pathology.  Reassessment required."
-            )
-
-        return flags
-
-    # ──────────────────────────────────────────────────────────────────────────
-    #  REGION-SPECIFIC RULES
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def _shoulder_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Shoulder injury restrictions (ACSM shoulder-impingement and rotator-cuff
-        return-to-activity guidelines).
-
-        MILD     → restrict overhead; reduce load 25 %
-        MODERATE → ban all overhead; restrict horizontal pressing/pulling
-        SEVERE   → ban all upper-body pushing; medical clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"vertical_push", "shoulder_raise"})
-            decision.load_modifier = min(decision.load_modifier, 0.75)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Shoulder – Mild] Reduce overhead pressing load 25 %.  Stop if pain > 3/10.  "
-                "Prefer neutral-grip pressing over pronated.  No kipping movements or "
-                "ballistic shoulder actions."
-            )
-            decision.substitutions.update({"vertical_push": "horizontal_push"})
-            decision.tags.extend(["reduce_overhead_load", "pain_free_rom"])
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update(
-                {"vertical_push", "shoulder_raise"}
-            )
-            decision.restricted_patterns.update({"horizontal_push", "horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Shoulder – Moderate] Avoid ALL overhead pressing.  Machine chest press "
-                "preferred over barbell flat bench.  No upright rows or dips behind neck.  "
-                "Pain-free cable/machine rows only — stop if shoulder impingement occurs."
-            )
-            decision.substitutions.update(
-                {
-                    "vertical_push": "horizontal_push",
-                    "shoulder_raise": "core_flexion",
-                }
-            )
-            decision.tags.extend(
-                ["no_overhead", "machine_preferred", "avoid_upright_rows"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"vertical_push", "shoulder_raise", "horizontal_push"}
-            )
-            decision.restricted_patterns.update({"horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe shoulder injury — all upper-body pushing is contraindicated until "
-                "the treating physician or physiotherapist provides written clearance."
-            )
-            decision.coaching_notes.append(
-                "[Shoulder – Severe] Medical clearance required before any upper-body "
-                "pushing.  Lower body and seated cable pulling are permitted within a "
-                "completely pain-free range only.  Abort set immediately on any shoulder pain."
-            )
-            decision.tags.extend(["clearance_required", "upper_body_restricted"])
-
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def _knee_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Knee injury restrictions (ACSM patellofemoral and ACL return-to-sport
-        load-management guidelines).
-
-        MILD     → restrict squats/lunges; limit depth
-        MODERATE → ban lunges; restrict knee-isolation work
-        SEVERE   → ban all direct leg patterns; medical clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"squat", "lunge"})
-            decision.load_modifier = min(decision.load_modifier, 0.75)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Knee – Mild] Limit squat depth to pain-free range (typically above parallel).  "
-                "Avoid jumping and plyometric loading.  Leg press preferred over barbell squat.  "
-                "Monitor for post-session swelling — if present, reduce load further next session."
-            )
-            decision.substitutions.update(
-                {
-                    "squat": "squat (half-depth, controlled tempo)",
-                    "lunge": "hip_hinge",
-                }
-            )
-            decision.tags.extend(["limit_squat_depth", "no_plyometrics"])
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"lunge"})
-            decision.restricted_patterns.update(
-                {"squat", "knee_extension", "knee_flexion"}
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Knee – Moderate] Replace barbell squats with leg press or box squat.  "
-                "No lunges in any variation.  Seated leg curl only if completely pain-free — "
-                "otherwise omit.  Focus programme on upper body and hip-hinge patterns that "
-                "do not stress the knee joint."
-            )
-            decision.substitutions.update(
-                {
-                    "squat": "hip_hinge",
-                    "lunge": "hip_hinge",
-                }
-            )
-            decision.tags.extend(["no_lunges", "leg_press_preferred"])
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"squat", "lunge", "knee_extension", "knee_flexion", "calf"}
-            )
-            decision.restricted_patterns.update({"hip_hinge"})
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe knee injury — all direct leg loading is contraindicated until "
-                "a physiotherapist clears progressive weight-bearing."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Knee – Severe] No direct leg work until physiotherapist clearance.  "
-                "Upper body and seated exercises only.  Hip hinges permitted only if the "
-                "knee is completely unloaded and pain-free throughout the movement."
-            )
-            decision.tags.extend(["clearance_required", "upper_body_only"])
-
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def _lower_back_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Lumbar spine restrictions (ACSM low-back pain exercise prescription
-        and McGill spinal-stability guidelines).
-
-        MILD     → restrict hip hinge / squat; demand neutral spine
-        MODERATE → ban free-weight hip hinge; restrict squat and row
-        SEVERE   → ban all axial loading; medical clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"hip_hinge", "squat"})
-            decision.load_modifier = min(decision.load_modifier, 0.70)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Lower Back – Mild] Brace core (intra-abdominal pressure) on ALL movements.  "
-                "Avoid any spinal rounding or flexion under load.  Prefer Romanian deadlift "
-                "over conventional deadlift.  Eliminate good mornings, hyperextensions, and "
-                "Jefferson curls from the session."
-            )
-            decision.substitutions.update(
-                {
-                    "hip_hinge": "hip_hinge (light load, strict neutral spine only)",
-                }
-            )
-            decision.tags.extend(["brace_core", "neutral_spine_only", "rdl_preferred"])
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"hip_hinge"})
-            decision.restricted_patterns.update({"squat", "horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.55)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Lower Back – Moderate] Remove ALL free-weight deadlift variations.  Use "
-                "hip thrust or cable pull-through as hip-extension alternatives.  Eliminate "
-                "bent-over rows — substitute with seated cable row (supported lumbar).  "
-                "Leg press preferred over barbell squat to reduce spinal compression."
-            )
-            decision.substitutions.update(
-                {
-                    "hip_hinge": "core_flexion",
-                    "horizontal_pull": "horizontal_pull (seated cable, supported back only)",
-                }
-            )
-            decision.tags.extend(
-                ["no_deadlift", "seated_cable_rows_only", "machine_preferred"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update({"hip_hinge", "squat", "lunge"})
-            decision.restricted_patterns.update({"core_flexion", "horizontal_pull"})
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe lower back injury — axial spinal loading is contraindicated.  "
-                "Medical imaging and specialist clearance required before resuming "
-                "any free-weight compound lower-body or posterior-chain work."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.40)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Lower Back – Severe] Medical clearance required.  Supine and seated exercises "
-                "only.  Zero axial spinal loading (no bar on back, no standing lifts).  "
-                "Focus exclusively on pain-free upper-body pressing and pulling in supported "
-                "positions."
-            )
-            decision.tags.extend(
-                ["clearance_required", "no_axial_load", "supine_seated_only"]
-            )
-
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def _elbow_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Elbow injury restrictions (lateral/medial epicondylitis and elbow
-        tendinopathy management guidelines).
-
-        MILD     → restrict direct arm work; reduce volume 35 %
-        MODERATE → ban all arm isolation; restrict compounds
-        SEVERE   → rest elbow completely; medical clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"elbow_flexion", "elbow_extension"})
-            decision.load_modifier = min(decision.load_modifier, 0.65)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Elbow – Mild] Reduce direct arm isolation volume by 35 %.  Use a neutral "
-                "(hammer) grip wherever possible.  Avoid full elbow lock-out on extension "
-                "exercises (stop 10–15° short of full extension).  "
-                "Ice elbow for 10 min post-session if soreness persists."
-            )
-            decision.tags.extend(
-                ["neutral_grip", "reduce_arm_volume", "avoid_elbow_lockout"]
-            )
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update(
-                {"elbow_flexion", "elbow_extension"}
-            )
-            decision.restricted_patterns.update({"horizontal_push", "horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Elbow – Moderate] Skip ALL direct arm isolation exercises.  Compound "
-                "pressing (bench) and pulling (row) permitted only if completely pain-free "
-                "throughout the full movement.  Use wrist wraps if gripping under load "
-                "aggravates symptoms.  Monitor for pain radiation into forearm or wrist."
-            )
-            decision.substitutions.update(
-                {
-                    "elbow_flexion": "horizontal_pull",
-                    "elbow_extension": "horizontal_push",
-                }
-            )
-            decision.tags.extend(
-                ["no_arm_isolation", "compounds_only", "wrist_wraps_advised"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {
-                    "elbow_flexion",
-                    "elbow_extension",
-                    "horizontal_push",
-                    "horizontal_pull",
-                }
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe elbow injury — complete elbow rest required.  "
-                "Medical review needed before resuming any upper-body pushing or pulling."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Elbow – Severe] Rest elbow completely — no grip-loaded upper-body work.  "
-                "Lower body and core exercises only.  Medical review required before returning "
-                "to any pushing, pulling, or carrying exercise."
-            )
-            decision.tags.extend(
-                ["clearance_required", "elbow_rest", "lower_body_core_only"]
-            )
-
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def _wrist_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Wrist injury restrictions (TFCC, carpal tunnel, and wrist tendinopathy
-        exercise modification protocols).
-
-        MILD     → restrict horizontal pressing; use neutral grip + wraps
-        MODERATE → ban pressing; restrict pulling and curls; cables/machines only
-        SEVERE   → ban all grip-intensive pushing and pulling; clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"horizontal_push"})
-            decision.load_modifier = min(decision.load_modifier, 0.75)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Wrist – Mild] Use neutral grip wherever possible.  Wear wrist wraps on all "
-                "pressing movements.  Avoid extreme wrist extension under load (flat bar bench).  "
-                "Reduce pressing volume by 25 %.  Dumbbell pressing preferred over barbell."
-            )
-            decision.substitutions.update(
-                {
-                    "horizontal_push": "horizontal_push (neutral-grip dumbbells or cable press)",
-                }
-            )
-            decision.tags.extend(
-                ["neutral_grip", "wrist_wraps_recommended", "dumbbell_over_barbell"]
-            )
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"horizontal_push"})
-            decision.restricted_patterns.update({"elbow_flexion", "horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Wrist – Moderate] No barbell or dumbbell pressing — cables and machines with "
-                "neutral grip only.  Minimise wrist flexion/extension under any load.  "
-                "Avoid heavy gripping exercises (shrugs, farmer carries, heavy pull-downs).  "
-                "Straps permitted for pulling movements if wrist is pain-free when used."
-            )
-            decision.substitutions.update(
-                {
-                    "horizontal_push": "vertical_pull",
-                    "horizontal_pull": "horizontal_pull (cable, neutral grip with straps)",
-                }
-            )
-            decision.tags.extend(
-                ["cables_machines_only", "no_barbell_pressing", "straps_permitted"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"horizontal_push", "horizontal_pull", "elbow_flexion"}
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe wrist injury — all grip-intensive upper-body pushing and pulling "
-                "is contraindicated until wrist stability and pain-free ROM are restored."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Wrist – Severe] Avoid all grip-loaded exercises.  Lower body, core, and "
-                "machine-isolated leg work only.  Medical clearance required before returning "
-                "to any upper-body training.  Consider splinting during daily activities."
-            )
-            decision.tags.extend(
-                ["clearance_required", "no_grip_loading", "lower_body_only"]
-            )
+        return [rule.message.format(i=injury) for rule in RED_FLAG_RULES if rule.applies(injury)]
 
     # ──────────────────────────────────────────────────────────────────────────
-
-    def _ankle_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Ankle injury restrictions (lateral ankle sprain and Achilles tendinopathy
-        progressive loading protocols).
-
-        MILD     → restrict squats/lunges/calf; avoid impact; heel elevation
-        MODERATE → ban lunges and calf; restrict squats; prefer seated
-        SEVERE   → ban all weight-bearing lower-body; clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"squat", "calf", "lunge"})
-            decision.load_modifier = min(decision.load_modifier, 0.75)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Ankle – Mild] Avoid all jumping and impact activities.  Use a heel elevation "
-                "(25 mm plate under heels) for squats to reduce dorsiflexion demand.  "
-                "Seated calf raises only — no standing single or double calf raises.  "
-                "Shorten lunge stride to reduce ankle loading.  Monitor for swelling after sessions."
-            )
-            decision.substitutions.update(
-                {
-                    "squat": "squat (heel-elevated, bilateral only)",
-                    "lunge": "hip_hinge",
-                    "calf": "calf (seated machine only)",
-                }
-            )
-            decision.tags.extend(["no_impact", "heel_elevation", "seated_calf_only"])
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"lunge", "calf"})
-            decision.restricted_patterns.update({"squat"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Ankle – Moderate] No lunges in any form (walking, reverse, lateral).  "
-                "No calf raises.  Limit squat range to pain-free depth — leg press preferred.  "
-                "Avoid single-leg loading entirely.  Upper body seated exercises and hip "
-                "thrusts are preferred alternatives for this phase."
-            )
-            decision.substitutions.update(
-                {
-                    "lunge": "hip_hinge",
-                    "calf": "hip_hinge",
-                    "squat": "squat (leg press alternative)",
-                }
-            )
-            decision.tags.extend(
-                ["no_lunges", "no_calf_raises", "bilateral_only", "leg_press_preferred"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"squat", "lunge", "calf", "hip_hinge"}
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe ankle injury — all weight-bearing lower-body movement is "
-                "contraindicated until bone and ligament integrity is confirmed by imaging "
-                "and the treating physiotherapist clears progressive loading."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Ankle – Severe] Upper body only.  No weight-bearing on injured ankle.  "
-                "All exercises must be performed seated or supine.  "
-                "Physiotherapist clearance and progressive weight-bearing protocol required "
-                "before returning to any standing exercise."
-            )
-            decision.tags.extend(
-                ["clearance_required", "upper_body_only", "non_weight_bearing"]
-            )
-
+    #  REGION RULE TABLE
     # ──────────────────────────────────────────────────────────────────────────
 
-    def _hip_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Hip injury restrictions (FAI, labral tear, hip flexor strain, and
-        greater trochanteric pain syndrome guidelines).
-
-        MILD     → restrict squat/hinge/lunge; limit end-range hip positions
-        MODERATE → ban all hip-dominant patterns; machine-based isolation only
-        SEVERE   → ban all lower-body compound and isolation; clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"squat", "hip_hinge", "lunge"})
-            decision.load_modifier = min(decision.load_modifier, 0.70)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Hip – Mild] Limit hip flexion depth (avoid deep squat / full hip hinge).  "
-                "Avoid end-range hip positions under any load.  "
-                "Prefer machines over free weights to control ROM precisely.  "
-                "Monitor for clicking, catching, or groin pain — stop if present."
-            )
-            decision.substitutions.update(
-                {
-                    "squat": "squat (limited depth, no below-parallel)",
-                    "hip_hinge": "hip_hinge (shallow, no full hip flexion)",
-                    "lunge": "core_flexion",
-                }
-            )
-            decision.tags.extend(
-                ["limit_hip_rom", "no_end_range_loading", "no_deep_squat"]
-            )
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"squat", "hip_hinge", "lunge"})
-            decision.restricted_patterns.update({"knee_extension", "knee_flexion"})
-            decision.load_modifier = min(decision.load_modifier, 0.55)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Hip – Moderate] No free-weight squat, hip hinge, or lunge variations.  "
-                "Machine-based knee isolation (leg extension, leg curl) permitted only if the "
-                "hip setup position is entirely pain-free.  "
-                "Seated exercises and upper body work are the focus for this phase."
-            )
-            decision.substitutions.update(
-                {
-                    "squat": "knee_extension",
-                    "hip_hinge": "core_flexion",
-                    "lunge": "core_flexion",
-                }
-            )
-            decision.tags.extend(["no_squat_hinge_lunge", "machine_based_only"])
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"squat", "hip_hinge", "lunge", "knee_extension", "knee_flexion"}
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe hip injury — all lower-body compound and isolation work is "
-                "contraindicated.  Imaging (X-ray / MRI) and orthopaedic or sports-medicine "
-                "specialist review required before progressive loading."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.40)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Hip – Severe] No lower-body loading of any kind.  Upper body only — "
-                "all exercises performed seated or supine.  "
-                "Specialist review and imaging are strongly recommended before resuming."
-            )
-            decision.tags.extend(
-                ["clearance_required", "upper_body_only", "specialist_review"]
-            )
+    # (region, severity) → RegionRule, validated and frozen once at import.
+    _REGION_RULES: Dict[Tuple[InjuryRegion, Severity], RegionRule] = compile_region_rules(
+        REGION_RULES
+    )
 
     # ──────────────────────────────────────────────────────────────────────────
-
-    def _neck_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
-        """
-        Cervical spine restrictions (cervical radiculopathy, whiplash, and
-        neck muscle strain exercise modification guidelines).
-
-        MILD     → no contraindications; reduce neck-loading movements
-        MODERATE → ban overhead pressing; restrict shoulder raises and vertical pull
-        SEVERE   → ban all overhead and compressive cervical loading; clearance required
-        """
-        if injury.severity == Severity.MILD:
-            decision.load_modifier = min(decision.load_modifier, 0.80)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Neck – Mild] Maintain strict neutral cervical spine on all exercises.  "
-                "Avoid heavy shrugs, heavy upper-trap work, and behind-the-neck pressing or "
-                "pulling.  Reduce overall upper-trap loading by 20 %.  "
-                "No axial cervical compression (no barbell back squats without a foam pad)."
-            )
-            decision.tags.extend(
-                ["neutral_neck", "avoid_neck_strain", "no_behind_neck"]
-            )
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"vertical_push"})
-            decision.restricted_patterns.update({"shoulder_raise", "vertical_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Neck – Moderate] No overhead pressing — compressive cervical force risk.  "
-                "No behind-the-neck lat pulldown.  Restrict shoulder shrugs.  "
-                "All exercises performed with head in neutral (no chin-tuck or jutting).  "
-                "Seated, fully-supported spine preferred throughout the session."
-            )
-            decision.substitutions.update(
-                {
-                    "vertical_push": "horizontal_push",
-                    "vertical_pull": "horizontal_pull",
-                }
-            )
-            decision.tags.extend(
-                ["no_overhead_press", "neutral_cervical_spine", "seated_supported"]
-            )
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"vertical_push", "shoulder_raise"}
-            )
-            decision.restricted_patterns.update({"vertical_pull", "horizontal_pull"})
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe neck injury — all overhead and compressive cervical loading requires "
-                "medical imaging (MRI/CT) and specialist clearance before exercise."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Neck – Severe] Medical clearance required before any overhead or heavy "
-                "upper-back loading.  Lower body and light core work permitted if pain-free.  "
-                "CRITICAL: tingling, numbness, or weakness in arms/hands = stop immediately "
-                "and seek emergency medical attention."
-            )
-            decision.tags.extend(
-                ["clearance_required", "no_cervical_compression", "neurological_watch"]
-            )
-
+    #  PUBLIC API
     # ──────────────────────────────────────────────────────────────────────────
 
-    def _upper_back_rules(self, injury: InjuryInput, decision: InjuryDecision) -> None:
+    def evaluate(self, injuries: List[InjuryInput]) -> FrozenInjuryDecision:
         """
-        Thoracic spine / upper back restrictions (thoracic facet joint, "
-        rhomboid strain, and mid-back disc guidelines).
-
-        MILD     → restrict horizontal pulling; reduce row load
-        MODERATE → ban horizontal pull; restrict vertical pull
-        SEVERE   → ban all pulling patterns; medical clearance required
+        Memoized ``evaluate_uncached()``: the injuries are evaluated in
+        canonical order (see ``canonical_injuries``) and the frozen decision
+        is cached, so equal inputs in any order share one result.
         """
-        if injury.severity == Severity.MILD:
-            decision.restricted_patterns.update({"horizontal_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.75)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PAIN_FREE_ONLY
-            )
-            decision.coaching_notes.append(
-                "[Upper Back – Mild] Reduce rowing volume and load.  "
-                "Cable rows preferred over barbell bent-over rows.  "
-                "Avoid extreme scapular protraction under load.  "
-                "Monitor for thoracic pain or stiffness during and after sessions."
-            )
-            decision.substitutions.update(
-                {
-                    "horizontal_pull": "horizontal_pull (seated cable, light load)",
-                }
-            )
-            decision.tags.extend(["reduce_row_volume", "cable_rows_preferred"])
-
-        elif injury.severity == Severity.MODERATE:
-            decision.contraindicated_patterns.update({"horizontal_pull"})
-            decision.restricted_patterns.update({"vertical_pull"})
-            decision.load_modifier = min(decision.load_modifier, 0.60)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.PARTIAL
-            )
-            decision.coaching_notes.append(
-                "[Upper Back – Moderate] No rowing movements of any kind.  "
-                "Lat pulldown permissible only if the thoracic spine remains unloaded and "
-                "pain-free throughout.  Avoid any exercise compressing the thoracic spine.  "
-                "Focus programme on lower body, core, and horizontal pressing."
-            )
-            decision.substitutions.update(
-                {
-                    "horizontal_pull": "core_flexion",
-                    "vertical_pull": "vertical_pull (light lat pulldown, pain-free only)",
-                }
-            )
-            decision.tags.extend(["no_rows", "thoracic_deloaded"])
-
-        else:  # SEVERE
-            decision.contraindicated_patterns.update(
-                {"horizontal_pull", "vertical_pull"}
-            )
-            decision.requires_clearance = True
-            decision.clearance_reasons.append(
-                "Severe upper back injury — all pulling movements are contraindicated until "
-                "the treating clinician confirms structural integrity and clears exercise."
-            )
-            decision.load_modifier = min(decision.load_modifier, 0.50)
-            decision.rom_modifier = _more_restrictive_rom(
-                decision.rom_modifier, ROMModifier.NONE_UNTIL_CLEARED
-            )
-            decision.coaching_notes.append(
-                "[Upper Back – Severe] No pulling movements.  Lower body, core, and "
-                "pain-free horizontal pressing are the only permitted training domains.  "
-                "Medical clearance required before returning to any rowing or pulling work."
-            )
-            decision.tags.extend(["clearance_required", "no_pulling_movements"])
+        return self._evaluate_cached(canonical_injuries(injuries))
 
-    # ──────────────────────────────────────────────────────────────────────────
-    #  REGION DISPATCH TABLE
-    # ──────────────────────────────────────────────────────────────────────────
+    def _evaluate_key(self, key: Tuple[InjuryKey, ...]) -> FrozenInjuryDecision:
+        decision = self.evaluate_uncached([injury_from_key(k) for k in key])
+        return FrozenInjuryDecision.from_decision(decision)
 
-    # Populated at the end of class body after all methods are defined.
-    _REGION_DISPATCH: Dict[
-        InjuryRegion,
-        Callable[["InjuryRulesEngine", InjuryInput, InjuryDecision], None],
-    ] = {}
+    def cache_info(self):
+        return self._evaluate_cached.cache_info()
 
-    # ──────────────────────────────────────────────────────────────────────────
-    #  PUBLIC API
-    # ──────────────────────────────────────────────────────────────────────────
-
-    def evaluate(self, injuries: List[InjuryInput]) -> InjuryDecision:
+    def evaluate_uncached(self, injuries: List[InjuryInput]) -> InjuryDecision:
         """
         Evaluate a list of ``InjuryInput`` objects and return a single merged
         ``InjuryDecision``.
@@ -1058,7 +1074,7 @@ class InjuryRulesEngine:
            rom_modifier=FULL).
         2. For each injury:
            a. Run red-flag detection — any flag sets ``requires_clearance=True``.
-           b. Dispatch to the region-specific rule method.
+           b. Look up and apply the (region, severity) ``RegionRule``.
         3. Merge by most-restrictive-wins:
            - ``contraindicated_patterns`` : union of all injuries.
            - ``restricted_patterns``      : union minus contraindicated.
@@ -1096,9 +1112,9 @@ class InjuryRulesEngine:
                 )
 
             # Step 2: Region-specific rules.
-            rule_fn = self._REGION_DISPATCH.get(injury.injury_region)
-            if rule_fn is not None:
-                rule_fn(self, injury, decision)
+            rule = self._REGION_RULES.get((injury.injury_region, injury.severity))
+            if rule is not None:
+                rule.apply(decision)
 
         # Step 3: Restricted patterns must not overlap contraindicated.
         decision.restricted_patterns -= decision.contraindicated_patterns
@@ -1115,10 +1131,22 @@ class InjuryRulesEngine:
 
         return decision
 
+    def compile_decision(
+        self, decision: InjuryDecision | FrozenInjuryDecision
+    ) -> "CompiledInjuryFilter":
+        """
+        Compile *decision* into a pattern → action table for filtering.
+        Frozen decisions are compiled once and cached; a mutable
+        ``InjuryDecision`` is compiled on every call (it may have changed).
+        """
+        if isinstance(decision, FrozenInjuryDecision):
+            return _compile_frozen(decision)
+        return CompiledInjuryFilter(decision)
+
     def filter_exercises(
         self,
         exercises: List[dict],
-        decision: InjuryDecision,
+        decision: InjuryDecision | FrozenInjuryDecision,
     ) -> List[dict]:
         """
         Filter a raw exercise pool against an ``InjuryDecision``.
@@ -1148,13 +1176,16 @@ class InjuryRulesEngine:
           - ``"substitution_suggestion"`` — if a substitute pattern is known.
         - **Allowed** exercises pass through unchanged.
 
-        The original dicts are never mutated (shallow copies are made).
+        The original dicts are never mutated: annotated exercises are shallow
+        copies, allowed ones are the caller's own objects.  The decision is
+        compiled to a lookup table first (see ``compile_decision``), so each
+        exercise costs one dict lookup.
 
         Parameters
         ----------
         exercises : List[dict]
             The full candidate exercise pool.
-        decision  : InjuryDecision
+        decision  : InjuryDecision | FrozenInjuryDecision
             Output from ``evaluate()``.
 
         Returns
@@ -1162,45 +1193,20 @@ class InjuryRulesEngine:
         List[dict]
             The filtered (and annotated) exercise pool.
         """
-        filtered: List[dict] = []
-
-        for exercise in exercises:
-            pattern: str = exercise.get("movement_pattern", "")
-            ex = dict(exercise)  # shallow copy — never mutate the original
-
-            if pattern in decision.contraindicated_patterns:
-                # Hard exclusion — do not include in the pool passed to the model.
-                continue
-
-            if pattern in decision.restricted_patterns:
-                # Soft restriction — include with annotations.
-                ex["load_modifier"] = round(decision.load_modifier, 2)
-                ex["rom_modifier"] = decision.rom_modifier.value
-                ex["injury_note"] = (
-                    f"RESTRICTED ({pattern}): use "
-                    f"{int(decision.load_modifier * 100)} % of normal load; "
-                    f"ROM constraint: {decision.rom_modifier.value.replace('_', ' ')}."
-                )
-                # Scale rep range conservatively.
-                if "reps_min" in ex:
-                    ex["reps_min"] = max(
-                        1, int(ex["reps_min"] * decision.load_modifier)
-                    )
-                if "reps_max" in ex:
-                    ex["reps_max"] = max(
-                        1, int(ex["reps_max"] * decision.load_modifier)
-                    )
-                # Attach substitution guidance when available.
-                sub = decision.substitutions.get(pattern)
-                if sub:
-                    ex["substitution_suggestion"] = sub
-
-            # Both restricted and allowed exercises are appended.
-            filtered.append(ex)
+        return self.compile_decision(decision).filter(exercises)
 
-        return filtered
+    def filter_exercise_lists(
+        self,
+        exercise_lists: List[List[dict]],
+        decision: InjuryDecision | FrozenInjuryDecision,
+    ) -> List[List[dict]]:
+        """
+        Batch ``filter_exercises``: filter several lists (e.g. every day of a
+        plan) against one decision, compiling it only once.
+        """
+        return self.compile_decision(decision).filter_many(exercise_lists)
 
-    def explain(self, decision: InjuryDecision) -> str:
+    def explain(self, decision: InjuryDecision | FrozenInjuryDecision) -> str:
         """
         Produce a human-readable, structured plain-text explanation of all
         injury-based restrictions contained in an ``InjuryDecision``.
@@ -1421,19 +1427,81 @@ class InjuryRulesEngine:
         )
 
 
-# Populate the dispatch table after all methods are defined to avoid
-# forward-reference issues inside the class body.
-InjuryRulesEngine._REGION_DISPATCH = {
-    InjuryRegion.SHOULDER: InjuryRulesEngine._shoulder_rules,
-    InjuryRegion.KNEE: InjuryRulesEngine._knee_rules,
-    InjuryRegion.LOWER_BACK: InjuryRulesEngine._lower_back_rules,
-    InjuryRegion.UPPER_BACK: InjuryRulesEngine._upper_back_rules,
-    InjuryRegion.ELBOW: InjuryRulesEngine._elbow_rules,
-    InjuryRegion.WRIST: InjuryRulesEngine._wrist_rules,
-    InjuryRegion.ANKLE: InjuryRulesEngine._ankle_rules,
-    InjuryRegion.HIP: InjuryRulesEngine._hip_rules,
-    InjuryRegion.NECK: InjuryRulesEngine._neck_rules,
-}
+# Shared instance (and memo cache) for services
+DEFAULT_ENGINE = InjuryRulesEngine()
+
+
+# ══════════════════════════════════════════════════════════════════════════════
+#  COMPILED FILTER
+# ══════════════════════════════════════════════════════════════════════════════
+
+# Action for contraindicated patterns; absent patterns pass through untouched
+_DROP = None
+
+
+class CompiledInjuryFilter:
+    """
+    An ``InjuryDecision`` compiled for ``filter_exercises``.
+
+    ``actions`` maps each contraindicated pattern to ``_DROP`` and each
+    restricted pattern to the annotation fields to add (note text, load and
+    ROM strings, substitution prebuilt once).  Any other pattern is allowed.
+    """
+
+    __slots__ = ("actions", "load_modifier")
+
+    def __init__(self, decision: InjuryDecision | FrozenInjuryDecision) -> None:
+        self.load_modifier = decision.load_modifier
+        self.actions: Dict[str, Optional[Dict[str, Any]]] = {}
+        for pattern in decision.restricted_patterns:
+            note = {
+                "load_modifier": round(decision.load_modifier, 2),
+                "rom_modifier": decision.rom_modifier.value,
+                "injury_note": (
+                    f"RESTRICTED ({pattern}): use "
+                    f"{int(decision.load_modifier * 100)} % of normal load; "
+                    f"ROM constraint: {decision.rom_modifier.value.replace('_', ' ')}."
+                ),
+            }
+            sub = decision.substitutions.get(pattern)
+            if sub:
+                note["substitution_suggestion"] = sub
+            self.actions[pattern] = note
+        # Contraindicated wins if a mutable decision lists a pattern in both
+        for pattern in decision.contraindicated_patterns:
+            self.actions[pattern] = _DROP
+
+    def filter(self, exercises: List[dict]) -> List[dict]:
+        actions = self.actions
+        if not actions:
+            return list(exercises)
+        load = self.load_modifier
+        filtered: List[dict] = []
+        for exercise in exercises:
+            pattern = exercise.get("movement_pattern", "")
+            if pattern not in actions:
+                filtered.append(exercise)
+                continue
+            note = actions[pattern]
+            if note is _DROP:
+                continue
+            ex = dict(exercise)  # shallow copy — never mutate the original
+            ex.update(note)
+            # Scale rep range conservatively.
+            if "reps_min" in ex:
+                ex["reps_min"] = max(1, int(ex["reps_min"] * load))
+            if "reps_max" in ex:
+                ex["reps_max"] = max(1, int(ex["reps_max"] * load))
+            filtered.append(ex)
+        return filtered
+
+    def filter_many(self, exercise_lists: List[List[dict]]) -> List[List[dict]]:
+        return [self.filter(exercises) for exercises in exercise_lists]
+
+
+@lru_cache(maxsize=1024)
+def _compile_frozen(decision: FrozenInjuryDecision) -> CompiledInjuryFilter:
+    return CompiledInjuryFilter(decision)
 
 
 # ══════════════════════════════════════════════════════════════════════════════
@@ -1441,7 +1509,7 @@ InjuryRulesEngine._REGION_DISPATCH = {
 # ══════════════════════════════════════════════════════════════════════════════
 
 
-def decision_to_json(decision: InjuryDecision, indent: int = 2) -> str:
+def decision_to_json(decision: InjuryDecision | FrozenInjuryDecision, indent: int = 2) -> str:
     """
     Serialise an ``InjuryDecision`` to a pretty-printed JSON string.
 
@@ -1463,16 +1531,16 @@ def decision_to_json(decision: InjuryDecision, indent: int = 2) -> str:
     """
     payload = {
         "requires_clearance": decision.requires_clearance,
-        "clearance_reasons": decision.clearance_reasons,
+        "clearance_reasons": list(decision.clearance_reasons),
         "contraindicated_patterns": sorted(decision.contraindicated_patterns),
         "restricted_patterns": sorted(decision.restricted_patterns),
         "allowed_patterns": sorted(decision.allowed_patterns),
         "load_modifier": decision.load_modifier,
         "rom_modifier": decision.rom_modifier.value,
-        "coaching_notes": decision.coaching_notes,
-        "red_flags": decision.red_flags,
-        "substitutions": decision.substitutions,
-        "tags": decision.tags,
+        "coaching_notes": list(decision.coaching_notes),
+        "red_flags": list(decision.red_flags),
+        "substitutions": dict(decision.substitutions),
+        "tags": list(decision.tags),
     }
     return json.dumps(payload, indent=indent, ensure_ascii=False)
 
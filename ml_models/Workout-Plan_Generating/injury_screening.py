@@ -0,0 +1,254 @@
+"""
+injury_screening.py
+===================
+
+Bulk injury screening: NDJSON in, NDJSON decisions out.
+
+Each input line is one member::
+
+    {"member_id": "m-0192", "injuries": [{"injury_region": "knee", ...}, ...]}
+
+where every injury is the raw dict ``InjuryRulesEngine.from_dict`` accepts.
+Each output line is the decision (the ``decision_to_json`` payload) for the
+input line with the same ``line`` number::
+
+    {"line": 1, "member_id": "m-0192", "decision": {...}}
+    {"line": 2, "member_id": null, "error": "line is not valid JSON: ..."}
+
+A bad line produces an error line; it never aborts the batch.
+
+Within one batch, identical injury profiles are evaluated once: each
+member's injuries are reduced to ``canonical_injuries`` (the same
+order-insensitive key the engine memoizes on) and the serialized decision
+is reused for every member with that key.  Repeated raw ``injuries``
+values also skip ``from_dict`` itself.  Imports from the old system are
+dominated by a few profiles ("no injuries", "knee, mild, cleared"), so most
+lines cost a dict lookup.
+
+Lines are processed in chunks of ``chunk_lines`` and evaluated inline by
+default (``workers=0``): JSON parsing stays in the parent, so on a
+realistic upload the pool's pickling round-trip costs more than the rules
+it offloads (see benchmarks/bench_injury_screening.py).  With
+``workers > 0``, a chunk with at least ``pool_min_profiles`` profiles not
+yet seen in the batch is split across a process pool instead.  The pool
+uses the ``fork`` start method and is started with ``start()`` before the
+service spawns its own threads: ``spawn``/``forkserver`` children re-import
+``__main__``, which for ``python workout_api_direct.py`` means loading the
+model in every worker.  Where ``fork`` is unavailable (Windows) everything
+runs inline.
+
+Nothing here touches the model, so screening never queues behind
+generation.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from injury_rules_engine import (
+    DEFAULT_ENGINE, InjuryKey, InjuryRulesEngine, canonical_injuries,
+    decision_to_json, injury_from_key,
+)
+
+ProfileKey = Tuple[InjuryKey, ...]
+
+
+# ── Worker side ──────────────────────────────────────────────────────────────
+
+def screen_profiles(keys: Sequence[ProfileKey]) -> List[str]:
+    """Compact decision JSON for each canonical injury list (pool entry point)."""
+    return [
+        decision_to_json(
+            DEFAULT_ENGINE.evaluate([injury_from_key(k) for k in key]), indent=None)
+        for key in keys
+    ]
+
+
+def _warm() -> int:
+    return 0
+
+
+# ── Parsing ──────────────────────────────────────────────────────────────────
+
+def parse_member(raw: bytes,
+                 profiles: Optional[Dict[str, ProfileKey]] = None) -> Tuple[Any, ProfileKey]:
+    """
+    ``(member_id, profile key)`` for one NDJSON line; ValueError if malformed.
+
+    *profiles* memoizes ``from_dict`` + ``canonical_injuries`` on the raw
+    ``injuries`` value (its ``repr``), which is most of the per-line cost
+    when a batch repeats the same few profiles.
+    """
+    try:
+        data = json.loads(raw)
+    except (UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ValueError(f"line is not valid JSON: {exc}") from None
+    if not isinstance(data, dict):
+        raise ValueError("line must be a JSON object")
+    injuries = data.get("injuries", [])
+    if not isinstance(injuries, list) or not all(isinstance(i, dict) for i in injuries):
+        raise ValueError("'injuries' must be a list of objects")
+    raw_key = repr(injuries)
+    key = profiles.get(raw_key) if profiles is not None else None
+    if key is None:
+        key = canonical_injuries([InjuryRulesEngine.from_dict(i) for i in injuries])
+        if profiles is not None:
+            profiles[raw_key] = key
+    return data.get("member_id"), key
+
+
+async def ndjson_lines(chunks: AsyncIterator[bytes],
+                       max_line_bytes: int = 64 * 1024) -> AsyncIterator[bytes]:
+    """Split a byte stream into non-blank lines (the last may lack a newline)."""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield line
+        if len(buffer) > max_line_bytes:
+            raise ValueError(f"NDJSON line longer than {max_line_bytes} bytes")
+    if buffer.strip():
+        yield buffer
+
+
+def _result_line(line_no: int, member_id: Any, decision_json: str) -> str:
+    # The decision is already serialized — splice it in instead of re-parsing
+    return (f'{{"line": {line_no}, "member_id": {json.dumps(member_id)}, '
+            f'"decision": {decision_json}}}\n')
+
+
+def _error_line(line_no: Optional[int], member_id: Any, message: str) -> str:
+    return json.dumps({"line": line_no, "member_id": member_id, "error": message}) + "\n"
+
+
+# ── Screener ─────────────────────────────────────────────────────────────────
+
+class BatchScreener:
+    """Long-lived screening service: owns the process pool and the counters."""
+
+    def __init__(self, workers: int = 0, chunk_lines: int = 512,
+                 pool_min_profiles: int = 64) -> None:
+        self.workers = workers
+        self.chunk_lines = max(1, chunk_lines)
+        self.pool_min_profiles = max(1, pool_min_profiles)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.lines_total = 0
+        self.errors_total = 0
+        self.evaluations_total = 0
+        self.pooled_evaluations_total = 0
+
+    # ── Pool lifecycle ───────────────────────────────────────────────────────
+
+    def start(self) -> None:
+        """Fork the worker processes now (call before starting service threads)."""
+        if self.workers <= 0 or self._pool is not None:
+            return
+        if "fork" not in multiprocessing.get_all_start_methods():
+            print("⚠️ Screening pool needs the 'fork' start method — screening inline")
+            self.workers = 0
+            return
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("fork"))
+        # fork-context pools start every worker on the first submit
+        self._pool.submit(_warm).result()
+        print(f"✅ Injury screening pool started ({self.workers} processes)")
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    # ── Evaluation ───────────────────────────────────────────────────────────
+
+    async def _evaluate(self, keys: List[ProfileKey]) -> List[str]:
+        if self._pool is not None and len(keys) >= self.pool_min_profiles:
+            loop = asyncio.get_running_loop()
+            n = min(self.workers, len(keys))
+            parts = [keys[i::n] for i in range(n)]
+            try:
+                results = await asyncio.gather(*(
+                    loop.run_in_executor(self._pool, screen_profiles, part)
+                    for part in parts))
+            except BrokenProcessPool:
+                print("⚠️ Screening pool broke — screening inline from now on")
+                self._pool = None
+            else:
+                out: List[str] = [""] * len(keys)
+                for i, part_results in enumerate(results):
+                    out[i::n] = part_results
+                self.pooled_evaluations_total += len(keys)
+                return out
+        return screen_profiles(keys)
+
+    async def _screen_chunk(self, chunk: List[Tuple[int, bytes]],
+                            seen: Dict[ProfileKey, str],
+                            profiles: Dict[str, ProfileKey]) -> List[str]:
+        parsed: List[Tuple[int, Any, Optional[ProfileKey], str]] = []
+        unseen: Dict[ProfileKey, None] = {}
+        for line_no, raw in chunk:
+            try:
+                member_id, key = parse_member(raw, profiles)
+            except ValueError as exc:
+                parsed.append((line_no, None, None, str(exc)))
+                continue
+            parsed.append((line_no, member_id, key, ""))
+            if key not in seen:
+                unseen[key] = None
+
+        if unseen:
+            keys = list(unseen)
+            seen.update(zip(keys, await self._evaluate(keys)))
+            self.evaluations_total += len(keys)
+
+        out = []
+        for line_no, member_id, key, error in parsed:
+            if key is None:
+                self.errors_total += 1
+                out.append(_error_line(line_no, member_id, error))
+            else:
+                out.append(_result_line(line_no, member_id, seen[key]))
+        self.lines_total += len(chunk)
+        return out
+
+    async def screen(self, lines: AsyncIterator[bytes]) -> AsyncIterator[str]:
+        """Decision lines for an NDJSON line stream, in input order."""
+        seen: Dict[ProfileKey, str] = {}
+        profiles: Dict[str, ProfileKey] = {}
+        chunk: List[Tuple[int, bytes]] = []
+        line_no = 0
+        try:
+            async for raw in lines:
+                line_no += 1
+                chunk.append((line_no, raw))
+                if len(chunk) >= self.chunk_lines:
+                    for out in await self._screen_chunk(chunk, seen, profiles):
+                        yield out
+                    chunk = []
+        except ValueError as exc:
+            # Unreadable input: flush what parsed, then report where it stopped
+            for out in await self._screen_chunk(chunk, seen, profiles):
+                yield out
+            self.errors_total += 1
+            yield _error_line(line_no + 1, None, str(exc))
+            return
+        if chunk:
+            for out in await self._screen_chunk(chunk, seen, profiles):
+                yield out
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.workers if self._pool is not None else 0,
+            "lines_total": self.lines_total,
+            "errors_total": self.errors_total,
+            "evaluations_total": self.evaluations_total,
+            "pooled_evaluations_total": self.pooled_evaluations_total,
+        }
@@ -0,0 +1,175 @@
+"""
+micro_batcher.py
+================
+
+Async micro-batching scheduler for the flan-t5 workout generator.
+
+Callers ``await batcher.submit(prompt)`` from request handlers.  A single
+background task collects prompts for at most ``window_ms`` milliseconds (or
+until ``max_batch_size`` prompts are waiting), hands the whole batch to one
+synchronous ``batch_fn`` call on a dedicated worker thread, and resolves each
+caller's future with its own result.
+
+Because every ``generate`` call runs on the same single worker thread, model
+throughput scales with batch size instead of with the number of executor
+threads fighting over the same CPU cores.
+
+Only Python standard library is used, so the scheduler can be exercised
+without torch installed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class MicroBatcher:
+    """
+    Gathers individual items into batches for one ``batch_fn`` call.
+
+    ``batch_fn`` receives a list of items and must return a list of results
+    of the same length and order.  An exception raised by ``batch_fn`` is
+    propagated to every caller in that batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], List[Any]],
+        window_ms: float = 8.0,
+        max_batch_size: int = 8,
+        name: str = "generate",
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self._batch_fn = batch_fn
+        self.window_ms = max(0.0, float(window_ms))
+        self.max_batch_size = int(max_batch_size)
+        self.name = name
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        # ── Metrics ──
+        self.batches_total = 0
+        self.items_total = 0
+        self.errors_total = 0
+        self.max_queue_depth = 0
+        self.batch_size_counts: Dict[int, int] = {}
+
+    # ── Lifecycle ────────────────────────────────────────────────────────────
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def start(self) -> None:
+        """Start the batching loop on the running event loop (idempotent)."""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"{self.name}-batch")
+        self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the loop and fail any callers still waiting in the queue."""
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, fut = self._queue.get_nowait()
+                if not fut.done():
+                    fut.set_exception(RuntimeError(
+                        f"{self.name} batcher stopped"))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its individual result."""
+        if not self.running:
+            self.start()
+        fut = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, fut))
+        self.max_queue_depth = max(self.max_queue_depth, self._queue.qsize())
+        return await fut
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and batch-fill metrics for /health and /metrics."""
+        avg_batch = self.items_total / self.batches_total if self.batches_total else 0.0
+        return {
+            "running": self.running,
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "queue_depth": self.queue_depth(),
+            "max_queue_depth": self.max_queue_depth,
+            "batches_total": self.batches_total,
+            "items_total": self.items_total,
+            "errors_total": self.errors_total,
+            "avg_batch_size": round(avg_batch, 3),
+            "avg_batch_fill": round(avg_batch / self.max_batch_size, 3),
+            "batch_size_counts": dict(sorted(self.batch_size_counts.items())),
+        }
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    async def _collect(self) -> List[Tuple[Any, asyncio.Future]]:
+        """Wait for one item, then gather more until the window closes or the batch is full."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window_ms / 1000.0
+        while len(batch) < self.max_batch_size:
+            # Drain whatever is already waiting without yielding
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            if len(batch) >= self.max_batch_size:
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # Callers that gave up (client disconnect / timeout) don't cost a slot
+        return [(item, fut) for item, fut in batch if not fut.done()]
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            items = [item for item, _ in batch]
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self._batch_fn, items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"{self.name} batch_fn returned {len(results)} results for {len(items)} items")
+            except Exception as e:
+                self.errors_total += 1
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            else:
+                for (_, fut), result in zip(batch, results):
+                    if not fut.done():
+                        fut.set_result(result)
+            self.batches_total += 1
+            self.items_total += len(items)
+            self.batch_size_counts[len(items)] = self.batch_size_counts.get(
+                len(items), 0) + 1
@@ -0,0 +1,438 @@
+"""
+model_loader.py
+===============
+
+Loads the flan-t5 workout generator (tokenizer + LoRA-merged weights) and
+reports readiness, either eagerly or in a background thread.
+
+Backends (``WORKOUT_MODEL_BACKEND``):
+
+  torch   merged PyTorch model (float32 on CPU, float16 on CUDA)
+  int8    merged model with ``torch.ao.quantization.quantize_dynamic`` applied
+          to every ``nn.Linear`` (CPU only)
+  onnx    ONNX Runtime graph exported by ``--export-onnx`` (CPU only; uses the
+          int8 ``*_quantized.onnx`` files when ``--quantize`` produced them)
+
+``ModelLoader.load()`` runs the phases
+
+    imports → tokenizer → weights → adapter (load + merge) → device [→ quantize]
+
+and records each phase's wall time.  The LoRA adapter is folded into the
+base weights with ``merge_and_unload()``, so inference calls the plain
+``T5ForConditionalGeneration`` without ``PeftModel`` indirection.  If a
+pre-merged checkpoint exists (``python model_loader.py --export-merged``)
+it is loaded directly and the adapter phase is skipped entirely.
+
+``generate_stream()`` decodes one prompt greedily and hands each piece of
+text to a callback as it is produced (a ``TextStreamer`` hook), for the
+streaming endpoint.  Streamers need a single hypothesis, so it cannot use
+beam search and its output may differ from ``generate()``'s.
+
+``start_background()`` runs ``load()`` on a worker thread so the FastAPI
+app can bind its port and serve dataset-backed endpoints while the weights
+load.  ``state`` moves ``pending → loading → ready`` (or ``failed``) and
+``status()`` is what ``/health`` reports.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from stage_metrics import StageTimer
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+BACKENDS = ("torch", "int8", "onnx")
+
+# Decoding settings shared by every backend (match training MAX_OUTPUT_LENGTH)
+GENERATION_KWARGS: Dict[str, Any] = {
+    "max_length": 1024,
+    "num_beams": 2,           # faster than 4 beams, still good quality
+    "early_stopping": True,
+    "do_sample": False,
+}
+# Token streamers only support one hypothesis → greedy search when streaming
+STREAM_GENERATION_KWARGS: Dict[str, Any] = {
+    "max_length": GENERATION_KWARGS["max_length"],
+    "num_beams": 1,
+    "do_sample": False,
+}
+TOKENIZER_KWARGS: Dict[str, Any] = {
+    "return_tensors": "pt",
+    "max_length": 256,
+    "truncation": True,
+    "padding": True,
+}
+
+_ONNX_FILES = ("encoder_model", "decoder_model", "decoder_with_past_model")
+
+# Fixed prompts (build_prompt_with_context format) for backend equivalence
+# checks and throughput benchmarks.
+REFERENCE_PROMPTS = [
+    "Act as an expert fitness coach. Generate a 4-day workout plan for a intermediate level person "
+    "with the goal of muscle. Strict Structure Constraint: Use a Upper/Lower Split (e.g., Upper, "
+    "Lower, Rest, Upper, Lower) based on proven workout dataset templates. Strict Set/Rep Constraint: "
+    "Use Straight Sets technique with 4 sets of 8-12 reps and 90s rest based on dataset goals. "
+    "Available equipment: Dumbbell, Barbell. Output valid JSON with plan_name, days array (each with "
+    "day_name, focus_areas, exercises with name, sets, reps, rest).",
+    "Act as an expert fitness coach. Generate a 3-day workout plan for a beginner level person "
+    "with the goal of weightloss. Strict Structure Constraint: Use a Full Body based on proven workout "
+    "dataset templates. Strict Set/Rep Constraint: Use Straight Sets technique with 4 sets of 8-12 reps "
+    "and 90s rest based on dataset goals. Available equipment: Bodyweight. Output valid JSON with "
+    "plan_name, days array (each with day_name, focus_areas, exercises with name, sets, reps, rest).",
+    "Act as an expert fitness coach. Generate a 5-day workout plan for a advanced level person "
+    "with the goal of strength. Strict Structure Constraint: Use a Push/Pull/Legs/Upper/Lower Split "
+    "based on proven workout dataset templates. Strict Set/Rep Constraint: Use Straight Sets technique "
+    "with 4 sets of 8-12 reps and 90s rest based on dataset goals. Full gym access with all equipment. "
+    "INJURY [Shoulder]: AVOID overhead pressing, bench press, dips, and lateral raises. USE cable and "
+    "machine-based chest/back exercises. Output valid JSON with plan_name, days array (each with "
+    "day_name, focus_areas, exercises with name, sets, reps, rest).",
+    "Act as an expert fitness coach. Generate a 6-day workout plan for a intermediate level person "
+    "with the goal of muscle. Strict Structure Constraint: Use a Push/Pull/Legs twice a week based on "
+    "proven workout dataset templates. Strict Set/Rep Constraint: Use Straight Sets technique with 4 "
+    "sets of 8-12 reps and 90s rest based on dataset goals. Available equipment: Cable, Machine. "
+    "Body fat: 22.5%. Muscle mass: 34.1kg. Output valid JSON with plan_name, days array (each with "
+    "day_name, focus_areas, exercises with name, sets, reps, rest).",
+    "Act as an expert fitness coach. Generate a 4-day workout plan for a beginner level person "
+    "with the goal of endurance. Strict Structure Constraint: Use a Upper/Lower Split (e.g., Upper, "
+    "Lower, Rest, Upper, Lower) based on proven workout dataset templates. Strict Set/Rep Constraint: "
+    "Use Straight Sets technique with 4 sets of 8-12 reps and 90s rest based on dataset goals. "
+    "Available equipment: Dumbbell. INJURY [Knee]: AVOID squats, lunges, leg press, leg extensions, "
+    "and jumping. USE ham curls, hip thrusts, and upper body focus. Output valid JSON with plan_name, "
+    "days array (each with day_name, focus_areas, exercises with name, sets, reps, rest).",
+]
+
+
+def _has_checkpoint(path: Optional[str]) -> bool:
+    return bool(path) and os.path.isfile(os.path.join(path, "config.json"))
+
+
+def _dir_fingerprint(path: Optional[str]) -> str:
+    """Short hash of the file names, sizes and mtimes directly under *path*."""
+    h = hashlib.sha256()
+    try:
+        for entry in sorted(os.scandir(path or ""), key=lambda e: e.name):
+            if entry.is_file():
+                st = entry.stat()
+                h.update(f"{entry.name}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    except OSError:
+        return "missing"
+    return h.hexdigest()[:12]
+
+
+class ModelLoader:
+    """Owns the tokenizer/model pair and its loading state."""
+
+    def __init__(self, base_model: str, adapter_dir: str,
+                 merged_dir: Optional[str] = None,
+                 device: Optional[str] = None,
+                 backend: str = "torch",
+                 onnx_dir: Optional[str] = None) -> None:
+        import torch
+        if backend not in BACKENDS:
+            raise ValueError(f"unknown model backend {backend!r} (expected one of {BACKENDS})")
+        self.base_model = base_model
+        self.adapter_dir = adapter_dir
+        self.merged_dir = merged_dir
+        self.backend = backend
+        self.onnx_dir = onnx_dir
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        if backend != "torch" and self.device != "cpu":
+            print(f"⚠️ {backend} backend is CPU-only — ignoring {self.device}")
+            self.device = "cpu"
+        # Optimize: Use float16 for GPU inference (faster + less VRAM)
+        self.torch_dtype = torch.float16 if self.device == "cuda" else torch.float32
+
+        self.tokenizer: Any = None
+        self.model: Any = None
+        self.state = PENDING
+        self.error: Optional[str] = None
+        self.source: Optional[str] = None  # "merged_checkpoint" | "base+adapter" | "onnx[-int8]"
+        self.timer = StageTimer()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._task: Optional[asyncio.Future] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == READY
+
+    # ── Loading ──────────────────────────────────────────────────────────────
+
+    def load(self) -> None:
+        """Load tokenizer and weights synchronously (no-op once ready)."""
+        with self._lock:
+            if self.state == READY:
+                return
+            self.state = LOADING
+            self.error = None
+            self.started_at = time.time()
+            try:
+                self._load_phases()
+            except Exception as e:
+                self.state = FAILED
+                self.error = str(e)
+                print(f"❌ Error loading model: {e}")
+                print(f"❌ Please check that the model files exist in: {self.adapter_dir}")
+                raise
+            finally:
+                self.finished_at = time.time()
+            self.state = READY
+            self._ready.set()
+        print(f"✅ Model ready for inference ({self.source}, "
+              f"{self.finished_at - self.started_at:.1f}s: {self.timer.as_ms()})")
+
+    def _load_phases(self) -> None:
+        if self.backend == "onnx":
+            self._load_onnx()
+            return
+
+        timer = self.timer
+        with timer.stage("imports"):
+            import torch  # (torch before transformers/peft on Windows)
+            from transformers import AutoModelForSeq2SeqLM, AutoTokenizer
+
+        use_merged = _has_checkpoint(self.merged_dir)
+        with timer.stage("tokenizer"):
+            self.tokenizer = AutoTokenizer.from_pretrained(
+                self.merged_dir if use_merged else self.base_model)
+        print("✅ Tokenizer loaded")
+
+        if use_merged:
+            with timer.stage("weights"):
+                model = AutoModelForSeq2SeqLM.from_pretrained(
+                    self.merged_dir, torch_dtype=self.torch_dtype)
+            self.source = "merged_checkpoint"
+            print(f"✅ Pre-merged weights loaded from {self.merged_dir}")
+        else:
+            with timer.stage("weights"):
+                base_model = AutoModelForSeq2SeqLM.from_pretrained(
+                    self.base_model, torch_dtype=self.torch_dtype)
+            print("✅ Base model loaded")
+            with timer.stage("adapter"):
+                from peft import PeftModel
+                model = PeftModel.from_pretrained(base_model, self.adapter_dir)
+                # Fold LoRA deltas into the base weights — no PeftModel at inference
+                model = model.merge_and_unload()
+            self.source = "base+adapter"
+            print("✅ LoRA adapter loaded and merged")
+
+        with timer.stage("device"):
+            model = model.to(self.device)
+            model.eval()
+
+        if self.backend == "int8":
+            with timer.stage("quantize"):
+                model = torch.ao.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8)
+            self.source += "+int8"
+            print("✅ Linear layers dynamically quantized to int8")
+        self.model = model
+
+    def _load_onnx(self) -> None:
+        timer = self.timer
+        if not _has_checkpoint(self.onnx_dir):
+            raise FileNotFoundError(
+                f"no ONNX export in {self.onnx_dir} — run "
+                f"`python model_loader.py --export-onnx [--quantize]`")
+        with timer.stage("imports"):
+            from optimum.onnxruntime import ORTModelForSeq2SeqLM
+            from transformers import AutoTokenizer
+        with timer.stage("tokenizer"):
+            self.tokenizer = AutoTokenizer.from_pretrained(self.onnx_dir)
+        quantized = all(os.path.isfile(os.path.join(self.onnx_dir, f"{name}_quantized.onnx"))
+                        for name in _ONNX_FILES)
+        files = {}
+        if quantized:
+            files = {"encoder_file_name": "encoder_model_quantized.onnx",
+                     "decoder_file_name": "decoder_model_quantized.onnx",
+                     "decoder_with_past_file_name": "decoder_with_past_model_quantized.onnx"}
+        with timer.stage("weights"):
+            self.model = ORTModelForSeq2SeqLM.from_pretrained(self.onnx_dir, **files)
+        self.source = "onnx-int8" if quantized else "onnx"
+        print(f"✅ ONNX Runtime session loaded from {self.onnx_dir} ({self.source})")
+
+    def generate(self, prompts: List[str],
+                 timings: Optional[Dict[str, float]] = None) -> Tuple[List[str], int]:
+        """
+        One batched generate call with the shared decoding settings.
+        Returns (decoded outputs, number of generated tokens) and, if
+        *timings* is given, fills tokenize / beam_search / decode seconds.
+        """
+        import torch
+        tokenizer, model = self.tokenizer, self.model
+        if model is None:
+            raise RuntimeError(f"model not loaded (state={self.state})")
+        t0 = time.perf_counter()
+        inputs = tokenizer(prompts, **TOKENIZER_KWARGS).to(self.device)
+        t1 = time.perf_counter()
+        with torch.no_grad():
+            outputs = model.generate(**inputs, **GENERATION_KWARGS)
+        t2 = time.perf_counter()
+        decoded = tokenizer.batch_decode(outputs, skip_special_tokens=True)
+        if timings is not None:
+            timings["model_tokenize"] = t1 - t0
+            timings["model_beam_search"] = t2 - t1
+            timings["model_decode"] = time.perf_counter() - t2
+        pad_id = tokenizer.pad_token_id
+        n_tokens = int((outputs != pad_id).sum()) if pad_id is not None else int(outputs.numel())
+        return decoded, n_tokens
+
+    def generate_stream(self, prompt: str, on_text: Callable[[str], None],
+                        cancelled: Optional[threading.Event] = None,
+                        timings: Optional[Dict[str, float]] = None) -> str:
+        """
+        Greedy generate for one prompt, calling ``on_text(piece)`` from this
+        thread as decoded text becomes available.  Setting *cancelled* stops
+        generation after the current token.  Returns the full decoded output.
+        """
+        import torch
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextStreamer
+
+        tokenizer, model = self.tokenizer, self.model
+        if model is None:
+            raise RuntimeError(f"model not loaded (state={self.state})")
+
+        class _CallbackStreamer(TextStreamer):
+            def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+                if text:
+                    on_text(text)
+
+        class _Cancelled(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                stop = cancelled is not None and cancelled.is_set()
+                return torch.full((input_ids.shape[0],), stop,
+                                  dtype=torch.bool, device=input_ids.device)
+
+        t0 = time.perf_counter()
+        inputs = tokenizer([prompt], **TOKENIZER_KWARGS).to(self.device)
+        t1 = time.perf_counter()
+        # skip_prompt drops the decoder start token, the only "prompt" a seq2seq decoder sees
+        streamer = _CallbackStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        with torch.no_grad():
+            outputs = model.generate(
+                **inputs, **STREAM_GENERATION_KWARGS, streamer=streamer,
+                stopping_criteria=StoppingCriteriaList([_Cancelled()]))
+        t2 = time.perf_counter()
+        decoded = tokenizer.decode(outputs[0], skip_special_tokens=True)
+        if timings is not None:
+            timings["model_tokenize"] = t1 - t0
+            timings["model_greedy_stream"] = t2 - t1
+            timings["model_decode"] = time.perf_counter() - t2
+        return decoded
+
+    def start_background(self) -> "asyncio.Future":
+        """Schedule ``load()`` on a worker thread; returns the future (idempotent)."""
+        if self._task is None or (self._task.done() and self.state == FAILED):
+            loop = asyncio.get_running_loop()
+            self._task = loop.run_in_executor(None, self._load_quietly)
+        return self._task
+
+    def _load_quietly(self) -> None:
+        try:
+            self.load()
+        except Exception:
+            pass  # state/error already recorded for /health
+
+    async def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._ready.wait, timeout)
+
+    def cache_namespace(self) -> str:
+        """
+        Which weights this loader will run, for the plan-result cache key:
+        backend, checkpoint path and a fingerprint of its files.  Known
+        before ``load()`` (same checkpoint choice), so background loading
+        can share it.
+        """
+        if self.backend == "onnx":
+            paths = [self.onnx_dir]
+        elif _has_checkpoint(self.merged_dir):
+            paths = [self.merged_dir]
+        else:
+            paths = [self.base_model, self.adapter_dir]
+        parts = [f"{p}@{_dir_fingerprint(p)}" if p and os.path.isdir(p) else str(p)
+                 for p in paths]
+        return f"{self.backend}:{'+'.join(parts)}"
+
+    def status(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 3)
+        return {
+            "state": self.state,
+            "backend": self.backend,
+            "source": self.source,
+            "device": self.device,
+            "elapsed_s": elapsed,
+            "phases_ms": self.timer.as_ms(),
+            "error": self.error,
+        }
+
+    # ── Offline export ───────────────────────────────────────────────────────
+
+    def export_merged(self, out_dir: str) -> None:
+        """Write base+LoRA merged weights and tokenizer to *out_dir*."""
+        self.merged_dir = None  # always merge from base + adapter
+        self.device = "cpu"
+        self.load()
+        os.makedirs(out_dir, exist_ok=True)
+        self.model.save_pretrained(out_dir)
+        self.tokenizer.save_pretrained(out_dir)
+        print(f"✅ Merged model written to {out_dir}")
+
+    def export_onnx(self, merged_dir: str, out_dir: str, quantize: bool = False) -> None:
+        """
+        Export the merged checkpoint to ONNX Runtime (``pip install optimum[onnxruntime]``);
+        with *quantize*, also write dynamically int8-quantized graphs.
+        """
+        if not _has_checkpoint(merged_dir):
+            self.export_merged(merged_dir)
+        from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        ort_model = ORTModelForSeq2SeqLM.from_pretrained(merged_dir, export=True)
+        ort_model.save_pretrained(out_dir)
+        AutoTokenizer.from_pretrained(merged_dir).save_pretrained(out_dir)
+        print(f"✅ ONNX graphs written to {out_dir}")
+        if quantize:
+            qconfig = AutoQuantizationConfig.avx2(is_static=False, per_channel=False)
+            for name in _ONNX_FILES:
+                quantizer = ORTQuantizer.from_pretrained(out_dir, file_name=f"{name}.onnx")
+                quantizer.quantize(save_dir=out_dir, quantization_config=qconfig)
+            print("✅ int8 dynamically quantized graphs written (*_quantized.onnx)")
+
+
+def main() -> None:
+    here = os.path.dirname(os.path.abspath(__file__))
+    ap = argparse.ArgumentParser(description="Workout model loading utilities")
+    ap.add_argument("--export-merged", action="store_true",
+                    help="merge the LoRA adapter into flan-t5 and save the checkpoint")
+    ap.add_argument("--export-onnx", action="store_true",
+                    help="export the merged model to ONNX Runtime (merges first if needed)")
+    ap.add_argument("--quantize", action="store_true",
+                    help="with --export-onnx: also write int8 dynamically quantized graphs")
+    ap.add_argument("--base-model", default="google/flan-t5-small")
+    ap.add_argument("--adapter-dir", default=os.path.join(here, "models", "workout-generator-v3"))
+    ap.add_argument("--out", default=os.path.join(here, "models", "workout-generator-v3-merged"))
+    ap.add_argument("--onnx-out", default=os.path.join(here, "models", "workout-generator-v3-onnx"))
+    args = ap.parse_args()
+    if args.export_merged:
+        ModelLoader(args.base_model, args.adapter_dir).export_merged(args.out)
+    elif args.export_onnx:
+        ModelLoader(args.base_model, args.adapter_dir, device="cpu").export_onnx(
+            args.out, args.onnx_out, quantize=args.quantize)
+    else:
+        ap.print_help()
+
+
+if __name__ == "__main__":
+    main()
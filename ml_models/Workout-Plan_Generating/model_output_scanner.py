@@ -0,0 +1,413 @@
+"""
+model_output_scanner.py
+=======================
+
+Single-pass scanner for flan-t5 workout output.
+
+The model emits quasi-JSON: the braces around array elements are usually
+dropped, and long generations stop at ``max_length`` in the middle of a
+value::
+
+    "plan_name": "...", "days": ["day_number": 1, "day_name": "Day 1: Push",
+    "focus_areas": ["chest", ...], "exercises": ["name": "Flat Db Press",
+    "sets": "4", "reps": "4-6", "rest": "180 sec", ...], "day_number": 2, ...
+
+The parsers used to run a dozen regex passes over that text, among them
+``"name".*?"sets".*?"reps".*?"rest"`` whose nested lazy groups backtrack
+polynomially once a field is missing.
+
+``ModelOutputScanner`` reads the text once.  It tokenizes strings, atoms
+(numbers / bare words) and punctuation, treats each ``"key": value`` pair as
+a field and relies on the keys rather than the braces to find records:
+``"day_number"`` starts a day, ``"name"`` starts an exercise, and a record
+ends at the next record of the same or a higher level, at the ``]`` closing
+its list, or at the end of input.  Only the unfinished token is buffered
+between ``feed()`` calls, so the same scanner works on a token stream.
+
+``feed()`` and ``close()`` return the events completed so far:
+
+* ``("metadata", key, value)`` – ``plan_name``, ``program_duration_weeks``,
+  ``notes`` and ``progressive_overload``; first occurrence of each, as the
+  regex parser did (so ``notes`` is usually the first exercise's note).
+* ``("exercise", day_seq, exercise)`` – an exercise with name, sets, reps
+  and rest.  ``day_seq`` counts ``day_number`` keys from 0 (None before the
+  first day).
+* ``("day", day_seq, day)`` – a day with its number, name, focus areas and
+  complete exercises, emitted after its last exercise.
+
+Truncated input is recovered rather than rejected: an unterminated string
+is dropped, an unterminated list keeps its complete items, and the records
+still open at ``close()`` are emitted if their required fields are present.
+
+``scan_model_output(text)`` runs a scanner over a whole string and collects
+the events into a ``ScannedPlan``.
+
+Only Python standard library is used.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+Event = Tuple[str, Any, Any]
+
+EXERCISE_REQUIRED = ("name", "sets", "reps", "rest")
+EXERCISE_TEXT_FIELDS = frozenset({
+    "reps", "rest", "equipment", "notes", "movement_pattern", "exercise_type",
+})
+PROGRESSIVE_OVERLOAD_FIELDS = frozenset({"type", "progression", "deload"})
+# Keys whose value is a list of strings
+_LIST_FIELDS = frozenset({"target_muscles", "focus_areas"})
+
+# One token per match: a complete string with the ":" that makes it a key or
+# the "," after it, an atom with its ",", or any other non-space character
+# (punctuation, or the '"' of a string that is not closed yet).  The branches
+# are unambiguous, so matching never backtracks.
+_TOKEN = re.compile(
+    r'\s*(?:"([^"\\]*(?:\\.[^"\\]*)*)"\s*(?:(:)|,)?|([^\s\[\]{}:,"]+)\s*,?|(\S))',
+    re.DOTALL)
+_DIGITS = re.compile(r"\d+")
+_OPENER = {"]": "[", "}": "{"}
+
+
+def _leading_int(raw: str) -> Optional[str]:
+    m = _DIGITS.match(raw)
+    return m.group(0) if m else None
+
+
+class ModelOutputScanner:
+    """Incremental event scanner; see module docstring."""
+
+    def __init__(self) -> None:
+        self._buf = ""
+        self._str_resume = 0     # offset in _buf to resume an open string search
+        self._events: List[Event] = []
+
+        self._key: Optional[str] = None       # key awaiting its value
+        self._stack: List[Tuple[str, Optional[str]]] = []  # (opener, owning key)
+        self._open_count = {"[": 0, "{": 0}
+        self._list: Optional[List[str]] = None
+        self._list_key: Optional[str] = None
+
+        self._day: Optional[Dict[str, Any]] = None
+        self._day_seq = -1
+        self._exercise: Optional[Dict[str, Any]] = None
+        self._overload: Optional[Dict[str, str]] = None
+        self._overload_depth = -1
+        self._metadata_seen: set = set()
+        self._closed = False
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def feed(self, chunk: str) -> List[Event]:
+        """Consume *chunk*; return the events it completed."""
+        if self._closed:
+            raise RuntimeError("scanner is closed")
+        if chunk:
+            self._tokenize(self._buf + chunk)
+        return self._drain()
+
+    def close(self, chunk: str = "") -> List[Event]:
+        """Consume the last *chunk*, then flush the trailing token and every open record."""
+        if self._closed:
+            return []
+        self._closed = True
+        if self._buf or chunk:
+            self._tokenize_final(self._buf + chunk)
+        while self._stack:
+            self._pop()
+        self._close_day()
+        return self._drain()
+
+    # ── Tokenizer ────────────────────────────────────────────────────────────
+
+    def _tokenize_final(self, buf: str) -> None:
+        # Nothing is carried over after the last chunk, so token positions are
+        # not needed: findall's plain tuples are much cheaper than match objects.
+        for string, colon, atom, char in _TOKEN.findall(buf):
+            if char:
+                if char == '"':
+                    return                 # unterminated string — drop it
+                self._on_punct(char)
+            elif atom:
+                if self._key is not None:
+                    self._on_value(atom, quoted=False)
+            else:
+                if "\\" in string:
+                    try:
+                        string = json.loads(f'"{string}"')
+                    except ValueError:
+                        pass
+                if colon:
+                    self._on_key(string)
+                elif self._key is not None:
+                    self._on_value(string, quoted=True)
+                elif self._list is not None and string:
+                    self._list.append(string)
+
+    def _tokenize(self, buf: str) -> None:
+        if self._str_resume:
+            # Still inside the string that ended the previous chunk?
+            if self._find_quote(buf, self._str_resume) < 0:
+                self._buf, self._str_resume = buf, len(buf)
+                return
+        self._str_resume = 0
+        pos = 0
+        n = len(buf)
+        for m in _TOKEN.finditer(buf):
+            string, colon, atom, char = m.groups()
+            if string is not None:
+                if colon is None and m.end() == n and buf[-1] != ",":
+                    pos = m.start(1) - 1   # a ":" may follow in the next chunk
+                    break
+                if "\\" in string:
+                    try:
+                        string = json.loads(f'"{string}"')
+                    except ValueError:
+                        pass
+                if colon is not None:
+                    self._on_key(string)
+                elif self._key is not None:
+                    self._on_value(string, quoted=True)
+                elif self._list is not None and string:
+                    self._list.append(string)
+            elif atom is not None:
+                if m.end(3) == n:
+                    pos = m.start(3)       # the atom may continue in the next chunk
+                    break
+                if self._key is not None:
+                    self._on_value(atom, quoted=False)
+            elif char == '"':
+                pos = m.start(4)           # unterminated string: wait for its end
+                self._str_resume = n - pos
+                break
+            else:
+                self._on_punct(char)
+            pos = m.end()
+        self._buf = buf[pos:]
+
+    @staticmethod
+    def _find_quote(buf: str, start: int) -> int:
+        """Index of the next unescaped ``"`` at or after *start*, or -1."""
+        while True:
+            i = buf.find('"', start)
+            if i < 0:
+                return -1
+            backslashes = 0
+            j = i - 1
+            while j >= 0 and buf[j] == "\\":
+                backslashes += 1
+                j -= 1
+            if backslashes % 2 == 0:
+                return i
+            start = i + 1
+
+    # ── Parser ───────────────────────────────────────────────────────────────
+
+    def _on_punct(self, char: str) -> None:
+        if char == "[" or char == "{":
+            self._open(char)
+            return
+        self._key = None
+        if char == "]" or char == "}":
+            opener = _OPENER[char]
+            if not self._open_count[opener]:
+                return             # stray closer (the model drops openers)
+            for i in range(len(self._stack) - 1, -1, -1):
+                if self._stack[i][0] == opener:
+                    while len(self._stack) > i:
+                        self._pop()
+                    break
+
+    def _open(self, opener: str) -> None:
+        key, self._key = self._key, None
+        if self._list is not None:
+            self._finish_list()    # "[" inside a string list: not one of ours
+        self._stack.append((opener, key))
+        self._open_count[opener] += 1
+        if opener == "[" and key in _LIST_FIELDS:
+            self._list, self._list_key = [], key
+        elif (opener == "{" and key == "progressive_overload"
+              and key not in self._metadata_seen and self._overload is None):
+            self._overload, self._overload_depth = {}, len(self._stack)
+
+    def _pop(self) -> None:
+        opener, key = self._stack.pop()
+        self._open_count[opener] -= 1
+        if opener == "[":
+            if key in _LIST_FIELDS:
+                self._finish_list()
+            elif key == "exercises":
+                self._close_exercise()
+            elif key == "days":
+                self._close_day()
+        if self._overload is not None and len(self._stack) < self._overload_depth:
+            self._finish_overload()
+
+    def _on_key(self, key: str) -> None:
+        if self._list is not None:
+            # A key inside a string list: the model never closed the list
+            while self._stack and self._list is not None:
+                self._pop()
+        self._key = key
+        if key == "day_number":
+            self._close_day()
+            self._day_seq += 1
+            self._day = {"day_number": None, "exercises": []}
+        elif key == "name":
+            self._close_exercise()
+            self._exercise = {}
+
+    def _on_value(self, raw: str, quoted: bool) -> None:
+        key, self._key = self._key, None
+
+        if self._overload is not None and len(self._stack) >= self._overload_depth:
+            if quoted and raw and key in PROGRESSIVE_OVERLOAD_FIELDS:
+                self._overload.setdefault(key, raw)
+            return
+
+        if key == "plan_name":
+            if quoted and raw:
+                self._metadata(key, raw)
+        elif key == "program_duration_weeks":
+            if not quoted and raw.isdigit():
+                self._metadata(key, int(raw))
+        elif key == "notes" and quoted and raw:
+            self._metadata(key, raw)
+
+        ex = self._exercise
+        if ex is not None:
+            if key == "name":
+                if quoted and raw.strip():
+                    ex.setdefault("name", raw.strip())
+                return
+            if key == "sets":
+                sets = _leading_int(raw)
+                if sets is not None:
+                    ex.setdefault("sets", sets)
+                return
+            if key in EXERCISE_TEXT_FIELDS:
+                # Numbers are accepted for reps/rest ("reps": 10)
+                if raw and (quoted or key in ("reps", "rest")):
+                    ex.setdefault(key, raw)
+                return
+
+        day = self._day
+        if day is not None:
+            if key == "day_number":
+                number = _leading_int(raw)
+                if number is not None:
+                    day["day_number"] = int(number)
+            elif key == "day_name":
+                if quoted and raw:
+                    day.setdefault("day_name", raw)
+            elif key == "estimated_duration_minutes":
+                if not quoted and raw.isdigit():
+                    day.setdefault("estimated_duration_minutes", int(raw))
+
+    def _finish_list(self) -> None:
+        items, key = self._list, self._list_key
+        self._list = self._list_key = None
+        if key == "target_muscles":
+            if self._exercise is not None:
+                self._exercise.setdefault("target_muscles", items)
+        elif key == "focus_areas":
+            if self._day is not None:
+                self._day.setdefault("focus_areas", items)
+
+    def _finish_overload(self) -> None:
+        overload, self._overload = self._overload, None
+        self._overload_depth = -1
+        if overload:
+            self._metadata("progressive_overload", overload)
+        self._metadata_seen.add("progressive_overload")  # only the first object
+
+    def _metadata(self, key: str, value: Any) -> None:
+        if key not in self._metadata_seen:
+            self._metadata_seen.add(key)
+            self._events.append(("metadata", key, value))
+
+    def _close_exercise(self) -> None:
+        ex, self._exercise = self._exercise, None
+        if ex is None or any(f not in ex for f in EXERCISE_REQUIRED):
+            return
+        day_seq = self._day_seq if self._day is not None else None
+        self._events.append(("exercise", day_seq, ex))
+        if self._day is not None:
+            self._day["exercises"].append(ex)
+
+    def _close_day(self) -> None:
+        self._close_exercise()
+        day, self._day = self._day, None
+        if (day is None or day["day_number"] is None
+                or "day_name" not in day or "focus_areas" not in day):
+            return
+        self._events.append(("day", self._day_seq, day))
+
+    def _drain(self) -> List[Event]:
+        events, self._events = self._events, []
+        return events
+
+
+# ============================================================
+# Whole-output helper
+# ============================================================
+
+
+def copy_exercise(ex: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(ex)
+    if "target_muscles" in out:
+        out["target_muscles"] = list(out["target_muscles"])
+    return out
+
+
+@dataclass
+class ScannedPlan:
+    """Everything the workout parsers read from one model output."""
+
+    plan_name: Optional[str] = None
+    program_duration_weeks: Optional[int] = None
+    notes: Optional[str] = None
+    progressive_overload: Optional[Dict[str, str]] = None
+    # Unique by lower-cased name, in output order
+    exercises: List[Dict[str, Any]] = field(default_factory=list)
+    # Each day's exercises are unique by lower-cased name within the day
+    days: List[Dict[str, Any]] = field(default_factory=list)
+    _seen: set = field(default_factory=set, repr=False)
+
+    def add(self, event: Event) -> None:
+        kind, where, payload = event
+        if kind == "metadata":
+            setattr(self, where, payload)
+        elif kind == "exercise":
+            name = payload["name"].lower()
+            if name not in self._seen:
+                self._seen.add(name)
+                self.exercises.append(copy_exercise(payload))
+        elif kind == "day":
+            self.days.append(dedupe_day(payload))
+
+
+def dedupe_day(day: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of *day* with repeated exercise names (case-insensitive) dropped."""
+    seen: set = set()
+    exercises = []
+    for ex in day["exercises"]:
+        name = ex["name"].lower()
+        if name not in seen:
+            seen.add(name)
+            exercises.append(copy_exercise(ex))
+    out = dict(day)
+    out["focus_areas"] = list(day["focus_areas"])
+    out["exercises"] = exercises
+    return out
+
+
+def scan_model_output(text: str) -> ScannedPlan:
+    plan = ScannedPlan()
+    for event in ModelOutputScanner().close(text):
+        plan.add(event)
+    return plan
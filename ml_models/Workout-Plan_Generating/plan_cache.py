@@ -0,0 +1,267 @@
+"""
+plan_cache.py
+=============
+
+Content-addressed cache of flan-t5 results for /generate-direct.
+
+Generation runs with ``do_sample=False`` and a fixed beam width, so one
+prompt always produces the same raw output.  ``PlanResultCache`` stores that
+raw output together with the plan parsed from it, keyed by::
+
+    sha256(MODEL_VERSION + "\\n" + model namespace + "\\n" + normalized prompt)
+
+The namespace names what actually produces the output — the inference
+backend and the checkpoint it loads (``ModelLoader.cache_namespace()``) —
+because int8 and ONNX runs, or a re-exported checkpoint, can decode a
+different plan from the same prompt under the same MODEL_VERSION.
+
+Normalization only collapses whitespace — the tokenizer is case-sensitive,
+so anything else could change the model's answer.
+
+Two tiers:
+
+* **memory** – ``OrderedDict`` LRU bounded by entry count.
+* **disk** – one JSON file per key under ``disk_dir``, bounded by total
+  bytes; the least recently used files (by mtime, touched on read) are
+  deleted first.  Files are written atomically, so several workers can
+  share the directory.
+
+The parsed plan also depends on the request fields passed to the parser
+(``req_goal`` is the raw goal, the prompt holds the InBody-adjusted one), so
+each entry records a ``parse_key``; on a mismatch the caller re-parses the
+cached raw output, which is cheap.  Only the deterministic part is cached:
+validation, the database fill and its shuffles run on a deep copy per
+request.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+_WS = re.compile(r"\s+")
+
+
+def normalize_prompt(prompt: str) -> str:
+    return _WS.sub(" ", prompt).strip()
+
+
+def plan_cache_key(prompt: str, model_version: str, namespace: str = "") -> str:
+    payload = f"{model_version}\n{namespace}\n{normalize_prompt(prompt)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class PlanResultCache:
+    """Memory + disk cache of ``{"raw_output", "parse_key", "plan"}`` entries."""
+
+    def __init__(
+        self,
+        model_version: str,
+        namespace: str = "",
+        max_memory_entries: int = 512,
+        disk_dir: Optional[str] = None,
+        max_disk_bytes: int = 64 * 1024 * 1024,
+    ) -> None:
+        self.model_version = model_version
+        self.namespace = namespace
+        self.max_memory_entries = int(max_memory_entries)
+        self.disk_dir = disk_dir or None
+        self.max_disk_bytes = int(max_disk_bytes)
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._disk_bytes = 0
+
+        # ── Metrics ──
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.reparses = 0
+        self.memory_evictions = 0
+        self.disk_evictions = 0
+        self.disk_errors = 0
+
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            except OSError as e:
+                print(f"⚠️ Plan cache directory unavailable ({e}) — memory tier only")
+                self.disk_dir = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_memory_entries > 0 or bool(self.disk_dir)
+
+    def key(self, prompt: str) -> str:
+        return plan_cache_key(prompt, self.model_version, self.namespace)
+
+    # ── Public API ───────────────────────────────────────────────────────────
+
+    def get(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Deep copy of the cached entry for *prompt*, or None."""
+        if not self.enabled:
+            return None
+        key = self.key(prompt)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return copy.deepcopy(entry)
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._memory_put(key, entry)
+        return copy.deepcopy(entry)
+
+    def put(self, prompt: str, raw_output: str, parse_key: str,
+            plan: Dict[str, Any]) -> None:
+        """Store the raw output and the (pre-validation) parsed plan for *prompt*."""
+        if not self.enabled:
+            return
+        key = self.key(prompt)
+        entry = {
+            "model_version": self.model_version,
+            "namespace": self.namespace,
+            "raw_output": raw_output,
+            "parse_key": parse_key,
+            "plan": copy.deepcopy(plan),
+        }
+        with self._lock:
+            self._memory_put(key, entry)
+        self._disk_put(key, entry)
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "namespace": self.namespace,
+            "memory_entries": len(self._memory),
+            "max_memory_entries": self.max_memory_entries,
+            "disk_dir": self.disk_dir,
+            "disk_bytes": self._disk_bytes,
+            "max_disk_bytes": self.max_disk_bytes if self.disk_dir else 0,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "reparses": self.reparses,
+            "memory_evictions": self.memory_evictions,
+            "disk_evictions": self.disk_evictions,
+            "disk_errors": self.disk_errors,
+        }
+
+    # ── Memory tier ──────────────────────────────────────────────────────────
+
+    def _memory_put(self, key: str, entry: Dict[str, Any]) -> None:
+        if self.max_memory_entries <= 0:
+            return
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self.memory_evictions += 1
+
+    # ── Disk tier ────────────────────────────────────────────────────────────
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _disk_files(self):
+        """(path, size, mtime) for every cache file."""
+        out = []
+        with os.scandir(self.disk_dir) as it:
+            for de in it:
+                if de.is_file() and de.name.endswith(".json"):
+                    st = de.stat()
+                    out.append((de.path, st.st_size, st.st_mtime))
+        return out
+
+    def _disk_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # LRU by mtime
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.disk_errors += 1
+            print(f"⚠️ Plan cache read failed ({e}) — discarding {path}")
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        if (entry.get("model_version") != self.model_version
+                or entry.get("namespace", "") != self.namespace):
+            return None
+        return entry
+
+    def _disk_put(self, key: str, entry: Dict[str, Any]) -> None:
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_disk_bytes:
+            return
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            try:
+                old_size = os.path.getsize(path)
+            except OSError:
+                old_size = 0
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError as e:
+            self.disk_errors += 1
+            print(f"⚠️ Plan cache write failed: {e}")
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - old_size
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until under ``max_disk_bytes``."""
+        try:
+            files = sorted(self._disk_files(), key=lambda f: f[2])
+        except OSError as e:
+            self.disk_errors += 1
+            print(f"⚠️ Plan cache scan failed: {e}")
+            return
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                self.disk_evictions += 1
+            except FileNotFoundError:
+                pass  # another worker got there first
+            except OSError:
+                continue
+            total -= size
+        with self._lock:
+            # Re-sync with what is actually on disk (other workers write too)
+            self._disk_bytes = total
+
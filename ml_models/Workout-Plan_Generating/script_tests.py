@@ -0,0 +1,35 @@
+"""
+script_tests.py
+===============
+
+Runner for the stdlib test files in this directory, so each one works
+both under pytest and as ``python test_<name>.py`` in the Docker image,
+where pytest isn't installed.
+
+    if __name__ == "__main__":
+        run_tests(globals(), "micro batcher")
+
+Runs every zero-argument ``test_*`` function in the module, prints
+PASS/FAIL per test and exits 1 if any failed.
+"""
+
+import sys
+from typing import Any, Dict
+
+
+def run_tests(namespace: Dict[str, Any], title: str) -> None:
+    tests = [(name, fn) for name, fn in namespace.items()
+             if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+        except Exception as e:
+            failed += 1
+            print(f"  FAIL  {name}  — {type(e).__name__}: {e}")
+        else:
+            print(f"  PASS  {name}")
+    if failed:
+        print(f"\n{failed} test(s) failed")
+        sys.exit(1)
+    print(f"\nAll {title} tests passed")
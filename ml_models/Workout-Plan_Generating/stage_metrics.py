@@ -0,0 +1,159 @@
+"""
+stage_metrics.py
+================
+
+Per-request stage timing and a minimal Prometheus text-format registry.
+
+``StageTimer`` wraps each pipeline stage of a request::
+
+    timer = StageTimer(STAGE_SECONDS)
+    with timer.stage("retrieve_user_context"):
+        ...
+    timer.as_ms()   # {"retrieve_user_context": 12.4, ...}
+
+``timer.finish()`` observes each stage's per-request total into a labelled
+``Histogram`` that ``MetricsRegistry.render()`` exposes in the Prometheus
+exposition format (``/metrics``).  Histograms are thread-safe so they can be observed from
+executor threads as well as the event loop.
+
+Only Python standard library is used — no prometheus_client dependency.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+# Request stages span ~1 ms (prompt building) to tens of seconds (CPU beam search)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt(value: float) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by one label (e.g. ``stage``)."""
+
+    def __init__(self, name: str, help_text: str, label: str = "stage",
+                 buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # label value → (bucket counts, sum, count)
+        self._series: Dict[str, List] = {}
+
+    def observe(self, label_value: str, value: float) -> None:
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = [[0] * len(self.buckets), 0.0, 0]
+                self._series[label_value] = series
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Count / sum / mean per label value (for /health and debugging)."""
+        with self._lock:
+            return {
+                lv: {"count": s[2], "sum_s": round(s[1], 6),
+                     "mean_ms": round(s[1] / s[2] * 1000, 3) if s[2] else 0.0}
+                for lv, s in sorted(self._series.items())
+            }
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}",
+                 f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for lv, (counts, total, n) in sorted(self._series.items()):
+                for bound, c in zip(self.buckets, counts):
+                    lines.append(
+                        f'{self.name}_bucket{{{self.label}="{lv}",le="{_fmt(bound)}"}} {c}')
+                lines.append(f'{self.name}_bucket{{{self.label}="{lv}",le="+Inf"}} {n}')
+                lines.append(f'{self.name}_sum{{{self.label}="{lv}"}} {total}')
+                lines.append(f'{self.name}_count{{{self.label}="{lv}"}} {n}')
+        return lines
+
+
+GaugeValue = Union[float, Dict[str, float]]
+
+
+class MetricsRegistry:
+    """Holds histograms plus callback gauges/counters and renders them as text."""
+
+    def __init__(self) -> None:
+        self._histograms: List[Histogram] = []
+        # (name, help, type, callback, label)
+        self._callbacks: List[Tuple[str, str, str, Callable[[], GaugeValue], str]] = []
+
+    def histogram(self, name: str, help_text: str, label: str = "stage",
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        hist = Histogram(name, help_text, label, buckets)
+        self._histograms.append(hist)
+        return hist
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], GaugeValue],
+              label: str = "", metric_type: str = "gauge") -> None:
+        """Register a value read at scrape time; a dict return becomes one series per key."""
+        self._callbacks.append((name, help_text, metric_type, fn, label))
+
+    def counter(self, name: str, help_text: str, fn: Callable[[], GaugeValue],
+                label: str = "") -> None:
+        self.gauge(name, help_text, fn, label, metric_type="counter")
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for hist in self._histograms:
+            lines.extend(hist.render())
+        for name, help_text, metric_type, fn, label in self._callbacks:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            if isinstance(value, dict):
+                for key, v in sorted(value.items()):
+                    lines.append(f'{name}{{{label}="{key}"}} {float(v)}')
+            else:
+                lines.append(f"{name} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """Collects wall-clock durations for the named stages of one request."""
+
+    def __init__(self, histogram: Optional[Histogram] = None) -> None:
+        self._histogram = histogram
+        self._stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name: str, seconds: float) -> None:
+        """Add *seconds* to stage *name* (stages hit repeatedly accumulate)."""
+        self._stages[name] = self._stages.get(name, 0.0) + seconds
+
+    def finish(self) -> None:
+        """Observe each stage's per-request total into the histogram (once)."""
+        if self._histogram is not None:
+            for name, seconds in self._stages.items():
+                self._histogram.observe(name, seconds)
+            self._histogram = None
+
+    def as_ms(self) -> Dict[str, float]:
+        return {name: round(s * 1000, 2) for name, s in self._stages.items()}
@@ -0,0 +1,151 @@
+"""
+Equivalence check: optimized backends vs. the PyTorch reference.
+
+Generates REFERENCE_PROMPTS (model_loader.py) with the float32 PyTorch
+backend and with each optimized backend, then compares per prompt:
+
+  exact        raw output strings identical
+  similarity   difflib ratio of the raw outputs
+  names        Jaccard overlap of the exercise names the parser would pick up
+
+Fails (exit 1) if any backend's mean similarity or mean name overlap falls
+below the thresholds.  int8 / ONNX arithmetic differs slightly from float32,
+so beam search may diverge late in long outputs — hence similarity, not
+equality, is the gate.
+
+Usage:
+  python model_loader.py --export-onnx --quantize     # once, for the onnx backend
+  python test_backend_equivalence.py [--backends int8 onnx] [--min-similarity 0.9]
+  pytest test_backend_equivalence.py                  # CI: default thresholds
+
+Under pytest each backend is skipped when torch/transformers (or
+optimum[onnxruntime] and the ONNX export, for onnx) are not installed.
+"""
+import argparse
+import difflib
+import functools
+import importlib.util
+import os
+import re
+import sys
+
+from model_loader import REFERENCE_PROMPTS, ModelLoader, _has_checkpoint
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_MODEL = "google/flan-t5-small"
+MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3")
+MERGED_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-merged")
+ONNX_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-onnx")
+MIN_SIMILARITY = 0.9
+MIN_NAME_OVERLAP = 0.8
+
+_NAME_RE = re.compile(r'"name":\s*"([^"]+)"')
+
+
+def exercise_names(text):
+    return {n.strip().lower() for n in _NAME_RE.findall(text)}
+
+
+def jaccard(a, b):
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+@functools.lru_cache(maxsize=None)
+def generate_all(backend):
+    loader = ModelLoader(BASE_MODEL, MODEL_DIR, merged_dir=MERGED_DIR,
+                         device="cpu", backend=backend, onnx_dir=ONNX_DIR)
+    loader.load()
+    # One prompt per call — batch padding must not influence the comparison
+    return tuple(loader.generate([p])[0][0] for p in REFERENCE_PROMPTS)
+
+
+def compare(reference, outputs):
+    """Per-prompt (exact, similarity, name overlap) rows."""
+    return [(ref == out, difflib.SequenceMatcher(None, ref, out).ratio(),
+             jaccard(exercise_names(ref), exercise_names(out)))
+            for ref, out in zip(reference, outputs)]
+
+
+def missing_requirements(backend):
+    """Why *backend* can't run here, or None."""
+    modules = ["torch", "transformers"]
+    if not _has_checkpoint(MERGED_DIR):
+        modules.append("peft")
+    if backend == "onnx":
+        modules.append("optimum")
+    for module in modules:
+        if importlib.util.find_spec(module) is None:
+            return f"{module} not installed"
+    if backend == "onnx" and not _has_checkpoint(ONNX_DIR):
+        return f"no ONNX export in {ONNX_DIR} (python model_loader.py --export-onnx)"
+    return None
+
+
+def _check_backend(backend):
+    import pytest
+    reason = missing_requirements(backend)
+    if reason:
+        pytest.skip(reason)
+    rows = compare(generate_all("torch"), generate_all(backend))
+    mean_sim = sum(r[1] for r in rows) / len(rows)
+    mean_ov = sum(r[2] for r in rows) / len(rows)
+    assert mean_sim >= MIN_SIMILARITY, f"mean similarity {mean_sim:.3f}"
+    assert mean_ov >= MIN_NAME_OVERLAP, f"mean name overlap {mean_ov:.3f}"
+
+
+def test_int8_matches_torch():
+    _check_backend("int8")
+
+
+def test_onnx_matches_torch():
+    _check_backend("onnx")
+
+
+def test_cache_namespace_differs_by_backend():
+    import pytest
+    if importlib.util.find_spec("torch") is None:
+        pytest.skip("torch not installed")
+    namespaces = {ModelLoader(BASE_MODEL, MODEL_DIR, merged_dir=MERGED_DIR, device="cpu",
+                              backend=b, onnx_dir=ONNX_DIR).cache_namespace()
+                  for b in ("torch", "int8", "onnx")}
+    assert len(namespaces) == 3, namespaces
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["int8", "onnx"])
+    ap.add_argument("--min-similarity", type=float, default=MIN_SIMILARITY)
+    ap.add_argument("--min-name-overlap", type=float, default=MIN_NAME_OVERLAP)
+    args = ap.parse_args()
+
+    print("Generating reference outputs (torch, float32)...")
+    reference = generate_all("torch")
+
+    failed = False
+    for backend in args.backends:
+        print(f"\n── {backend} ──")
+        try:
+            outputs = generate_all(backend)
+        except (ImportError, FileNotFoundError) as e:
+            print(f"   SKIPPED: {e}")
+            continue
+        sims, overlaps, exact = [], [], 0
+        for i, (same, sim, ov) in enumerate(compare(reference, outputs)):
+            exact += same
+            sims.append(sim)
+            overlaps.append(ov)
+            print(f"   prompt {i}: exact={same!s:<5} similarity={sim:.3f} names={ov:.3f}")
+        mean_sim = sum(sims) / len(sims)
+        mean_ov = sum(overlaps) / len(overlaps)
+        ok = mean_sim >= args.min_similarity and mean_ov >= args.min_name_overlap
+        failed |= not ok
+        print(f"   {'PASS' if ok else 'FAIL'}: exact {exact}/{len(sims)}, "
+              f"mean similarity {mean_sim:.3f}, mean name overlap {mean_ov:.3f}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
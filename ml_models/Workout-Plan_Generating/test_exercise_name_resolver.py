@@ -0,0 +1,69 @@
+"""
+Tests for exercise_name_resolver.py against Dataset/unique_exercises.csv,
+no torch needed.
+
+Covers:
+  - the names flan-t5 emits resolve to the canonical catalog entry
+    (barbell/dumbbell, not a band/trx/sumo variant; bent over, not meadows)
+  - an explicitly requested equipment prefix is kept
+  - misses, short queries and determinism across fresh resolvers
+
+Run with: python test_exercise_name_resolver.py   (or pytest)
+"""
+import os
+
+from exercise_catalog import load_unique_exercises
+from exercise_name_resolver import ExerciseNameResolver
+from script_tests import run_tests
+
+CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                        "Dataset", "unique_exercises.csv")
+KEYS = [ex["name"].lower().strip() for ex in load_unique_exercises(CSV_PATH)]
+RESOLVER = ExerciseNameResolver(KEYS)
+
+EXPECTED = {
+    "Bench Press": "barbell bench press",
+    "Barbell Squat": "barbell back squat",
+    "Overhead Press": "barbell overhead press",
+    "Hammer Curls": "dumbbell hammer curl",
+    "Flat Db Press": "dumbbell bench press",
+    "Romanian Deadlift": "barbell romanian deadlift",
+    "Goblet Squat": "dumbbell goblet squat",
+    "Lateral Raises": "dumbbell lateral raise",
+    "Push-Ups": "push up",
+    "Deadlift": "deadlift",
+    "Leg Press": "leg press",
+    # The curated names the built-in exercise lists emit: the plain form,
+    # not a named variant (meadows row) or a home substitute (band)
+    "Barbell Rows": "barbell bent over row",
+    "Face Pulls": "cable rope face pulls",
+    "Treadmill HIIT": "treadmill sprint",
+    "Cable Flyes": "cable pec fly",
+}
+
+
+def test_canonical_variants():
+    got = {name: RESOLVER.resolve(name) for name in EXPECTED}
+    wrong = {name: key for name, key in got.items() if key != EXPECTED[name]}
+    assert not wrong, wrong
+
+
+def test_requested_equipment_is_kept():
+    assert RESOLVER.resolve("Band Face Pulls") == "band face pull"
+    assert RESOLVER.resolve("Cable Woodchoppers") == "cable wood chopper"
+    assert RESOLVER.resolve("Dumbbell Curls") == "dumbbell curl"
+
+
+def test_misses_and_short_queries():
+    assert RESOLVER.resolve("zzqx wobble") is None
+    assert RESOLVER.resolve("ab") is None
+    assert RESOLVER.resolve("") is None
+
+
+def test_deterministic_across_instances():
+    fresh = ExerciseNameResolver(reversed(KEYS))
+    assert all(fresh.resolve(name) == RESOLVER.resolve(name) for name in EXPECTED)
+
+
+if __name__ == "__main__":
+    run_tests(globals(), "exercise name resolver")
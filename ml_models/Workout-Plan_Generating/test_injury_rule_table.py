@@ -0,0 +1,276 @@
+"""
+Parity tests: the declarative rule tables vs. the original rule methods.
+
+``test_injury_rule_table.golden.json.gz`` holds the decisions of the
+pre-table ``InjuryRulesEngine`` (``_check_red_flags`` and the nine
+``_<region>_rules`` if/else methods, baseline commit 6d23ce8), generated
+once with ``--write-golden``.  The current engine must reproduce every one
+of them — same sets, same note / reason / tag order, same substitution
+mapping.
+
+Inputs covered:
+
+  single   full cartesian product of every field the rules read — region,
+           injury type, severity, duration, pain 0–10 and the five red-flag
+           booleans (the remaining fields are not read by either side)
+  pairs    every (region, severity) × (region, severity) combination, in
+           both orders, with and without red flags
+  random   multi-injury lists of 3–4 random injuries over all fields
+
+Run with: pytest test_injury_rule_table.py   (or python test_injury_rule_table.py)
+
+Regenerate the golden file (only if the rules are meant to change)::
+
+    git show 6d23ce8:ml_models/Workout-Plan_Generating/injury_rules_engine.py > /tmp/engine.py
+    python test_injury_rule_table.py --write-golden /tmp/engine.py
+"""
+import argparse
+import dataclasses
+import functools
+import gzip
+import importlib.util
+import itertools
+import json
+import os
+import random
+import sys
+
+import injury_rules_engine
+from injury_rules_engine import (
+    DurationCategory, InjuryRegion, InjuryRulesEngine, InjuryType, Severity,
+)
+from script_tests import run_tests
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           "test_injury_rule_table.golden.json.gz")
+RED_FLAG_FIELDS = ("recent_trauma", "unexplained_swelling", "major_weakness",
+                   "systemic_symptoms", "worsening")
+OTHER_FIELDS = ("pain_with_daily_activity", "range_of_motion_limited", "doctor_cleared",
+                "currently_in_physio", "movements_that_hurt")
+RANDOM_CASES = 1000
+
+ENGINE = InjuryRulesEngine(cache_size=0)
+
+
+# ── Inputs (plain values, so they can be stored and fed to either engine) ─────
+
+def injury_row(region, severity, injury_type="pain", duration="chronic", pain_now=3,
+               flags=(), other=(False, False, False, False, ())):
+    """[region, type, severity, duration, pain, *OTHER_FIELDS, *RED_FLAG_FIELDS]"""
+    return [region, injury_type, severity, duration, pain_now, *other[:4], list(other[4]),
+            *(name in flags for name in RED_FLAG_FIELDS)]
+
+
+def to_input(row, module):
+    region, injury_type, severity, duration, pain_now = row[:5]
+    rest = dict(zip(OTHER_FIELDS + RED_FLAG_FIELDS, row[5:]))
+    return module.InjuryInput(
+        injury_region=module.InjuryRegion(region), injury_type=module.InjuryType(injury_type),
+        severity=module.Severity(severity), duration_category=module.DurationCategory(duration),
+        pain_now=pain_now, **rest)
+
+
+def flag_sets():
+    return [tuple(f for f, on in zip(RED_FLAG_FIELDS, bits) if on)
+            for bits in itertools.product((False, True), repeat=len(RED_FLAG_FIELDS))]
+
+
+def single_axes():
+    return {
+        "region": [e.value for e in InjuryRegion],
+        "injury_type": [e.value for e in InjuryType],
+        "severity": [e.value for e in Severity],
+        "duration": [e.value for e in DurationCategory],
+        "pain_now": list(range(11)),
+        "flags": [list(f) for f in flag_sets()],
+    }
+
+
+def single_rows(axes):
+    for region, injury_type, severity, duration, pain_now, flags in itertools.product(
+            axes["region"], axes["injury_type"], axes["severity"], axes["duration"],
+            axes["pain_now"], axes["flags"]):
+        yield [injury_row(region, severity, injury_type, duration, pain_now, flags)]
+
+
+def pair_cases():
+    cells = list(itertools.product([e.value for e in InjuryRegion], [e.value for e in Severity]))
+    for (r1, s1), (r2, s2) in itertools.product(cells, repeat=2):
+        for flags in ((), ("worsening",), ("recent_trauma", "major_weakness")):
+            yield [injury_row(r1, s1, flags=flags), injury_row(r2, s2, pain_now=9)]
+
+
+def random_cases(rng, n):
+    def one():
+        other = tuple(rng.random() < 0.5 for _ in range(4)) + (
+            rng.sample(["overhead", "squat", "twist"], rng.randint(0, 2)),)
+        return injury_row(
+            rng.choice(list(InjuryRegion)).value, rng.choice(list(Severity)).value,
+            rng.choice(list(InjuryType)).value, rng.choice(list(DurationCategory)).value,
+            rng.randint(0, 10), [f for f in RED_FLAG_FIELDS if rng.random() < 0.15], other)
+    return [[one() for _ in range(rng.randint(3, 4))] for _ in range(n)]
+
+
+# ── Decisions ─────────────────────────────────────────────────────────────────
+
+def decision_record(decision):
+    """JSON-able form of an InjuryDecision; sets sorted, everything else in order."""
+    record = {}
+    for f in dataclasses.fields(decision):
+        value = getattr(decision, f.name)
+        if isinstance(value, (set, frozenset)):
+            value = sorted(value)
+        elif hasattr(value, "value"):
+            value = value.value
+        record[f.name] = value
+    return record
+
+
+def evaluate(rows, module=injury_rules_engine, engine=ENGINE):
+    injuries = [to_input(r, module) for r in rows]
+    # The pre-table engine has no memo cache, so plain evaluate() there
+    run = getattr(engine, "evaluate_uncached", engine.evaluate)
+    return decision_record(run(injuries))
+
+
+# The golden file stores each distinct decision once, with every string
+# (notes, reasons, patterns, tags) interned in one table — they repeat
+# across thousands of decisions.
+
+def _kind(value):
+    return {list: "list", dict: "dict", str: "str"}.get(type(value), "plain")
+
+
+def pack_decisions(records):
+    strings, table = {}, []
+
+    def sid(s):
+        if s not in strings:
+            strings[s] = len(table)
+            table.append(s)
+        return strings[s]
+
+    fields = [[name, _kind(value)] for name, value in records[0].items()]
+    packed = []
+    for record in records:
+        row = []
+        for name, kind in fields:
+            value = record[name]
+            if kind == "list":
+                value = [sid(v) for v in value]
+            elif kind == "dict":
+                value = [[sid(k), sid(v)] for k, v in value.items()]
+            elif kind == "str":
+                value = sid(value)
+            row.append(value)
+        packed.append(row)
+    return {"fields": fields, "strings": table, "rows": packed}
+
+
+def unpack_decisions(packed):
+    table = packed["strings"]
+    records = []
+    for row in packed["rows"]:
+        record = {}
+        for (name, kind), value in zip(packed["fields"], row):
+            if kind == "list":
+                value = [table[i] for i in value]
+            elif kind == "dict":
+                value = {table[k]: table[v] for k, v in value}
+            elif kind == "str":
+                value = table[value]
+            record[name] = value
+        records.append(record)
+    return records
+
+
+@functools.lru_cache(maxsize=1)
+def golden():
+    with gzip.open(GOLDEN_PATH, "rt", encoding="utf-8") as f:
+        data = json.load(f)
+    data["decisions"] = unpack_decisions(data["decisions"])
+    return data
+
+
+def _mismatches(cases, expected_ids):
+    decisions = golden()["decisions"]
+    bad = []
+    for rows, idx in zip(cases, expected_ids):
+        actual = evaluate(rows)
+        if actual != decisions[idx]:
+            fields = [k for k in actual if actual[k] != decisions[idx].get(k)]
+            bad.append((rows, fields))
+    return bad
+
+
+# ── Tests ─────────────────────────────────────────────────────────────────────
+
+def test_golden_axes_match_engine_enums():
+    assert golden()["single"]["axes"] == single_axes()
+
+
+def test_single_injuries():
+    single = golden()["single"]
+    cases = list(single_rows(single["axes"]))
+    assert len(cases) == len(single["decisions"])
+    bad = _mismatches(cases, single["decisions"])
+    assert not bad, f"{len(bad)} of {len(cases)} differ, first: {bad[0]}"
+
+
+def test_injury_pairs():
+    pairs = golden()["pairs"]
+    cases = list(pair_cases())
+    assert len(cases) == len(pairs)
+    bad = _mismatches(cases, pairs)
+    assert not bad, f"{len(bad)} of {len(cases)} differ, first: {bad[0]}"
+
+
+def test_random_multi_injury_lists():
+    cases = golden()["random"]
+    bad = _mismatches([rows for rows, _ in cases], [idx for _, idx in cases])
+    assert not bad, f"{len(bad)} of {len(cases)} differ, first: {bad[0]}"
+
+
+# ── Golden file ───────────────────────────────────────────────────────────────
+
+def write_golden(engine_path):
+    """Evaluate every case with the engine at *engine_path* and store the decisions."""
+    spec = importlib.util.spec_from_file_location("reference_injury_rules_engine", engine_path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module     # dataclasses look their module up here
+    spec.loader.exec_module(module)
+    engine = module.InjuryRulesEngine()
+
+    decisions, ids = [], {}
+
+    def decide(rows):
+        record = evaluate(rows, module, engine)
+        key = json.dumps(record, sort_keys=True)
+        if key not in ids:
+            ids[key] = len(decisions)
+            decisions.append(record)
+        return ids[key]
+
+    axes = single_axes()
+    data = {
+        "source": "InjuryRulesEngine rule methods at commit 6d23ce8 (before the rule tables)",
+        "single": {"axes": axes, "decisions": [decide(rows) for rows in single_rows(axes)]},
+        "pairs": [decide(rows) for rows in pair_cases()],
+        "random": [[rows, decide(rows)] for rows in random_cases(random.Random(18), RANDOM_CASES)],
+        "decisions": pack_decisions(decisions),
+    }
+    with gzip.open(GOLDEN_PATH, "wt", encoding="utf-8", compresslevel=9) as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+    print(f"Wrote {GOLDEN_PATH}: {len(decisions)} distinct decisions, "
+          f"{os.path.getsize(GOLDEN_PATH) / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--write-golden", metavar="ENGINE_PY",
+                    help="regenerate the golden file from the injury_rules_engine.py at this path")
+    args = ap.parse_args()
+    if args.write_golden:
+        write_golden(args.write_golden)
+    else:
+        run_tests(globals(), "injury rule table")
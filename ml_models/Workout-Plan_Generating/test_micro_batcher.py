@@ -0,0 +1,162 @@
+"""
+Tests for micro_batcher.py, no torch needed.
+
+``batch_fn`` is a plain function that records the batches it receives, so
+the scheduler is exercised exactly as /generate-direct drives it.
+
+Covers:
+  - concurrent submits share one batch_fn call, results in caller order
+  - max_batch_size splits a burst; window_ms flushes a partial batch
+  - an exception (or a wrong result count) reaches every caller in the batch
+  - stop() fails callers still queued, and submit() after stop restarts
+
+Run with: python test_micro_batcher.py   (or pytest)
+"""
+import asyncio
+import threading
+import time
+
+from micro_batcher import MicroBatcher
+from script_tests import run_tests
+
+
+class Recorder:
+    """batch_fn that records batches; optionally blocks until released."""
+
+    def __init__(self, fail=None, gate=None):
+        self.batches = []
+        self.fail = fail
+        self.gate = gate
+
+    def __call__(self, items):
+        if self.gate is not None:
+            self.gate.wait(5)
+        self.batches.append(list(items))
+        if self.fail is not None:
+            raise self.fail
+        return [f"out:{x}" for x in items]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_submits_share_a_batch():
+    async def main():
+        fn = Recorder()
+        batcher = MicroBatcher(fn, window_ms=50, max_batch_size=8)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        finally:
+            await batcher.stop()
+        return fn, batcher, results
+
+    fn, batcher, results = run(main())
+    assert results == [f"out:{i}" for i in range(5)]
+    assert fn.batches == [[0, 1, 2, 3, 4]]
+    assert batcher.stats()["batch_size_counts"] == {5: 1}
+
+
+def test_max_batch_size_splits_a_burst():
+    async def main():
+        fn = Recorder()
+        batcher = MicroBatcher(fn, window_ms=50, max_batch_size=3)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+        finally:
+            await batcher.stop()
+        return fn, results
+
+    fn, results = run(main())
+    assert results == [f"out:{i}" for i in range(7)]
+    assert [len(b) for b in fn.batches] == [3, 3, 1]
+
+
+def test_window_flushes_partial_batch():
+    async def main():
+        fn = Recorder()
+        batcher = MicroBatcher(fn, window_ms=30, max_batch_size=8)
+        try:
+            t0 = time.perf_counter()
+            first = await batcher.submit("a")
+            waited = time.perf_counter() - t0
+            # A submit arriving after the window closed gets its own batch
+            second = await batcher.submit("b")
+        finally:
+            await batcher.stop()
+        return fn, first, second, waited
+
+    fn, first, second, waited = run(main())
+    assert (first, second) == ("out:a", "out:b")
+    assert fn.batches == [["a"], ["b"]]
+    assert 0.025 <= waited < 1.0, waited
+
+
+def test_error_reaches_every_caller_in_the_batch():
+    async def main():
+        fn = Recorder(fail=ValueError("boom"))
+        batcher = MicroBatcher(fn, window_ms=50, max_batch_size=8)
+        try:
+            results = await asyncio.gather(*(batcher.submit(i) for i in range(4)),
+                                           return_exceptions=True)
+            # The loop survives a failed batch
+            fn.fail = None
+            after = await batcher.submit("ok")
+        finally:
+            await batcher.stop()
+        return batcher, results, after
+
+    batcher, results, after = run(main())
+    assert all(isinstance(r, ValueError) and str(r) == "boom" for r in results)
+    assert after == "out:ok"
+    assert batcher.errors_total == 1
+
+
+def test_wrong_result_count_fails_the_batch():
+    async def main():
+        batcher = MicroBatcher(lambda items: items[:-1], window_ms=20, max_batch_size=8)
+        try:
+            return await asyncio.gather(*(batcher.submit(i) for i in range(3)),
+                                        return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    results = run(main())
+    assert all(isinstance(r, RuntimeError) and "2 results for 3 items" in str(r)
+               for r in results)
+
+
+def test_stop_fails_pending_callers():
+    async def main():
+        gate = threading.Event()
+        fn = Recorder(gate=gate)
+        batcher = MicroBatcher(fn, window_ms=0, max_batch_size=1)
+        first = asyncio.ensure_future(batcher.submit("running"))
+        await asyncio.sleep(0.02)          # "running" is now inside batch_fn
+        queued = [asyncio.ensure_future(batcher.submit(i)) for i in range(3)]
+        await asyncio.sleep(0.01)
+        await batcher.stop()
+        gate.set()
+        pending = await asyncio.gather(*queued, return_exceptions=True)
+        running_after_stop = batcher.running
+        restarted = await batcher.submit("again")
+        await batcher.stop()
+        first.cancel()
+        return pending, running_after_stop, restarted
+
+    pending, running_after_stop, restarted = run(main())
+    assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in pending)
+    assert not running_after_stop
+    assert restarted == "out:again"
+
+
+def test_invalid_batch_size():
+    try:
+        MicroBatcher(lambda items: items, max_batch_size=0)
+    except ValueError:
+        return
+    raise AssertionError("max_batch_size=0 accepted")
+
+
+if __name__ == "__main__":
+    run_tests(globals(), "micro batcher")
@@ -0,0 +1,232 @@
+"""
+user_context.py
+===============
+
+RAG user-context retrieval for the workout generator.
+
+``fetch_user_context`` reads the member's latest InBody measurement, latest
+muscle-development scan and top strength profiles in ONE round-trip: a
+single statement with three ``LEFT JOIN LATERAL`` subqueries.  asyncpg
+prepares and caches that statement per pooled connection
+(``statement_cache_size``), so after the first call each request is a bind +
+execute.
+
+Older databases may lack some of the tables ("tables may not exist").  When
+the combined statement fails because a table or column is missing, the
+module switches to ``fetch_user_context_parallel``: the three original
+queries run concurrently on separate pooled connections via
+``asyncio.gather``, and each one fails independently.
+
+The functions take the pool as an argument (anything with an asyncpg-style
+``acquire()``), so they can be benchmarked against a stand-in pool.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, List, Optional
+
+INBODY_SQL = """
+    SELECT "MuscleMass", "BodyFatPercentage", "CreatedAt"
+    FROM "InBodyMeasurements"
+    WHERE "UserId" = $1
+    ORDER BY "CreatedAt" DESC
+    LIMIT 1
+"""
+
+SCAN_SQL = """
+    SELECT "UnderdevelopedMuscles", "WellDevelopedMuscles", "ScanDate"
+    FROM "MuscleDevelopmentScans"
+    WHERE "UserId" = $1
+    ORDER BY "ScanDate" DESC
+    LIMIT 1
+"""
+
+STRENGTH_SQL = """
+    SELECT "ExerciseName", "OneRepMax", "ConfidenceScore"
+    FROM "UserStrengthProfiles"
+    WHERE "UserId" = $1
+    ORDER BY "LastUpdated" DESC
+    LIMIT 10
+"""
+
+# All three lookups in one statement / one network round-trip.
+USER_CONTEXT_SQL = """
+    SELECT ib."MuscleMass", ib."BodyFatPercentage", ib.inbody_found,
+           sc."UnderdevelopedMuscles", sc."WellDevelopedMuscles",
+           sc.scan_found,
+           sp.strength
+    FROM (SELECT $1::int AS uid) u
+    LEFT JOIN LATERAL (
+        SELECT "MuscleMass", "BodyFatPercentage", TRUE AS inbody_found
+        FROM "InBodyMeasurements"
+        WHERE "UserId" = u.uid
+        ORDER BY "CreatedAt" DESC
+        LIMIT 1
+    ) ib ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT "UnderdevelopedMuscles", "WellDevelopedMuscles", TRUE AS scan_found
+        FROM "MuscleDevelopmentScans"
+        WHERE "UserId" = u.uid
+        ORDER BY "ScanDate" DESC
+        LIMIT 1
+    ) sc ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+                   'exercise', s."ExerciseName",
+                   'one_rep_max', s."OneRepMax",
+                   'confidence', s."ConfidenceScore")
+                   ORDER BY s."LastUpdated" DESC) AS strength
+        FROM (
+            SELECT "ExerciseName", "OneRepMax", "ConfidenceScore", "LastUpdated"
+            FROM "UserStrengthProfiles"
+            WHERE "UserId" = u.uid
+            ORDER BY "LastUpdated" DESC
+            LIMIT 10
+        ) s
+    ) sp ON TRUE
+"""
+
+# SQLSTATEs meaning "schema doesn't have this table/column" → stop trying the
+# combined statement and use the per-table queries from then on.
+_SCHEMA_SQLSTATES = {"42P01", "42703"}
+_combined_query_supported = True
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    return float(value) if value else None
+
+
+def _inbody_context(muscle_mass: Any, body_fat: Any) -> Dict[str, Any]:
+    return {
+        "muscle_mass_kg": _float_or_none(muscle_mass),
+        "body_fat_percent": _float_or_none(body_fat),
+        "skeletal_muscle_mass": _float_or_none(muscle_mass),
+    }
+
+
+def _scan_context(weak: Any, strong: Any) -> Dict[str, Any]:
+    return {
+        "weak_areas": weak if weak else [],
+        "strong_areas": strong if strong else [],
+    }
+
+
+def _strength_context(rows: List[Any]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "exercise": row["exercise"],
+            "one_rep_max": _float_or_none(row["one_rep_max"]),
+            "confidence": _float_or_none(row["confidence"]),
+        }
+        for row in rows
+    ]
+
+
+def _context_from_combined_row(row: Any, user_id: int) -> Dict[str, Any]:
+    context: Dict[str, Any] = {}
+    if row is None:
+        return context
+    if row["inbody_found"]:
+        context["inbody_data"] = _inbody_context(
+            row["MuscleMass"], row["BodyFatPercentage"])
+        print(f"✅ Retrieved InBody data for user {user_id}")
+    if row["scan_found"]:
+        context["muscle_scan"] = _scan_context(
+            row["UnderdevelopedMuscles"], row["WellDevelopedMuscles"])
+        print(f"✅ Retrieved muscle scan for user {user_id}")
+    strength = row["strength"]
+    if isinstance(strength, str):
+        strength = json.loads(strength)
+    if strength:
+        context["strength_profile"] = _strength_context(strength)
+        print(f"✅ Retrieved {len(strength)} strength profiles for user {user_id}")
+    return context
+
+
+async def fetch_user_context(pool: Any, user_id: int) -> Dict[str, Any]:
+    """
+    Retrieve user context from PostgreSQL using RAG pattern
+    Returns: Dictionary with InBody, MuscleScan, and StrengthProfile data
+    """
+    global _combined_query_supported
+    if not pool:
+        print("⚠️ Database pool not available")
+        return {}
+
+    if _combined_query_supported:
+        try:
+            async with pool.acquire() as conn:
+                row = await conn.fetchrow(USER_CONTEXT_SQL, user_id)
+            return _context_from_combined_row(row, user_id)
+        except Exception as e:
+            if getattr(e, "sqlstate", None) in _SCHEMA_SQLSTATES:
+                _combined_query_supported = False
+                print(f"⚠️ Combined context query unsupported by schema ({e}) "
+                      f"— switching to per-table queries")
+            else:
+                print(f"⚠️ Combined context query failed: {e} — retrying per table")
+
+    return await fetch_user_context_parallel(pool, user_id)
+
+
+async def _fetch_inbody(pool: Any, user_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(INBODY_SQL, user_id)
+        if row:
+            print(f"✅ Retrieved InBody data for user {user_id}")
+            return _inbody_context(row["MuscleMass"], row["BodyFatPercentage"])
+    except Exception as e:
+        print(f"⚠️ InBody query failed: {e}")
+    return None
+
+
+async def _fetch_scan(pool: Any, user_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(SCAN_SQL, user_id)
+        if row:
+            print(f"✅ Retrieved muscle scan for user {user_id}")
+            return _scan_context(row["UnderdevelopedMuscles"], row["WellDevelopedMuscles"])
+    except Exception as e:
+        print(f"⚠️ Muscle scan query failed: {e}")
+    return None
+
+
+async def _fetch_strength(pool: Any, user_id: int) -> Optional[List[Dict[str, Any]]]:
+    try:
+        async with pool.acquire() as conn:
+            rows = await conn.fetch(STRENGTH_SQL, user_id)
+        if rows:
+            print(f"✅ Retrieved {len(rows)} strength profiles for user {user_id}")
+            return _strength_context([
+                {"exercise": r["ExerciseName"], "one_rep_max": r["OneRepMax"],
+                 "confidence": r["ConfidenceScore"]}
+                for r in rows
+            ])
+    except Exception as e:
+        print(f"⚠️ Strength profile query failed: {e}")
+    return None
+
+
+async def fetch_user_context_parallel(pool: Any, user_id: int) -> Dict[str, Any]:
+    """The three per-table queries, each on its own pooled connection, concurrently."""
+    try:
+        inbody, scan, strength = await asyncio.gather(
+            _fetch_inbody(pool, user_id),
+            _fetch_scan(pool, user_id),
+            _fetch_strength(pool, user_id),
+        )
+    except Exception as e:
+        print(f"❌ Error retrieving user context: {e}")
+        return {}
+    context: Dict[str, Any] = {}
+    if inbody:
+        context["inbody_data"] = inbody
+    if scan:
+        context["muscle_scan"] = scan
+    if strength:
+        context["strength_profile"] = strength
+    return context
@@ -2,7 +2,6 @@
 FastAPI service for the trained workout plan generator model
 Matches the C# MLServiceClient expected API contract
 """
-import re
 import sys
 import os
 
@@ -18,6 +17,8 @@ from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel, Field
 from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
 from peft import PeftModel
+from model_output_scanner import scan_model_output
+from injury_keyword_matcher import InjuryKeywordMatcher
 
 # Set UTF-8 encoding for Windows console
 if sys.platform == 'win32':
@@ -170,147 +171,39 @@ def build_prompt(req: MLWorkoutRequest) -> str:
 def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: str = "Muscle", req_level: str = "Intermediate") -> Dict[str, Any]:
     """
     Extract workout data from ML model output and build a structured plan.
-    The model outputs quasi-JSON that we parse with regex patterns.
+    The model outputs quasi-JSON that we parse with model_output_scanner.
 
     IMPORTANT: The model outputs malformed JSON where arrays contain objects 
     without curly braces. Example: "days": ["day_number": 1, "day_name": "..." 
     instead of "days": [{"day_number": 1, "day_name": "..." 
-    This is why regex patterns avoid relying on {} boundaries.
+    This is why the scanner finds records by their keys, not {} boundaries.
     """
 
-    # Extract plan name
-    plan_name_match = re.search(r'"plan_name":\s*"([^"]+)"', text)
-    plan_name = plan_name_match.group(
-        1) if plan_name_match else f"AI {req_goal} Plan"
+    # One pass over the output → plan metadata, exercises and days
+    scanned = scan_model_output(text)
+    plan_name = scanned.plan_name or f"AI {req_goal} Plan"
 
-    # Extract exercises - look for patterns like "name": "Exercise Name"
-    exercises_data = []
-
-    # Pattern to match exercise data - model outputs arrays without {} around objects
-    exercise_pattern = r'"name":\s*"([^"]+)".*?"sets":\s*"?(\d+)"?.*?"reps":\s*"([^"]+)".*?"rest":\s*"([^"]+)"'
-
-    for match in re.finditer(exercise_pattern, text):
-        exercise = {
-            "name": match.group(1),
-            "sets": match.group(2),
-            "reps": match.group(3),
-            "rest": match.group(4)
-        }
-
-        # Try to extract additional fields if present
-        # Look for target_muscles, equipment, notes near this exercise
-        # Search forward from match start to next "name" or end of reasonable distance
-        search_start = match.start()
-        next_name_match = text.find('"name":', match.end())
-        search_end = next_name_match if next_name_match > 0 else min(
-            len(text), match.start() + 500)
-        search_window = text[search_start:search_end]
-
-        muscles_match = re.search(
-            r'"target_muscles":\s*\[([^\]]+)\]', search_window)
-        if muscles_match:
-            muscles = re.findall(r'"([^"]+)"', muscles_match.group(1))
-            exercise["target_muscles"] = muscles
-
-        equipment_match = re.search(r'"equipment":\s*"([^"]+)"', search_window)
-        if equipment_match:
-            exercise["equipment"] = equipment_match.group(1)
-
-        notes_match = re.search(r'"notes":\s*"([^"]+)"', search_window)
-        if notes_match:
-            exercise["notes"] = notes_match.group(1)
-
-        movement_match = re.search(
-            r'"movement_pattern":\s*"([^"]+)"', search_window)
-        if movement_match:
-            exercise["movement_pattern"] = movement_match.group(1)
-
-        exercise_type_match = re.search(
-            r'"exercise_type":\s*"([^"]+)"', search_window)
-        if exercise_type_match:
-            exercise["exercise_type"] = exercise_type_match.group(1)
-
-        exercises_data.append(exercise)
+    # Exercises with name, sets, reps and rest (plus any extra fields found)
+    exercises_data = scanned.exercises
 
     print(f"📊 Extracted {len(exercises_data)} exercises from model output")
 
     # Extract day information - model outputs arrays without {} around objects
     days_data = []
-    day_pattern = r'"day_number":\s*(\d+).*?"day_name":\s*"([^"]+)".*?"focus_areas":\s*\[([^\]]+)\]'
-
-    day_matches = list(re.finditer(day_pattern, text))
-
-    if day_matches:
+    if scanned.days:
         # We found day structures in the output
-        for i, match in enumerate(day_matches):
-            day_number = int(match.group(1))
-            day_name = match.group(2)
-            focus_areas_str = match.group(3)
-            focus_areas = re.findall(r'"([^"]+)"', focus_areas_str)
-
-            # Get exercises for this day
-            start_pos = match.end()
-            end_pos = day_matches[i + 1].start() if i + \
-                1 < len(day_matches) else len(text)
-            day_text = text[start_pos:end_pos]
-
-            # Try to extract estimated_duration_minutes if present
-            duration_match = re.search(
-                r'"estimated_duration_minutes":\s*(\d+)', day_text)
-            estimated_duration = int(
-                duration_match.group(1)) if duration_match else None
-
-            day_exercises = []
-            for ex_match in re.finditer(exercise_pattern, day_text):
-                exercise = {
-                    "name": ex_match.group(1),
-                    "sets": ex_match.group(2),
-                    "reps": ex_match.group(3),
-                    "rest": ex_match.group(4)
-                }
-
-                # Extract additional fields for each exercise in the day
-                ex_start = ex_match.start()
-                next_ex = day_text.find('"name":', ex_match.end())
-                ex_end = next_ex if next_ex > 0 else len(day_text)
-                ex_window = day_text[ex_start:ex_end]
-
-                muscles_match = re.search(
-                    r'"target_muscles":\s*\[([^\]]+)\]', ex_window)
-                if muscles_match:
-                    exercise["target_muscles"] = re.findall(
-                        r'"([^"]+)"', muscles_match.group(1))
-
-                equipment_match = re.search(
-                    r'"equipment":\s*"([^"]+)"', ex_window)
-                if equipment_match:
-                    exercise["equipment"] = equipment_match.group(1)
-
-                notes_match = re.search(r'"notes":\s*"([^"]+)"', ex_window)
-                if notes_match:
-                    exercise["notes"] = notes_match.group(1)
-
-                movement_match = re.search(
-                    r'"movement_pattern":\s*"([^"]+)"', ex_window)
-                if movement_match:
-                    exercise["movement_pattern"] = movement_match.group(1)
-
-                exercise_type_match = re.search(
-                    r'"exercise_type":\s*"([^"]+)"', ex_window)
-                if exercise_type_match:
-                    exercise["exercise_type"] = exercise_type_match.group(1)
-
-                day_exercises.append(exercise)
+        for i, scanned_day in enumerate(scanned.days):
+            day_exercises = scanned_day["exercises"]
 
             day_dict = {
-                "day_number": day_number,
-                "day_name": day_name,
-                "focus_areas": focus_areas,
+                "day_number": scanned_day["day_number"],
+                "day_name": scanned_day["day_name"],
+                "focus_areas": scanned_day["focus_areas"],
                 "exercises": day_exercises if day_exercises else exercises_data[i*3:(i+1)*3] if exercises_data else []
             }
 
-            if estimated_duration:
-                day_dict["estimated_duration_minutes"] = estimated_duration
+            if scanned_day.get("estimated_duration_minutes"):
+                day_dict["estimated_duration_minutes"] = scanned_day["estimated_duration_minutes"]
 
             days_data.append(day_dict)
     else:
@@ -363,40 +256,14 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
         "days": days_data
     }
 
-    # Try to extract program_duration_weeks if present in model output
-    duration_match = re.search(r'"program_duration_weeks":\s*(\d+)', text)
-    if duration_match:
-        plan["program_duration_weeks"] = int(duration_match.group(1))
+    # Plan-level fields, if present in model output
+    if scanned.program_duration_weeks is not None:
+        plan["program_duration_weeks"] = scanned.program_duration_weeks
 
-    # Try to extract notes if present in model output
-    notes_match = re.search(r'"notes":\s*"([^"]+)"', text)
-    if notes_match:
-        plan["notes"] = notes_match.group(1)
-    else:
-        plan["notes"] = "Generated by AI - exercises extracted from model output"
+    plan["notes"] = scanned.notes or "Generated by AI - exercises extracted from model output"
 
-    # Try to extract progressive_overload if present (may be nested object)
-    prog_overload_match = re.search(
-        r'"progressive_overload":\s*\{([^}]+)\}', text)
-    if prog_overload_match:
-        prog_obj = {}
-        prog_content = prog_overload_match.group(1)
-
-        prog_type_match = re.search(r'"type":\s*"([^"]+)"', prog_content)
-        if prog_type_match:
-            prog_obj["type"] = prog_type_match.group(1)
-
-        prog_progression_match = re.search(
-            r'"progression":\s*"([^"]+)"', prog_content)
-        if prog_progression_match:
-            prog_obj["progression"] = prog_progression_match.group(1)
-
-        prog_deload_match = re.search(r'"deload":\s*"([^"]+)"', prog_content)
-        if prog_deload_match:
-            prog_obj["deload"] = prog_deload_match.group(1)
-
-        if prog_obj:
-            plan["progressive_overload"] = prog_obj
+    if scanned.progressive_overload:
+        plan["progressive_overload"] = scanned.progressive_overload
 
     return plan
 
@@ -585,14 +452,13 @@ INJURY_SAFE_REPLACEMENTS: Dict[str, Dict[str, List[Dict[str, str]]]] = {
 }
 
 
+# All blacklists compiled into one automaton (see injury_keyword_matcher.py)
+INJURY_MATCHER = InjuryKeywordMatcher(INJURY_EXERCISE_BLACKLIST)
+
+
 def _is_exercise_unsafe(exercise_name: str, injury: str) -> bool:
     """Check if an exercise is unsafe for a given injury."""
-    blacklist = INJURY_EXERCISE_BLACKLIST.get(injury, [])
-    name_lower = exercise_name.lower()
-    for keyword in blacklist:
-        if keyword.lower() in name_lower:
-            return True
-    return False
+    return INJURY_MATCHER.is_unsafe(exercise_name, injury)
 
 
 def _get_replacement(injury: str, focus_hint: str, used_names: set) -> Optional[Dict[str, str]]:
@@ -641,16 +507,10 @@ def filter_exercises_for_injuries(plan: Dict[str, Any], injuries: List[str]) ->
         for exercise in day.get("exercises", []):
             ex_name = exercise.get("name", "")
 
-            # Check against ALL reported injuries
-            is_unsafe = False
-            triggering_injury = ""
-            for injury in injuries:
-                if _is_exercise_unsafe(ex_name, injury):
-                    is_unsafe = True
-                    triggering_injury = injury
-                    break
+            # Check against ALL reported injuries (one scan of the name)
+            triggering_injury = INJURY_MATCHER.first_unsafe(ex_name, injuries)
 
-            if is_unsafe:
+            if triggering_injury:
                 removed_count += 1
                 # Try to find a safe replacement
                 replacement = _get_replacement(triggering_injury, focus_hint, used_names)
@@ -2,29 +2,61 @@
 FastAPI service with direct database access for frontend integration
 Optimized for performance - frontend calls directly, retrieves user context via RAG
 """
-import csv as _csv
 import asyncio
+import hmac
+import itertools
 import json
+import random
+import threading
 import time
 import asyncpg
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import Optional, List, Dict, Any
-from fastapi import FastAPI, HTTPException, Header
+from typing import Optional, List, Dict, Any, AsyncIterator, Callable
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel, Field
-from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
-from peft import PeftModel
+from micro_batcher import MicroBatcher
+from exercise_catalog import (
+    DAY_EXCLUSIONS, FOCUS_MUSCLE_MAP, ExerciseIndex, WarmupCardioPools, equipment_aliases,
+    load_calisthenics, load_unique_exercises, load_workout_goal_templates,
+)
+from compiled_catalog import CompiledCatalog, DEFAULT_FILENAME as CATALOG_FILENAME
+from exercise_name_resolver import ExerciseNameResolver
+from injury_keyword_matcher import InjuryKeywordMatcher
+from stage_metrics import MetricsRegistry, StageTimer
+from user_context import fetch_user_context
+from context_cache import RedisBackend, UserContextCache
+from plan_cache import PlanResultCache
+from model_loader import ModelLoader
+from model_output_scanner import ModelOutputScanner, scan_model_output
+# Movement-pattern injury rules (Layer 0) — imported once here, not per request
+try:
+    from injury_rules_engine import (
+        DEFAULT_ENGINE as INJURY_ENGINE, DurationCategory, InjuryInput, InjuryRegion,
+        InjuryType, Severity,
+    )
+    INJURY_RULES_AVAILABLE = True
+except ImportError as _e:
+    print(f"⚠️ injury_rules_engine not importable ({_e}) — skipping Layer-0 filter")
+    INJURY_RULES_AVAILABLE = False
+# Bulk screening (/injury-screening/batch) — a failure here must not disable Layer 0
+try:
+    from injury_screening import BatchScreener, ndjson_lines
+    INJURY_SCREENING_AVAILABLE = True
+except ImportError as _e:
+    print(f"⚠️ injury_screening not importable ({_e}) — /injury-screening/batch disabled")
+    INJURY_SCREENING_AVAILABLE = False
 import re
-import torch
 import sys
 import os
 
 # Fix OMP: Error #15: Initializing libomp.dll, but found libiomp5md.dll already initialized.
+# Must be set before torch loads — torch is imported only inside model_loader.py
+# (ModelLoader), which also imports it ahead of transformers/peft for Windows DLLs.
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
-# torch MUST be imported before peft/transformers so its DLLs load correctly on Windows
-
-
 # Set UTF-8 encoding for Windows console
 if sys.platform == 'win32':
     sys.stdout.reconfigure(encoding='utf-8')  # type: ignore
@@ -32,42 +64,63 @@ if sys.platform == 'win32':
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_DIR = os.path.join(SCRIPT_DIR, "models", "workout-generator-v3")
+# LoRA already folded into the weights (python model_loader.py --export-merged);
+# used instead of base + adapter when present.
+MERGED_MODEL_DIR = os.environ.get(
+    "WORKOUT_MERGED_MODEL_DIR", os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-merged"))
 BASE_MODEL = "google/flan-t5-small"
 MODEL_VERSION = "v3.0.0-direct"
 
+# Micro-batching for model.generate — prompts arriving within the window are
+# padded into one tokenizer batch and decoded together.
+BATCH_WINDOW_MS = float(os.environ.get("WORKOUT_BATCH_WINDOW_MS", "8"))
+BATCH_MAX_SIZE = int(os.environ.get("WORKOUT_BATCH_MAX_SIZE", "8"))
+
+# "eager": load the model at import (default).  "background": bind the port
+# first and load in a worker thread; /generate-direct answers 503 until ready.
+MODEL_LOAD_MODE = os.environ.get("WORKOUT_MODEL_LOAD_MODE", "eager").lower()
+# Inference backend: "torch" (default), "int8" (dynamic int8 quantization on
+# CPU) or "onnx" (ONNX Runtime export from `python model_loader.py --export-onnx`)
+MODEL_BACKEND = os.environ.get("WORKOUT_MODEL_BACKEND", "torch").lower()
+ONNX_MODEL_DIR = os.environ.get(
+    "WORKOUT_ONNX_MODEL_DIR", os.path.join(SCRIPT_DIR, "models", "workout-generator-v3-onnx"))
+
+# Deterministic plan-result cache (raw model output + parsed plan per prompt).
+# Set WORKOUT_PLAN_CACHE_DIR="" to keep it in memory only.
+PLAN_CACHE_MEMORY_ENTRIES = int(os.environ.get("WORKOUT_PLAN_CACHE_MEMORY_ENTRIES", "512"))
+PLAN_CACHE_DIR = os.environ.get(
+    "WORKOUT_PLAN_CACHE_DIR", os.path.join(SCRIPT_DIR, "cache", "plan_results"))
+PLAN_CACHE_DISK_MB = float(os.environ.get("WORKOUT_PLAN_CACHE_DISK_MB", "64"))
+
+# /generate-direct/stream bypasses the batcher (one greedy generate per
+# stream); this caps how many run at once next to the batcher's worker.
+STREAM_MAX_CONCURRENCY = int(os.environ.get("WORKOUT_STREAM_MAX_CONCURRENCY", "2"))
+
+# /injury-screening/batch runs inline by default: parsing stays in this process,
+# so the pool measured slower than inline (bench_injury_screening.py).  With
+# SCREENING_WORKERS > 0, chunks with at least POOL_MIN_PROFILES new injury
+# profiles are spread over that many processes instead.
+SCREENING_WORKERS = int(os.environ.get("WORKOUT_SCREENING_WORKERS", "0"))
+SCREENING_CHUNK_LINES = int(os.environ.get("WORKOUT_SCREENING_CHUNK_LINES", "512"))
+SCREENING_POOL_MIN_PROFILES = int(os.environ.get("WORKOUT_SCREENING_POOL_MIN_PROFILES", "64"))
+
 print("=" * 60)
 print("🏋️ Starting Workout Plan Generator API (Direct Mode)")
 print("=" * 60)
 print(f"📂 Model Directory: {MODEL_DIR}")
 print(f"🤖 Base Model: {BASE_MODEL}")
-print("⏳ Loading model... (this may take a few moments)")
-
-# Determine device
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print(f"🖥️ Using device: {device}")
 
-try:
-    tokenizer = AutoTokenizer.from_pretrained(BASE_MODEL)
-    print("✅ Tokenizer loaded")
+MODEL_LOADER = ModelLoader(BASE_MODEL, MODEL_DIR, merged_dir=MERGED_MODEL_DIR,
+                           backend=MODEL_BACKEND, onnx_dir=ONNX_MODEL_DIR)
+device = MODEL_LOADER.device
+print(f"🖥️ Using device: {device} (backend: {MODEL_BACKEND})")
 
-    # Optimize: Use float16 for GPU inference (faster + less VRAM)
-    torch_dtype = torch.float16 if device == "cuda" else torch.float32
-    print(f"   Dtype: {torch_dtype}")
-
-    base_model = AutoModelForSeq2SeqLM.from_pretrained(
-        BASE_MODEL, torch_dtype=torch_dtype
-    )
-    print("✅ Base model loaded")
-    model = PeftModel.from_pretrained(base_model, MODEL_DIR)
-    model = model.to(device)
-    print("✅ LoRA adapter loaded")
-    model.eval()
-    print("✅ Model ready for inference")
+if MODEL_LOAD_MODE == "background":
+    print("⏳ Model will load in the background after startup")
+else:
+    print("⏳ Loading model... (this may take a few moments)")
+    MODEL_LOADER.load()
     print("=" * 60)
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
-    print(f"❌ Please check that the model files exist in: {MODEL_DIR}")
-    raise
 
 app = FastAPI(
     title="Workout Plan Generator ML Service (Direct)",
@@ -88,18 +141,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ============================================================
+# Metrics — per-stage histograms exposed at /metrics
+# ============================================================
+
+METRICS = MetricsRegistry()
+STAGE_SECONDS = METRICS.histogram(
+    "workout_stage_duration_seconds",
+    "Per-request time spent in each /generate-direct pipeline stage.",
+    label="stage")
+REQUEST_SECONDS = METRICS.histogram(
+    "workout_request_duration_seconds",
+    "End-to-end request latency.",
+    label="endpoint")
+
 # Database connection pool
 db_pool: Optional[asyncpg.Pool] = None
 
-# Database configuration (from appsettings.Development.json)
+# Database configuration (defaults from appsettings.Development.json)
 DB_CONFIG = {
-    "host": "localhost",
-    "port": 5432,
-    "database": "PulseGym_v1.0.1",
-    "user": "postgres",
-    "password": "123"
+    "host": os.environ.get("WORKOUT_DB_HOST", "localhost"),
+    "port": int(os.environ.get("WORKOUT_DB_PORT", "5432")),
+    "database": os.environ.get("WORKOUT_DB_NAME", "PulseGym_v1.0.1"),
+    "user": os.environ.get("WORKOUT_DB_USER", "postgres"),
+    "password": os.environ.get("WORKOUT_DB_PASSWORD", "123"),
+    # Pool sizing and timeouts
+    "min_size": int(os.environ.get("WORKOUT_DB_POOL_MIN", "2")),
+    "max_size": int(os.environ.get("WORKOUT_DB_POOL_MAX", "10")),
+    "command_timeout_s": float(os.environ.get("WORKOUT_DB_COMMAND_TIMEOUT_S", "5")),
+    "statement_timeout_ms": int(os.environ.get("WORKOUT_DB_STATEMENT_TIMEOUT_MS", "3000")),
+    # Prepared statements cached per connection (0 disables, e.g. behind pgbouncer)
+    "statement_cache_size": int(os.environ.get("WORKOUT_DB_STATEMENT_CACHE", "100")),
 }
 
+# User-context cache (TTL 0 disables).  Set WORKOUT_CONTEXT_CACHE_REDIS_URL to
+# share entries between uvicorn workers.  The invalidation endpoint requires
+# the X-Cache-Token header to match WORKOUT_CACHE_INVALIDATE_TOKEN, and only
+# reaches every worker through Redis: without it, other workers (uvicorn's
+# WEB_CONCURRENCY > 1) drop their copy within WORKOUT_CONTEXT_CACHE_LOCAL_TTL_S.
+CONTEXT_CACHE_TTL_S = float(os.environ.get("WORKOUT_CONTEXT_CACHE_TTL_S", "300"))
+CONTEXT_CACHE_MAX_ENTRIES = int(os.environ.get("WORKOUT_CONTEXT_CACHE_MAX_ENTRIES", "2048"))
+CONTEXT_CACHE_LOCAL_TTL_S = float(os.environ.get("WORKOUT_CONTEXT_CACHE_LOCAL_TTL_S", "5"))
+CONTEXT_CACHE_REDIS_URL = os.environ.get("WORKOUT_CONTEXT_CACHE_REDIS_URL", "")
+UVICORN_WORKERS = int(os.environ.get("WEB_CONCURRENCY", "1"))
+CACHE_INVALIDATE_TOKEN = os.environ.get("WORKOUT_CACHE_INVALIDATE_TOKEN", "")
+
+
+def _build_context_cache() -> UserContextCache:
+    backend = None
+    if CONTEXT_CACHE_REDIS_URL:
+        try:
+            backend = RedisBackend(CONTEXT_CACHE_REDIS_URL)
+            print("✅ User-context cache shared via Redis")
+        except ImportError:
+            print("⚠️ redis package not installed — user-context cache is per-worker only")
+    return UserContextCache(
+        ttl_s=CONTEXT_CACHE_TTL_S,
+        max_entries=CONTEXT_CACHE_MAX_ENTRIES,
+        backend=backend,
+        local_ttl_s=CONTEXT_CACHE_LOCAL_TTL_S,
+        workers=UVICORN_WORKERS,
+    )
+
+
+user_context_cache = _build_context_cache()
+METRICS.counter("workout_user_context_cache_lookups_total",
+                "User-context cache lookups by outcome.",
+                lambda: {"local_hit": user_context_cache.local_hits,
+                         "shared_hit": user_context_cache.shared_hits,
+                         "miss": user_context_cache.misses},
+                label="result")
+
 
 # ============================================================
 # Database Connection Management
@@ -115,18 +227,35 @@ async def startup():
             database=DB_CONFIG["database"],
             user=DB_CONFIG["user"],
             password=DB_CONFIG["password"],
-            min_size=2,
-            max_size=10
+            min_size=DB_CONFIG["min_size"],
+            max_size=DB_CONFIG["max_size"],
+            command_timeout=DB_CONFIG["command_timeout_s"],
+            statement_cache_size=DB_CONFIG["statement_cache_size"],
+            server_settings={
+                "statement_timeout": str(DB_CONFIG["statement_timeout_ms"])},
         )
         print("✅ Database connection pool created")
     except Exception as e:
         print(f"❌ Failed to create database pool: {e}")
         raise
+    if INJURY_SCREENER is not None:
+        # Fork the screening workers before the loader/batcher threads exist
+        INJURY_SCREENER.start()
+    if not MODEL_LOADER.ready:
+        MODEL_LOADER.start_background()
+        print("⏳ Model loading in background — /health reports progress")
+    generation_batcher.start()
+    print(f"✅ Generation batcher started (window={BATCH_WINDOW_MS}ms, "
+          f"max_batch={BATCH_MAX_SIZE})")
 
 
 @app.on_event("shutdown")
 async def shutdown():
     global db_pool
+    await generation_batcher.stop()
+    stream_executor.shutdown(wait=False, cancel_futures=True)
+    if INJURY_SCREENER is not None:
+        INJURY_SCREENER.shutdown()
     if db_pool:
         await db_pool.close()
         print("✅ Database connection pool closed")
@@ -145,6 +274,9 @@ class DirectWorkoutRequest(BaseModel):
     equipment: List[str] = Field(default_factory=list)
     injuries: List[str] = Field(default_factory=list)
     include_user_context: bool = False  # Default to false since tables may not exist
+    debug: bool = False  # Return per-stage timings in the response
+    # Seeds the request's RNG (DB fill + warmup picks); same seed → same plan
+    seed: Optional[int] = None
 
 
 class DirectWorkoutResponse(BaseModel):
@@ -155,6 +287,8 @@ class DirectWorkoutResponse(BaseModel):
     generation_latency_ms: int = 0
     user_context_retrieved: bool = False
     error: Optional[str] = None
+    stage_timings_ms: Optional[Dict[str, float]] = None  # only when debug=True
+    seed: Optional[int] = None  # send back as `seed` to reproduce this plan
 
 
 class SavePlanRequest(BaseModel):
@@ -173,83 +307,11 @@ async def retrieve_user_context(user_id: int) -> Dict[str, Any]:
     """
     Retrieve user context from PostgreSQL using RAG pattern
     Returns: Dictionary with InBody, MuscleScan, and StrengthProfile data
+    One round-trip (LATERAL joins) — see user_context.py.
+    Served from user_context_cache when fresh — see context_cache.py.
     """
-    if not db_pool:
-        print("⚠️ Database pool not available")
-        return {}
-
-    context = {}
-
-    try:
-        async with db_pool.acquire() as conn:
-            # 1. Get latest InBody measurement
-            try:
-                inbody_row = await conn.fetchrow("""
-                    SELECT "MuscleMass", "BodyFatPercentage", "CreatedAt"
-                    FROM "InBodyMeasurements"
-                    WHERE "UserId" = $1
-                    ORDER BY "CreatedAt" DESC
-                    LIMIT 1
-                """, user_id)
-
-                if inbody_row:
-                    context["inbody_data"] = {
-                        "muscle_mass_kg": float(inbody_row["MuscleMass"]) if inbody_row["MuscleMass"] else None,
-                        "body_fat_percent": float(inbody_row["BodyFatPercentage"]) if inbody_row["BodyFatPercentage"] else None,
-                        "skeletal_muscle_mass": float(inbody_row["MuscleMass"]) if inbody_row["MuscleMass"] else None
-                    }
-                    print(f"✅ Retrieved InBody data for user {user_id}")
-            except Exception as e:
-                print(f"⚠️ InBody query failed: {e}")
-
-            # 2. Get latest muscle development scan
-            try:
-                scan_row = await conn.fetchrow("""
-                    SELECT "UnderdevelopedMuscles", "WellDevelopedMuscles", "ScanDate"
-                    FROM "MuscleDevelopmentScans"
-                    WHERE "UserId" = $1
-                    ORDER BY "ScanDate" DESC
-                    LIMIT 1
-                """, user_id)
-
-                if scan_row:
-                    context["muscle_scan"] = {
-                        "weak_areas": scan_row["UnderdevelopedMuscles"] if scan_row["UnderdevelopedMuscles"] else [],
-                        "strong_areas": scan_row["WellDevelopedMuscles"] if scan_row["WellDevelopedMuscles"] else []
-                    }
-                    print(f"✅ Retrieved muscle scan for user {user_id}")
-            except Exception as e:
-                print(f"⚠️ Muscle scan query failed: {e}")
-
-            # 3. Get strength profile (top exercises)
-            try:
-                strength_rows = await conn.fetch("""
-                    SELECT "ExerciseName", "OneRepMax", "ConfidenceScore"
-                    FROM "UserStrengthProfiles"
-                    WHERE "UserId" = $1
-                    ORDER BY "LastUpdated" DESC
-                    LIMIT 10
-                """, user_id)
-
-                if strength_rows:
-                    context["strength_profile"] = [
-                        {
-                            "exercise": row["ExerciseName"],
-                            "one_rep_max": float(row["OneRepMax"]) if row["OneRepMax"] else None,
-                            "confidence": float(row["ConfidenceScore"]) if row["ConfidenceScore"] else None
-                        }
-                        for row in strength_rows
-                    ]
-                    print(
-                        f"✅ Retrieved {len(strength_rows)} strength profiles for user {user_id}")
-            except Exception as e:
-                print(f"⚠️ Strength profile query failed: {e}")
-
-        return context
-
-    except Exception as e:
-        print(f"❌ Error retrieving user context: {e}")
-        return {}
+    return await user_context_cache.get_or_load(
+        user_id, lambda uid: fetch_user_context(db_pool, uid))
 
 
 def _infer_goal_from_inbody(context: Dict[str, Any], user_goal: str) -> tuple[str, str]:
@@ -480,21 +542,22 @@ def enrich_exercise_with_metadata(exercise: dict) -> dict:
     """
     Enrich an exercise dict with image_url, description, and video_url.
     Lookup order:
-      1. EXERCISE_DB_BY_NAME (from unique_exercises.csv — full instructions)
-      2. EXERCISE_METADATA_FALLBACK (legacy hardcoded dict)
-      3. Procedural fallback
+      1. EXERCISE_DB_BY_NAME, exact name (from unique_exercises.csv — full instructions)
+      2. EXERCISE_METADATA_FALLBACK (legacy hardcoded dict, curated names)
+      3. EXERCISE_DB_BY_NAME via the fuzzy name resolver
+      4. Procedural fallback
     """
     name = exercise.get("name", "")
     name_lower = name.lower().strip()
 
     # ── Primary: unique_exercises.csv data ──
     db_entry = EXERCISE_DB_BY_NAME.get(name_lower)
-    if not db_entry:
-        # Fuzzy fallback — try partial name match
-        for db_key, db_val in EXERCISE_DB_BY_NAME.items():
-            if (name_lower in db_key or db_key in name_lower) and len(min(name_lower, db_key, key=len)) > 4:
-                db_entry = db_val
-                break
+    if not db_entry and name not in EXERCISE_METADATA_FALLBACK:
+        # Fuzzy fallback — ranked token/trigram match (cached).  Curated
+        # names skip it: their hand-written entry beats a near match.
+        resolved = EXERCISE_NAME_RESOLVER.resolve(name_lower)
+        if resolved:
+            db_entry = EXERCISE_DB_BY_NAME.get(resolved)
 
     if db_entry:
         exercise["image_url"] = db_entry.get(
@@ -529,6 +592,63 @@ def enrich_exercise_with_metadata(exercise: dict) -> dict:
 #     pass
 
 
+def _equipment_ok(exercise: Dict[str, Any], req_equipment: Optional[List[str]]) -> bool:
+    """True if *exercise* is bodyweight, unlabelled, or uses requested equipment."""
+    if not req_equipment:
+        return True
+    ex_eq = exercise.get("equipment", "").lower()
+    is_bodyweight = "body" in ex_eq and "weight" in ex_eq or ex_eq == "bodyweight"
+    return is_bodyweight or not ex_eq or any(
+        eq.lower() in ex_eq or ex_eq in eq.lower() for eq in req_equipment)
+
+
+def _day_from_scan(scanned_day: Dict[str, Any], exercises_pool: List[Dict[str, Any]],
+                   req_equipment: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Build a plan day from a scanner day event.  Exercises that don't match
+    the requested equipment are dropped; an empty day borrows up to 5
+    exercises matching its focus from *exercises_pool* (the whole output's
+    exercises, already equipment-filtered).
+    """
+    focus_areas = scanned_day["focus_areas"]
+    estimated_duration = scanned_day.get("estimated_duration_minutes")
+
+    # Exercises for this day (already deduplicated within the day)
+    day_exercises = []
+    seen_in_day = set()
+    for exercise in scanned_day["exercises"]:
+        seen_in_day.add(exercise["name"].lower())
+        if _equipment_ok(exercise, req_equipment):
+            day_exercises.append(exercise)
+
+    # If per-day parsing found nothing, try to assign from global pool
+    if not day_exercises and exercises_pool:
+        # Match exercises by focus area / muscle group (use full phrases)
+        for ex in exercises_pool:
+            ex_muscles = " ".join(ex.get("target_muscles", [])).lower()
+            ex_name_lower = ex.get("name", "").lower()
+            combined = f"{ex_muscles} {ex_name_lower}"
+            if any(fa.lower() in combined for fa in focus_areas):
+                if ex["name"].lower() not in seen_in_day:
+                    day_exercises.append(ex.copy())
+                    seen_in_day.add(ex["name"].lower())
+                    if len(day_exercises) >= 5:
+                        break
+
+    day_dict = {
+        "day_number": scanned_day["day_number"],
+        "day_name": scanned_day["day_name"],
+        "focus_areas": focus_areas,
+        "focus": ", ".join(focus_areas) if focus_areas else "General",
+        "exercises": day_exercises
+    }
+
+    if estimated_duration:
+        day_dict["estimated_duration_minutes"] = estimated_duration
+
+    return day_dict
+
+
 def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: str = "Muscle", req_level: str = "Intermediate", req_equipment: List[str] = None) -> Dict[str, Any]:
     """
     Extract workout data from ML model output and build a structured plan.
@@ -536,86 +656,28 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
       - Exercise deduplication (no repeated exercises within a day)
       - Smart muscle-group-based exercise distribution
       - Equipment filtering before enrichment
-      - Better regex handling for malformed model output
+      - Single-pass scanning of malformed / truncated model output
+        (model_output_scanner — no backtracking regexes)
     """
-    # ── Step 1: Extract plan-level metadata ──
-    plan_name_match = re.search(r'"plan_name":\s*"([^"]+)"', text)
-    plan_name = plan_name_match.group(
-        1) if plan_name_match else f"AI {req_goal} Plan"
+    # ── Step 1–2: One pass over the output → metadata, exercises, days ──
+    scanned = scan_model_output(text)
+    plan_name = scanned.plan_name or f"AI {req_goal} Plan"
 
-    # ── Step 2: Extract ALL exercises from the raw text ──
-    exercises_data = []
-    seen_exercises_global = set()  # Deduplicate globally
-    exercise_pattern = r'"name":\s*"([^"]+)".*?"sets":\s*"?(\d+)"?.*?"reps":\s*"([^"]+)".*?"rest":\s*"([^"]+)"'
-
-    for match in re.finditer(exercise_pattern, text):
-        ex_name = match.group(1).strip()
-
-        # Skip if we've already seen this exercise
-        if ex_name.lower() in seen_exercises_global:
-            continue
-        seen_exercises_global.add(ex_name.lower())
-
-        exercise = {
-            "name": ex_name,
-            "sets": match.group(2),
-            "reps": match.group(3),
-            "rest": match.group(4)
-        }
-
-        # Extract additional fields from a search window after this exercise
-        search_start = match.start()
-        next_name_match = text.find('"name":', match.end())
-        search_end = next_name_match if next_name_match > 0 else min(
-            len(text), match.start() + 500)
-        search_window = text[search_start:search_end]
-
-        muscles_match = re.search(
-            r'"target_muscles":\s*\[([^\]]+)\]', search_window)
-        if muscles_match:
-            exercise["target_muscles"] = re.findall(
-                r'"([^"]+)"', muscles_match.group(1))
-
-        equipment_match = re.search(r'"equipment":\s*"([^"]+)"', search_window)
-        if equipment_match:
-            exercise["equipment"] = equipment_match.group(1)
-
-        notes_match = re.search(r'"notes":\s*"([^"]+)"', search_window)
-        if notes_match:
-            exercise["notes"] = notes_match.group(1)
-
-        movement_match = re.search(
-            r'"movement_pattern":\s*"([^"]+)"', search_window)
-        if movement_match:
-            exercise["movement_pattern"] = movement_match.group(1)
-
-        exercise_type_match = re.search(
-            r'"exercise_type":\s*"([^"]+)"', search_window)
-        if exercise_type_match:
-            exercise["exercise_type"] = exercise_type_match.group(1)
-
-        exercises_data.append(exercise)
+    # All complete exercises, deduplicated globally by name
+    exercises_data = scanned.exercises
 
     print(
         f"📊 Extracted {len(exercises_data)} unique exercises from model output")
 
     # ── Step 3: Equipment filter (before enrichment) ──
     if req_equipment:
-        equipment_lower = [eq.lower() for eq in req_equipment]
-        filtered = []
-        for ex in exercises_data:
-            ex_eq = ex.get("equipment", "").lower()
-            is_bodyweight = "body" in ex_eq and "weight" in ex_eq or ex_eq == "bodyweight"
-            if is_bodyweight or not ex_eq or any(eq in ex_eq or ex_eq in eq for eq in equipment_lower):
-                filtered.append(ex)
+        filtered = [ex for ex in exercises_data if _equipment_ok(ex, req_equipment)]
         print(
             f"   🔧 Equipment filter: {len(exercises_data)} → {len(filtered)} exercises")
         exercises_data = filtered
 
     # ── Step 4: Parse day structures from model output ──
     days_data = []
-    day_pattern = r'"day_number":\s*(\d+).*?"day_name":\s*"([^"]+)".*?"focus_areas":\s*\[([^\]]+)\]'
-    day_matches = list(re.finditer(day_pattern, text))
 
     # Define day templates — must match the training split templates
     day_templates = {
@@ -639,108 +701,10 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
     }
     templates = day_templates.get(req_days, day_templates[4])
 
-    if day_matches:
+    if scanned.days:
         # ── Path A: Model generated day structures ──
-        for i, match in enumerate(day_matches):
-            day_number = int(match.group(1))
-            day_name = match.group(2)
-            focus_areas_str = match.group(3)
-            focus_areas = re.findall(r'"([^"]+)"', focus_areas_str)
-
-            # Extract the text segment for THIS day only
-            start_pos = match.end()
-            end_pos = day_matches[i + 1].start() if i + \
-                1 < len(day_matches) else len(text)
-            day_text = text[start_pos:end_pos]
-
-            # Parse duration if present
-            duration_match = re.search(
-                r'"estimated_duration_minutes":\s*(\d+)', day_text)
-            estimated_duration = int(
-                duration_match.group(1)) if duration_match else None
-
-            # Extract exercises for this day (with per-day dedup)
-            day_exercises = []
-            seen_in_day = set()
-            for ex_match in re.finditer(exercise_pattern, day_text):
-                ex_name = ex_match.group(1).strip()
-                if ex_name.lower() in seen_in_day:
-                    continue  # Skip duplicate within this day
-                seen_in_day.add(ex_name.lower())
-
-                exercise = {
-                    "name": ex_name,
-                    "sets": ex_match.group(2),
-                    "reps": ex_match.group(3),
-                    "rest": ex_match.group(4)
-                }
-
-                # Extract additional fields
-                ex_start = ex_match.start()
-                next_ex = day_text.find('"name":', ex_match.end())
-                ex_end = next_ex if next_ex > 0 else len(day_text)
-                ex_window = day_text[ex_start:ex_end]
-
-                muscles_match = re.search(
-                    r'"target_muscles":\s*\[([^\]]+)\]', ex_window)
-                if muscles_match:
-                    exercise["target_muscles"] = re.findall(
-                        r'"([^"]+)"', muscles_match.group(1))
-
-                equipment_match = re.search(
-                    r'"equipment":\s*"([^"]+)"', ex_window)
-                if equipment_match:
-                    exercise["equipment"] = equipment_match.group(1)
-
-                notes_match = re.search(r'"notes":\s*"([^"]+)"', ex_window)
-                if notes_match:
-                    exercise["notes"] = notes_match.group(1)
-
-                movement_match = re.search(
-                    r'"movement_pattern":\s*"([^"]+)"', ex_window)
-                if movement_match:
-                    exercise["movement_pattern"] = movement_match.group(1)
-
-                exercise_type_match = re.search(
-                    r'"exercise_type":\s*"([^"]+)"', ex_window)
-                if exercise_type_match:
-                    exercise["exercise_type"] = exercise_type_match.group(1)
-
-                # Equipment filter for per-day exercises
-                if req_equipment:
-                    ex_eq = exercise.get("equipment", "").lower()
-                    is_bw = "body" in ex_eq and "weight" in ex_eq or ex_eq == "bodyweight"
-                    if ex_eq and not is_bw and not any(eq in ex_eq or ex_eq in eq for eq in equipment_lower):
-                        continue  # Skip exercise that doesn't match equipment
-
-                day_exercises.append(exercise)
-
-            # If per-day parsing found nothing, try to assign from global pool
-            if not day_exercises and exercises_data:
-                # Match exercises by focus area / muscle group (use full phrases)
-                for ex in exercises_data:
-                    ex_muscles = " ".join(ex.get("target_muscles", [])).lower()
-                    ex_name_lower = ex.get("name", "").lower()
-                    combined = f"{ex_muscles} {ex_name_lower}"
-                    if any(fa.lower() in combined for fa in focus_areas):
-                        if ex["name"].lower() not in seen_in_day:
-                            day_exercises.append(ex.copy())
-                            seen_in_day.add(ex["name"].lower())
-                            if len(day_exercises) >= 5:
-                                break
-
-            day_dict = {
-                "day_number": day_number,
-                "day_name": day_name,
-                "focus_areas": focus_areas,
-                "focus": ", ".join(focus_areas) if focus_areas else "General",
-                "exercises": day_exercises
-            }
-
-            if estimated_duration:
-                day_dict["estimated_duration_minutes"] = estimated_duration
-
-            days_data.append(day_dict)
+        for scanned_day in scanned.days:
+            days_data.append(_day_from_scan(scanned_day, exercises_data, req_equipment))
 
         # Fill missing days if model didn't generate enough
         if len(days_data) < req_days:
@@ -879,37 +843,13 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
         "days": days_data
     }
 
-    duration_match = re.search(r'"program_duration_weeks":\s*(\d+)', text)
-    if duration_match:
-        plan["program_duration_weeks"] = int(duration_match.group(1))
+    if scanned.program_duration_weeks is not None:
+        plan["program_duration_weeks"] = scanned.program_duration_weeks
 
-    notes_match = re.search(r'"notes":\s*"([^"]+)"', text)
-    if notes_match:
-        plan["notes"] = notes_match.group(1)
-    else:
-        plan["notes"] = "Generated by AI with user context"
-
-    prog_overload_match = re.search(
-        r'"progressive_overload":\s*\{([^}]+)\}', text)
-    if prog_overload_match:
-        prog_obj = {}
-        prog_content = prog_overload_match.group(1)
-
-        prog_type_match = re.search(r'"type":\s*"([^"]+)"', prog_content)
-        if prog_type_match:
-            prog_obj["type"] = prog_type_match.group(1)
-
-        prog_progression_match = re.search(
-            r'"progression":\s*"([^"]+)"', prog_content)
-        if prog_progression_match:
-            prog_obj["progression"] = prog_progression_match.group(1)
-
-        prog_deload_match = re.search(r'"deload":\s*"([^"]+)"', prog_content)
-        if prog_deload_match:
-            prog_obj["deload"] = prog_deload_match.group(1)
+    plan["notes"] = scanned.notes or "Generated by AI with user context"
 
-        if prog_obj:
-            plan["progressive_overload"] = prog_obj
+    if scanned.progressive_overload:
+        plan["progressive_overload"] = scanned.progressive_overload
 
     return plan
 
@@ -922,161 +862,10 @@ def extract_workout_from_model_output(text: str, req_days: int = 4, req_goal: st
 
 DATASET_DIR = os.path.join(SCRIPT_DIR, "Dataset")
 
-# ── 1. unique_exercises.csv → primary exercise pool ──────────────────────────
-# Columns: exercise_name, target_muscle, secondary_muscles, equipment,
-#          mechanics, force_type, difficulty, instructions, video_url, source
-
-EXERCISE_DB: List[Dict[str, Any]] = []
-
-# Movement-pattern inference for unique_exercises.csv
-# The CSV has mechanics (Compound/Isolation) and force_type (Push/Pull) but no
-# explicit movement_pattern column, so we derive one deterministically.
-_MECHANICS_FORCE_TO_PATTERN: Dict[str, str] = {
-    "compound_push": "horizontal_push",
-    "compound_pull": "horizontal_pull",
-    "isolation_push": "elbow_extension",
-    "isolation_pull": "elbow_flexion",
-    "compound_push (bilateral)": "horizontal_push",
-}
-_MUSCLE_TO_PATTERN: Dict[str, str] = {
-    "quads": "squat",
-    "hamstrings": "hip_hinge",
-    "glutes": "hip_hinge",
-    "calves": "calf",
-    "abs": "core_flexion",
-    "shoulders": "vertical_push",
-    "chest": "horizontal_push",
-    "back": "horizontal_pull",
-    "lats": "vertical_pull",
-    "biceps": "elbow_flexion",
-    "triceps": "elbow_extension",
-    "forearms": "elbow_flexion",
-}
-_GOAL_REP_SCHEMES: Dict[str, Dict[str, Any]] = {
-    "Strength":   {"min_reps": 3,  "max_reps": 6,  "rest_seconds": 180, "sets": 5},
-    "Power":      {"min_reps": 1,  "max_reps": 5,  "rest_seconds": 240, "sets": 3},
-    "Muscle":     {"min_reps": 8,  "max_reps": 12, "rest_seconds": 90,  "sets": 4},
-    "WeightLoss": {"min_reps": 12, "max_reps": 15, "rest_seconds": 60,  "sets": 3},
-    "Endurance":  {"min_reps": 15, "max_reps": 20, "rest_seconds": 45,  "sets": 3},
-}
-
-
-def _derive_movement_pattern(mechanics: str, force_type: str, target_muscle: str) -> str:
-    """Derive a movement_pattern string from unique_exercises.csv columns."""
-    m = mechanics.strip().lower()
-    f = force_type.strip().lower()
-    t = target_muscle.strip().lower()
-
-    # Check combined key first
-    key = f"{m}_{f}"
-    if key in _MECHANICS_FORCE_TO_PATTERN:
-        return _MECHANICS_FORCE_TO_PATTERN[key]
-
-    # Muscle-specific overrides (legs, core, etc.)
-    for muscle_kw, pattern in _MUSCLE_TO_PATTERN.items():
-        if muscle_kw in t:
-            return pattern
-
-    # Generic fallback using just force
-    if "push" in f:
-        return "horizontal_push"
-    if "pull" in f:
-        return "horizontal_pull"
-    return "general"
-
-
-_UNIQUE_EXERCISES_CSV = os.path.join(DATASET_DIR, "unique_exercises.csv")
-try:
-    with open(_UNIQUE_EXERCISES_CSV, "r", encoding="utf-8") as _f:
-        reader = _csv.DictReader(_f)
-        for row in reader:
-            mechanics = row.get("mechanics", "").strip()
-            force_type = row.get("force_type", "").strip()
-            target_muscle = row.get("target_muscle", "").strip()
-            difficulty = row.get("difficulty", "Intermediate").strip().lower()
-            difficulty_level = {
-                "beginner": 1, "intermediate": 2, "advanced": 3}.get(difficulty, 2)
-            exercise_type = "compound" if mechanics.lower() == "compound" else "isolation"
-
-            # Secondary muscles: stored as comma-separated string
-            secondary_raw = row.get("secondary_muscles", "")
-            secondary_muscles = [m.strip()
-                                 for m in secondary_raw.split(",") if m.strip()]
-
-            movement_pattern = _derive_movement_pattern(
-                mechanics, force_type, target_muscle)
-
-            # Goal suitability: compounds are better for Strength/Muscle
-            if exercise_type == "compound":
-                goal_suit = {"Strength": 8, "Muscle": 8,
-                             "WeightLoss": 7, "Endurance": 6, "Power": 8}
-            else:
-                goal_suit = {"Strength": 4, "Muscle": 7,
-                             "WeightLoss": 6, "Endurance": 7, "Power": 3}
-
-            ex = {
-                "name":             row.get("exercise_name", "").strip(),
-                "targetMuscles":    [target_muscle] if target_muscle else [],
-                # fallback
-                "bodyParts":        [target_muscle] if target_muscle else [],
-                "equipments":       [row.get("equipment", "Bodyweight").strip() or "Bodyweight"],
-                "secondaryMuscles": secondary_muscles,
-                "instructions":     row.get("instructions", ""),
-                "video_url":        row.get("video_url", ""),
-                "movement_pattern": movement_pattern,
-                "difficulty_level": difficulty_level,
-                "exercise_type":    exercise_type,
-                "goal_suitability": goal_suit,
-                "rep_ranges_by_goal": {g: dict(v) for g, v in _GOAL_REP_SCHEMES.items()},
-                "unilateral":       False,
-            }
-            if ex["name"]:
-                EXERCISE_DB.append(ex)
-    print(f"✅ Loaded {len(EXERCISE_DB)} exercises from unique_exercises.csv")
-except Exception as _e:
-    print(f"❌ Failed to load unique_exercises.csv: {_e}")
-    print(f"   Expected path: {_UNIQUE_EXERCISES_CSV}")
-
-# ── 2. calisthenics-exercises-training-data.csv → warmup & cardio pool ───────
-# Columns: id, name, category, primary_muscles, description,
-#          progression_1, progression_2, progression_3
-
-CALISTHENICS_DB: List[Dict[str, Any]] = []
-CALISTHENICS_BY_CATEGORY: Dict[str, List[Dict]] = {}
-_CALISTHENICS_CSV = os.path.join(
-    DATASET_DIR, "calisthenics-exercises-training-data.csv")
-try:
-    with open(_CALISTHENICS_CSV, "r", encoding="utf-8") as _f:
-        reader = _csv.DictReader(_f)
-        for row in reader:
-            cat = row.get("category", "core").strip().lower()
-            # Parse primary_muscles — stored as "[muscle1, muscle2]" string
-            muscles_raw = row.get("primary_muscles", "")
-            muscles = [m.strip().strip('[').strip(']').strip('"')
-                       for m in re.split(r'[,\[\]]', muscles_raw) if m.strip()]
-            entry = {
-                "name":            row.get("name", "").strip(),
-                "category":        cat,
-                "primary_muscles": muscles,
-                "description":     row.get("description", ""),
-                "progressions": [
-                    row.get("progression_1", ""),
-                    row.get("progression_2", ""),
-                    row.get("progression_3", ""),
-                ],
-            }
-            if entry["name"]:
-                CALISTHENICS_DB.append(entry)
-                CALISTHENICS_BY_CATEGORY.setdefault(cat, []).append(entry)
-    print(f"✅ Loaded {len(CALISTHENICS_DB)} calisthenics entries "
-          f"({len(CALISTHENICS_BY_CATEGORY)} categories) from calisthenics CSV")
-except Exception as _e:
-    print(f"❌ Failed to load calisthenics CSV: {_e}")
-
-# ── 3. workout_dataset.csv → goal-specific rep/set scheme overrides ───────────
-# Columns: title, main_goal, workout_type, training_level, program_duration,
-#          days_per_week, ..., pdf_text
-# We parse pdf_text to extract ramped-set notation and rep ranges per goal.
+# Compiled columnar catalog (python compiled_catalog.py) — memory-mapped so
+# uvicorn workers share one copy.  Missing or stale → parse the CSVs below.
+CATALOG_PATH = os.environ.get(
+    "WORKOUT_CATALOG_PATH", os.path.join(DATASET_DIR, CATALOG_FILENAME))
 
 WORKOUT_GOAL_TEMPLATES: Dict[str, Dict[str, Any]] = {
     # Defaults — overridden by parsed dataset values where available
@@ -1087,40 +876,64 @@ WORKOUT_GOAL_TEMPLATES: Dict[str, Dict[str, Any]] = {
     "Gain Weight":         {"sets": 4, "rep_range": "6-10",  "rest": "120s", "technique": "Progressive Overload"},
     "General Fitness":     {"sets": 3, "rep_range": "10-15", "rest": "60s",  "technique": "Straight Sets"},
 }
-_WORKOUT_DATASET_CSV = os.path.join(DATASET_DIR, "workout_dataset.csv")
+
+EXERCISE_DB: List[Dict[str, Any]] = []
+CALISTHENICS_DB: List[Dict[str, Any]] = []
+CALISTHENICS_BY_CATEGORY: Dict[str, List[Dict]] = {}
+
 try:
-    with open(_WORKOUT_DATASET_CSV, "r", encoding="utf-8-sig") as _f:
-        reader = _csv.DictReader(_f)
-        _goal_rep_count: Dict[str, int] = {}
-        for row in reader:
-            goal = row.get("main_goal", "").strip()
-            if not goal:
-                continue
-            pdf_text = row.get("pdf_text", "")
-            # Detect ramped set programs (e.g. "5 5" pattern with Ramped keyword)
-            is_ramped = "Ramped" in pdf_text or "ramped" in pdf_text
-            # Extract rep numbers from pdf_text for heuristic detection
-            rep_pattern_match = re.search(
-                r'\b(\d+)\s*[-–]\s*(\d+)\b', pdf_text)
-            if rep_pattern_match and goal not in _goal_rep_count:
-                min_r = int(rep_pattern_match.group(1))
-                max_r = int(rep_pattern_match.group(2))
-                if 1 < min_r < max_r < 30:
-                    technique = "Ramped Sets" if is_ramped else "Straight Sets"
-                    rest_s = "180s" if max_r <= 6 else (
-                        "90s" if max_r <= 12 else "60s")
-                    WORKOUT_GOAL_TEMPLATES[goal] = {
-                        "sets":      5 if is_ramped else 3,
-                        "rep_range": f"{min_r}-{max_r}",
-                        "rest":      rest_s,
-                        "technique": technique,
-                    }
-                    _goal_rep_count[goal] = 1
-    print(
-        f"✅ Workout dataset loaded — {len(WORKOUT_GOAL_TEMPLATES)} goal templates active")
+    COMPILED_CATALOG = CompiledCatalog.open(CATALOG_PATH, DATASET_DIR)
 except Exception as _e:
-    print(
-        f"⚠️ Could not load workout_dataset.csv: {_e} — using built-in templates")
+    print(f"⚠️ Could not open compiled catalog {CATALOG_PATH}: {_e}")
+    COMPILED_CATALOG = None
+
+if COMPILED_CATALOG is not None:
+    EXERCISE_DB.extend(COMPILED_CATALOG.exercises())
+    CALISTHENICS_DB.extend(COMPILED_CATALOG.calisthenics())
+    WORKOUT_GOAL_TEMPLATES.update(COMPILED_CATALOG.goal_templates)
+    print(f"✅ Memory-mapped compiled catalog {CATALOG_PATH}: "
+          f"{len(EXERCISE_DB)} exercises, {len(CALISTHENICS_DB)} calisthenics entries, "
+          f"{len(WORKOUT_GOAL_TEMPLATES)} goal templates")
+else:
+    print(f"ℹ️ No up-to-date compiled catalog at {CATALOG_PATH} — parsing CSVs "
+          f"(run `python compiled_catalog.py` to speed up startup)")
+
+    # ── 1. unique_exercises.csv → primary exercise pool ──────────────────────
+    # Columns: exercise_name, target_muscle, secondary_muscles, equipment,
+    #          mechanics, force_type, difficulty, instructions, video_url, source
+    _UNIQUE_EXERCISES_CSV = os.path.join(DATASET_DIR, "unique_exercises.csv")
+    try:
+        EXERCISE_DB.extend(load_unique_exercises(_UNIQUE_EXERCISES_CSV))
+        print(f"✅ Loaded {len(EXERCISE_DB)} exercises from unique_exercises.csv")
+    except Exception as _e:
+        print(f"❌ Failed to load unique_exercises.csv: {_e}")
+        print(f"   Expected path: {_UNIQUE_EXERCISES_CSV}")
+
+    # ── 2. calisthenics-exercises-training-data.csv → warmup & cardio pool ───
+    # Columns: id, name, category, primary_muscles, description,
+    #          progression_1, progression_2, progression_3
+    _CALISTHENICS_CSV = os.path.join(
+        DATASET_DIR, "calisthenics-exercises-training-data.csv")
+    try:
+        CALISTHENICS_DB.extend(load_calisthenics(_CALISTHENICS_CSV))
+        print(f"✅ Loaded {len(CALISTHENICS_DB)} calisthenics entries from calisthenics CSV")
+    except Exception as _e:
+        print(f"❌ Failed to load calisthenics CSV: {_e}")
+
+    # ── 3. workout_dataset.csv → goal-specific rep/set scheme overrides ──────
+    # We parse pdf_text to extract ramped-set notation and rep ranges per goal.
+    _WORKOUT_DATASET_CSV = os.path.join(DATASET_DIR, "workout_dataset.csv")
+    try:
+        WORKOUT_GOAL_TEMPLATES.update(
+            load_workout_goal_templates(_WORKOUT_DATASET_CSV))
+        print(
+            f"✅ Workout dataset loaded — {len(WORKOUT_GOAL_TEMPLATES)} goal templates active")
+    except Exception as _e:
+        print(
+            f"⚠️ Could not load workout_dataset.csv: {_e} — using built-in templates")
+
+for _entry in CALISTHENICS_DB:
+    CALISTHENICS_BY_CATEGORY.setdefault(_entry["category"], []).append(_entry)
 
 # Organise DB by movement pattern & muscle for fast lookup
 DB_BY_PATTERN: Dict[str, List[Dict]] = {}
@@ -1138,206 +951,61 @@ for _ex in EXERCISE_DB:
         DB_BY_NAME[_nm] = _ex
         EXERCISE_DB_BY_NAME[_nm] = _ex
 
+# Focus keyword / equipment / pattern bitmask indexes for _pick_exercises_for_focus
+EXERCISE_INDEX = ExerciseIndex(EXERCISE_DB)
+# Shared fuzzy name → DB_BY_NAME key resolver (Step 2b validation + enrichment)
+EXERCISE_NAME_RESOLVER = ExerciseNameResolver(DB_BY_NAME.keys())
+
 
 def _pick_exercises_for_focus(focus_areas: List[str], goal: str, level: str,
                               n: int = 5, exclude: set = None,
-                              equipment: List[str] = None) -> List[Dict[str, Any]]:
+                              equipment: List[str] = None,
+                              injuries: List[str] = None,
+                              rng: Optional[random.Random] = None) -> List[Dict[str, Any]]:
     """
     Pick *n* exercises from the SAME database the model was trained on,
     matching the given focus areas.  This ensures quality and variety
-    even when the small model truncates its output.
+    even when the small model truncates its output.  Exercises on the
+    keyword blacklist of any of *injuries* are never candidates.
+    Variety comes from *rng* (the request's RNG, see ``_request_rng``).
     """
-    import random as _rand
+    rng = rng or random.Random()
     exclude = exclude or set()
     goal_key = goal if goal in ["Strength", "Muscle",
                                 "WeightLoss", "Endurance", "Power"] else "Muscle"
+    index = EXERCISE_INDEX
 
-    # Expanded keyword map: focus area → possible targetMuscle/bodyPart/pattern matches
-    # Updated for IntelliFit CSV format (targetMuscles: "pectorals", "delts", etc.)
-    FOCUS_KEYWORDS: Dict[str, List[str]] = {
-        "chest": ["chest", "pectoral"],
-        "shoulders": ["shoulder", "delt"],
-        "triceps": ["tricep"],
-        "back": ["back", "lat", "rhomboid", "trap", "spine"],
-        "biceps": ["bicep"],
-        "quads": ["quad"],
-        "hamstrings": ["hamstring"],
-        "glutes": ["glute"],
-        "core": ["abs", "abdomin", "oblique", "core", "waist"],
-        "calves": ["calf", "calves", "soleus", "gastrocnemius", "lower legs"],
-        "rear delts": ["rear delt", "posterior delt", "upper back"],
-        "cardio": ["cardio", "cardiovascular"],
-        "legs": ["quad", "hamstring", "glute", "calf", "upper legs", "lower legs", "adductor", "abductor"],
-        "front delts": ["front delt", "anterior delt", "delt"],
-        "forearms": ["forearm", "lower arms", "wrist"],
-        "lats": ["lat"],
-    }
-
-    # Movement pattern exclusion: prevent push exercises on pull days, etc.
-    PUSH_FOCUSES = {"chest", "shoulders", "triceps", "front delts"}
-    PULL_FOCUSES = {"back", "biceps", "rear delts", "lats"}
-    LEG_FOCUSES = {"quads", "hamstrings", "glutes", "calves", "legs"}
-    focus_set = {f.lower() for f in focus_areas}
-
-    excluded_patterns = set()
-    # Also track which bodyParts are NOT allowed (prevents cross-contamination)
-    excluded_body_parts = set()
-    # Target muscle exclusion sets (catches mislabeled exercises in CSV)
-    LEG_TARGET_MUSCLES_PICK = {"glutes", "quads",
-                               "hamstrings", "calves", "adductors", "abductors"}
-    UPPER_PUSH_TARGET_MUSCLES_PICK = {
-        "pectorals", "delts", "triceps", "serratus anterior"}
-    UPPER_PULL_TARGET_MUSCLES_PICK = {
-        "lats", "traps", "upper back", "biceps", "forearms", "levator scapulae", "spine"}
-
-    excluded_target_muscles = set()
-    if focus_set & PULL_FOCUSES and not (focus_set & PUSH_FOCUSES) and not (focus_set & LEG_FOCUSES):
-        # Pull day: no push, no leg/hip exercises
-        excluded_patterns = {"push", "elbow_extension", "horizontal_push",
-                             "vertical_push", "squat", "lunge", "hinge",
-                             "plyometric"}
-        excluded_body_parts = {"upper legs", "lower legs"}
-        excluded_target_muscles = LEG_TARGET_MUSCLES_PICK
-    elif focus_set & PUSH_FOCUSES and not (focus_set & PULL_FOCUSES) and not (focus_set & LEG_FOCUSES):
-        # Push day: no pull, no leg/hip exercises
-        excluded_patterns = {"pull", "elbow_flexion", "horizontal_pull",
-                             "vertical_pull", "squat", "lunge", "hinge",
-                             "plyometric"}
-        excluded_body_parts = {"upper legs", "lower legs"}
-        excluded_target_muscles = LEG_TARGET_MUSCLES_PICK
-    elif focus_set & LEG_FOCUSES and not (focus_set & (PUSH_FOCUSES | PULL_FOCUSES)):
-        # Leg day: no upper body exercises
-        excluded_patterns = {"horizontal_push", "vertical_push", "horizontal_pull",
-                             "vertical_pull", "elbow_extension", "elbow_flexion"}
-        excluded_target_muscles = UPPER_PUSH_TARGET_MUSCLES_PICK | UPPER_PULL_TARGET_MUSCLES_PICK
-
-    # Equipment normalization for matching
-    user_equipment = set()
-    if equipment:
-        for eq in equipment:
-            eq_low = eq.lower().strip()
-            user_equipment.add(eq_low)
-            # Also add common aliases
-            if "dumbbell" in eq_low:
-                user_equipment.add("dumbbell")
-            if "barbell" in eq_low:
-                user_equipment.add("barbell")
-            if "cable" in eq_low:
-                user_equipment.add("cable")
-            if "machine" in eq_low:
-                user_equipment.update(
-                    {"machine", "leverage machine", "smith machine"})
-    user_equipment.add("body weight")  # always available
-
-    # Match by bodyParts + targetMuscles + movement_pattern
-    candidates: List[Dict] = []
-    for focus in focus_areas:
-        focus_lower = focus.lower()
-        keywords = FOCUS_KEYWORDS.get(focus_lower, [focus_lower])
-
-        for ex in EXERCISE_DB:
-            # Skip exercises with empty/placeholder targetMuscles (bad data)
-            target_muscles = ex.get("targetMuscles", [])
-            real_muscles = [m for m in target_muscles if m and m.strip()]
-            if not real_muscles:
-                continue
-
-            # Skip generic/full-body exercises (too unspecific for focused days)
-            body_parts = ex.get("bodyParts", [])
-            if any(bp.lower() in ("full body", "other", "cardio") for bp in body_parts):
-                continue
-
-            # Skip exercises with conflicting movement patterns
-            ex_pattern = ex.get("movement_pattern", "").lower()
-            if excluded_patterns and any(excl in ex_pattern for excl in excluded_patterns):
-                continue
-
-            # Skip exercises whose bodyParts are in the excluded set
-            # (e.g., "upper legs" exercises should not appear on push/pull days)
-            if excluded_body_parts and any(bp.lower() in excluded_body_parts for bp in body_parts):
-                continue
-
-            # Skip exercises whose targetMuscles are in the excluded set
-            # (catches mislabeled exercises, e.g. glutes with bodyParts="back")
-            if excluded_target_muscles and any(m.lower().strip() in excluded_target_muscles for m in real_muscles):
-                continue
-
-            # Check if exercise matches the focus area
-            # NOTE: We intentionally do NOT include secondaryMuscles here
-            # because "lower back" secondary muscles cause glute/hamstring
-            # exercises to falsely match "back" focus on Pull days.
-            combined_text = " ".join([
-                " ".join(real_muscles),
-                " ".join(body_parts),
-                ex_pattern,
-            ]).lower()
-
-            if any(kw in combined_text for kw in keywords):
-                candidates.append(ex)
-
+    # Candidates come from the precomputed focus-keyword bitmasks with the
+    # push/pull/leg day exclusions and injury-unsafe ids already masked
+    # out — no full-DB scan, and Layer 1 has nothing left to replace.
     # De-dup & exclude already-used (also prevent similar names like "X" and "X V. 2")
-    import re as _re
-
-    def _base_name(n: str) -> str:
-        """Normalize name for dedup: lowercase, strip version suffixes."""
-        n = n.lower().strip()
-        n = _re.sub(r'\s*v\.?\s*\d+\s*$', '', n)  # Strip "V. 2", "v2" etc.
-        # Strip trailing parenthesized
-        n = _re.sub(r'\s*\(.*?\)\s*$', '', n)
-        return n.strip()
-
     seen = set()
-    unique: List[Dict] = []
-    for ex in candidates:
-        base = _base_name(ex["name"])
-        if base not in seen and ex["name"].lower() not in exclude:
+    unique_ids: List[int] = []
+    for i in index.candidate_ids(focus_areas, _unsafe_catalog_ids(injuries)):
+        base = index.base_names[i]
+        if base not in seen and index.name_lower[i] not in exclude:
             seen.add(base)
-            unique.append(ex)
+            unique_ids.append(i)
 
     # Filter by difficulty for beginners
     if level.lower() == "beginner":
-        filtered = [ex for ex in unique if ex.get("difficulty_level", 3) <= 3]
-        unique = filtered if filtered else unique
-
-    # Prioritize exercises that match user's equipment
-    if user_equipment:
-        equip_match = []
-        equip_other = []
-        for ex in unique:
-            ex_equips = [e.lower()
-                         for e in ex.get("equipments", ["body weight"])]
-            # Check if this exercise uses any of the user's equipment
-            has_match = any(
-                ueq in ex_eq or ex_eq in ueq
-                for ex_eq in ex_equips
-                for ueq in user_equipment
-            )
-            if has_match:
-                equip_match.append(ex)
-            else:
-                equip_other.append(ex)
-        # Use equipment-matched first, then fall back to others
-        unique = equip_match + equip_other
+        filtered = [i for i in unique_ids if index.easy_ids >> i & 1]
+        unique_ids = filtered if filtered else unique_ids
+
+    # Prioritize exercises that match user's equipment (body weight always available)
+    user_equipment = equipment_aliases(equipment)
+    equip_mask = index.matching_equipment_ids(user_equipment)
+    # Equipment bonus ignores body weight so real equipment is preferred
+    bonus_mask = index.matching_equipment_ids(
+        user_equipment, skip_body_weight=True)
+    unique_ids = ([i for i in unique_ids if equip_mask >> i & 1]
+                  + [i for i in unique_ids if not equip_mask >> i & 1])
 
     # Sort by goal suitability (descending) then by compound-first
-    def _score(ex):
-        goal_score = ex.get("goal_suitability", {}).get(goal_key, 5)
-        compound_bonus = 3 if ex.get("exercise_type") == "compound" else 0
-        # Equipment match bonus: prefer exercises using user's equipment
-        if user_equipment:
-            ex_equips = [e.lower()
-                         for e in ex.get("equipments", ["body weight"])]
-            has_equip = any(
-                ueq in ex_eq or ex_eq in ueq
-                for ex_eq in ex_equips
-                for ueq in user_equipment
-                if ueq != "body weight"  # don't bonus body weight specifically
-            )
-            equip_bonus = 2 if has_equip else 0
-        else:
-            equip_bonus = 0
-        return goal_score + compound_bonus + equip_bonus
-    unique.sort(key=_score, reverse=True)
+    goal_scores = index.goal_scores(goal_key)
+    unique_ids.sort(key=lambda i: goal_scores[i] + (2 if bonus_mask >> i & 1 else 0),
+                    reverse=True)
+    unique = [EXERCISE_DB[i] for i in unique_ids]
 
     # Add some variety: pick top candidates but shuffle a bit
     pool = unique[:max(n * 3, 15)]
@@ -1345,7 +1013,7 @@ def _pick_exercises_for_focus(focus_areas: List[str], goal: str, level: str,
         # Keep the top 2, shuffle the rest
         top = pool[:2]
         rest = pool[2:]
-        _rand.shuffle(rest)
+        rng.shuffle(rest)
         pool = top + rest
 
     selected = pool[:n]
@@ -1370,24 +1038,204 @@ def _pick_exercises_for_focus(focus_areas: List[str], goal: str, level: str,
     return formatted
 
 
-def _generate_plan_sync(prompt: str) -> str:
-    """Run one synchronous model generation call (matches training format)."""
-    inputs = tokenizer(
-        prompt,
-        return_tensors="pt",
-        max_length=256,
-        truncation=True,
-        padding=True,
-    ).to(device)
-    with torch.no_grad():
-        outputs = model.generate(
-            **inputs,
-            max_length=1024,       # match training MAX_OUTPUT_LENGTH
-            num_beams=2,           # faster than 4 beams, still good quality
-            early_stopping=True,
-            do_sample=False,
-        )
-    return tokenizer.decode(outputs[0], skip_special_tokens=True)
+# ── Per-day post-processing (shared by /generate-direct and its stream) ──
+# The model (flan-t5-small) often omits target_muscles/movement_pattern, so
+# validation looks each exercise up by name in EXERCISE_DB and decides with
+# EXERCISE_INDEX's precomputed focus / exclusion bitmasks.
+
+def _validate_day_focus(day: Dict[str, Any]) -> None:
+    """Drop exercises from *day* whose DB muscles don't match its focus areas."""
+    focus_areas = day.get("focus_areas", [])
+    if not focus_areas:
+        return
+    index = EXERCISE_INDEX
+    day_type, allowed_ids = index.day_focus_masks(focus_areas)
+    pattern_ids, body_part_ids, target_ids = index.excluded_by.get(day_type, (0, 0, 0))
+    excluded_ids = pattern_ids | body_part_ids | target_ids
+    excluded_target_muscles = DAY_EXCLUSIONS[day_type][2] if day_type else set()
+    # Keywords are only needed for exercises the DB doesn't know
+    allowed = None
+
+    # Check each exercise
+    validated = []
+    for ex in day.get("exercises", []):
+        ex_name = ex.get("name", "").strip()
+        ex_name_lower = ex_name.lower()
+
+        # Try to look up exercise in DB for reliable data
+        i = index.id_by_name.get(ex_name_lower)
+        if i is None and ex_name not in EXERCISE_METADATA_FALLBACK:
+            # Fuzzy match (model may generate slightly different names);
+            # curated names keep their own target_muscles instead
+            resolved = EXERCISE_NAME_RESOLVER.resolve(ex_name_lower)
+            if resolved:
+                i = index.id_by_name.get(resolved)
+
+        if i is not None:
+            # Use DB data for validation (most reliable) — one bit test per rule
+            bit = 1 << i
+            if not bit & excluded_ids:
+                if bit & allowed_ids:
+                    validated.append(ex)
+                else:
+                    print(
+                        f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {index.texts[i][:80]})")
+                continue
+            db_entry = EXERCISE_DB[i]
+            if bit & pattern_ids:
+                print(
+                    f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (movement pattern conflict: {db_entry.get('movement_pattern', '').lower()})")
+            elif bit & body_part_ids:
+                body_parts_str = " ".join(db_entry.get("bodyParts", [])).lower()
+                print(
+                    f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (body part '{body_parts_str}' excluded for this day)")
+            else:
+                ex_target_muscles = {m.lower().strip()
+                                     for m in db_entry.get("targetMuscles", [])}
+                print(
+                    f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (target muscle {ex_target_muscles & excluded_target_muscles} excluded for this day)")
+            continue
+
+        # Fallback: use model-parsed data (less reliable)
+        muscles_text = " ".join(ex.get("target_muscles", [])).lower()
+        movement = ex.get("movement_pattern", "").lower()
+        combined = f"{muscles_text} {movement}"
+
+        # Even with model data, check target muscle exclusion
+        if excluded_target_muscles:
+            ex_muscles_set = {m.lower().strip()
+                              for m in ex.get("target_muscles", [])}
+            if ex_muscles_set & excluded_target_muscles:
+                print(
+                    f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (model target muscle excluded for this day)")
+                continue
+
+        # Keep exercise if ANY of its muscles match the day's focus
+        if allowed is None:
+            allowed = {kw for fa in focus_areas
+                       for kw in FOCUS_MUSCLE_MAP.get(fa.lower(), [fa.lower()])}
+        if any(kw in combined for kw in allowed):
+            validated.append(ex)
+        else:
+            print(
+                f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {combined[:80]})")
+    day["exercises"] = validated
+
+
+MIN_EXERCISES_PER_DAY = 4
+
+
+def _fill_day_from_db(day: Dict[str, Any], req_goal: str, req_level: str,
+                      req_equipment: Optional[List[str]], used_names: set,
+                      req_injuries: Optional[List[str]] = None,
+                      rng: Optional[random.Random] = None) -> None:
+    """Top *day* up to 5 exercises from EXERCISE_DB if it has fewer than 4."""
+    current_count = len(day.get("exercises", []))
+    if current_count >= MIN_EXERCISES_PER_DAY:
+        return
+    needed = 5 - current_count  # target 5 per day
+    focus_areas = day.get("focus_areas", ["chest"])
+    print(
+        f"   📋 Day '{day.get('day_name', '')}' has {current_count} exercises — filling {needed} from exercise DB")
+
+    db_exercises = _pick_exercises_for_focus(
+        focus_areas, req_goal, req_level, n=needed, exclude=used_names,
+        equipment=req_equipment, injuries=req_injuries, rng=rng
+    )
+    for ex in db_exercises:
+        ex = enrich_exercise_with_metadata(ex)
+        day["exercises"].append(ex)
+        used_names.add(ex.get("name", "").lower())
+
+    print(f"   ✅ Day now has {len(day['exercises'])} exercises")
+
+
+def _generate_plan_batch_sync(prompts: List[str],
+                              timings: Optional[Dict[str, float]] = None) -> List[str]:
+    """
+    Run ONE model.generate call for a batch of prompts (matches training format).
+    Prompts are padded to the longest in the batch; each output is decoded
+    independently so callers get exactly what a batch-of-1 call would return.
+    If *timings* is given it receives tokenize / beam_search / decode seconds.
+    Runs on whichever backend WORKOUT_MODEL_BACKEND selected (see model_loader.py).
+    """
+    decoded, _ = MODEL_LOADER.generate(prompts, timings)
+    return decoded
+
+
+def _generate_plan_batch_timed(prompts: List[str]) -> List[tuple[str, Dict[str, float]]]:
+    """Batcher entry point: each caller gets (output, timings of its batch)."""
+    timings: Dict[str, float] = {}
+    outputs = _generate_plan_batch_sync(prompts, timings)
+    return [(out, timings) for out in outputs]
+
+
+def _generate_plan_sync(prompt: str,
+                        on_text: Optional[Callable[[str], None]] = None,
+                        cancelled: Optional[threading.Event] = None,
+                        timings: Optional[Dict[str, float]] = None) -> str:
+    """
+    Run one synchronous model generation call (batch of 1).
+    With *on_text* the model decodes greedily and each new piece of text is
+    passed to it as soon as it is produced (see ModelLoader.generate_stream);
+    setting *cancelled* stops that generation early.
+    """
+    if on_text is not None:
+        return MODEL_LOADER.generate_stream(prompt, on_text, cancelled, timings)
+    return _generate_plan_batch_sync([prompt], timings)[0]
+
+
+# Keyed by backend + checkpoint too: int8/ONNX or a re-exported model may decode differently
+PLAN_CACHE = PlanResultCache(
+    MODEL_VERSION,
+    namespace=MODEL_LOADER.cache_namespace(),
+    max_memory_entries=PLAN_CACHE_MEMORY_ENTRIES,
+    disk_dir=PLAN_CACHE_DIR,
+    max_disk_bytes=int(PLAN_CACHE_DISK_MB * 1024 * 1024),
+)
+METRICS.counter("workout_plan_cache_lookups_total",
+                "Plan-result cache lookups by outcome.",
+                lambda: {"memory_hit": PLAN_CACHE.memory_hits,
+                         "disk_hit": PLAN_CACHE.disk_hits,
+                         "miss": PLAN_CACHE.misses},
+                label="result")
+
+# Single scheduler in front of the model: one worker thread, many prompts per call
+generation_batcher = MicroBatcher(
+    _generate_plan_batch_timed,
+    window_ms=BATCH_WINDOW_MS,
+    max_batch_size=BATCH_MAX_SIZE,
+    name="flan-t5",
+)
+METRICS.gauge("workout_generation_queue_depth",
+              "Prompts waiting for the generation batcher.",
+              generation_batcher.queue_depth)
+METRICS.gauge("workout_generation_batch_fill",
+              "Mean batch size divided by the configured max batch size.",
+              lambda: generation_batcher.stats()["avg_batch_fill"])
+METRICS.counter("workout_generation_batches_total",
+                "model.generate calls issued by the batcher.",
+                lambda: generation_batcher.batches_total)
+METRICS.counter("workout_generation_prompts_total",
+                "Prompts served by the batcher.",
+                lambda: generation_batcher.items_total)
+
+# Streamed generations run here, outside the batcher (streamers need batch=1)
+stream_executor = ThreadPoolExecutor(max_workers=max(1, STREAM_MAX_CONCURRENCY),
+                                     thread_name_prefix="flan-t5-stream")
+
+# Bulk injury screening — rules engine only, never touches the model
+INJURY_SCREENER = BatchScreener(
+    workers=SCREENING_WORKERS, chunk_lines=SCREENING_CHUNK_LINES,
+    pool_min_profiles=SCREENING_POOL_MIN_PROFILES,
+) if INJURY_SCREENING_AVAILABLE else None
+if INJURY_SCREENER is not None:
+    METRICS.counter("workout_screening_lines_total",
+                    "NDJSON lines answered by /injury-screening/batch.",
+                    lambda: INJURY_SCREENER.lines_total)
+    METRICS.counter("workout_screening_evaluations_total",
+                    "Distinct injury profiles evaluated (after in-batch dedupe).",
+                    lambda: INJURY_SCREENER.evaluations_total)
 
 
 async def generate_workout_plan_direct(
@@ -1397,6 +1245,8 @@ async def generate_workout_plan_direct(
     req_level: str,
     req_equipment: List[str] = None,
     req_injuries: List[str] = None,
+    timer: Optional[StageTimer] = None,
+    rng: Optional[random.Random] = None,
 ) -> tuple[Dict[str, Any] | None, bool, str | None]:
     """
     Generate a workout plan with a SINGLE model call (matches training format)
@@ -1410,188 +1260,81 @@ async def generate_workout_plan_direct(
     complete remaining days from the same 8 000-exercise database the model
     was trained on — ensuring consistency and quality.
     """
+    timer = timer or StageTimer()
     print(f"\n🏋️ Generating {req_days}-day {req_goal} plan ({req_level})...")
     print(f"   Prompt: {prompt[:200]}...")
 
-    # ── Step 1: Single model call (matches training format) ──
-    try:
-        loop = asyncio.get_event_loop()
-        raw_output = await loop.run_in_executor(None, _generate_plan_sync, prompt)
-        print(f"   📄 Model output: {len(raw_output)} chars")
-        print(f"   Preview: {raw_output[:300]}")
-    except Exception as e:
-        print(f"   ❌ Model generation error: {e}")
-        return None, False, f"Model generation failed: {e}"
+    # ── Step 0: Plan-result cache (same prompt → same beam-search output) ──
+    parse_key = json.dumps([req_days, req_goal, req_level, req_equipment or []])
+    with timer.stage("plan_cache_lookup"):
+        cached = PLAN_CACHE.get(prompt)
 
-    # ── Step 2: Parse model output with existing robust parser ──
-    plan = extract_workout_from_model_output(
-        raw_output, req_days=req_days, req_goal=req_goal,
-        req_level=req_level, req_equipment=req_equipment
-    )
+    if cached is not None:
+        raw_output = cached["raw_output"]
+        print(f"   ♻️ Plan cache hit — skipping model ({len(raw_output)} chars)")
+        if cached["parse_key"] == parse_key:
+            plan = cached["plan"]
+        else:
+            PLAN_CACHE.reparses += 1
+            with timer.stage("parse_model_output"):
+                plan = extract_workout_from_model_output(
+                    raw_output, req_days=req_days, req_goal=req_goal,
+                    req_level=req_level, req_equipment=req_equipment
+                )
+            PLAN_CACHE.put(prompt, raw_output, parse_key, plan)
+    else:
+        if not MODEL_LOADER.ready:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Model is not ready (state={MODEL_LOADER.state})",
+                headers={"Retry-After": "10"},
+            )
+        # ── Step 1: Single model call (matches training format) ──
+        try:
+            t_model = time.perf_counter()
+            raw_output, batch_timings = await generation_batcher.submit(prompt)
+            model_total = time.perf_counter() - t_model
+            for stage_name, seconds in batch_timings.items():
+                timer.record(stage_name, seconds)
+            # Whatever isn't tokenize/beam search/decode was spent queued for a batch
+            timer.record("model_queue_wait", max(
+                0.0, model_total - sum(batch_timings.values())))
+            print(f"   📄 Model output: {len(raw_output)} chars")
+            print(f"   Preview: {raw_output[:300]}")
+        except Exception as e:
+            print(f"   ❌ Model generation error: {e}")
+            return None, False, f"Model generation failed: {e}"
+
+        # ── Step 2: Parse model output with existing robust parser ──
+        with timer.stage("parse_model_output"):
+            plan = extract_workout_from_model_output(
+                raw_output, req_days=req_days, req_goal=req_goal,
+                req_level=req_level, req_equipment=req_equipment
+            )
+        # Cache before validation/fill mutate the plan — those run per request
+        with timer.stage("plan_cache_store"):
+            PLAN_CACHE.put(prompt, raw_output, parse_key, plan)
 
     # ── Step 2b: Validate exercises match their day's focus areas ──
-    # Uses EXERCISE_DB for reliable muscle data instead of trusting model output.
-    # The model (flan-t5-small) often omits target_muscles/movement_pattern,
-    # so we look up each exercise by name in the DB.
-    FOCUS_MUSCLE_MAP = {
-        "chest": ["chest", "pec", "pectoral"],
-        "shoulders": ["shoulder", "delt"],
-        "triceps": ["tricep"],
-        "back": ["back", "lat", "rhomboid", "trapez", "upper back", "spine"],
-        "biceps": ["bicep", "brachialis"],
-        "rear delts": ["rear delt", "posterior delt", "upper back"],
-        "quads": ["quad"],
-        "hamstrings": ["hamstring"],
-        "glutes": ["glute"],
-        "calves": ["calf", "calves", "soleus", "gastrocnemius", "lower legs"],
-        "core": ["abs", "abdomin", "oblique", "core", "waist"],
-        "lats": ["lat", "latissimus"],
-        "legs": ["quad", "hamstring", "glute", "calf", "upper legs", "lower legs",
-                 "adductor", "abductor"],
-        "front delts": ["front delt", "anterior delt", "delt"],
-        "forearms": ["forearm", "lower arms", "wrist"],
-    }
-
-    # Movement pattern sets for cross-contamination prevention
-    V_PUSH_FOCUSES = {"chest", "shoulders", "triceps", "front delts"}
-    V_PULL_FOCUSES = {"back", "biceps", "rear delts", "lats"}
-    V_LEG_FOCUSES = {"quads", "hamstrings", "glutes", "calves", "legs"}
-
-    # Target muscle sets for cross-contamination prevention
-    # These catch mislabeled exercises (e.g. glute exercises with bodyParts="back")
-    LEG_TARGET_MUSCLES = {"glutes", "quads",
-                          "hamstrings", "calves", "adductors", "abductors"}
-    UPPER_PUSH_TARGET_MUSCLES = {"pectorals",
-                                 "delts", "triceps", "serratus anterior"}
-    UPPER_PULL_TARGET_MUSCLES = {
-        "lats", "traps", "upper back", "biceps", "forearms", "levator scapulae", "spine"}
-
+    t_validate = time.perf_counter()
     for day in plan.get("days", []):
-        focus_areas = day.get("focus_areas", [])
-        if not focus_areas:
-            continue
-        focus_set = {fa.lower() for fa in focus_areas}
-
-        # Build set of allowed keywords for this day
-        allowed = set()
-        for fa in focus_areas:
-            for kw in FOCUS_MUSCLE_MAP.get(fa.lower(), [fa.lower()]):
-                allowed.add(kw)
-
-        # Determine excluded movement patterns, body parts, AND target muscles
-        excluded_patterns = set()
-        excluded_body_parts = set()
-        excluded_target_muscles = set()
-        if focus_set & V_PULL_FOCUSES and not (focus_set & V_PUSH_FOCUSES) and not (focus_set & V_LEG_FOCUSES):
-            excluded_patterns = {"push", "elbow_extension", "horizontal_push",
-                                 "vertical_push", "squat", "lunge", "hinge",
-                                 "plyometric"}
-            excluded_body_parts = {"upper legs", "lower legs"}
-            excluded_target_muscles = LEG_TARGET_MUSCLES
-        elif focus_set & V_PUSH_FOCUSES and not (focus_set & V_PULL_FOCUSES) and not (focus_set & V_LEG_FOCUSES):
-            excluded_patterns = {"pull", "elbow_flexion", "horizontal_pull",
-                                 "vertical_pull", "squat", "lunge", "hinge",
-                                 "plyometric"}
-            excluded_body_parts = {"upper legs", "lower legs"}
-            excluded_target_muscles = LEG_TARGET_MUSCLES
-        elif focus_set & V_LEG_FOCUSES and not (focus_set & (V_PUSH_FOCUSES | V_PULL_FOCUSES)):
-            excluded_patterns = {"horizontal_push", "vertical_push", "horizontal_pull",
-                                 "vertical_pull", "elbow_extension", "elbow_flexion"}
-            excluded_target_muscles = UPPER_PUSH_TARGET_MUSCLES | UPPER_PULL_TARGET_MUSCLES
-
-        # Check each exercise
-        validated = []
-        for ex in day.get("exercises", []):
-            ex_name = ex.get("name", "").strip()
-            ex_name_lower = ex_name.lower()
-
-            # Try to look up exercise in DB for reliable data
-            db_entry = DB_BY_NAME.get(ex_name_lower)
-            if not db_entry:
-                # Try partial/fuzzy match (model may generate slightly different names)
-                for db_nm, db_ex in DB_BY_NAME.items():
-                    if (ex_name_lower in db_nm or db_nm in ex_name_lower) and len(min(ex_name_lower, db_nm, key=len)) > 5:
-                        db_entry = db_ex
-                        break
-
-            if db_entry:
-                # Use DB data for validation (most reliable)
-                real_muscles = " ".join(
-                    db_entry.get("targetMuscles", [])).lower()
-                body_parts_str = " ".join(
-                    db_entry.get("bodyParts", [])).lower()
-                ex_pattern = db_entry.get("movement_pattern", "").lower()
-                combined = f"{real_muscles} {body_parts_str} {ex_pattern}"
-
-                # Check movement pattern exclusion
-                if excluded_patterns and any(excl in ex_pattern for excl in excluded_patterns):
-                    print(
-                        f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (movement pattern conflict: {ex_pattern})")
-                    continue
-                # Check body part exclusion
-                if excluded_body_parts and any(bp in excluded_body_parts for bp in [b.lower() for b in db_entry.get("bodyParts", [])]):
-                    print(
-                        f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (body part '{body_parts_str}' excluded for this day)")
-                    continue
-                # Check target muscle exclusion (catches mislabeled exercises)
-                if excluded_target_muscles:
-                    ex_target_muscles = {m.lower().strip()
-                                         for m in db_entry.get("targetMuscles", [])}
-                    if ex_target_muscles & excluded_target_muscles:
-                        print(
-                            f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (target muscle {ex_target_muscles & excluded_target_muscles} excluded for this day)")
-                        continue
-            else:
-                # Fallback: use model-parsed data (less reliable)
-                muscles_text = " ".join(ex.get("target_muscles", [])).lower()
-                movement = ex.get("movement_pattern", "").lower()
-                combined = f"{muscles_text} {movement}"
-
-                # Even with model data, check target muscle exclusion
-                if excluded_target_muscles:
-                    ex_muscles_set = {m.lower().strip()
-                                      for m in ex.get("target_muscles", [])}
-                    if ex_muscles_set & excluded_target_muscles:
-                        print(
-                            f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (model target muscle excluded for this day)")
-                        continue
-
-            # Keep exercise if ANY of its muscles match the day's focus
-            if any(kw in combined for kw in allowed):
-                validated.append(ex)
-            else:
-                print(
-                    f"   ⚠️ Removed '{ex_name}' from '{day.get('day_name')}' (muscles don't match focus: {combined[:80]})")
-        day["exercises"] = validated
+        _validate_day_focus(day)
+    timer.record("validate_focus", time.perf_counter() - t_validate)
 
     # ── Step 3: Fill underpopulated days from exercise database ──
     # The model typically generates Day 1 fully + partial Day 2 before
     # flan-t5-small truncates.  We fill remaining days from the SAME
     # exercise database the model was trained on (8 000+ real exercises).
+    t_fill = time.perf_counter()
     all_used_names: set = set()
     for day in plan.get("days", []):
         for ex in day.get("exercises", []):
             all_used_names.add(ex.get("name", "").lower())
 
-    MIN_EXERCISES = 4
     for day in plan.get("days", []):
-        current_count = len(day.get("exercises", []))
-        if current_count < MIN_EXERCISES:
-            needed = 5 - current_count  # target 5 per day
-            focus_areas = day.get("focus_areas", ["chest"])
-            print(
-                f"   📋 Day '{day.get('day_name', '')}' has {current_count} exercises — filling {needed} from exercise DB")
-
-            db_exercises = _pick_exercises_for_focus(
-                focus_areas, req_goal, req_level, n=needed, exclude=all_used_names,
-                equipment=req_equipment
-            )
-            for ex in db_exercises:
-                ex = enrich_exercise_with_metadata(ex)
-                day["exercises"].append(ex)
-                all_used_names.add(ex.get("name", "").lower())
-
-            print(f"   ✅ Day now has {len(day['exercises'])} exercises")
+        _fill_day_from_db(day, req_goal, req_level, req_equipment, all_used_names,
+                          req_injuries, rng)
+    timer.record("db_fill", time.perf_counter() - t_fill)
 
     total_exercises = sum(len(d.get("exercises", []))
                           for d in plan.get("days", []))
@@ -1843,14 +1586,24 @@ INJURY_SAFE_REPLACEMENTS: Dict[str, Dict[str, List[Dict[str, Any]]]] = {
 }
 
 
+# All blacklists compiled into one automaton: one scan per exercise name
+# finds every injury it is unsafe for (see injury_keyword_matcher.py)
+INJURY_MATCHER = InjuryKeywordMatcher(INJURY_EXERCISE_BLACKLIST)
+# Injury → bitmask of EXERCISE_DB ids unsafe for it (EXERCISE_INDEX layout)
+CATALOG_UNSAFE_IDS: Dict[str, int] = INJURY_MATCHER.id_masks(EXERCISE_INDEX.name_lower)
+
+
+def _unsafe_catalog_ids(injuries: Optional[List[str]]) -> int:
+    """Bitmask of catalog ids unsafe for any of *injuries*."""
+    mask = 0
+    for injury in injuries or ():
+        mask |= CATALOG_UNSAFE_IDS.get(injury, 0)
+    return mask
+
+
 def _is_exercise_unsafe(exercise_name: str, injury: str) -> bool:
     """Check if an exercise is unsafe for a given injury."""
-    blacklist = INJURY_EXERCISE_BLACKLIST.get(injury, [])
-    name_lower = exercise_name.lower()
-    for keyword in blacklist:
-        if keyword.lower() in name_lower:
-            return True
-    return False
+    return INJURY_MATCHER.is_unsafe(exercise_name, injury)
 
 
 def _get_replacement(injury: str, focus_hint: str, used_names: set) -> Optional[Dict[str, Any]]:
@@ -1999,132 +1752,126 @@ def _get_focus_area_exercises(focus_hint: str) -> list:
     return results
 
 
-def filter_exercises_for_injuries(plan: Dict[str, Any], injuries: List[str]) -> Dict[str, Any]:
+def _filter_day_for_injuries(day: Dict[str, Any], injuries: List[str],
+                             used_names: set) -> tuple[int, int]:
     """
-    Post-process a generated workout plan to remove exercises that are
-    unsafe for the user's reported injuries and replace them with safe
-    alternatives. This is the DEFINITIVE safety layer because the small
-    ML model cannot reliably follow injury constraints from prompt alone.
+    Replace or drop the exercises in *day* that are unsafe for *injuries*
+    and top up days left with fewer than 3.  *used_names* tracks the
+    replacements handed out across days.  Returns (removed, replaced).
     """
-    if not injuries or not plan:
-        return plan
-
-    used_names: set = set()  # track replacements already used to avoid duplicates
     removed_count = 0
     replaced_count = 0
 
-    for day in plan.get("days", []):
-        focus_hint = " ".join(day.get("focus_areas", []))
-        day_name = day.get("day_name", "")
-        focus_hint = f"{focus_hint} {day_name}"
+    focus_hint = " ".join(day.get("focus_areas", []))
+    day_name = day.get("day_name", "")
+    focus_hint = f"{focus_hint} {day_name}"
+
+    safe_exercises = []
+    for exercise in day.get("exercises", []):
+        ex_name = exercise.get("name", "")
+
+        # Check against ALL reported injuries (one scan of the name)
+        triggering_injury = INJURY_MATCHER.first_unsafe(ex_name, injuries)
+
+        if triggering_injury:
+            removed_count += 1
+            # Try to find a safe replacement
+            replacement = _get_replacement(
+                triggering_injury, focus_hint, used_names)
+            if replacement:
+                replacement["notes"] = f"⚠️ Replaced '{ex_name}' (unsafe for {triggering_injury} injury)"
+                safe_exercises.append(replacement)
+                replaced_count += 1
+                print(
+                    f"   🔄 Replaced '{ex_name}' → '{replacement['name']}' ({triggering_injury})")
+            else:
+                print(
+                    f"   ❌ Removed '{ex_name}' (unsafe for {triggering_injury}, no replacement found)")
+        else:
+            safe_exercises.append(exercise)
 
-        safe_exercises = []
-        for exercise in day.get("exercises", []):
-            ex_name = exercise.get("name", "")
+    day["exercises"] = safe_exercises
 
-            # Check against ALL reported injuries
-            is_unsafe = False
-            triggering_injury = ""
-            for injury in injuries:
-                if _is_exercise_unsafe(ex_name, injury):
-                    is_unsafe = True
-                    triggering_injury = injury
-                    break
+    # ── Fill underpopulated days (< 3 exercises) with safe alternatives ──
+    # Handles both empty days AND days where the model only generated 1-2 exercises.
+    if len(safe_exercises) < 3:
+        existing_names = {ex.get("name", "") for ex in safe_exercises}
+        needed = 5 - len(safe_exercises)
+        is_empty = len(safe_exercises) == 0
+        print(
+            f"   📋 Day '{day.get('day_name', '')}' has {len(safe_exercises)} exercises — adding up to {needed} more")
+
+        # Strategy: For empty days (e.g. Leg Day with knee injury), prioritize
+        # injury-safe replacements. For underpopulated days (e.g. Pull Day with
+        # 1 exercise), prioritize general focus-area pool to stay on-topic.
 
-            if is_unsafe:
-                removed_count += 1
-                # Try to find a safe replacement
-                replacement = _get_replacement(
-                    triggering_injury, focus_hint, used_names)
-                if replacement:
-                    replacement["notes"] = f"⚠️ Replaced '{ex_name}' (unsafe for {triggering_injury} injury)"
+        if is_empty and injuries:
+            # ── Empty day: injury-safe replacements first ──
+            for injury in injuries:
+                replacements = INJURY_SAFE_REPLACEMENTS.get(injury, {})
+                # Try focus-area match first
+                for category, exercises in replacements.items():
+                    if category in focus_hint.lower():
+                        for ex in exercises:
+                            if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
+                                replacement = dict(ex)
+                                replacement = enrich_exercise_with_metadata(
+                                    replacement)
+                                replacement["notes"] = f"✅ Safe for {injury} injury"
+                                safe_exercises.append(replacement)
+                                used_names.add(ex["name"])
+                                existing_names.add(ex["name"])
+                                replaced_count += 1
+
+                # If still not enough, grab from any category
+                if len(safe_exercises) < 3:
+                    for category, exercises in replacements.items():
+                        for ex in exercises:
+                            if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
+                                replacement = dict(ex)
+                                replacement = enrich_exercise_with_metadata(
+                                    replacement)
+                                replacement["notes"] = f"✅ Safe for {injury} injury"
+                                safe_exercises.append(replacement)
+                                used_names.add(ex["name"])
+                                existing_names.add(ex["name"])
+                                replaced_count += 1
+
+        # ── General focus-area exercise pool (matches the day's focus) ──
+        if len(safe_exercises) < 5:
+            focus_pool = _get_focus_area_exercises(focus_hint)
+            for ex in focus_pool:
+                if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
+                    replacement = dict(ex)
+                    replacement = enrich_exercise_with_metadata(
+                        replacement)
+                    replacement["notes"] = "Auto-filled to meet minimum exercises"
                     safe_exercises.append(replacement)
+                    used_names.add(ex["name"])
+                    existing_names.add(ex["name"])
                     replaced_count += 1
-                    print(
-                        f"   🔄 Replaced '{ex_name}' → '{replacement['name']}' ({triggering_injury})")
-                else:
-                    print(
-                        f"   ❌ Removed '{ex_name}' (unsafe for {triggering_injury}, no replacement found)")
-            else:
-                safe_exercises.append(exercise)
 
         day["exercises"] = safe_exercises
+        if safe_exercises:
+            print(f"   ✅ Day now has {len(safe_exercises)} exercises")
+
+    # ── Deduplicate exercises within the day ──
+    seen_in_day = set()
+    unique_exercises = []
+    for ex in day["exercises"]:
+        ex_name = ex.get("name", "")
+        if ex_name not in seen_in_day:
+            seen_in_day.add(ex_name)
+            unique_exercises.append(ex)
+        else:
+            print(f"   🔁 Removed duplicate: '{ex_name}'")
+    day["exercises"] = unique_exercises
 
-        # ── Fill underpopulated days (< 3 exercises) with safe alternatives ──
-        # Handles both empty days AND days where the model only generated 1-2 exercises.
-        if len(safe_exercises) < 3:
-            existing_names = {ex.get("name", "") for ex in safe_exercises}
-            needed = 5 - len(safe_exercises)
-            is_empty = len(safe_exercises) == 0
-            print(
-                f"   📋 Day '{day.get('day_name', '')}' has {len(safe_exercises)} exercises — adding up to {needed} more")
-
-            # Strategy: For empty days (e.g. Leg Day with knee injury), prioritize
-            # injury-safe replacements. For underpopulated days (e.g. Pull Day with
-            # 1 exercise), prioritize general focus-area pool to stay on-topic.
+    return removed_count, replaced_count
 
-            if is_empty and injuries:
-                # ── Empty day: injury-safe replacements first ──
-                for injury in injuries:
-                    replacements = INJURY_SAFE_REPLACEMENTS.get(injury, {})
-                    # Try focus-area match first
-                    for category, exercises in replacements.items():
-                        if category in focus_hint.lower():
-                            for ex in exercises:
-                                if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
-                                    replacement = dict(ex)
-                                    replacement = enrich_exercise_with_metadata(
-                                        replacement)
-                                    replacement["notes"] = f"✅ Safe for {injury} injury"
-                                    safe_exercises.append(replacement)
-                                    used_names.add(ex["name"])
-                                    existing_names.add(ex["name"])
-                                    replaced_count += 1
-
-                    # If still not enough, grab from any category
-                    if len(safe_exercises) < 3:
-                        for category, exercises in replacements.items():
-                            for ex in exercises:
-                                if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
-                                    replacement = dict(ex)
-                                    replacement = enrich_exercise_with_metadata(
-                                        replacement)
-                                    replacement["notes"] = f"✅ Safe for {injury} injury"
-                                    safe_exercises.append(replacement)
-                                    used_names.add(ex["name"])
-                                    existing_names.add(ex["name"])
-                                    replaced_count += 1
-
-            # ── General focus-area exercise pool (matches the day's focus) ──
-            if len(safe_exercises) < 5:
-                focus_pool = _get_focus_area_exercises(focus_hint)
-                for ex in focus_pool:
-                    if ex["name"] not in used_names and ex["name"] not in existing_names and len(safe_exercises) < 5:
-                        replacement = dict(ex)
-                        replacement = enrich_exercise_with_metadata(
-                            replacement)
-                        replacement["notes"] = "Auto-filled to meet minimum exercises"
-                        safe_exercises.append(replacement)
-                        used_names.add(ex["name"])
-                        existing_names.add(ex["name"])
-                        replaced_count += 1
-
-            day["exercises"] = safe_exercises
-            if safe_exercises:
-                print(f"   ✅ Day now has {len(safe_exercises)} exercises")
-
-        # ── Deduplicate exercises within the day ──
-        seen_in_day = set()
-        unique_exercises = []
-        for ex in day["exercises"]:
-            ex_name = ex.get("name", "")
-            if ex_name not in seen_in_day:
-                seen_in_day.add(ex_name)
-                unique_exercises.append(ex)
-            else:
-                print(f"   🔁 Removed duplicate: '{ex_name}'")
-        day["exercises"] = unique_exercises
 
+def _note_injury_filter(plan: Dict[str, Any], injuries: List[str],
+                        removed_count: int, replaced_count: int) -> None:
     if removed_count > 0:
         injury_list = ", ".join(injuries)
         existing_notes = plan.get("notes", "")
@@ -2135,9 +1882,106 @@ def filter_exercises_for_injuries(plan: Dict[str, Any], injuries: List[str]) ->
         print(
             f"✅ Injury filter: all exercises are safe for [{', '.join(injuries)}]")
 
+
+def filter_exercises_for_injuries(plan: Dict[str, Any], injuries: List[str]) -> Dict[str, Any]:
+    """
+    Post-process a generated workout plan to remove exercises that are
+    unsafe for the user's reported injuries and replace them with safe
+    alternatives. This is the DEFINITIVE safety layer because the small
+    ML model cannot reliably follow injury constraints from prompt alone.
+    """
+    if not injuries or not plan:
+        return plan
+
+    used_names: set = set()  # track replacements already used to avoid duplicates
+    removed_count = 0
+    replaced_count = 0
+
+    for day in plan.get("days", []):
+        removed, replaced = _filter_day_for_injuries(day, injuries, used_names)
+        removed_count += removed
+        replaced_count += replaced
+
+    _note_injury_filter(plan, injuries, removed_count, replaced_count)
     return plan
 
 
+# Request injury strings → engine regions.  String injuries carry no
+# severity etc., so each becomes the same conservative default InjuryInput.
+_INJURY_REGION_MAP: Dict[str, Any] = {}
+# Every combination of those regions → its (frozen) engine decision,
+# computed once at import: Layer 0 is a dict lookup per request.
+INJURY_DECISIONS_BY_REGIONS: Dict[frozenset, Any] = {}
+
+
+def _default_injury_input(region: Any) -> Any:
+    return InjuryInput(
+        injury_region=region,
+        injury_type=InjuryType.PAIN,
+        severity=Severity.MODERATE,          # conservative default
+        duration_category=DurationCategory.CHRONIC,
+        pain_now=4,
+        pain_with_daily_activity=False,
+        range_of_motion_limited=True,
+        doctor_cleared=False,
+        currently_in_physio=False,
+        movements_that_hurt=[],
+        recent_trauma=False,
+        unexplained_swelling=False,
+        major_weakness=False,
+        systemic_symptoms=False,
+        worsening=False,
+    )
+
+
+if INJURY_RULES_AVAILABLE:
+    _INJURY_REGION_MAP.update({
+        "Lower Back": InjuryRegion.LOWER_BACK,
+        "Shoulder": InjuryRegion.SHOULDER,
+        "Knee": InjuryRegion.KNEE,
+        "Wrist": InjuryRegion.WRIST,
+        "Elbow": InjuryRegion.ELBOW,
+        "Hip": InjuryRegion.HIP,
+        "Ankle": InjuryRegion.ANKLE,
+        "Neck": InjuryRegion.NECK,
+        "Upper Back": InjuryRegion.UPPER_BACK,
+    })
+    _t_rules = time.perf_counter()
+    _regions = list(_INJURY_REGION_MAP.values())
+    for _k in range(1, len(_regions) + 1):
+        for _combo in itertools.combinations(_regions, _k):
+            INJURY_DECISIONS_BY_REGIONS[frozenset(_combo)] = INJURY_ENGINE.evaluate(
+                [_default_injury_input(r) for r in _combo])
+    print(f"✅ Precomputed {len(INJURY_DECISIONS_BY_REGIONS)} injury-rule decisions "
+          f"in {(time.perf_counter() - _t_rules) * 1000:.0f}ms")
+
+
+def _evaluate_injury_rules(injuries: List[str]) -> Optional[tuple]:
+    """
+    Layer 0: InjuryRulesEngine decision for the request's string injuries
+    (precomputed per region set; repeats and order don't matter).
+    Returns (engine, decision), or None if no injury maps to a region.
+    """
+    regions = frozenset(_INJURY_REGION_MAP[inj] for inj in injuries
+                        if inj in _INJURY_REGION_MAP)
+    if not regions:
+        return None
+    injury_decision = INJURY_DECISIONS_BY_REGIONS[regions]
+    print(f"\u2705 InjuryRulesEngine decision: "
+          f"contraindicated={sorted(injury_decision.contraindicated_patterns)}, "
+          f"restricted={sorted(injury_decision.restricted_patterns)}")
+    return INJURY_ENGINE, injury_decision
+
+
+def _note_injury_decision(plan: Dict[str, Any], injury_decision: Any) -> None:
+    """Add the engine's coaching notes / clearance flags to the plan."""
+    if injury_decision.coaching_notes:
+        plan["injury_coaching_notes"] = list(injury_decision.coaching_notes)
+    if injury_decision.requires_clearance:
+        plan["medical_clearance_required"] = True
+        plan["clearance_reasons"] = list(injury_decision.clearance_reasons)
+
+
 # ============================================================
 # Warmup & Cardio Generation (backed by calisthenics dataset)
 # ============================================================
@@ -2168,46 +2012,49 @@ _INJURY_UNSAFE_CALISTHENICS_CATS: Dict[str, set] = {
 }
 
 
-def generate_warmup_and_cardio(
+# Safe warm-up categories / cardio candidates for every injury combination
+WARMUP_CARDIO_POOLS = WarmupCardioPools(
+    CALISTHENICS_BY_CATEGORY, _WARMUP_CATEGORY_ORDER,
+    _INJURY_UNSAFE_CALISTHENICS_CATS, sorted(set(_GOAL_TO_CARDIO_CATEGORY.values())),
+)
+
+
+def generate_warmup_and_cardio_days(
     goal: str,
     fitness_level: str,
     injuries: Optional[List[str]] = None,
     n_warmup: int = 3,
     n_cardio: int = 1,
-) -> Dict[str, Any]:
+    n_days: int = 1,
+    rng: Optional[random.Random] = None,
+) -> List[Dict[str, Any]]:
     """
-    Select warm-up exercises and an optional cardio finisher from the
-    calisthenics dataset.  Selections are:
+    Select warm-up exercises and an optional cardio finisher for each of
+    *n_days* training days from the calisthenics dataset.  Selections are:
       - Injury-safe (excluded categories per injury map)
       - Level-appropriate (beginner gets progression_1 cues, advanced gets progression_3)
       - Goal-aligned (cardio category chosen by goal)
+      - Different per day, as far as the safe pool allows
 
-    Returns a dict with keys `warmup` (list) and `cardio` (list).
+    Returns one dict per day with keys `warmup` (list) and `cardio` (list);
+    no lists or exercise dicts are shared between days.
     """
-    import random as _rand
-
-    injuries = injuries or []
-
-    # Build excluded category set from injuries
-    excluded_cats: set = set()
-    for inj in injuries:
-        excluded_cats.update(_INJURY_UNSAFE_CALISTHENICS_CATS.get(inj, set()))
-
+    rng = rng or random.Random()
     # Determine appropriate progression index from fitness level
     level_lower = fitness_level.lower()
     prog_idx = 0 if "beginner" in level_lower else (
         2 if "advanced" in level_lower else 1)
 
-    # ── Warm-up selection ──
-    warmup_exercises: List[Dict[str, Any]] = []
-    for cat in _WARMUP_CATEGORY_ORDER:
-        if cat in excluded_cats:
-            continue
-        pool = [e for e in CALISTHENICS_BY_CATEGORY.get(cat, [])]
-        _rand.shuffle(pool)
-        for entry in pool:
-            if len(warmup_exercises) >= n_warmup:
-                break
+    goal_key = goal if goal in _GOAL_TO_CARDIO_CATEGORY else "General"
+    duration = "10-15 min" if goal_key in {"WeightLoss", "Endurance"} else "5-8 min"
+    warmup_days = WARMUP_CARDIO_POOLS.warmups(injuries, n_warmup, n_days, rng)
+    cardio_days = WARMUP_CARDIO_POOLS.cardio(
+        injuries, _GOAL_TO_CARDIO_CATEGORY[goal_key], n_cardio, n_days, rng)
+
+    days: List[Dict[str, Any]] = []
+    for warmup_picks, cardio_picks in zip(warmup_days, cardio_days):
+        warmup_exercises: List[Dict[str, Any]] = []
+        for cat, entry in warmup_picks:
             progression = entry["progressions"][prog_idx] if entry["progressions"] else entry["name"]
             warmup_exercises.append({
                 "name":            entry["name"],
@@ -2220,47 +2067,56 @@ def generate_warmup_and_cardio(
                 "progression_cue": progression,
                 "notes":           "Warm-up: perform with controlled tempo",
             })
-        if len(warmup_exercises) >= n_warmup:
-            break
+        cardio_exercises: List[Dict[str, Any]] = []
+        for entry in cardio_picks:
+            progression = entry["progressions"][prog_idx] if entry["progressions"] else entry["name"]
+            cardio_exercises.append({
+                "name":            entry["name"],
+                "category":        entry["category"],
+                "sets":            "1",
+                "reps":            duration,
+                "rest":            "none",
+                "target_muscles":  entry["primary_muscles"][:3],
+                "description":     entry["description"],
+                "progression_cue": progression,
+                "notes":           "Cardio/finisher: maintain consistent pace",
+            })
+        days.append({"warmup": warmup_exercises, "cardio": cardio_exercises})
+    return days
 
-    # ── Cardio / finisher selection ──
-    cardio_exercises: List[Dict[str, Any]] = []
-    goal_key = goal if goal in _GOAL_TO_CARDIO_CATEGORY else "General"
-    pref_cat = _GOAL_TO_CARDIO_CATEGORY[goal_key]
-
-    # Try preferred category first, then fall back to any non-excluded
-    cardio_candidates = [e for e in CALISTHENICS_BY_CATEGORY.get(pref_cat, [])
-                         if pref_cat not in excluded_cats]
-    if not cardio_candidates:
-        cardio_candidates = [
-            e for cat, entries in CALISTHENICS_BY_CATEGORY.items()
-            if cat not in excluded_cats
-            for e in entries
-        ]
-    _rand.shuffle(cardio_candidates)
-    for entry in cardio_candidates[:n_cardio]:
-        progression = entry["progressions"][prog_idx] if entry["progressions"] else entry["name"]
-        duration = "10-15 min" if goal_key in {
-            "WeightLoss", "Endurance"} else "5-8 min"
-        cardio_exercises.append({
-            "name":            entry["name"],
-            "category":        entry["category"],
-            "sets":            "1",
-            "reps":            duration,
-            "rest":            "none",
-            "target_muscles":  entry["primary_muscles"][:3],
-            "description":     entry["description"],
-            "progression_cue": progression,
-            "notes":           "Cardio/finisher: maintain consistent pace",
-        })
 
-    return {"warmup": warmup_exercises, "cardio": cardio_exercises}
+def generate_warmup_and_cardio(
+    goal: str,
+    fitness_level: str,
+    injuries: Optional[List[str]] = None,
+    n_warmup: int = 3,
+    n_cardio: int = 1,
+    rng: Optional[random.Random] = None,
+) -> Dict[str, Any]:
+    """
+    One day's warm-up and cardio (see ``generate_warmup_and_cardio_days``).
+
+    Returns a dict with keys `warmup` (list) and `cardio` (list).
+    """
+    return generate_warmup_and_cardio_days(
+        goal, fitness_level, injuries, n_warmup, n_cardio, n_days=1, rng=rng)[0]
 
 
 # ============================================================
 # API Endpoints
 # ============================================================
 
+def _request_rng(seed: Optional[int]) -> tuple[int, random.Random]:
+    """
+    The request's own RNG and the seed it was built from.  Never the shared
+    ``random`` module state, so concurrent requests can't disturb each
+    other's picks; unseeded requests get a fresh seed to report back.
+    """
+    if seed is None:
+        seed = int.from_bytes(os.urandom(4), "big")
+    return seed, random.Random(seed)
+
+
 @app.post("/generate-direct", response_model=DirectWorkoutResponse)
 async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
     """
@@ -2269,17 +2125,27 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
     """
     start_time = time.time()
     user_context_retrieved = False
+    timer = StageTimer(STAGE_SECONDS)
+    seed, rng = _request_rng(req.seed)
+
+    def _timings() -> Optional[Dict[str, float]]:
+        """Close out the stage timer; return the timings only in debug mode."""
+        timer.finish()
+        REQUEST_SECONDS.observe("/generate-direct", time.time() - start_time)
+        return timer.as_ms() if req.debug else None
 
     try:
         # 1. Retrieve user context from database (RAG pattern)
         user_context = {}
         if req.include_user_context:
-            user_context = await retrieve_user_context(req.user_id)
+            with timer.stage("retrieve_user_context"):
+                user_context = await retrieve_user_context(req.user_id)
             user_context_retrieved = len(user_context) > 0
             print(f"📊 User context retrieved: {user_context_retrieved}")
 
         # 2. Build prompt with user context
-        prompt = build_prompt_with_context(req, user_context)
+        with timer.stage("build_prompt"):
+            prompt = build_prompt_with_context(req, user_context)
         print(f"📝 Prompt: {prompt[:200]}...")
 
         # 3. Generate plan using ML model (one call per day to avoid truncation)
@@ -2290,6 +2156,8 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
             req.fitness_level,
             req.equipment,
             req.injuries,
+            timer=timer,
+            rng=rng,
         )
 
         # 4. Calculate latency
@@ -2304,75 +2172,32 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
                 model_version=MODEL_VERSION,
                 generation_latency_ms=latency_ms,
                 user_context_retrieved=user_context_retrieved,
-                error=error or "AI model failed to generate a valid workout plan"
+                error=error or "AI model failed to generate a valid workout plan",
+                stage_timings_ms=_timings(),
             )
 
         # 5a. InjuryRulesEngine — movement-pattern aware pre-filter (Layer 0)
         # This is a SEPARATE safety pass from the keyword blacklist below.
         # It operates on clinical movement patterns (squat, hip_hinge, etc.)
         # rather than exercise names, catching exercises the keyword list misses.
-        if req.injuries:
+        if req.injuries and INJURY_RULES_AVAILABLE:
             try:
-                from injury_rules_engine import InjuryRulesEngine, InjuryInput, InjuryRegion, InjuryType, Severity, DurationCategory
-                _engine = InjuryRulesEngine()
-
-                # Build InjuryInput objects with conservative defaults for simple string injuries
-                _INJURY_REGION_MAP = {
-                    "Lower Back": InjuryRegion.LOWER_BACK,
-                    "Shoulder": InjuryRegion.SHOULDER,
-                    "Knee": InjuryRegion.KNEE,
-                    "Wrist": InjuryRegion.WRIST,
-                    "Elbow": InjuryRegion.ELBOW,
-                    "Hip": InjuryRegion.HIP,
-                    "Ankle": InjuryRegion.ANKLE,
-                    "Neck": InjuryRegion.NECK,
-                    "Upper Back": InjuryRegion.UPPER_BACK,
-                }
-                injury_inputs = []
-                for inj_str in req.injuries:
-                    region = _INJURY_REGION_MAP.get(inj_str)
-                    if region:
-                        injury_inputs.append(InjuryInput(
-                            injury_region=region,
-                            injury_type=InjuryType.PAIN,
-                            severity=Severity.MODERATE,          # conservative default
-                            duration_category=DurationCategory.CHRONIC,
-                            pain_now=4,
-                            pain_with_daily_activity=False,
-                            range_of_motion_limited=True,
-                            doctor_cleared=False,
-                            currently_in_physio=False,
-                            movements_that_hurt=[],
-                            recent_trauma=False,
-                            unexplained_swelling=False,
-                            major_weakness=False,
-                            systemic_symptoms=False,
-                            worsening=False,
-                        ))
-
-                if injury_inputs:
-                    injury_decision = _engine.evaluate(injury_inputs)
-                    print(f"\u2705 InjuryRulesEngine decision: "
-                          f"contraindicated={injury_decision.contraindicated_patterns}, "
-                          f"restricted={injury_decision.restricted_patterns}")
-
-                    # Add coaching notes to plan
-                    if injury_decision.coaching_notes:
-                        plan["injury_coaching_notes"] = injury_decision.coaching_notes
-                    if injury_decision.requires_clearance:
-                        plan["medical_clearance_required"] = True
-                        plan["clearance_reasons"] = injury_decision.clearance_reasons
-
-                    # Filter each day's exercises by movement pattern
-                    for _day in plan.get("days", []):
-                        _day["exercises"] = _engine.filter_exercises(
-                            _day.get("exercises", []), injury_decision
-                        )
+                with timer.stage("injury_rules_evaluate"):
+                    injury_rules = _evaluate_injury_rules(req.injuries)
+
+                if injury_rules:
+                    _engine, injury_decision = injury_rules
+                    _note_injury_decision(plan, injury_decision)
+
+                    # Filter each day's exercises by movement pattern (one batch call)
+                    with timer.stage("injury_rules_filter"):
+                        _days = plan.get("days", [])
+                        _kept = _engine.filter_exercise_lists(
+                            [_day.get("exercises", []) for _day in _days], injury_decision)
+                        for _day, _exercises in zip(_days, _kept):
+                            _day["exercises"] = _exercises
                     print(f"\u2705 InjuryRulesEngine movement-pattern filter applied")
 
-            except ImportError:
-                print(
-                    "\u26a0\ufe0f injury_rules_engine not importable — skipping Layer-0 filter")
             except Exception as _ie:
                 print(
                     f"\u26a0\ufe0f InjuryRulesEngine error (non-fatal): {_ie}")
@@ -2383,18 +2208,22 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
         if req.injuries:
             print(
                 f"\U0001f6e1\ufe0f Applying injury keyword filter for: {req.injuries}")
-            plan = filter_exercises_for_injuries(plan, req.injuries)
-
-        # 6. Attach warmup & cardio to every training day (from calisthenics dataset)
-        if CALISTHENICS_DB:
-            wc = generate_warmup_and_cardio(
-                goal=req.goal,
-                fitness_level=req.fitness_level,
-                injuries=req.injuries,
-                n_warmup=3,
-                n_cardio=1 if req.goal in {"WeightLoss", "Endurance"} else 0,
-            )
-            for day in plan.get("days", []):
+            with timer.stage("injury_keyword_filter"):
+                plan = filter_exercises_for_injuries(plan, req.injuries)
+
+        # 6. Attach a warmup & cardio to every training day (from calisthenics dataset)
+        if CALISTHENICS_DB and plan.get("days"):
+            with timer.stage("warmup_cardio"):
+                wc_days = generate_warmup_and_cardio_days(
+                    goal=req.goal,
+                    fitness_level=req.fitness_level,
+                    injuries=req.injuries,
+                    n_warmup=3,
+                    n_cardio=1 if req.goal in {"WeightLoss", "Endurance"} else 0,
+                    n_days=len(plan["days"]),
+                    rng=rng,
+                )
+            for day, wc in zip(plan["days"], wc_days):
                 day["warmup"] = wc["warmup"]
                 if wc["cardio"]:
                     day["cardio"] = wc["cardio"]
@@ -2407,9 +2236,14 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
             model_version=MODEL_VERSION,
             generation_latency_ms=latency_ms,
             user_context_retrieved=user_context_retrieved,
-            error=None
+            error=None,
+            stage_timings_ms=_timings(),
+            seed=seed,
         )
 
+    except HTTPException:
+        timer.finish()
+        raise
     except Exception as e:
         latency_ms = int((time.time() - start_time) * 1000)
         print(f"❌ Error in generate_direct: {e}")
@@ -2419,20 +2253,291 @@ async def generate_direct(req: DirectWorkoutRequest) -> DirectWorkoutResponse:
             model_version=MODEL_VERSION,
             generation_latency_ms=latency_ms,
             user_context_retrieved=user_context_retrieved,
-            error=str(e)
+            error=str(e),
+            stage_timings_ms=_timings(),
         )
 
 
+def _sse(event: str, data: Any) -> str:
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/generate-direct/stream")
+async def generate_direct_stream(req: DirectWorkoutRequest) -> StreamingResponse:
+    """
+    Streaming variant of /generate-direct (Server-Sent Events).
+
+    Events, in order:
+      context  – user context retrieved, prompt built
+      token    – raw model text as it is decoded (skipped on a plan-cache hit)
+      day      – a finished day: focus-validated, DB-filled, injury-filtered,
+                 warmup/cardio attached — sent as soon as the model closes it
+      plan     – the complete plan, same shape as the /generate-direct response
+      error    – generation failed; no plan event follows
+
+    The model decodes greedily here (streamers can't follow beam search), so
+    the raw text may differ from /generate-direct's and is not put in the
+    plan cache; a cached beam-search result is served if there is one.
+    Days that need exercises borrowed from later in the output are held
+    back and sent, with any template days, once generation finishes.
+    """
+    start_time = time.time()
+    timer = StageTimer(STAGE_SECONDS)
+    seed, rng = _request_rng(req.seed)
+
+    # Context, prompt and cache lookup happen before the stream opens so
+    # a 503 (model still loading) is a normal HTTP error, not an SSE event
+    user_context = {}
+    if req.include_user_context:
+        with timer.stage("retrieve_user_context"):
+            user_context = await retrieve_user_context(req.user_id)
+    user_context_retrieved = len(user_context) > 0
+    with timer.stage("build_prompt"):
+        prompt = build_prompt_with_context(req, user_context)
+    with timer.stage("plan_cache_lookup"):
+        cached = PLAN_CACHE.get(prompt)
+    if cached is None and not MODEL_LOADER.ready:
+        timer.finish()
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is not ready (state={MODEL_LOADER.state})",
+            headers={"Retry-After": "10"},
+        )
+
+    async def events() -> AsyncIterator[str]:
+        cancelled = threading.Event()
+        used_names: set = set()          # cross-day DB fill
+        injury_used_names: set = set()   # Layer-1 replacements
+        injury_counts = [0, 0]           # removed, replaced
+        days_out: List[Dict[str, Any]] = []
+
+        injury_rules = None
+        if req.injuries and INJURY_RULES_AVAILABLE:
+            try:
+                with timer.stage("injury_rules_evaluate"):
+                    injury_rules = _evaluate_injury_rules(req.injuries)
+            except Exception as _ie:
+                print(f"\u26a0\ufe0f InjuryRulesEngine error (non-fatal): {_ie}")
+        wc_days: List[Dict[str, Any]] = []
+        if CALISTHENICS_DB:
+            with timer.stage("warmup_cardio"):
+                wc_days = generate_warmup_and_cardio_days(
+                    goal=req.goal,
+                    fitness_level=req.fitness_level,
+                    injuries=req.injuries,
+                    n_warmup=3,
+                    n_cardio=1 if req.goal in {"WeightLoss", "Endurance"} else 0,
+                    n_days=max(1, req.days_per_week),
+                    rng=rng,
+                )
+
+        def finish_day(day: Dict[str, Any]) -> Dict[str, Any]:
+            """/generate-direct steps 2b, 3, 5a, 5b and 6 for one day."""
+            with timer.stage("validate_focus"):
+                _validate_day_focus(day)
+            with timer.stage("db_fill"):
+                for ex in day.get("exercises", []):
+                    used_names.add(ex.get("name", "").lower())
+                _fill_day_from_db(day, req.goal, req.fitness_level,
+                                  req.equipment, used_names, req.injuries, rng)
+            if injury_rules:
+                _engine, injury_decision = injury_rules
+                with timer.stage("injury_rules_filter"):
+                    day["exercises"] = _engine.filter_exercises(
+                        day.get("exercises", []), injury_decision)
+            if req.injuries:
+                with timer.stage("injury_keyword_filter"):
+                    removed, replaced = _filter_day_for_injuries(
+                        day, req.injuries, injury_used_names)
+                injury_counts[0] += removed
+                injury_counts[1] += replaced
+            if wc_days:
+                # The model may emit more days than requested — cycle
+                wc = wc_days[len(days_out) % len(wc_days)]
+                day["warmup"] = wc["warmup"]
+                if wc["cardio"]:
+                    day["cardio"] = wc["cardio"]
+            days_out.append(day)
+            if len(days_out) == 1:
+                timer.record("time_to_first_day", time.time() - start_time)
+            return day
+
+        try:
+            yield _sse("context", {
+                "user_context_retrieved": user_context_retrieved,
+                "plan_cache_hit": cached is not None,
+                "model_version": MODEL_VERSION,
+                "seed": seed,
+            })
+
+            if cached is not None:
+                print(f"   ♻️ Plan cache hit — streaming cached plan")
+                parse_key = json.dumps([req.days_per_week, req.goal,
+                                        req.fitness_level, req.equipment or []])
+                if cached["parse_key"] == parse_key:
+                    plan = cached["plan"]
+                else:
+                    with timer.stage("parse_model_output"):
+                        plan = extract_workout_from_model_output(
+                            cached["raw_output"], req_days=req.days_per_week,
+                            req_goal=req.goal, req_level=req.fitness_level,
+                            req_equipment=req.equipment)
+            else:
+                loop = asyncio.get_running_loop()
+                queue: asyncio.Queue = asyncio.Queue()
+                gen_timings: Dict[str, float] = {}
+
+                def run_model() -> str:
+                    try:
+                        return _generate_plan_sync(
+                            prompt,
+                            on_text=lambda t: loop.call_soon_threadsafe(queue.put_nowait, t),
+                            cancelled=cancelled,
+                            timings=gen_timings,
+                        )
+                    finally:
+                        loop.call_soon_threadsafe(queue.put_nowait, None)
+
+                future = loop.run_in_executor(stream_executor, run_model)
+                scanner = ModelOutputScanner()
+                holding = False   # a day needed the global pool → rest waits for the end
+                while True:
+                    piece = await queue.get()
+                    if piece is None:
+                        break
+                    yield _sse("token", {"text": piece})
+                    for kind, _, value in scanner.feed(piece):
+                        if kind != "day" or holding:
+                            continue
+                        day = _day_from_scan(value, [], req.equipment)
+                        if not day["exercises"]:
+                            holding = True
+                            continue
+                        day["exercises"] = [enrich_exercise_with_metadata(ex)
+                                            for ex in day["exercises"]]
+                        yield _sse("day", finish_day(day))
+                raw_output = await future
+                for stage_name, seconds in gen_timings.items():
+                    timer.record(stage_name, seconds)
+                print(f"   📄 Streamed model output: {len(raw_output)} chars")
+
+                # Whole-output parse: metadata, held-back days, template days
+                with timer.stage("parse_model_output"):
+                    plan = extract_workout_from_model_output(
+                        raw_output, req_days=req.days_per_week, req_goal=req.goal,
+                        req_level=req.fitness_level, req_equipment=req.equipment)
+
+            for day in plan.get("days", [])[len(days_out):]:
+                yield _sse("day", finish_day(day))
+            plan["days"] = days_out
+
+            total_exercises = sum(len(d.get("exercises", [])) for d in days_out)
+            if total_exercises == 0:
+                yield _sse("error", {"error": "Model failed to generate exercises"})
+                return
+
+            if injury_rules:
+                _note_injury_decision(plan, injury_rules[1])
+            if req.injuries:
+                _note_injury_filter(plan, req.injuries, *injury_counts)
+
+            timer.finish()
+            yield _sse("plan", DirectWorkoutResponse(
+                plan=plan,
+                is_valid_json=True,
+                model_version=MODEL_VERSION,
+                generation_latency_ms=int((time.time() - start_time) * 1000),
+                user_context_retrieved=user_context_retrieved,
+                error=None,
+                stage_timings_ms=timer.as_ms() if req.debug else None,
+                seed=seed,
+            ).model_dump())
+        except Exception as e:
+            print(f"❌ Error in generate_direct_stream: {e}")
+            yield _sse("error", {"error": str(e)})
+        finally:
+            # Client gone or stream done — stop the model if it's still decoding
+            cancelled.set()
+            timer.finish()
+            REQUEST_SECONDS.observe("/generate-direct/stream", time.time() - start_time)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/injury-screening/batch")
+async def injury_screening_batch(request: Request) -> StreamingResponse:
+    """
+    Bulk injury clearance for member imports (NDJSON in, NDJSON out).
+
+    One member per line — ``{"member_id": ..., "injuries": [{...}, ...]}``
+    with each injury in the ``InjuryRulesEngine.from_dict`` format.  One
+    ``{"line", "member_id", "decision"}`` (or ``"error"``) line comes back
+    per input line, in order, while the upload is still being read.
+    Runs on the rules engine only, so it never waits behind generation.
+    """
+    if INJURY_SCREENER is None:
+        raise HTTPException(status_code=503, detail="Injury rules engine is not available")
+    start_time = time.time()
+
+    async def lines() -> AsyncIterator[str]:
+        try:
+            async for out in INJURY_SCREENER.screen(ndjson_lines(request.stream())):
+                yield out
+        finally:
+            REQUEST_SECONDS.observe("/injury-screening/batch", time.time() - start_time)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @app.get("/health")
 def health():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
+    """Health check endpoint — reports model readiness while it loads in the background"""
+    status = {"ready": "healthy", "failed": "unhealthy"}.get(MODEL_LOADER.state, "loading")
+    body = {
+        "status": status,
+        "ready": MODEL_LOADER.ready,
+        "model": MODEL_LOADER.status(),
         "model_version": MODEL_VERSION,
         "device": device,
         "database_connected": db_pool is not None,
+        "batching": generation_batcher.stats(),
+        "user_context_cache": user_context_cache.stats(),
+        "plan_cache": PLAN_CACHE.stats(),
+        "injury_screening": INJURY_SCREENER.stats() if INJURY_SCREENER else None,
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
+    if MODEL_LOADER.state == "failed":
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+
+@app.post("/cache/invalidate/{user_id}")
+async def invalidate_user_context(user_id: int,
+                                  x_cache_token: Optional[str] = Header(None)):
+    """Drop a member's cached context (called by the backend after new InBody/scan data)"""
+    if not CACHE_INVALIDATE_TOKEN:
+        raise HTTPException(status_code=503,
+                            detail="Cache invalidation is not configured")
+    if not x_cache_token or not hmac.compare_digest(x_cache_token, CACHE_INVALIDATE_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid cache token")
+    was_cached = await user_context_cache.invalidate(user_id)
+    print(f"🧹 User-context cache invalidated for user {user_id}")
+    # Without Redis, other workers' copies expire on their own (local_ttl_s)
+    return {"user_id": user_id, "invalidated": True, "was_cached": was_cached,
+            "all_workers": (user_context_cache.backend is not None
+                            or user_context_cache.workers == 1)}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus scrape endpoint: stage histograms + batcher gauges"""
+    return PlainTextResponse(METRICS.render(),
+                             media_type="text/plain; version=0.0.4")
 
 
 @app.get("/")
@@ -2442,7 +2547,7 @@ def root():
         "message": "Workout Plan Generator ML Service (Direct Mode) is running!",
         "model_version": MODEL_VERSION,
         "device": device,
-        "endpoints": ["/generate-direct", "/health"],
+        "endpoints": ["/generate-direct", "/generate-direct/stream", "/injury-screening/batch", "/health", "/metrics", "/cache/invalidate/{user_id}"],
         "optimization": "Frontend → FastAPI (direct) → PostgreSQL (RAG) → ML Model"
     }
 